@@ -2,6 +2,7 @@ import axios from 'axios';
 import {
   TraceResponse,
   SessionResponse,
+  SessionSummaryResponse,
   TypesResponse,
   FunctionsResponse,
   TagsResponse,
@@ -60,6 +61,14 @@ export const getSessions = async (limit?: number): Promise<SessionResponse> => {
   return response.data;
 };
 
+export const getSessionSummaries = async (limit?: number): Promise<SessionSummaryResponse> => {
+  const params: Record<string, number> = {};
+  if (limit) params.limit = limit;
+
+  const response = await apiClient.get<SessionSummaryResponse>('/traces/sessions/summary', { params });
+  return response.data;
+};
+
 export const getTraceTypes = async (): Promise<TypesResponse> => {
   const response = await apiClient.get<TypesResponse>('/traces/types');
   return response.data;
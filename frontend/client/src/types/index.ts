@@ -25,6 +25,23 @@ export interface SessionResponse {
   sessions: string[];
 }
 
+export interface SessionSummary {
+  session_id: string;
+  first_timestamp: string | null;
+  last_timestamp: string | null;
+  span_count: number;
+  error_count: number;
+  total_duration_ms: number;
+  tags: string[];
+  eval_ids: string[];
+}
+
+export interface SessionSummaryResponse {
+  success: boolean;
+  count: number;
+  sessions: SessionSummary[];
+}
+
 export interface TypesResponse {
   success: boolean;
   count: number;
@@ -1,4 +1,5 @@
 import { getDb } from '../services/dbService';
+import { refreshSessionSummary } from './traceRepository';
 
 /**
  * Check if a table exists in the database
@@ -284,8 +285,12 @@ export const deleteEval = async (evalId: string): Promise<boolean> => {
     await db.run('DELETE FROM eval_events WHERE eval_id = ?', evalId);
     
     // Delete the evaluation itself
+    const evaluation = await db.get('SELECT session_id FROM eval_results WHERE id = ?', evalId);
     const result = await db.run('DELETE FROM eval_results WHERE id = ?', evalId);
     
+    // Drop it from its session's summary
+    await refreshSessionSummary(db, evaluation?.session_id);
+    
     // Commit the transaction
     await db.run('COMMIT');
     
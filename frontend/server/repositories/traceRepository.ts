@@ -1,5 +1,12 @@
+import { Database } from 'sqlite';
 import { getDb } from '../services/dbService';
 
+// Whether a trace recorded an error, in SQL; matches TRACE_ERROR_SQL in the Python package's db.py
+const TRACE_ERROR_SQL = "(CASE WHEN json_valid(data) THEN json_extract(data, '$.error') IS NOT NULL ELSE 0 END)";
+
+// Whether each connection's database has the sessions table, checked once per connection
+const sessionsTableByConnection = new WeakMap<Database, boolean>();
+
 // Trace interface based on the database schema
 export interface Trace {
   id: string;
@@ -11,6 +18,17 @@ export interface Trace {
   data: string;
 }
 
+export interface SessionSummary {
+  session_id: string;
+  first_timestamp: string | null;
+  last_timestamp: string | null;
+  span_count: number;
+  error_count: number;
+  total_duration_ms: number;
+  tags: string[];
+  eval_ids: string[];
+}
+
 export interface TraceResponse {
   id: string;
   session_id: string;
@@ -100,17 +118,99 @@ export const getTraces = async (
 };
 
 /**
- * Get unique session IDs
+ * Whether the database has the sessions summary table maintained by the Python tracer
+ */
+export const hasSessionsTable = async (db: Database): Promise<boolean> => {
+  let exists = sessionsTableByConnection.get(db);
+  if (exists === undefined) {
+    const result = await db.get("SELECT name FROM sqlite_master WHERE type='table' AND name='sessions'");
+    exists = !!result;
+    sessionsTableByConnection.set(db, exists);
+  }
+  return exists;
+};
+
+/**
+ * Recompute a session's summary row from its remaining traces and evaluations.
+ * Call inside the transaction that deleted them.
+ */
+export const refreshSessionSummary = async (db: Database, sessionId: string | null | undefined): Promise<void> => {
+  if (!sessionId || !(await hasSessionsTable(db))) {
+    return;
+  }
+  
+  await db.run('DELETE FROM sessions WHERE session_id = ?', sessionId);
+  await db.run(
+    `INSERT INTO sessions (session_id, first_timestamp, last_timestamp, span_count, error_count,
+       total_duration_ms, tags, eval_ids)
+     SELECT session_id, MIN(timestamp), MAX(timestamp), COUNT(*), SUM(${TRACE_ERROR_SQL}),
+       COALESCE(SUM(duration_ms), 0),
+       (SELECT json_group_array(value) FROM (
+         SELECT DISTINCT tag.value FROM traces, json_each(traces.tags) AS tag
+         WHERE traces.session_id = ? AND json_valid(traces.tags) ORDER BY 1
+       )),
+       '[]'
+     FROM traces WHERE session_id = ? GROUP BY session_id`,
+    sessionId, sessionId
+  );
+  
+  const evalTable = await db.get("SELECT name FROM sqlite_master WHERE type='table' AND name='eval_results'");
+  if (!evalTable) {
+    return;
+  }
+  const evals = await db.get(
+    `SELECT COUNT(*) AS count, MIN(timestamp) AS first, MAX(timestamp) AS last, json_group_array(id) AS ids
+     FROM (SELECT timestamp, id FROM eval_results WHERE session_id = ? ORDER BY timestamp)`,
+    sessionId
+  );
+  if (!evals || !evals.count) {
+    return;
+  }
+  await db.run("INSERT OR IGNORE INTO sessions VALUES (?, NULL, NULL, 0, 0, 0, '[]', '[]')", sessionId);
+  await db.run(
+    `UPDATE sessions SET first_timestamp = MIN(COALESCE(first_timestamp, ?), ?),
+       last_timestamp = MAX(COALESCE(last_timestamp, ?), ?), eval_ids = ?
+     WHERE session_id = ?`,
+    evals.first, evals.first, evals.last, evals.last, evals.ids, sessionId
+  );
+};
+
+/**
+ * Get unique session IDs, most recently active first
  */
 export const getSessionIds = async (limit: number = 100): Promise<string[]> => {
   const db = await getDb();
   
-  const query = "SELECT DISTINCT session_id FROM traces ORDER BY timestamp DESC LIMIT ?";
+  // Databases written by older tracers have no sessions table
+  const query = await hasSessionsTable(db)
+    ? "SELECT session_id FROM sessions ORDER BY last_timestamp DESC LIMIT ?"
+    : "SELECT session_id FROM traces GROUP BY session_id ORDER BY MAX(timestamp) DESC LIMIT ?";
   const rows = await db.all(query, limit);
   
   return rows.map(row => row.session_id);
 };
 
+/**
+ * Get session summaries, most recently active first
+ */
+export const getSessionSummaries = async (limit: number = 100): Promise<SessionSummary[]> => {
+  const db = await getDb();
+  
+  if (!(await hasSessionsTable(db))) {
+    return [];
+  }
+  
+  const query = `SELECT session_id, first_timestamp, last_timestamp, span_count, error_count,
+    total_duration_ms, tags, eval_ids FROM sessions ORDER BY last_timestamp DESC LIMIT ?`;
+  const rows = await db.all(query, limit);
+  
+  return rows.map(row => ({
+    ...row,
+    tags: JSON.parse(row.tags || '[]'),
+    eval_ids: JSON.parse(row.eval_ids || '[]')
+  }));
+};
+
 /**
  * Get trace types
  */
@@ -160,15 +260,24 @@ export const getTags = async (): Promise<string[]> => {
 };
 
 /**
- * Delete a trace by ID
+ * Delete a trace by ID and update its session's summary
  */
 export const deleteTrace = async (id: string): Promise<boolean> => {
+  const db = await getDb();
+  
   try {
-    const db = await getDb();
-    const query = "DELETE FROM traces WHERE id = ?";
-    const result = await db.run(query, id);
+    await db.run('BEGIN TRANSACTION');
+    const trace = await db.get('SELECT session_id FROM traces WHERE id = ?', id);
+    const result = await db.run("DELETE FROM traces WHERE id = ?", id);
+    await refreshSessionSummary(db, trace?.session_id);
+    await db.run('COMMIT');
     return (result.changes ?? 0) > 0;
   } catch (error) {
+    try {
+      await db.run('ROLLBACK');
+    } catch (rollbackError) {
+      console.error('Error during transaction rollback:', rollbackError);
+    }
     console.error('Error deleting trace:', error);
     throw error;
   }
@@ -253,6 +362,11 @@ export const deleteSession = async (sessionId: string): Promise<{ deletedTraces:
       // Continue with the transaction, don't throw here
     }
     
+    // Remove the session's summary row
+    if (await hasSessionsTable(db)) {
+      await db.run('DELETE FROM sessions WHERE session_id = ?', sessionId);
+    }
+    
     // Commit the transaction
     await db.run('COMMIT');
     
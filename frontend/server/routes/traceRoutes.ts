@@ -54,6 +54,29 @@ router.get('/sessions', async (req: Request, res: Response) => {
   }
 });
 
+/**
+ * GET /api/traces/sessions/summary
+ * Get session summaries (timestamps, span and error counts, duration, tags, eval IDs)
+ */
+router.get('/sessions/summary', async (req: Request, res: Response) => {
+  try {
+    const limit = parseInt(req.query.limit as string) || 100;
+    const sessions = await traceRepository.getSessionSummaries(limit);
+    
+    res.json({
+      success: true,
+      count: sessions.length,
+      sessions
+    });
+  } catch (error) {
+    console.error('Error retrieving session summaries:', error);
+    res.status(500).json({
+      success: false,
+      error: 'Failed to retrieve session summaries'
+    });
+  }
+});
+
 /**
  * GET /api/traces/types
  * Get all trace types
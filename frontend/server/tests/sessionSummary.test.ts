@@ -0,0 +1,74 @@
+import { test, beforeEach, afterEach } from 'node:test';
+import assert from 'node:assert/strict';
+import fs from 'fs';
+import os from 'os';
+import path from 'path';
+import { closeDb, getDb, setDbPath } from '../services/dbService';
+import { deleteTrace } from '../repositories/traceRepository';
+import { deleteEval } from '../repositories/evalRepository';
+
+// Schema written by the Python tracer (agenttrace/db.py)
+const SCHEMA = [
+  `CREATE TABLE traces (id TEXT PRIMARY KEY, session_id TEXT, timestamp TEXT, trace_type TEXT,
+     function_name TEXT, tags TEXT, data JSON, duration_ms REAL)`,
+  `CREATE TABLE sessions (session_id TEXT PRIMARY KEY, first_timestamp TEXT, last_timestamp TEXT,
+     span_count INTEGER, error_count INTEGER, total_duration_ms REAL, tags TEXT, eval_ids TEXT)`,
+  `CREATE TABLE eval_events (id TEXT PRIMARY KEY, eval_id TEXT, session_id TEXT, timestamp TEXT,
+     event_type TEXT, name TEXT, data JSON)`,
+  `CREATE TABLE eval_results (id TEXT PRIMARY KEY, name TEXT, timestamp TEXT, trial_count INTEGER,
+     session_id TEXT, data JSON)`,
+];
+
+let tmpdir: string;
+
+const session = async (sessionId: string) => {
+  const db = await getDb();
+  return db.get('SELECT * FROM sessions WHERE session_id = ?', sessionId);
+};
+
+beforeEach(async () => {
+  tmpdir = fs.mkdtempSync(path.join(os.tmpdir(), 'agenttrace-server-'));
+  setDbPath(path.join(tmpdir, 'traces.db'));
+  const db = await getDb();
+  for (const statement of SCHEMA) {
+    await db.run(statement);
+  }
+  await db.run(`INSERT INTO traces VALUES
+    ('t1', 's1', '2025-01-01T00:00:01', 'COMPLETE', 'f', '["a"]', '{}', 10),
+    ('t2', 's1', '2025-01-01T00:00:02', 'COMPLETE', 'f', '["b"]', '{"error": {"type": "ValueError"}}', 5)`);
+  await db.run(`INSERT INTO eval_results VALUES
+    ('e1', 'eval', '2025-01-01T00:00:03', 1, 's1', '{}'),
+    ('e2', 'eval', '2025-01-01T00:00:04', 1, 's1', '{}')`);
+  await db.run(`INSERT INTO sessions VALUES
+    ('s1', '2025-01-01T00:00:01', '2025-01-01T00:00:04', 2, 1, 15, '["a","b"]', '["e1","e2"]')`);
+});
+
+afterEach(async () => {
+  await closeDb();
+  fs.rmSync(tmpdir, { recursive: true, force: true });
+});
+
+test('deleting a trace updates its session summary', async () => {
+  assert.equal(await deleteTrace('t2'), true);
+  const row = await session('s1');
+  assert.equal(row.span_count, 1);
+  assert.equal(row.error_count, 0);
+  assert.equal(row.total_duration_ms, 10);
+  assert.deepEqual(JSON.parse(row.tags), ['a']);
+  assert.deepEqual(JSON.parse(row.eval_ids), ['e1', 'e2']);
+  assert.equal(row.last_timestamp, '2025-01-01T00:00:04');
+});
+
+test('deleting an evaluation updates its session summary', async () => {
+  assert.equal(await deleteEval('e2'), true);
+  let row = await session('s1');
+  assert.deepEqual(JSON.parse(row.eval_ids), ['e1']);
+  assert.equal(row.last_timestamp, '2025-01-01T00:00:03');
+  assert.equal(row.span_count, 2);
+
+  await deleteEval('e1');
+  await deleteTrace('t1');
+  await deleteTrace('t2');
+  row = await session('s1');
+  assert.equal(row, undefined);
+});
@@ -2,9 +2,39 @@
 AgentTrace - A tool for evaluating and tracing agent operations.
 """
 
-# Import main classes to make them available at the top level
-from .agenttrace import TraceManager
-from .agenttrace import TracerEval
+# Main classes are available at the top level but imported on first use, so
+# that importing the package (or running the CLI) does not load the tracing engine.
+_LAZY_ATTRIBUTES = {
+    "TraceManager": ".agenttrace",
+    "TracerEval": ".agenttrace",
+    "trace": ".agenttrace",
+    "ReplayMissError": ".replay",
+    "EvalScheduler": ".scheduling",
+    "RetryPolicy": ".scheduling",
+    "current_span": ".spans",
+    "SpanExporter": ".exporters",
+    "OTLPHttpExporter": ".exporters",
+    "StorageBackend": ".storage",
+    "SQLiteBackend": ".storage",
+    "MemoryBackend": ".storage",
+    "SegmentLogBackend": ".logstore",
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
 
 # Version information
-__version__ = "0.1.0" 
\ No newline at end of file
+__version__ = "0.1.0"
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        import importlib
+
+        value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
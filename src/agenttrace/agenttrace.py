@@ -1,5 +1,4 @@
 import os
-import sqlite3
 import json
 import time
 import logging
@@ -10,15 +9,32 @@ import uuid
 import atexit
 from functools import partial
 import threading
+import random
 import sys
+import asyncio
+import copy
+import weakref
 
-# ANSI color codes for terminal output
-class Colors:
-    RESET = "\033[0m"
-    CYAN = "\033[36m"
-    GREEN = "\033[32m"
-    RED = "\033[31m"
-    BOLD = "\033[1m"
+from .cache import QueryCache, query_key
+from .console import Colors, LiveView
+from .db import TABLE_COLUMNS
+from .ids import new_id
+from .journal import DEFAULT_MAX_BYTES as DEFAULT_SPILL_BYTES, SpillJournal
+from .loopmonitor import DEFAULT_INTERVAL_MS as DEFAULT_LOOP_INTERVAL_MS, DEFAULT_THRESHOLD_MS as DEFAULT_STALL_MS, LoopMonitor
+from .metrics import TracerMetrics, start_metrics_server
+from .profiling import DEFAULT_INTERVAL_MS as DEFAULT_PROFILE_INTERVAL_MS, DEFAULT_SLOW_MS, SamplingProfiler
+from .records import COMPLETE, START, SpanRecord
+from .replay import RECORD, REPLAY, ReplayMissError, args_hash, check_mode, decode_result, encode_result, signature_of
+from .spans import DEFAULT_MAX_EVENTS, Span, activate, current_span, deactivate
+from .storage import SQLiteBackend
+from .streaming import is_stream_result, summarize_streaming_events, wrap_stream
+from .timing import CallTimer, MemoryPeaks
+from .usage import extract_llm_usage, merge_usage
+
+# Upper bound on START traces from ``add_trace`` waiting for their END; the
+# oldest are forgotten first, and a late END is then stored on its own.
+MAX_OPEN_SPANS = 65536
+MAX_REPLAY_CACHE = 4096
 
 # Check if terminal supports colors
 def supports_color():
@@ -34,131 +50,190 @@ COLORS_AVAILABLE = supports_color()
 
 class TraceManager:
     """
-    Manages tracing of function calls and data, persisting trace entries to an SQLite database.
-    Implements a singleton pattern to ensure a single instance.
+    Manages tracing of function calls and data, persisting trace entries to a storage
+    backend (an SQLite database by default).
+    
+    ``TraceManager()`` returns a process-wide default instance. Passing a ``name``
+    returns an independent instance with its own database, buffer and writer;
+    the same name always returns the same instance.
     """
     _instance = None
+    _named = {}
+    _registry_lock = threading.Lock()
 
-    def __new__(cls, *args, **kwargs):
-        """Return the singleton instance of TraceManager."""
-        if cls._instance is None:
-            cls._instance = super(TraceManager, cls).__new__(cls)
-            cls._instance._initialized = False
-        return cls._instance
+    def __new__(cls, *args, name=None, **kwargs):
+        """Return the default instance, or the instance registered under ``name``."""
+        with cls._registry_lock:
+            if name is None:
+                if cls._instance is None:
+                    cls._instance = super(TraceManager, cls).__new__(cls)
+                    cls._instance._initialized = False
+                return cls._instance
+            if name not in cls._named:
+                instance = super(TraceManager, cls).__new__(cls)
+                instance._initialized = False
+                cls._named[name] = instance
+            return cls._named[name]
+
+    @classmethod
+    def get(cls, name=None):
+        """
+        Look up an existing tracer.
+        
+        Args:
+            name (str, optional): Name the tracer was created with. None returns the default tracer.
+            
+        Returns:
+            TraceManager: The tracer.
+            
+        Raises:
+            KeyError: If no tracer was created under ``name``.
+        """
+        if name is None:
+            return cls()
+        with cls._registry_lock:
+            if name not in cls._named:
+                raise KeyError(f"No TraceManager named {name!r}; create it with TraceManager(name={name!r}, db_path=...)")
+            return cls._named[name]
 
-    def __init__(self, db_path="traces2.db", colored_logging=True):
+    def __init__(self, db_path="traces2.db", colored_logging=True, usage_extractors=None, exporters=None,
+                 sample_rate=1.0, max_buffer_size=None, query_cache_size=256, name=None,
+                 max_span_events=DEFAULT_MAX_EVENTS, spill_journal=False, spill_max_bytes=DEFAULT_SPILL_BYTES,
+                 storage=None, profile_slow_ms=None, profile_interval_ms=DEFAULT_PROFILE_INTERVAL_MS,
+                 trace_memory=False, replay_mode=None):
         """
-        Initialize the TraceManager with a specified SQLite database.
+        Initialize the TraceManager with a specified SQLite database or storage backend.
+        
+        Arguments only take effect the first time an instance is created; later
+        calls return the existing instance unchanged.
         
         Args:
             db_path (str): Path to the SQLite database file.
             colored_logging (bool): Whether to use colored logging in the terminal.
+            usage_extractors (list, optional): Callables that pull token usage from traced
+                results. Defaults to the built-in OpenAI/Anthropic extractor.
+            exporters (list, optional): SpanExporter instances that receive completed traces on each flush.
+            sample_rate (float): Fraction of traced calls to record, between 0 and 1.
+            max_buffer_size (int, optional): Maximum number of traces held in memory between
+                flushes. New traces are dropped and counted once it is reached. Unbounded by default.
+            query_cache_size (int): Number of read query results kept in memory between
+                writes. 0 disables the cache.
+            name (str, optional): Register an independent tracer under this name instead
+                of using the default instance.
+            max_span_events (int): Maximum number of events kept per span; further
+                events are counted but discarded.
+            spill_journal (bool or str): Also write buffered traces to a memory-mapped journal
+                (``db_path + ".spill"``, or the given path) so they survive a crash or a failed
+                flush. Traces left in it are written to the database on the next start, and
+                traces that do not fit in a full buffer are kept there instead of being dropped.
+            spill_max_bytes (int): Size of the spill journal file.
+            storage (StorageBackend, optional): Where traces and evaluation data are stored.
+                Defaults to ``SQLiteBackend(db_path)``; see also ``SegmentLogBackend`` and
+                ``MemoryBackend``.
+            profile_slow_ms (float, optional): Sample the stacks of every traced call and keep
+                them with traces that take at least this many milliseconds or raise. Off by
+                default; ``trace(profile=...)`` turns profiling on or off per function.
+            profile_interval_ms (float): Time between stack samples while profiled calls run.
+            trace_memory (bool): Record the peak memory allocated during each traced call.
+                Starts ``tracemalloc``, which slows down allocation-heavy code; requires Python 3.9+.
+            replay_mode (str, optional): ``"record"`` stores a hash of each traced call's arguments,
+                ``"replay"`` returns the result of a recorded call with the same arguments instead
+                of calling the function (raising ``ReplayMissError`` if there is none), and
+                ``"record_missing"`` replays when it can and records otherwise. Off by default;
+                ``trace(replay=...)`` overrides it per function.
         """
         if self._initialized:
+            if db_path != "traces2.db" and os.path.abspath(db_path) != os.path.abspath(self.db_path):
+                logging.warning(f"TraceManager{f' {name!r}' if name else ''} already writes to {self.db_path}; "
+                                f"ignoring db_path={db_path!r}. Pass a new name for a separate tracer.")
             return
 
+        check_mode(replay_mode)
+        self.name = name
         self.db_path = db_path
         self.traces = []
+        self._open_spans = {}
         self.last_save_time = time.time()
         self.save_interval = 5
         self._initialized = True
         self.colored_logging = colored_logging and COLORS_AVAILABLE
-        self.active_traces = {}  # Track active traces with their spinner state
-        self.spinner_thread = None
-        self.spinner_running = False
-        self.spinner_lock = threading.Lock()
+        self.live_view = LiveView() if self.colored_logging and LiveView.supported() else None
+        self.usage_extractors = list(usage_extractors) if usage_extractors is not None else [extract_llm_usage]
+        self.exporters = list(exporters or [])
+        self.sample_rate = sample_rate
+        self.max_buffer_size = max_buffer_size
+        self._metrics = TracerMetrics()
+        self.query_cache = QueryCache(query_cache_size)
+        self.max_span_events = max_span_events
+        self.profile_slow_ms = profile_slow_ms
+        self.profile_interval_ms = profile_interval_ms
+        self._profiler = SamplingProfiler(profile_interval_ms)
+        self._flush_threads = set()
+        self.replay_mode = replay_mode
+        self._replay_recent = {}
+        self.trace_memory = trace_memory and MemoryPeaks.supported
+        if trace_memory and not MemoryPeaks.supported:
+            logging.warning("trace_memory requires Python 3.9 or later; memory peaks will not be recorded")
 
-        atexit.register(self.save_traces)
-        
-        if self.colored_logging:
-            self._start_spinner_thread()
+        # The storage is opened, and the exit hook registered, on first use.
+        self.storage = storage if storage is not None else SQLiteBackend(db_path)
+        self._storage_open = False
+        self._db_failed = False
+        self._exit_hook_registered = False
+
+        self._spill = None
+        self._spill_replay = False
+        if spill_journal:
+            spill_path = spill_journal if isinstance(spill_journal, (str, os.PathLike)) else f"{db_path}.spill"
+            try:
+                self._spill = SpillJournal(spill_path, spill_max_bytes)
+            except Exception as e:
+                logging.error(f"Error opening spill journal {spill_path}: {str(e)}")
+            else:
+                if not self._spill.is_empty():
+                    logging.info(f"Replaying unflushed traces from {spill_path}")
+                    self._spill_replay = True
+                    self.save_traces()
+
+    def _backend(self):
+        """Return the storage backend, opening it on first use. None if it could not be opened."""
+        if not self._storage_open and not self._db_failed:
+            try:
+                self.storage.open()
+                self._storage_open = True
+            except Exception as e:
+                logging.error(f"Error initializing trace storage ({self.storage}): {str(e)}")
+                self._metrics.db_errors += 1
+                self._db_failed = True
+        return self.storage if self._storage_open else None
+
+    @property
+    def conn(self):
+        """The SQLite connection, opened on first access. None if the database could not be opened or another backend is used."""
+        return getattr(self._backend(), "conn", None)
+
+    @property
+    def cursor(self):
+        """Cursor on ``conn``."""
+        return getattr(self._backend(), "cursor", None)
 
-        try:
-            self.conn = sqlite3.connect(self.db_path)
-            self.conn.execute("PRAGMA foreign_keys = ON")
-            self.cursor = self.conn.cursor()
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS traces (
-                    id TEXT PRIMARY KEY,
-                    session_id TEXT,
-                    timestamp TEXT,
-                    trace_type TEXT,
-                    function_name TEXT,
-                    tags TEXT,
-                    data JSON
-                )
-            ''')
-            self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_timestamp ON traces(timestamp)')
-            self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_type ON traces(trace_type)')
-            self.conn.commit()
-            logging.info(f"Initialized SQLite database at {self.db_path}")
-        except Exception as e:
-            logging.error(f"Error initializing SQLite database: {str(e)}")
-            self.conn = None
-            
-    def _start_spinner_thread(self):
-        """Start the background thread for updating spinners in the terminal."""
-        if not self.spinner_thread:
-            self.spinner_running = True
-            self.spinner_thread = threading.Thread(target=self._update_spinners, daemon=True)
-            self.spinner_thread.start()
-            
-    def _update_spinners(self):
-        """Update the spinner animation for active traces in the terminal."""
-        spinner_chars = ['⠋', '⠙', '⠹', '⠸', '⠼', '⠴', '⠦', '⠧', '⠇', '⠏']
-        idx = 0
-        
-        while self.spinner_running:
-            with self.spinner_lock:
-                for trace_id, trace_info in list(self.active_traces.items()):
-                    if trace_info['active']:
-                        elapsed = time.time() - trace_info['start_time']
-                        spinner = spinner_chars[idx % len(spinner_chars)]
-                        
-                        # Clear the line and print the updated spinner
-                        if sys.stdout.isatty():  # Only if running in a terminal
-                            sys.stdout.write(f"\r{Colors.CYAN}{spinner} {trace_info['function_name']} "
-                                            f"({elapsed:.2f}s){Colors.RESET}{' ' * 20}")
-                            sys.stdout.flush()
-            
-            idx += 1
-            time.sleep(0.1)
-    
     def _log_trace_start(self, func_name, session_id):
-        """Log the start of a trace with colored output."""
-        if not self.colored_logging:
-            return
-            
-        with self.spinner_lock:
-            self.active_traces[session_id] = {
-                'function_name': func_name,
-                'start_time': time.time(),
-                'active': True
-            }
+        """Report the start of a trace to the live terminal view."""
+        if self.live_view is not None:
+            self.live_view.span_started(func_name, session_id)
             
     def _log_trace_end(self, func_name, session_id, duration_ms, success=True):
-        """Log the end of a trace with colored output."""
-        if not self.colored_logging:
-            return
-            
-        with self.spinner_lock:
-            if session_id in self.active_traces:
-                self.active_traces[session_id]['active'] = False
-                
-                # Clear the spinner line
-                if sys.stdout.isatty():
-                    sys.stdout.write("\r" + " " * 80 + "\r")
-                    
-                # Print completion message
-                color = Colors.GREEN if success else Colors.RED
-                status = "✓" if success else "✗"
-                print(f"{color}{status} {func_name} completed in {duration_ms:.2f}ms{Colors.RESET}")
+        """Report the end of a trace to the live terminal view."""
+        if self.live_view is not None:
+            self.live_view.span_ended(func_name, session_id, duration_ms, success)
 
-    def add_trace(self, trace_type, func_name, args=None, kwargs=None, result=None, duration=None, tool_eval=None, tags=None, session_id=None):
+    def add_trace(self, trace_type, func_name, args=None, kwargs=None, result=None, duration=None, tool_eval=None, tags=None, session_id=None,
+                  streaming=None, usage=None, span=None):
         """
         Add a trace entry to the internal collection.
         
-        If an END trace is provided, attempts to merge with a matching START trace.
+        An END trace is merged into the oldest open START trace with the same
+        function name and session, turning it into a COMPLETE trace.
         
         Args:
             trace_type (str): The type of the trace (e.g., "START", "END").
@@ -170,70 +245,412 @@ class TraceManager:
             tool_eval (optional): Evaluation result of tool output.
             tags (optional): Tags associated with the trace.
             session_id (optional): Session identifier to group related traces.
+            streaming (dict, optional): Streaming summary (chunk count, time to first chunk, inter-chunk latency).
+            usage (dict, optional): Token usage and model name. Extracted from ``result`` when not given.
+            span (Span, optional): The finished span whose events are stored with an END trace.
             
         Returns:
             str: The session_id associated with the trace.
         """
-        trace_id = f"{datetime.now().isoformat()}_{id(trace_type)}"
-        timestamp = datetime.now().isoformat()
         if not session_id:
             session_id = str(uuid.uuid4())
 
-        data = {}
+        if trace_type == "START":
+            record = self._start_record(func_name, args, kwargs, tags, session_id)
+            if record is not None:
+                self._open_spans.setdefault((session_id, func_name), []).append(record)
+                if len(self._open_spans) > MAX_OPEN_SPANS:
+                    del self._open_spans[next(iter(self._open_spans))]
+            return session_id
+
+        record = None
+        if trace_type == "END":
+            key = (session_id, func_name)
+            pending = self._open_spans.get(key)
+            if pending:
+                record = pending.pop(0)
+                if not pending:
+                    del self._open_spans[key]
+        self._finish_record(record, trace_type, func_name, result, duration, tool_eval, tags, session_id,
+                            streaming, usage, span)
+        return session_id
+
+    def _start_record(self, func_name, args, kwargs, tags, session_id):
+        """
+        Buffer a START trace.
+        
+        Args:
+            func_name (str): The name of the function being traced.
+            args (optional): Positional arguments of the function.
+            kwargs (optional): Keyword arguments of the function.
+            tags (optional): Tags associated with the trace.
+            session_id (str): Session identifier.
+            
+        Returns:
+            SpanRecord: The buffered record, to pass to ``_finish_record``, or None if the buffer is full.
+        """
+        self._register_exit_hook()
+        serialize_start = time.perf_counter()
+        record = SpanRecord(START, func_name, session_id, tags)
         if args is not None:
-            data["args"] = self._sanitize_for_json(args)
+            record.args = self._sanitize_for_json(args)
         if kwargs is not None:
-            data["kwargs"] = self._sanitize_for_json(kwargs)
+            record.kwargs = self._sanitize_for_json(kwargs)
+        self._metrics.serialization_ms.record((time.perf_counter() - serialize_start) * 1000)
+        self._log_trace_start(func_name, session_id)
+        return record if self._buffer(record) else None
+
+    def _finish_record(self, record, trace_type, func_name, result=None, duration=None, tool_eval=None, tags=None,
+                       session_id=None, streaming=None, usage=None, span=None, error=None, profile=None,
+                       timing=None, args_hash=None, replayed_from=None, raw_result=None):
+        """
+        Complete a START record in place, or buffer a new trace if there is none.
+        
+        A record that was already flushed is buffered again, so the next flush
+        replaces its START row with the COMPLETE one.
+        
+        Args:
+            record (SpanRecord): The record returned by ``_start_record``, or None.
+            trace_type (str): The type of the trace when there is no record to complete.
+            error (dict, optional): Type and message of the exception the call raised.
+            profile (dict, optional): Folded stacks sampled while the call ran.
+            timing (dict, optional): CPU, running, suspended and memory measurements of the call.
+            args_hash (str, optional): Hash of the call's arguments, stored so the call can be replayed.
+                The returned value is then also encoded unless its JSON form replays it unchanged.
+            replayed_from (str, optional): ID of the recorded trace whose result was replayed.
+            raw_result (optional): The value the call returned, when ``result`` is a standardized
+                form of it such as a tuple or streaming summary. Replay returns this value.
+            Other arguments are as for ``add_trace``.
+        """
+        self._register_exit_hook()
+        if usage is None and result is not None:
+            usage = self._extract_usage(result)
+
+        serialize_start = time.perf_counter()
+        merged = record is not None
+        if not merged:
+            record = SpanRecord(trace_type, func_name, session_id, tags)
         if result is not None:
-            data["result"] = self._sanitize_for_json(result)
-        if duration is not None:
-            data["duration_ms"] = duration
+            record.result = self._sanitize_for_json(result)
+        record.duration_ms = duration
         if tool_eval is not None:
-            data["tool_eval"] = tool_eval
-
-        trace_entry = {
-            "id": trace_id,
-            "session_id": session_id,
-            "timestamp": timestamp,
-            "trace_type": trace_type,
-            "function_name": func_name,
-            "tags": json.dumps(tags) if tags else None,
-            "data": json.dumps(data)
-        }
+            record.tool_eval = tool_eval
+        if streaming is not None:
+            record.streaming = streaming
+        record.usage = usage
+        if timing is not None:
+            record.timing = timing
+        if span is not None and span.events:
+            record.events = span.serialize_events(self._sanitize_for_json)
+            record.events_dropped = span.dropped_events
+        if error is not None:
+            record.error = error
+        if profile is not None:
+            record.profile = profile
+        if args_hash is not None:
+            returned = result if raw_result is None else raw_result
+            replayable, record.replay_result = encode_result(returned, record.result)
+            if replayable:
+                record.args_hash = args_hash
+                self._remember_replay((func_name, args_hash), record)
+            else:
+                logging.warning(f"Not recording {func_name} for replay: "
+                                f"its {type(returned).__name__} result cannot be stored as JSON")
+        if replayed_from is not None:
+            record.replayed_from = replayed_from
+        self._metrics.serialization_ms.record((time.perf_counter() - serialize_start) * 1000)
+
+        if trace_type == "END":
+            success = error is None and not (tool_eval and not tool_eval.get("success", True))
+            self._log_trace_end(func_name, session_id, duration, success)
+
+        if not merged:
+            self._buffer(record)
+            return
+        record.trace_type = COMPLETE
+        if record.flushed:
+            record.flushed = False
+            self._buffer(record, new=False)
+            return
+        self._journal(record)
+        self._maybe_save()
+
+    def _buffer(self, record, new=True):
+        """
+        Append a record to the buffer.
         
-        # Log trace start with spinner
-        if trace_type == "START":
-            self._log_trace_start(func_name, session_id)
-
-        if trace_type == "END" and self.traces:
-            for i, trace in enumerate(self.traces):
-                if (trace["function_name"] == func_name and 
-                    trace["session_id"] == session_id and 
-                    trace["trace_type"] == "START"):
-                    start_data = json.loads(trace["data"])
-                    start_data.update(data)
-                    self.traces[i]["data"] = json.dumps(start_data)
-                    self.traces[i]["trace_type"] = "COMPLETE"
-                    
-                    # Log trace end with completion status
-                    success = True
-                    if tool_eval and not tool_eval.get("success", True):
-                        success = False
-                    self._log_trace_end(func_name, session_id, duration, success)
-                    
-                    current_time = time.time()
-                    if current_time - self.last_save_time > self.save_interval:
-                        self.save_traces()
-                        self.last_save_time = current_time
-                    return session_id
-
-        self.traces.append(trace_entry)
+        When the buffer is full the record is kept only in the spill journal, if
+        there is one; otherwise a new record is dropped and counted.
+        
+        Args:
+            record (SpanRecord): The record.
+            new (bool): False when re-buffering a flushed record that has just completed.
+            
+        Returns:
+            bool: Whether the record was kept.
+        """
+        journaled = self._journal(record)
+        if self.max_buffer_size is not None and len(self.traces) >= self.max_buffer_size:
+            if journaled:
+                record.flushed = True
+                self._spill_replay = True
+                if new:
+                    self._metrics.spans_spilled += 1
+            elif new:
+                self._metrics.spans_dropped += 1
+                return False
+            else:
+                self.traces.append(record)
+        else:
+            self.traces.append(record)
+        if new:
+            self._metrics.spans_recorded += 1
+        self._maybe_save()
+        return True
+
+    def _journal(self, record):
+        """Write a record's current state to the spill journal. Returns whether it was written."""
+        if self._spill is None:
+            return False
+        # Every change to a record is journaled, so the encoded row stays current until the flush.
+        record.encoded = record.to_row()
+        if self._spill.append(record.encoded):
+            return True
+        self._metrics.spill_overflows += 1
+        return False
+
+    def _maybe_save(self):
+        """Flush the buffer if the save interval has elapsed."""
         current_time = time.time()
         if current_time - self.last_save_time > self.save_interval:
             self.save_traces()
             self.last_save_time = current_time
 
-        return session_id
+    def _register_exit_hook(self):
+        """Flush on interpreter exit, registered with the first trace."""
+        if not self._exit_hook_registered:
+            self._exit_hook_registered = True
+            atexit.register(self.shutdown)
+
+    def _profile_threshold(self, profile):
+        """
+        Return the slow-call threshold for a ``trace(profile=...)`` setting.
+        
+        Args:
+            profile (bool or float, optional): The setting given to ``trace``.
+            
+        Returns:
+            float: Threshold in milliseconds, or None if the call is not profiled.
+        """
+        if profile is None:
+            return self.profile_slow_ms
+        if profile is False:
+            return None
+        if profile is True:
+            return self.profile_slow_ms if self.profile_slow_ms is not None else DEFAULT_SLOW_MS
+        return profile
+
+    def _end_profile(self, sampling, threshold_ms, duration_ms, failed=False):
+        """
+        Stop sampling a call and decide whether its stacks are kept.
+        
+        Args:
+            sampling (SpanProfile): The value returned by ``SamplingProfiler.start``.
+            threshold_ms (float): Calls at least this slow keep their stacks.
+            duration_ms (float): Duration of the call.
+            failed (bool): Whether the call raised; failed calls always keep their stacks.
+            
+        Returns:
+            dict: Sample interval, sample count and folded stacks, or None if they are discarded.
+        """
+        self._profiler.stop(sampling)
+        if not sampling.count or (not failed and duration_ms < threshold_ms):
+            return None
+        return {"interval_ms": self.profile_interval_ms, "samples": sampling.count, "stacks": sampling.folded()}
+
+    def _finish_failed(self, record, func_name, timer, tags, session_id, span, error,
+                       sampling=None, threshold_ms=None):
+        """
+        Record the END of a traced call that raised ``error``.
+        
+        Args:
+            record (SpanRecord): The call's START record, or None.
+            func_name (str): The name of the traced function.
+            timer (CallTimer): The call's timer.
+            tags (list, optional): Tags for the trace.
+            session_id (str): Session identifier of the call.
+            span (Span): The call's span.
+            error (BaseException): The exception raised by the call.
+            sampling (SpanProfile, optional): The call's stack samples, if it was profiled.
+            threshold_ms (float, optional): Slow-call threshold for the profile.
+        """
+        try:
+            duration_ms, timing = timer.finish()
+            profile = self._end_profile(sampling, threshold_ms, duration_ms, failed=True) if sampling else None
+            logging.info(f"TRACE END: {func_name} - raised {type(error).__name__}: {error}")
+            self._finish_record(record, "END", func_name, duration=duration_ms, tags=tags, session_id=session_id,
+                                span=span, error={"type": type(error).__name__, "message": str(error)},
+                                profile=profile, timing=timing)
+        except Exception as e:
+            logging.error(f"Error recording failed call to {func_name}: {str(e)}")
+
+    def _replay_lookup(self, func_name, call_hash):
+        """
+        Find the recorded result of an earlier call with the same arguments.
+        
+        Calls recorded by this tracer are found before they are flushed; others are
+        looked up in the storage backend by the indexed ``args_hash`` column.
+        
+        Args:
+            func_name (str): The name of the traced function.
+            call_hash (str): Hash of the call's arguments.
+            
+        Returns:
+            tuple: The recorded trace's ID and a copy of its result, or None if there is none.
+        """
+        key = (func_name, call_hash)
+        hit = self._replay_recent.get(key)
+        if hit is None:
+            backend = self._backend()
+            row = None
+            if backend is not None:
+                try:
+                    row = backend.find_by_args_hash(func_name, call_hash)
+                except Exception as e:
+                    logging.error(f"Error looking up recorded call to {func_name} in {self.storage}: {str(e)}")
+            if row is None:
+                self._metrics.replay_misses += 1
+                return None
+            if row[7]:
+                hit = (row[0], None, row[7])
+            else:
+                data = json.loads(row[6]) if row[6] else {}
+                hit = (row[0], data.get("result"), None)
+            self._remember_replay(key, hit)
+        if isinstance(hit, SpanRecord):
+            if hit.id is None:
+                hit.id = new_id(hit.timestamp_ns)
+            hit = (hit.id, hit.result, hit.replay_result)
+        trace_id, result, encoded = hit
+        try:
+            result = decode_result(encoded) if encoded else copy.deepcopy(result)
+        except ValueError as e:
+            # Rows written by older versions hold pickled results, which are never loaded.
+            logging.warning(f"Ignoring recorded call to {func_name} in {self.storage}: {str(e)}")
+            self._replay_recent.pop(key, None)
+            self._metrics.replay_misses += 1
+            return None
+        self._metrics.replay_hits += 1
+        return trace_id, result
+
+    def _remember_replay(self, key, hit):
+        """Keep a recorded call (a SpanRecord or an ``(id, result, encoded result)`` tuple) for replay lookups."""
+        self._replay_recent[key] = hit
+        if len(self._replay_recent) > MAX_REPLAY_CACHE:
+            del self._replay_recent[next(iter(self._replay_recent))]
+
+    def _sampled(self):
+        """Decide whether a traced call is recorded under the configured sample rate."""
+        if self.sample_rate >= 1.0 or random.random() < self.sample_rate:
+            return True
+        self._metrics.spans_sampled_out += 1
+        return False
+
+    def current_span(self):
+        """
+        Return the span of the innermost traced call running in this thread or task.
+        
+        Example:
+            span = tm.current_span()
+            span.add_event("retry", attempt=2, reason="rate_limited")
+            with span.measure("tool:search", query=query):
+                results = search(query)
+        
+        Returns:
+            Span: The active span, or a non-recording span whose methods do nothing
+            outside a traced call.
+        """
+        return current_span()
+
+    def metrics(self):
+        """
+        Return the tracer's own counters and histograms.
+        
+        Returns:
+            dict: Spans recorded, dropped and sampled out, buffer depth, flush counts,
+            rows and bytes written, database errors, and summaries of flush duration,
+            rows per flush and per-trace serialization time.
+        """
+        return self._metrics.snapshot(len(self.traces), self.exporters)
+
+    def serve_metrics(self, port=9464, host="127.0.0.1"):
+        """
+        Expose ``metrics()`` in the Prometheus text format at ``http://host:port/metrics``.
+        
+        Args:
+            port (int): Port to listen on. Use 0 to pick a free port.
+            host (str): Interface to bind.
+            
+        Returns:
+            ThreadingHTTPServer: The running server; call ``shutdown()`` to stop it.
+        """
+        return start_metrics_server(self.metrics, host=host, port=port)
+
+    def monitor_event_loop(self, loop=None, interval_ms=DEFAULT_LOOP_INTERVAL_MS, threshold_ms=DEFAULT_STALL_MS):
+        """
+        Watch an asyncio event loop for stalls and attribute them to the traced coroutine blocking it.
+        
+        Lag is recorded in the ``loop_lag_ms`` histogram. A stall longer than ``threshold_ms``
+        increments ``loop_stalls`` and adds a ``loop.stall`` event, with ``blocked_ms`` and the
+        task name, to the span of the traced coroutine that was running.
+        
+        Example:
+            async def main():
+                async with tm.monitor_event_loop(threshold_ms=50):
+                    await agent.run()
+        
+        Args:
+            loop (asyncio.AbstractEventLoop, optional): The loop to watch. Defaults to the running loop.
+            interval_ms (float): Time between heartbeats on the loop.
+            threshold_ms (float): Lag above which the loop counts as stalled.
+            
+        Returns:
+            LoopMonitor: The running monitor; call ``stop()`` to end it.
+        """
+        if loop is None:
+            loop = asyncio.get_running_loop()
+        return LoopMonitor(self, loop, interval_ms=interval_ms, threshold_ms=threshold_ms).start()
+
+    def add_usage_extractor(self, extractor):
+        """
+        Register a custom token usage extractor, tried before the existing ones.
+        
+        Args:
+            extractor (callable): Takes a traced result and returns a dict with any of
+                ``model``, ``prompt_tokens``, ``completion_tokens``, ``cached_tokens`` and
+                ``total_tokens``, or None if it does not recognise the result.
+        """
+        self.usage_extractors.insert(0, extractor)
+
+    def _extract_usage(self, result):
+        """
+        Run the usage extractors over a traced result.
+        
+        Args:
+            result: The traced result.
+            
+        Returns:
+            dict: Token usage from the first extractor that recognises the result, or None.
+        """
+        for extractor in self.usage_extractors:
+            try:
+                usage = extractor(result)
+            except Exception as e:
+                logging.debug(f"Usage extractor {extractor!r} failed: {str(e)}")
+                continue
+            if usage:
+                return usage
+        return None
 
     def _sanitize_for_json(self, obj):
         """
@@ -260,40 +677,141 @@ class TraceManager:
         else:
             return str(obj)
 
+    def add_exporter(self, exporter):
+        """
+        Register a span exporter that receives completed traces on each flush.
+        
+        Args:
+            exporter (SpanExporter): The exporter. Its ``export`` method must not block.
+        """
+        self.exporters.append(exporter)
+
+    def _export(self, rows):
+        """Hand completed trace rows to every registered exporter."""
+        if not self.exporters:
+            return
+        columns = TABLE_COLUMNS["traces"]
+        completed = [dict(zip(columns, row)) for row in rows if row[3] != START]
+        if not completed:
+            return
+        for exporter in self.exporters:
+            try:
+                exporter.export(completed)
+            except Exception as e:
+                logging.error(f"Error exporting traces with {type(exporter).__name__}: {str(e)}")
+
+    def close(self):
+        """
+        Flush and shut down this tracer, close its database, and unregister it.
+        
+        A later ``TraceManager(name=...)`` (or ``TraceManager()`` for the default
+        tracer) creates a fresh instance.
+        """
+        self.shutdown()
+        self._profiler.shutdown()
+        if self._exit_hook_registered:
+            atexit.unregister(self.shutdown)
+            self._exit_hook_registered = False
+        if self._storage_open:
+            self.storage.close()
+            self._storage_open = False
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+        cls = type(self)
+        with cls._registry_lock:
+            if cls._instance is self:
+                cls._instance = None
+            elif cls._named.get(self.name) is self:
+                del cls._named[self.name]
+
+    def shutdown(self):
+        """
+        Flush pending traces, then stop the exporters and the live terminal view.
+        """
+        self.save_traces()
+        for exporter in self.exporters:
+            try:
+                exporter.shutdown()
+            except Exception as e:
+                logging.error(f"Error shutting down {type(exporter).__name__}: {str(e)}")
+        if self.live_view is not None:
+            self.live_view.close()
+
     def save_traces(self):
         """
-        Persist the collected traces to the SQLite database and clear the internal trace list.
+        Persist the collected traces to the storage backend and clear the internal trace list.
+        
+        Buffered records are encoded to rows here rather than when they are traced.
+        Completed traces are also handed to any registered exporters once they are committed.
         """
-        if not self.traces or self.conn is None:
+        if not self.traces and not self._spill_replay:
+            return
+        # Threads flushing right now, for the loop monitor; flushes may overlap.
+        thread_id = threading.get_ident()
+        self._flush_threads.add(thread_id)
+        try:
+            self._flush()
+        finally:
+            self._flush_threads.discard(thread_id)
+
+    def _flush(self):
+        """Write the buffer and any journaled traces being replayed; see ``save_traces``."""
+        backend = self._backend()
+        if backend is None:
+            if self.exporters and self.traces:
+                traces, self.traces = self.traces, []
+                self._export([self._encode(record) for record in traces])
             return
 
+        flush_start = time.perf_counter()
+        spill_mark = self._spill.mark() if self._spill is not None else None
+        replay = self._spill_replay
+        self._spill_replay = False
+        traces, self.traces = self.traces, []
+        rows = [self._encode(record) for record in traces]
+        written = rows
+        if replay:
+            # Journals written by older versions have fewer metric columns.
+            width = len(TABLE_COLUMNS["traces"])
+            journaled = [row + (None,) * (width - len(row)) for row in self._spill.read(spill_mark)]
+            # Keep the last state of each trace; buffered rows are newer than journaled ones.
+            written = list({row[0]: row for row in journaled + rows}.values())
         try:
-            self.conn.execute("BEGIN TRANSACTION")
-            for trace in self.traces:
-                self.cursor.execute('''
-                    INSERT OR REPLACE INTO traces 
-                    (id, session_id, timestamp, trace_type, function_name, tags, data)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    trace["id"],
-                    trace["session_id"],
-                    trace["timestamp"],
-                    trace["trace_type"],
-                    trace["function_name"],
-                    trace["tags"],
-                    trace["data"]
-                ))
-            self.conn.commit()
-            trace_count = len(self.traces)
-            self.traces = []
-            logging.info(f"Saved {trace_count} traces to SQLite at {self.db_path}")
+            backend.write_traces(written)
         except Exception as e:
-            logging.error(f"Error saving traces to SQLite: {str(e)}")
-            self.conn.rollback()
+            logging.error(f"Error saving traces to {self.storage}: {str(e)}")
+            self._metrics.db_errors += 1
+            for record in traces:
+                record.flushed = False
+            self.traces = traces + self.traces
+            self._spill_replay = self._spill_replay or replay
+            return
+        if self._spill is not None:
+            self._spill.discard(spill_mark)
+        self.query_cache.invalidate()
+        trace_count = len(written)
+        self._metrics.record_flush(
+            trace_count,
+            sum(len(row[6]) + len(row[5] or "") for row in written),
+            (time.perf_counter() - flush_start) * 1000,
+            len(rows),
+        )
+        self._export(written)
+        logging.info(f"Saved {trace_count} traces to {self.storage}")
+
+    @staticmethod
+    def _encode(record):
+        """Mark a record as written and encode it as a row."""
+        # Flag first: an END merged while the row is built buffers the record again.
+        record.flushed = True
+        row, record.encoded = record.encoded, None
+        return row if row is not None else record.to_row()
 
-    def get_traces(self, limit=100, trace_type=None, tag=None, function_name=None, session_id=None):
+    def get_traces(self, limit=100, trace_type=None, tag=None, function_name=None, session_id=None,
+                   since=None, until=None):
         """
-        Retrieve traces from the SQLite database using various filtering options.
+        Retrieve traces from the storage backend using various filtering options.
         
         Args:
             limit (int): Maximum number of traces to retrieve.
@@ -301,37 +819,20 @@ class TraceManager:
             tag (str, optional): Filter by tag.
             function_name (str, optional): Filter by function name.
             session_id (str, optional): Filter by session identifier.
+            since (str, optional): Only include traces with an ISO timestamp at or after this value.
+            until (str, optional): Only include traces with an ISO timestamp before this value.
             
         Returns:
             list: A list of trace dictionaries.
         """
-        if self.conn is None:
+        backend = self._backend()
+        if backend is None:
             return []
 
-        traces = []
-        try:
-            query = "SELECT id, session_id, timestamp, trace_type, function_name, tags, data FROM traces"
-            conditions = []
-            params = []
-            if trace_type:
-                conditions.append("trace_type = ?")
-                params.append(trace_type)
-            if tag:
-                conditions.append("tags LIKE ?")
-                params.append(f'%"{tag}"%')
-            if function_name:
-                conditions.append("function_name = ?")
-                params.append(function_name)
-            if session_id:
-                conditions.append("session_id = ?")
-                params.append(session_id)
-            if conditions:
-                query += " WHERE " + " AND ".join(conditions)
-            query += " ORDER BY timestamp DESC LIMIT ?"
-            params.append(limit)
-
-            self.cursor.execute(query, params)
-            rows = self.cursor.fetchall()
+        def fetch():
+            traces = []
+            rows = backend.query_traces(limit=limit, trace_type=trace_type, tag=tag, function_name=function_name,
+                                        session_id=session_id, since=since, until=until)
             for row in rows:
                 data = json.loads(row[6]) if row[6] else {}
                 tags_val = json.loads(row[5]) if row[5] else None
@@ -346,25 +847,209 @@ class TraceManager:
                 trace.update(data)
                 traces.append(trace)
             return traces
+
+        try:
+            return self._cached_query(
+                query_key("traces", limit=limit, trace_type=trace_type, tag=tag,
+                          function_name=function_name, session_id=session_id, since=since, until=until),
+                fetch
+            )
+        except Exception as e:
+            logging.error(f"Error retrieving traces from {self.storage}: {str(e)}")
+            return []
+
+    def get_sessions(self, limit=100, since=None, until=None):
+        """
+        Retrieve summaries of the most recently active sessions.
+        
+        Summaries are kept up to date as traces are saved and evaluations finish,
+        so listing sessions does not scan the traces.
+        
+        Args:
+            limit (int): Maximum number of sessions to retrieve.
+            since (str, optional): Only include sessions last active at or after this ISO timestamp.
+            until (str, optional): Only include sessions last active before this ISO timestamp.
+            
+        Returns:
+            list: Session dictionaries with first and last timestamps, span and error counts,
+            total duration, tags and linked evaluation IDs, most recently active first.
+        """
+        backend = self._backend()
+        if backend is None:
+            return []
+
+        def fetch():
+            return [{
+                "session_id": row[0],
+                "first_timestamp": row[1],
+                "last_timestamp": row[2],
+                "span_count": row[3],
+                "error_count": row[4],
+                "total_duration_ms": row[5],
+                "tags": json.loads(row[6]) if row[6] else [],
+                "eval_ids": json.loads(row[7]) if row[7] else [],
+            } for row in backend.query_sessions(limit=limit, since=since, until=until)]
+
+        try:
+            return self._cached_query(query_key("sessions", limit=limit, since=since, until=until), fetch)
         except Exception as e:
-            logging.error(f"Error retrieving traces from SQLite: {str(e)}")
+            logging.error(f"Error retrieving sessions from {self.storage}: {str(e)}")
+            return []
+
+    def _cached_query(self, key, fetch):
+        """
+        Serve a read query from the query cache, running ``fetch`` on a miss.
+        
+        Commits made through this manager invalidate the cache directly; commits
+        from other connections are detected through the backend's ``data_version``
+        (``PRAGMA data_version`` for SQLite).
+        
+        Args:
+            key (tuple): Key built by ``query_key``.
+            fetch (callable): Runs the query and returns a list of dictionaries.
+            
+        Returns:
+            list: Deep copies of the result dictionaries, so callers may modify them and
+            their nested values.
+        """
+        cache = self.query_cache
+        cache.observe_data_version(self.storage.data_version())
+        hit, rows = cache.get(key)
+        if not hit:
+            generation = cache.generation
+            rows = fetch()
+            cache.put(key, rows, generation)
+        return copy.deepcopy(rows)
+
+    def export_arrow(self, output_dir, format="parquet", tables=None, since=None, include_payloads=False,
+                     chunk_size=50000):
+        """
+        Flush pending traces and export the database to columnar Parquet or Arrow files.
+        
+        Args:
+            output_dir (str): Directory to write the dataset into.
+            format (str): "parquet" or "arrow".
+            tables (list, optional): Tables to export. Defaults to traces, eval_events and eval_results.
+            since (dict, optional): Watermark mapping table name to the last rowid already exported.
+            include_payloads (bool): Whether to include the raw JSON ``data`` column.
+            chunk_size (int): Number of rows per record batch.
+            
+        Returns:
+            dict: Per table, the rows written, the output path and the new watermark.
+            
+        Raises:
+            ValueError: If traces are not stored in SQLite.
+        """
+        from .export import EXPORT_TABLES, export_tables
+
+        if not isinstance(self.storage, SQLiteBackend):
+            raise ValueError(f"export_arrow reads SQLite databases; this tracer stores traces in {self.storage}")
+        self.save_traces()
+        return export_tables(self.storage.db_path, output_dir, format=format, tables=tables or EXPORT_TABLES, since=since,
+                             include_payloads=include_payloads, chunk_size=chunk_size)
+
+    def get_token_usage(self, group_by="function", function_name=None, session_id=None, tag=None, model=None,
+                        since=None, until=None, limit=100):
+        """
+        Aggregate token usage and throughput from the numeric usage columns.
+        
+        Args:
+            group_by (str): One of "function", "session", "tag" or "model".
+            function_name (str, optional): Filter by function name.
+            session_id (str, optional): Filter by session identifier.
+            tag (str, optional): Filter by tag.
+            model (str, optional): Filter by model name.
+            since (str, optional): Only include traces with an ISO timestamp at or after this value.
+            until (str, optional): Only include traces with an ISO timestamp before this value.
+            limit (int): Maximum number of groups to return.
+            
+        Returns:
+            list: One dictionary per group with call count, token totals, total duration
+            and ``tokens_per_second`` (completion tokens per second of traced time).
+            Empty unless the SQLite backend is in use.
+        """
+        group_columns = {
+            "function": "traces.function_name",
+            "session": "traces.session_id",
+            "tag": "tag_values.value",
+            "model": "traces.model",
+        }
+        if group_by not in group_columns:
+            raise ValueError(f"group_by must be one of {sorted(group_columns)}")
+        if self.conn is None:
+            return []
+
+        try:
+            query = "FROM traces"
+            if group_by == "tag":
+                query += ", json_each(traces.tags) AS tag_values"
+            conditions = ["traces.total_tokens IS NOT NULL"]
+            params = []
+            if function_name:
+                conditions.append("traces.function_name = ?")
+                params.append(function_name)
+            if session_id:
+                conditions.append("traces.session_id = ?")
+                params.append(session_id)
+            if tag:
+                conditions.append("traces.tags LIKE ?")
+                params.append(f'%"{tag}"%')
+            if model:
+                conditions.append("traces.model = ?")
+                params.append(model)
+            if since:
+                conditions.append("traces.timestamp >= ?")
+                params.append(since)
+            if until:
+                conditions.append("traces.timestamp < ?")
+                params.append(until)
+            key = group_columns[group_by]
+            query = (
+                f"SELECT {key}, COUNT(*), SUM(traces.prompt_tokens), SUM(traces.completion_tokens), "
+                f"SUM(traces.cached_tokens), SUM(traces.total_tokens), SUM(traces.duration_ms) "
+                f"{query} WHERE {' AND '.join(conditions)} "
+                f"GROUP BY {key} ORDER BY SUM(traces.total_tokens) DESC LIMIT ?"
+            )
+            params.append(limit)
+
+            self.cursor.execute(query, params)
+            usage = []
+            for row in self.cursor.fetchall():
+                duration_ms = row[6] or 0
+                completion_tokens = row[3] or 0
+                usage.append({
+                    group_by: row[0],
+                    "calls": row[1],
+                    "prompt_tokens": row[2] or 0,
+                    "completion_tokens": completion_tokens,
+                    "cached_tokens": row[4] or 0,
+                    "total_tokens": row[5] or 0,
+                    "duration_ms": duration_ms,
+                    "tokens_per_second": completion_tokens / (duration_ms / 1000) if duration_ms else None,
+                })
+            return usage
+        except Exception as e:
+            logging.error(f"Error retrieving token usage from SQLite: {str(e)}")
             return []
 
     def __del__(self):
         """
-        Destructor for TraceManager that saves any pending traces and closes the database connection.
+        Destructor for TraceManager that saves any pending traces and closes the storage backend.
         """
-        if hasattr(self, 'spinner_running'):
-            self.spinner_running = False
+        if getattr(self, 'live_view', None) is not None:
+            self.live_view.close()
             
-        if hasattr(self, 'conn') and self.conn:
+        if getattr(self, '_storage_open', False):
             self.save_traces()
-            self.conn.close()
+            self.storage.close()
 
     def evaluate_tool_output(self, output, schema):
         """
         Evaluate whether the output from a tool matches the expected schema.
         
+        The schema is compiled once and cached, and all validation errors are
+        collected rather than stopping at the first one.
+        
         Args:
             output: The output from a tool, as a dict or JSON string.
             schema (dict): The JSON schema the output is expected to satisfy.
@@ -372,38 +1057,26 @@ class TraceManager:
         Returns:
             dict: A dictionary with the evaluation status and error details if applicable.
         """
-        try:
-            if isinstance(output, str):
-                try:
-                    output = json.loads(output)
-                except json.JSONDecodeError:
-                    return {"success": False, "errors": ["Output is not valid JSON"]}
-            if "required" in schema:
-                for field in schema["required"]:
-                    if field not in output:
-                        return {"success": False, "errors": [f"Missing required field: {field}"]}
-            if "properties" in schema:
-                for prop_name, prop_schema in schema["properties"].items():
-                    if prop_name in output:
-                        prop_value = output[prop_name]
-                        expected_type = prop_schema.get("type")
-                        if expected_type == "string" and not isinstance(prop_value, str):
-                            return {"success": False, "errors": [f"Field {prop_name} should be a string"]}
-                        elif expected_type == "number" and not isinstance(prop_value, (int, float)):
-                            return {"success": False, "errors": [f"Field {prop_name} should be a number"]}
-                        elif expected_type == "integer" and not isinstance(prop_value, int):
-                            return {"success": False, "errors": [f"Field {prop_name} should be an integer"]}
-                        elif expected_type == "boolean" and not isinstance(prop_value, bool):
-                            return {"success": False, "errors": [f"Field {prop_name} should be a boolean"]}
-                        elif expected_type == "array" and not isinstance(prop_value, list):
-                            return {"success": False, "errors": [f"Field {prop_name} should be an array"]}
-                        elif expected_type == "object" and not isinstance(prop_value, dict):
-                            return {"success": False, "errors": [f"Field {prop_name} should be an object"]}
-            return {"success": True, "errors": []}
-        except Exception as e:
-            return {"success": False, "errors": [f"Error evaluating tool output: {str(e)}"]}
+        from .validation import compile_schema
 
-    def trace(self, func=None, *, tags=None, session_id=None):
+        return compile_schema(schema)(output)
+
+    def evaluate_tool_outputs(self, outputs, schema):
+        """
+        Evaluate many tool outputs against a single schema.
+        
+        Args:
+            outputs (iterable): The outputs from a tool, as dicts or JSON strings.
+            schema (dict): The JSON schema the outputs are expected to satisfy.
+            
+        Returns:
+            list: One evaluation dictionary per output, in input order.
+        """
+        from .validation import validate_many
+
+        return validate_many(outputs, schema)
+
+    def trace(self, func=None, *, tags=None, session_id=None, profile=None, replay=None, replay_ignore=None):
         """
         Decorator to trace function execution, automatically selecting asynchronous or synchronous tracing.
         
@@ -413,18 +1086,32 @@ class TraceManager:
             func (callable, optional): The function to decorate.
             tags (list, optional): A list of tags to associate with the trace.
             session_id (str, optional): The session identifier.
+            profile (bool or float, optional): Sample the call's stacks and keep them with traces
+                that fail or take at least this many milliseconds. ``True`` uses the tracer's
+                ``profile_slow_ms`` (or 1000 ms), ``False`` disables profiling for this function.
+                Defaults to the tracer's ``profile_slow_ms``.
+            replay (str or bool, optional): Replay mode for this function (``"record"``, ``"replay"``
+                or ``"record_missing"``), or ``False`` to never replay it. Defaults to the
+                tracer's ``replay_mode``.
+            replay_ignore (list, optional): Names of parameters, such as clients or request IDs,
+                left out of the arguments hash.
             
         Returns:
             callable: The decorated function.
         """
+        if replay is not False:
+            check_mode(replay)
+        replay_options = (replay, tuple(replay_ignore or ()))
         if func is not None:
-            return self._apply_trace(func, tags=tags or [], session_id=session_id)
+            return self._apply_trace(func, tags=tags or [], session_id=session_id, profile=profile,
+                                     replay=replay_options)
 
         def decorator(func):
-            return self._apply_trace(func, tags=tags or [], session_id=session_id)
+            return self._apply_trace(func, tags=tags or [], session_id=session_id, profile=profile,
+                                     replay=replay_options)
         return decorator
 
-    def _apply_trace(self, func, tags=None, session_id=None):
+    def _apply_trace(self, func, tags=None, session_id=None, profile=None, replay=None):
         """
         Apply the appropriate trace decorator based on whether the function is asynchronous.
         
@@ -432,16 +1119,18 @@ class TraceManager:
             func (callable): The function to decorate.
             tags (list, optional): List of tags for the trace.
             session_id (str, optional): Session identifier.
+            profile (bool or float, optional): Profiling setting, as for ``trace``.
+            replay (tuple, optional): Replay mode and ignored parameter names, as for ``trace``.
             
         Returns:
             callable: The wrapped function.
         """
         if inspect.iscoroutinefunction(func):
-            return self._trace_async(func, tags, session_id)
+            return self._trace_async(func, tags, session_id, profile, replay)
         else:
-            return self._trace_sync(func, tags, session_id)
+            return self._trace_sync(func, tags, session_id, profile, replay)
 
-    def _trace_async(self, func, tags=None, session_id=None):
+    def _trace_async(self, func, tags=None, session_id=None, profile=None, replay=None):
         """
         Asynchronous decorator to log function start and end, including arguments and results.
         
@@ -449,10 +1138,16 @@ class TraceManager:
             func (callable): The asynchronous function to decorate.
             tags (list, optional): Tags for the trace.
             session_id (str, optional): Session identifier.
+            profile (bool or float, optional): Profiling setting, as for ``trace``.
+            replay (tuple, optional): Replay mode and ignored parameter names, as for ``trace``.
             
         Returns:
             callable: The wrapped asynchronous function.
         """
+        code = getattr(func, "__code__", None)
+        replay_mode, replay_ignore = replay or (None, ())
+        signature = signature_of(func)
+
         @functools.wraps(func)
         async def wrapper(*args, **kwargs):
             trace_enabled = True
@@ -461,8 +1156,21 @@ class TraceManager:
                 self_obj = args[0]
             else:
                 self_obj = None
+            if trace_enabled and not self._sampled():
+                trace_enabled = False
+
+            mode = self.replay_mode if replay_mode is None else replay_mode
+            call_hash = replayed = None
+            if mode and signature is not None:
+                call_hash = args_hash(func, signature, args, kwargs, self._sanitize_for_json, replay_ignore)
+                if call_hash is not None and mode != RECORD:
+                    replayed = self._replay_lookup(func.__name__, call_hash)
+            # Arguments that do not bind are left to the call itself, which raises the caller's TypeError.
+            if mode == REPLAY and replayed is None and (call_hash is not None or signature is None):
+                raise ReplayMissError(f"No recorded call to {func.__name__} matches these arguments")
 
-            start_time = time.time()
+            start_ns = time.perf_counter_ns()
+            sampling = None
             if trace_enabled:
                 sig = inspect.signature(func)
                 param_names = list(sig.parameters.keys())
@@ -473,12 +1181,46 @@ class TraceManager:
                         args_dict[param_names[i]] = arg
                     else:
                         args_dict[f"arg{i}"] = arg
-                current_session_id = self.add_trace("START", func.__name__, args_dict, kwargs, tags=tags, session_id=session_id)
+                current_session_id = session_id or str(uuid.uuid4())
+                record = self._start_record(func.__name__, args_dict, kwargs, tags, current_session_id)
+                span = Span(func.__name__, current_session_id, self.max_span_events, start_ns / 1e9)
+                span_token = activate(span)
+                threshold_ms = self._profile_threshold(profile) if code is not None else None
+                if threshold_ms is not None:
+                    sampling = self._profiler.start(code)
+                timer = CallTimer(start_ns, self.trace_memory)
 
-            result = await func(*args, **kwargs)
+            try:
+                if replayed is not None:
+                    result = replayed[1]
+                elif trace_enabled:
+                    coro = func(*args, **kwargs)
+                    if sampling is not None:
+                        sampling.frame = getattr(coro, "cr_frame", None)
+                    result = await timer.run(coro, span)
+                else:
+                    result = await func(*args, **kwargs)
+            except BaseException as e:
+                if trace_enabled:
+                    self._finish_failed(record, func.__name__, timer, tags, current_session_id, span, e,
+                                        sampling, threshold_ms)
+                raise
+            finally:
+                if trace_enabled:
+                    deactivate(span_token)
+                    if sampling is not None:
+                        self._profiler.stop(sampling)
+            if trace_enabled and is_stream_result(result, kwargs):
+                if call_hash is not None and replayed is None:
+                    logging.warning(f"Not recording {func.__name__} for replay: it returned a stream")
+                return self._wrap_stream(result, func.__name__, timer, tags, current_session_id, span, record)
             if trace_enabled:
-                duration_ms = (time.time() - start_time) * 1000
+                duration_ms, timing = timer.finish()
+                profile_data = self._end_profile(sampling, threshold_ms, duration_ms) if sampling else None
                 standardized_result = result
+                streaming_summary = None
+                if isinstance(result, dict) and "streaming_events" in result:
+                    standardized_result, streaming_summary = summarize_streaming_events(result)
                 if isinstance(result, tuple) and len(result) >= 2:
                     processed_response, raw_response = result[0], result[1]
                     standardized_result = {
@@ -504,11 +1246,15 @@ class TraceManager:
                             else:
                                 logging.warning(f"TOOL EVAL: {func.__name__} - Schema validation FAILED: {tool_eval['errors']}")
                 logging.info(f"TRACE END: {func.__name__} - result: {standardized_result!r}")
-                self.add_trace("END", func.__name__, result=standardized_result, duration=duration_ms, tool_eval=tool_eval, tags=tags, session_id=current_session_id)
+                self._finish_record(record, "END", func.__name__, result=standardized_result, duration=duration_ms,
+                                    tool_eval=tool_eval, tags=tags, session_id=current_session_id,
+                                    streaming=streaming_summary, span=span, profile=profile_data, timing=timing,
+                                    args_hash=call_hash if replayed is None else None, raw_result=result,
+                                    replayed_from=replayed[0] if replayed is not None else None)
             return result
         return wrapper
 
-    def _trace_sync(self, func, tags=None, session_id=None):
+    def _trace_sync(self, func, tags=None, session_id=None, profile=None, replay=None):
         """
         Synchronous decorator to log function execution details including arguments and result.
         
@@ -516,10 +1262,15 @@ class TraceManager:
             func (callable): The synchronous function to decorate.
             tags (list, optional): Tags for the trace.
             session_id (str, optional): Session identifier.
+            profile (bool or float, optional): Profiling setting, as for ``trace``.
             
         Returns:
             callable: The wrapped synchronous function.
         """
+        code = getattr(func, "__code__", None)
+        replay_mode, replay_ignore = replay or (None, ())
+        signature = signature_of(func)
+
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
             trace_enabled = True
@@ -528,8 +1279,21 @@ class TraceManager:
                 self_obj = args[0]
             else:
                 self_obj = None
+            if trace_enabled and not self._sampled():
+                trace_enabled = False
+
+            mode = self.replay_mode if replay_mode is None else replay_mode
+            call_hash = replayed = None
+            if mode and signature is not None:
+                call_hash = args_hash(func, signature, args, kwargs, self._sanitize_for_json, replay_ignore)
+                if call_hash is not None and mode != RECORD:
+                    replayed = self._replay_lookup(func.__name__, call_hash)
+            # Arguments that do not bind are left to the call itself, which raises the caller's TypeError.
+            if mode == REPLAY and replayed is None and (call_hash is not None or signature is None):
+                raise ReplayMissError(f"No recorded call to {func.__name__} matches these arguments")
 
-            start_time = time.time()
+            start_ns = time.perf_counter_ns()
+            sampling = None
             if trace_enabled:
                 sig = inspect.signature(func)
                 param_names = list(sig.parameters.keys())
@@ -540,40 +1304,38 @@ class TraceManager:
                         args_dict[param_names[i]] = arg
                     else:
                         args_dict[f"arg{i}"] = arg
-                current_session_id = self.add_trace("START", func.__name__, args_dict, kwargs, tags=tags, session_id=session_id)
+                current_session_id = session_id or str(uuid.uuid4())
+                record = self._start_record(func.__name__, args_dict, kwargs, tags, current_session_id)
+                span = Span(func.__name__, current_session_id, self.max_span_events, start_ns / 1e9)
+                span_token = activate(span)
+                threshold_ms = self._profile_threshold(profile) if code is not None else None
+                if threshold_ms is not None:
+                    sampling = self._profiler.start(code)
+                timer = CallTimer(start_ns, self.trace_memory)
 
-            result = func(*args, **kwargs)
+            try:
+                result = replayed[1] if replayed is not None else func(*args, **kwargs)
+            except BaseException as e:
+                if trace_enabled:
+                    self._finish_failed(record, func.__name__, timer, tags, current_session_id, span, e,
+                                        sampling, threshold_ms)
+                raise
+            finally:
+                if trace_enabled:
+                    deactivate(span_token)
+                    if sampling is not None:
+                        self._profiler.stop(sampling)
+            if trace_enabled and is_stream_result(result, kwargs):
+                if call_hash is not None and replayed is None:
+                    logging.warning(f"Not recording {func.__name__} for replay: it returned a stream")
+                return self._wrap_stream(result, func.__name__, timer, tags, current_session_id, span, record)
             if trace_enabled:
-                duration_ms = (time.time() - start_time) * 1000
+                duration_ms, timing = timer.finish()
+                profile_data = self._end_profile(sampling, threshold_ms, duration_ms) if sampling else None
                 standardized_result = result
-                
-                # Handle streaming responses
-                is_streaming = False
                 streaming_summary = None
-                if "stream" in kwargs and kwargs["stream"] is True:
-                    is_streaming = True
-                
-                # Check if result is a dict with streaming_events
                 if isinstance(result, dict) and "streaming_events" in result:
-                    is_streaming = True
-                    # Create a summary of streaming events
-                    event_types = {}
-                    for event in result.get("streaming_events", []):
-                        event_type = getattr(event, "type", str(type(event)))
-                        event_types[event_type] = event_types.get(event_type, 0) + 1
-                    
-                    streaming_summary = {
-                        "is_streaming": True,
-                        "event_count": len(result.get("streaming_events", [])),
-                        "event_types": event_types,
-                        "full_response": result.get("full_response", "")
-                    }
-                    
-                    # Replace the full event list with the summary to avoid huge traces
-                    if "streaming_events" in result:
-                        result_copy = result.copy()
-                        result_copy["streaming_events"] = f"[{len(result['streaming_events'])} events]"
-                        standardized_result = result_copy
+                    standardized_result, streaming_summary = summarize_streaming_events(result)
                 
                 if isinstance(result, tuple) and len(result) >= 2:
                     processed_response, raw_response = result[0], result[1]
@@ -601,23 +1363,79 @@ class TraceManager:
                             else:
                                 logging.warning(f"TOOL EVAL: {func.__name__} - Schema validation FAILED: {tool_eval['errors']}")
                 
-                trace_data = {
-                    "result": standardized_result,
-                    "duration": duration_ms,
-                    "tool_eval": tool_eval
-                }
-                
-                # Add streaming summary if available
-                if streaming_summary:
-                    trace_data["streaming_summary"] = streaming_summary
-                
                 logging.info(f"TRACE END: {func.__name__} - result: {standardized_result!r}")
-                self.add_trace("END", func.__name__, result=standardized_result, duration=duration_ms, 
-                              tool_eval=tool_eval, tags=tags, session_id=current_session_id)
+                self._finish_record(record, "END", func.__name__, result=standardized_result, duration=duration_ms,
+                                    tool_eval=tool_eval, tags=tags, session_id=current_session_id,
+                                    streaming=streaming_summary, span=span, profile=profile_data, timing=timing,
+                                    args_hash=call_hash if replayed is None else None, raw_result=result,
+                                    replayed_from=replayed[0] if replayed is not None else None)
             
             return result
         return wrapper
 
+    def _wrap_stream(self, stream, func_name, timer, tags, session_id, span=None, record=None):
+        """
+        Wrap a generator or stream returned by a traced function so that its END trace
+        is recorded when the stream is finished rather than when it is returned.
+        
+        Args:
+            stream: The generator, async generator or SDK stream returned by the function.
+            func_name (str): The name of the traced function.
+            timer (CallTimer): The call's timer; it runs until the stream finishes.
+            tags (list, optional): Tags for the trace.
+            session_id (str): Session identifier returned by the START trace.
+            span (Span, optional): The call's span; events added to it before the stream
+                finishes are stored with the END trace.
+            record (SpanRecord, optional): The call's START record, completed when the stream finishes.
+            
+        Returns:
+            The wrapped stream, which yields the same chunks as the original.
+        """
+        def on_finish(summary, stats):
+            duration_ms, timing = timer.finish()
+            usage = merge_usage(self._extract_usage(chunk) for chunk in stats.usage_chunks)
+            logging.info(f"TRACE END: {func_name} - streamed {summary['chunk_count']} chunks")
+            self._finish_record(record, "END", func_name, result=f"[{summary['chunk_count']} chunks]",
+                                duration=duration_ms, tags=tags, session_id=session_id, streaming=summary,
+                                usage=usage, span=span, timing=timing)
+        wrapped = wrap_stream(stream, on_finish, start=timer.start_ns / 1e9, span=span)
+        if timer.memory_token is not None:
+            # Release the memory token when the stream is collected, or at exit, even if it
+            # was never exhausted or closed.
+            weakref.finalize(wrapped, timer.release)
+        return wrapped
+
+def _resolve_tracer(tracer):
+    """Return the TraceManager for a tracer argument: an instance, a registered name, or None for the default."""
+    if isinstance(tracer, TraceManager):
+        return tracer
+    return TraceManager.get(tracer)
+
+
+def trace(func=None, *, tags=None, session_id=None, tracer=None, profile=None, replay=None, replay_ignore=None):
+    """
+    Decorator that traces a function with a chosen tracer.
+    
+    Can be used as ``@trace`` or ``@trace(tracer=tenant_tracer, tags=[...])``.
+    
+    Args:
+        func (callable, optional): The function to decorate.
+        tags (list, optional): Tags to associate with the trace.
+        session_id (str, optional): Session identifier for grouping traces.
+        tracer (TraceManager or str, optional): Tracer (or tracer name) that records the
+            calls. Defaults to the default TraceManager.
+        profile (bool or float, optional): Keep sampled stacks of slow or failing calls;
+            see ``TraceManager.trace``.
+        replay (str or bool, optional): Record/replay mode; see ``TraceManager.trace``.
+        replay_ignore (list, optional): Parameters left out of the arguments hash.
+        
+    Returns:
+        callable: The decorated function or a decorator.
+    """
+    return _resolve_tracer(tracer).trace(func, tags=tags, session_id=session_id, profile=profile, replay=replay,
+                                         replay_ignore=replay_ignore)
+
+
 class TracerEval:
     """
     Performs evaluation of a task function over test cases, logging events and results via TraceManager.
@@ -625,7 +1443,8 @@ class TracerEval:
     Supports scoring of outputs and optional tracking of tools including schema evaluation.
     """
     def __init__(self, name: str, data, task, scores, trial_count: int = 1,
-                 track_tools: bool = False, tools=None, session_id=None, **task_kwargs):
+                 track_tools: bool = False, tools=None, session_id=None, tracer=None, scheduler=None,
+                 **task_kwargs):
         """
         Initialize the evaluation process.
         
@@ -638,8 +1457,15 @@ class TracerEval:
             track_tools (bool): Whether to track tools and schema validations.
             tools (list, optional): List of tools to use.
             session_id (str, optional): Session identifier.
+            tracer (TraceManager or str, optional): Tracer (or tracer name) that stores the
+                evaluation. Defaults to the default TraceManager.
+            scheduler (EvalScheduler, optional): Runs cases concurrently under adaptive concurrency
+                and rate limits, retrying transient failures. Cases that still fail are recorded
+                with an ``error`` instead of stopping the evaluation. Without one, cases run one
+                at a time and task errors propagate.
             **task_kwargs: Additional keyword arguments for the task.
         """
+        self.tracer = tracer
         self.name = name
         self.data = data
         self.task = task
@@ -650,6 +1476,7 @@ class TracerEval:
         self.tools = tools or []
         self.tool_summary = {"total_tool_calls": 0, "successful_tool_calls": 0, "score": None}
         self.session_id = session_id or str(uuid.uuid4())
+        self.scheduler = scheduler
         self.task_kwargs = task_kwargs
         self.score_functions_code = self._extract_score_functions_code()
 
@@ -705,6 +1532,207 @@ class TracerEval:
                 score_functions_code[scorer_name] = f"Could not extract source code: {str(e)}"
         return score_functions_code
 
+    async def _run_case(self, tm, test_input, trial):
+        """
+        Run the task on one test case and score its output.
+        
+        Args:
+            tm (TraceManager): Tracer used to validate tool outputs.
+            test_input: The case's input.
+            trial (int): Trial number.
+            
+        Returns:
+            tuple: The result entry and the raw task output.
+        """
+        start_ns = time.perf_counter_ns()
+        retries = None
+        if self.scheduler is not None:
+            output, error, retries = await self.scheduler.call(self.wrapped_task, test_input)
+            if error is not None:
+                return {
+                    "input": test_input,
+                    "output": None,
+                    "duration_ms": (time.perf_counter_ns() - start_ns) / 1e6,
+                    "scores": {},
+                    "trial": trial,
+                    "retries": retries,
+                    "error": {"type": type(error).__name__, "message": str(error)}
+                }, None
+        elif inspect.iscoroutinefunction(self.wrapped_task):
+            output = await self.wrapped_task(test_input)
+        else:
+            output = self.wrapped_task(test_input)
+        duration = (time.perf_counter_ns() - start_ns) / 1e6
+
+        score_results = {}
+        for scorer in self.scores:
+            try:
+                scorer_name = getattr(scorer, "name", str(scorer))
+                score_results[scorer_name] = scorer(output)
+            except Exception as e:
+                score_results[scorer_name] = {"success": False, "error": str(e)}
+
+        tool_info = {}
+        if self.track_tools and self.tools:
+            if isinstance(output, tuple) and len(output) >= 2:
+                processed_output = output[0]
+                raw_output = output[1]
+                tool_evals = []
+                tools_passed = [tool.get("name", "unnamed") for tool in self.tools]
+                tool_called = None
+                for i, tool in enumerate(self.tools):
+                    if "input_schema" in tool:
+                        schema = tool["input_schema"]
+                        eval_result = tm.evaluate_tool_output(processed_output, schema)
+                        tool_evals.append(eval_result)
+                        if eval_result.get("success", False):
+                            tool_called = tool.get("name", f"tool_{i}")
+                any_schema_valid = any(te.get("success", False) for te in tool_evals) if tool_evals else False
+                tool_info = {
+                    "tools_passed": tools_passed,
+                    "tool_called": tool_called,
+                    "tool_evals": tool_evals,
+                    "schema_valid": any_schema_valid
+                }
+
+        result_entry = {
+            "input": test_input,
+            "output": tm._sanitize_for_json(output),
+            "duration_ms": duration,
+            "scores": score_results,
+            "trial": trial
+        }
+        if tool_info:
+            result_entry["tool_info"] = tool_info
+        if retries is not None:
+            result_entry["retries"] = retries
+        return result_entry, output
+
+    async def _run_cases(self, tm, test_cases, indices, on_result):
+        """
+        Run every trial of the selected test cases.
+        
+        Without a scheduler, cases run one at a time in order. With one, up to
+        ``scheduler.max_concurrency`` cases run at once and ``on_result`` is called
+        in completion order; if a case raises, the remaining ones are cancelled.
+        
+        Args:
+            tm (TraceManager): Tracer used to validate tool outputs.
+            test_cases (list): All test cases.
+            indices (list): Positions of the test cases to run.
+            on_result (callable): Called with ``(trial, index, result_entry, output)`` per case.
+        """
+        jobs = iter([(trial, index) for trial in range(self.trial_count) for index in indices])
+
+        async def worker():
+            for trial, index in jobs:
+                result_entry, output = await self._run_case(tm, test_cases[index].get("input", ""), trial)
+                on_result(trial, index, result_entry, output)
+
+        if self.scheduler is None:
+            await worker()
+            return
+        workers = [asyncio.ensure_future(worker()) for _ in range(self.scheduler.max_concurrency)]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            # When one worker fails, stop the others instead of leaving them running cases.
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    @staticmethod
+    def _tool_summary(results):
+        """
+        Summarize schema validation of tool calls over a list of result entries.
+        
+        Args:
+            results (list): Result entries from ``_run_case``.
+            
+        Returns:
+            dict: Total and successful tool calls and their ratio (None if there were none).
+        """
+        tool_results = [result["tool_info"] for result in results if result.get("tool_info")]
+        successful = sum(1 for info in tool_results if info.get("schema_valid"))
+        return {
+            "total_tool_calls": len(tool_results),
+            "successful_tool_calls": successful,
+            "score": successful / len(tool_results) if tool_results else None,
+        }
+
+    @staticmethod
+    def _output_data(name, results, tool_summary, score_functions_code, trial_count, test_case_count, track_tools):
+        """Build the payload stored in an ``eval_results`` row."""
+        return {
+            "eval_results": results,
+            "tool_summary": tool_summary if track_tools else None,
+            "score_functions_code": score_functions_code,
+            "metadata": {
+                "name": name,
+                "trial_count": trial_count,
+                "test_case_count": test_case_count,
+                "timestamp": datetime.now().isoformat(),
+                "track_tools": track_tools
+            }
+        }
+
+    @staticmethod
+    def _log_eval_event(tm, backend, eval_id, session_id, name, event_type, data):
+        """
+        Write one evaluation event to the storage backend.
+        
+        Args:
+            tm (TraceManager): Tracer whose storage and query cache are used.
+            backend (StorageBackend): The opened backend, or None to skip.
+            eval_id (str): Evaluation ID.
+            session_id (str): Session identifier.
+            name (str): Evaluation name.
+            event_type (str): The type of the event.
+            data (dict): Data associated with the event.
+        """
+        if backend is None:
+            return
+        try:
+            backend.write_eval_event((
+                new_id(),
+                eval_id,
+                session_id,
+                datetime.now().isoformat(),
+                event_type,
+                name,
+                json.dumps(tm._sanitize_for_json(data))
+            ))
+            tm.query_cache.invalidate()
+        except Exception as e:
+            logging.error(f"Error logging eval event: {str(e)}")
+
+    @staticmethod
+    def _save_eval_result(tm, backend, eval_id, name, trial_count, session_id, output_data):
+        """Write the ``eval_results`` row of a finished evaluation."""
+        if backend is None:
+            return
+        try:
+            json_data = json.dumps(tm._sanitize_for_json(output_data))
+            backend.write_eval_result((
+                eval_id,
+                name,
+                datetime.now().isoformat(),
+                trial_count,
+                session_id,
+                json_data
+            ))
+            tm.query_cache.invalidate()
+            logging.info(f"Saved evaluation results to {tm.storage} with ID: {eval_id}")
+        except Exception as e:
+            logging.error(f"Error saving evaluation results to {tm.storage}: {str(e)}")
+
+    @staticmethod
+    def _step_event(result):
+        """Return the EVAL_STEP event data for a result entry."""
+        return {key: result[key] for key in ("input", "output", "duration_ms", "scores", "trial", "tool_info",
+                                             "retries", "error")
+                if key in result}
+
     async def run(self):
         """
         Execute the evaluation on all test cases for the specified trials.
@@ -715,186 +1743,120 @@ class TracerEval:
         Returns:
             dict: The final evaluation data including results, tool summary, and metadata.
         """
-        import inspect
-        import time
-
-        tm = TraceManager()
-
-        if tm.conn:
-            try:
-                tm.cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS eval_events (
-                        id TEXT PRIMARY KEY,
-                        eval_id TEXT,
-                        session_id TEXT,
-                        timestamp TEXT,
-                        event_type TEXT,
-                        name TEXT,
-                        data JSON
-                    )
-                ''')
-                tm.cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS eval_results (
-                        id TEXT PRIMARY KEY,
-                        name TEXT,
-                        timestamp TEXT,
-                        trial_count INTEGER,
-                        session_id TEXT,
-                        data JSON
-                    )
-                ''')
-                tm.conn.commit()
-            except Exception as e:
-                logging.error(f"Error creating eval tables: {str(e)}")
+        tm = _resolve_tracer(self.tracer)
+        backend = tm._backend()
 
         def log_eval_event(event_type, data):
-            """
-            Helper function to log evaluation events to the database.
-            
-            Args:
-                event_type (str): The type of the event.
-                data (dict): Data associated with the event.
-            """
-            if not tm.conn:
-                return
-            try:
-                event_id = f"eval_event_{datetime.now().isoformat()}_{id(event_type)}"
-                json_data = json.dumps(tm._sanitize_for_json(data))
-                tm.cursor.execute('''
-                    INSERT INTO eval_events 
-                    (id, eval_id, session_id, timestamp, event_type, name, data)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    event_id,
-                    eval_id,
-                    self.session_id,
-                    datetime.now().isoformat(),
-                    event_type,
-                    self.name,
-                    json_data
-                ))
-                tm.conn.commit()
-            except Exception as e:
-                logging.error(f"Error logging eval event: {str(e)}")
-                if tm.conn:
-                    tm.conn.rollback()
+            self._log_eval_event(tm, backend, eval_id, self.session_id, self.name, event_type, data)
 
         eval_id = f"eval_{self.name}_{datetime.now().isoformat()}"
         log_eval_event("EVAL_START", {"trial_count": self.trial_count})
 
         test_cases = self.data()
+        results = {}
 
-        for trial in range(self.trial_count):
-            for case in test_cases:
-                test_input = case.get("input", "")
-                start_time = time.time()
-                if inspect.iscoroutinefunction(self.wrapped_task):
-                    output = await self.wrapped_task(test_input)
-                else:
-                    output = self.wrapped_task(test_input)
-                duration = (time.time() - start_time) * 1000
-
-                score_results = {}
-                for scorer in self.scores:
-                    try:
-                        scorer_name = getattr(scorer, "name", str(scorer))
-                        score_results[scorer_name] = scorer(output)
-                    except Exception as e:
-                        score_results[scorer_name] = {"success": False, "error": str(e)}
-
-                tool_info = {}
-                if self.track_tools and self.tools:
-                    if isinstance(output, tuple) and len(output) >= 2:
-                        processed_output = output[0]
-                        raw_output = output[1]
-                        tool_evals = []
-                        tools_passed = [tool.get("name", "unnamed") for tool in self.tools]
-                        tool_called = None
-                        for i, tool in enumerate(self.tools):
-                            if "input_schema" in tool:
-                                schema = tool["input_schema"]
-                                eval_result = tm.evaluate_tool_output(processed_output, schema)
-                                tool_evals.append(eval_result)
-                                if eval_result.get("success", False):
-                                    tool_called = tool.get("name", f"tool_{i}")
-                        any_schema_valid = any(te.get("success", False) for te in tool_evals) if tool_evals else False
-                        tool_info = {
-                            "tools_passed": tools_passed,
-                            "tool_called": tool_called,
-                            "tool_evals": tool_evals,
-                            "schema_valid": any_schema_valid
-                        }
-                        self.tool_summary["total_tool_calls"] += 1
-                        if any_schema_valid:
-                            self.tool_summary["successful_tool_calls"] += 1
-
-                result_entry = {
-                    "input": test_input,
-                    "output": tm._sanitize_for_json(output),
-                    "duration_ms": duration,
-                    "scores": score_results,
-                    "trial": trial
-                }
-                if tool_info:
-                    result_entry["tool_info"] = tool_info
+        def on_result(trial, index, result_entry, output):
+            results[trial, index] = result_entry
+            log_eval_event("EVAL_STEP", {**self._step_event(result_entry), "output": output})
 
-                self.results.append(result_entry)
-                log_eval_event("EVAL_STEP", {
-                    "input": test_input,
-                    "output": output,
-                    "duration_ms": duration,
-                    "scores": score_results,
-                    "trial": trial,
-                    **({"tool_info": tool_info} if tool_info else {})
-                })
+        await self._run_cases(tm, test_cases, range(len(test_cases)), on_result)
+        self.results.extend(results[key] for key in sorted(results))
 
-        if self.track_tools and self.tool_summary["total_tool_calls"] > 0:
-            self.tool_summary["score"] = (
-                self.tool_summary["successful_tool_calls"] / self.tool_summary["total_tool_calls"]
-            )
-        else:
-            self.tool_summary["score"] = None
+        self.tool_summary = self._tool_summary(self.results)
+        output_data = self._output_data(self.name, self.results, self.tool_summary, self.score_functions_code,
+                                        self.trial_count, len(test_cases), self.track_tools)
+        self._save_eval_result(tm, backend, eval_id, self.name, self.trial_count, self.session_id, output_data)
+
+        log_eval_event("EVAL_END", {"results_count": len(self.results)})
+        return output_data
+
+    async def run_shard(self, shard, shard_count, partial_dir):
+        """
+        Run only this process's share of the test cases and write them to a partial file.
+        
+        Cases are assigned to shards by their ``"id"`` (or a hash of their contents),
+        so every worker computes the same split. Nothing is written to the trace
+        store; combine the partial files of all shards with ``merge_shards``.
+        
+        Args:
+            shard (int): Zero-based index of this shard.
+            shard_count (int): Total number of shards.
+            partial_dir (str): Directory for the partial file.
+            
+        Returns:
+            str: Path of the partial file.
+        """
+        from .sharding import PartialWriter, case_key, dataset_digest, partial_path, shard_of
 
-        output_data = {
-            "eval_results": self.results,
-            "tool_summary": self.tool_summary if self.track_tools else None,
+        tm = _resolve_tracer(self.tracer)
+        test_cases = self.data()
+        keys = [case_key(case) for case in test_cases]
+        mine = [index for index, key in enumerate(keys) if shard_of(key, shard_count) == shard]
+        header = {
+            "name": self.name,
+            "shard": shard,
+            "shards": shard_count,
+            "session_id": self.session_id,
+            "trial_count": self.trial_count,
+            "test_case_count": len(test_cases),
+            "dataset": dataset_digest(keys),
+            "track_tools": self.track_tools,
             "score_functions_code": self.score_functions_code,
-            "metadata": {
-                "name": self.name,
-                "trial_count": self.trial_count,
-                "test_case_count": len(test_cases),
-                "timestamp": datetime.now().isoformat(),
-                "track_tools": self.track_tools
-            }
         }
+        path = partial_path(partial_dir, self.name, shard, shard_count)
+        with PartialWriter(path, header) as writer:
+            def on_result(trial, index, result_entry, output):
+                result_entry = tm._sanitize_for_json(result_entry)
+                self.results.append(result_entry)
+                writer.add(trial, index, result_entry)
 
-        if tm.conn:
-            try:
-                json_data = json.dumps(tm._sanitize_for_json(output_data))
-                tm.cursor.execute('''
-                    INSERT OR REPLACE INTO eval_results 
-                    (id, name, timestamp, trial_count, session_id, data)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (
-                    eval_id,
-                    self.name,
-                    datetime.now().isoformat(),
-                    self.trial_count,
-                    self.session_id,
-                    json_data
-                ))
-                tm.conn.commit()
-                logging.info(f"Saved evaluation results to SQLite with ID: {eval_id}")
-            except Exception as e:
-                logging.error(f"Error saving evaluation results to SQLite: {str(e)}")
-                if tm.conn:
-                    tm.conn.rollback()
+            await self._run_cases(tm, test_cases, mine, on_result)
+        logging.info(f"Wrote {len(mine) * self.trial_count} results of shard {shard}/{shard_count} to {path}")
+        return path
 
-        log_eval_event("EVAL_END", {"results_count": len(self.results)})
+    @staticmethod
+    def merge_shards(paths, tracer=None):
+        """
+        Combine the partial files of every shard into one evaluation.
+        
+        Writes a single ``eval_results`` row and an EVAL_START, EVAL_STEP..., EVAL_END
+        event stream with results in the same order as a single-process ``run``.
+        Events are written at merge time.
+        
+        Args:
+            paths (list): Partial files written by ``run_shard``, one per shard.
+            tracer (TraceManager or str, optional): Tracer (or tracer name) that stores the
+                evaluation. Defaults to the default TraceManager.
+            
+        Returns:
+            dict: The final evaluation data, as returned by ``run``.
+            
+        Raises:
+            ValueError: If shards are missing, duplicated or from different evaluations.
+        """
+        from .sharding import merge_partials
+
+        header, results = merge_partials(paths)
+        tm = _resolve_tracer(tracer)
+        backend = tm._backend()
+        name, session_id, trial_count = header["name"], header["session_id"], header["trial_count"]
+        eval_id = f"eval_{name}_{datetime.now().isoformat()}"
+
+        def log_eval_event(event_type, data):
+            TracerEval._log_eval_event(tm, backend, eval_id, session_id, name, event_type, data)
+
+        log_eval_event("EVAL_START", {"trial_count": trial_count})
+        for result in results:
+            log_eval_event("EVAL_STEP", TracerEval._step_event(result))
+        output_data = TracerEval._output_data(name, results, TracerEval._tool_summary(results),
+                                              header.get("score_functions_code", {}), trial_count,
+                                              header["test_case_count"], header["track_tools"])
+        TracerEval._save_eval_result(tm, backend, eval_id, name, trial_count, session_id, output_data)
+        log_eval_event("EVAL_END", {"results_count": len(results)})
         return output_data
 
     @staticmethod
-    def get_eval_results(eval_id=None, name=None, session_id=None, limit=10):
+    def get_eval_results(eval_id=None, name=None, session_id=None, limit=10, tracer=None):
         """
         Retrieve evaluation results from the database with optional filtering.
         
@@ -903,35 +1865,19 @@ class TracerEval:
             name (str, optional): Filter by evaluation name.
             session_id (str, optional): Filter by session ID.
             limit (int): Maximum number of results to return.
+            tracer (TraceManager or str, optional): Tracer (or tracer name) to read from.
             
         Returns:
             list: A list of evaluation result dictionaries.
         """
-        tm = TraceManager()
-        if not tm.conn:
+        tm = _resolve_tracer(tracer)
+        backend = tm._backend()
+        if backend is None:
             return []
 
-        results = []
-        try:
-            query = "SELECT id, name, timestamp, trial_count, session_id, data FROM eval_results"
-            conditions = []
-            params = []
-            if eval_id:
-                conditions.append("id = ?")
-                params.append(eval_id)
-            if name:
-                conditions.append("name = ?")
-                params.append(name)
-            if session_id:
-                conditions.append("session_id = ?")
-                params.append(session_id)
-            if conditions:
-                query += " WHERE " + " AND ".join(conditions)
-            query += " ORDER BY timestamp DESC LIMIT ?"
-            params.append(limit)
-
-            tm.cursor.execute(query, params)
-            rows = tm.cursor.fetchall()
+        def fetch():
+            results = []
+            rows = backend.query_eval_results(eval_id=eval_id, name=name, session_id=session_id, limit=limit)
             for row in rows:
                 data = json.loads(row[5]) if row[5] else {}
                 result = {
@@ -944,12 +1890,18 @@ class TracerEval:
                 }
                 results.append(result)
             return results
+
+        try:
+            return tm._cached_query(
+                query_key("eval_results", eval_id=eval_id, name=name, session_id=session_id, limit=limit),
+                fetch
+            )
         except Exception as e:
-            logging.error(f"Error retrieving evaluation results from SQLite: {str(e)}")
+            logging.error(f"Error retrieving evaluation results from {tm.storage}: {str(e)}")
             return []
 
     @staticmethod
-    def get_eval_events(eval_id=None, session_id=None, event_type=None, limit=100):
+    def get_eval_events(eval_id=None, session_id=None, event_type=None, limit=100, tracer=None):
         """
         Retrieve evaluation events from the database with optional filtering.
         
@@ -958,35 +1910,20 @@ class TracerEval:
             session_id (str, optional): Filter by session ID.
             event_type (str, optional): Filter by event type.
             limit (int): Maximum number of events to return.
+            tracer (TraceManager or str, optional): Tracer (or tracer name) to read from.
             
         Returns:
             list: A list of evaluation event dictionaries.
         """
-        tm = TraceManager()
-        if not tm.conn:
+        tm = _resolve_tracer(tracer)
+        backend = tm._backend()
+        if backend is None:
             return []
 
-        events = []
-        try:
-            query = "SELECT id, eval_id, session_id, timestamp, event_type, name, data FROM eval_events"
-            conditions = []
-            params = []
-            if eval_id:
-                conditions.append("eval_id = ?")
-                params.append(eval_id)
-            if session_id:
-                conditions.append("session_id = ?")
-                params.append(session_id)
-            if event_type:
-                conditions.append("event_type = ?")
-                params.append(event_type)
-            if conditions:
-                query += " WHERE " + " AND ".join(conditions)
-            query += " ORDER BY timestamp DESC LIMIT ?"
-            params.append(limit)
-
-            tm.cursor.execute(query, params)
-            rows = tm.cursor.fetchall()
+        def fetch():
+            events = []
+            rows = backend.query_eval_events(eval_id=eval_id, session_id=session_id, event_type=event_type,
+                                             limit=limit)
             for row in rows:
                 data = json.loads(row[6]) if row[6] else {}
                 event = {
@@ -1000,8 +1937,14 @@ class TracerEval:
                 }
                 events.append(event)
             return events
+
+        try:
+            return tm._cached_query(
+                query_key("eval_events", eval_id=eval_id, session_id=session_id, event_type=event_type, limit=limit),
+                fetch
+            )
         except Exception as e:
-            logging.error(f"Error retrieving evaluation events from SQLite: {str(e)}")
+            logging.error(f"Error retrieving evaluation events from {tm.storage}: {str(e)}")
             return []
 
     def __str__(self):
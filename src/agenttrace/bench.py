@@ -0,0 +1,431 @@
+"""
+Benchmark suite for the tracing and evaluation hot paths.
+
+Run with ``agenttrace bench``. Each benchmark produces one or more results with
+a value, a unit and whether higher values are better, so runs can be saved as
+JSON baselines and compared to catch performance regressions.
+"""
+
+import asyncio
+import gc
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+from .db import TABLE_COLUMNS, create_trace_tables
+
+DEFAULT_SIZES = (10_000, 1_000_000, 10_000_000)
+QUICK_SIZES = (10_000,)
+
+
+class Result:
+    """A single benchmark measurement."""
+
+    __slots__ = ("name", "value", "unit", "higher_is_better", "params")
+
+    def __init__(self, name, value, unit, higher_is_better, **params):
+        self.name = name
+        self.value = value
+        self.unit = unit
+        self.higher_is_better = higher_is_better
+        self.params = params
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "value": self.value,
+            "unit": self.unit,
+            "higher_is_better": self.higher_is_better,
+            "params": self.params,
+        }
+
+
+def _best_time(fn, number, repeat):
+    """Return the fastest of ``repeat`` timings of ``number`` calls to ``fn``, in seconds."""
+    best = None
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                fn()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return best
+
+
+_TRACER_NAME = "agenttrace-bench"
+
+
+def _manager(db_path):
+    """Create a dedicated TraceManager writing to ``db_path`` with console output and auto-flush disabled."""
+    from .agenttrace import TraceManager
+
+    _close_manager()
+    tm = TraceManager(db_path=db_path, colored_logging=False, name=_TRACER_NAME)
+    tm.save_interval = float("inf")
+    return tm
+
+
+def _close_manager():
+    """Discard the benchmark's TraceManager, if any, without flushing its buffer."""
+    from .agenttrace import TraceManager
+
+    try:
+        tm = TraceManager.get(_TRACER_NAME)
+    except KeyError:
+        return
+    tm.traces = []
+    tm.close()
+
+
+def _sdk_response(i):
+    """Build an object shaped like an OpenAI ChatCompletion with a tool call."""
+    function = SimpleNamespace(name="get_capital", arguments=json.dumps({"country": "France"}))
+    tool_call = SimpleNamespace(id=f"call_{i}", type="function", function=function)
+    message = SimpleNamespace(role="assistant", content="The capital of France is Paris. " * 8,
+                              tool_calls=[tool_call], refusal=None)
+    choice = SimpleNamespace(index=0, finish_reason="tool_calls", message=message, logprobs=None)
+    usage = SimpleNamespace(prompt_tokens=120, completion_tokens=48, total_tokens=168,
+                            prompt_tokens_details=SimpleNamespace(cached_tokens=64))
+    return SimpleNamespace(id=f"chatcmpl-{i}", object="chat.completion", created=1700000000 + i,
+                           model="gpt-4o", choices=[choice], usage=usage, system_fingerprint="fp_abc")
+
+
+def bench_decorator(workdir, number=5000, repeat=5, **_):
+    """Per-call overhead of the sync and async decorators with tracing on and off."""
+    tm = _manager(os.path.join(workdir, "decorator.db"))
+
+    def plain(x, y=1):
+        return x + y
+
+    traced = tm.trace(plain)
+
+    class Agent:
+        trace_enabled = False
+
+        @tm.trace
+        def step(self, x, y=1):
+            return x + y
+
+    agent = Agent()
+
+    async def plain_async(x, y=1):
+        return x + y
+
+    traced_async = tm.trace(plain_async)
+
+    class AsyncAgent:
+        trace_enabled = False
+
+        @tm.trace
+        async def step(self, x, y=1):
+            return x + y
+
+    async_agent = AsyncAgent()
+
+    def flush_between(fn):
+        def run():
+            fn()
+            if len(tm.traces) >= 1000:
+                tm.traces = []
+        return run
+
+    baseline = _best_time(lambda: plain(1, y=2), number, repeat)
+    results = []
+    for label, fn in (("sync_on", flush_between(lambda: traced(1, y=2))),
+                      ("sync_off", lambda: agent.step(1, y=2))):
+        elapsed = _best_time(fn, number, repeat)
+        results.append(Result(f"decorator.{label}", (elapsed - baseline) / number * 1e9, "ns/call", False))
+
+    loop = asyncio.new_event_loop()
+    try:
+        def drive(coro_fn):
+            async def many():
+                for _ in range(number):
+                    await coro_fn()
+                    if len(tm.traces) >= 1000:
+                        tm.traces = []
+            return lambda: loop.run_until_complete(many())
+
+        async_baseline = _best_time(drive(lambda: plain_async(1, y=2)), 1, repeat)
+        for label, fn in (("async_on", lambda: traced_async(1, y=2)), ("async_off", lambda: async_agent.step(1, y=2))):
+            elapsed = _best_time(drive(fn), 1, repeat)
+            results.append(Result(f"decorator.{label}", (elapsed - async_baseline) / number * 1e9, "ns/call", False))
+    finally:
+        loop.close()
+    tm.traces = []
+    return results
+
+
+def bench_add_trace(workdir, in_flight=10000, number=2000, repeat=3, **_):
+    """Throughput of START/END pairs through add_trace with a large in-flight buffer."""
+    tm = _manager(os.path.join(workdir, "add_trace.db"))
+    results = []
+    for buffered in (0, in_flight):
+        tm.traces = []
+        for i in range(buffered):
+            tm.add_trace("START", f"pending_{i % 50}", args={"i": i}, session_id=f"pending-{i}")
+
+        def pair():
+            session_id = tm.add_trace("START", "bench_call", args={"prompt": "hello"})
+            tm.add_trace("END", "bench_call", result={"text": "world"}, duration=1.0, session_id=session_id)
+
+        elapsed = _best_time(pair, number, repeat)
+        results.append(Result("add_trace.pairs_per_sec", number / elapsed, "pairs/s", True, in_flight=buffered))
+    tm.traces = []
+    return results
+
+
+def bench_save_traces(workdir, rows=20000, repeat=3, **_):
+    """Rows per second persisted by save_traces."""
+    tm = _manager(os.path.join(workdir, "save.db"))
+    best = None
+    for _ in range(repeat):
+        for i in range(rows):
+            session_id = tm.add_trace("START", "saved_call", args={"i": i})
+            tm.add_trace("END", "saved_call", result={"ok": True}, duration=1.0, session_id=session_id)
+        # Only persist the completed spans; measure the flush alone.
+        start = time.perf_counter()
+        tm.save_traces()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return [Result("save_traces.rows_per_sec", rows / best, "rows/s", True, rows=rows)]
+
+
+def bench_sanitize(workdir, number=5000, repeat=5, **_):
+    """Throughput of _sanitize_for_json on realistic SDK response objects."""
+    tm = _manager(os.path.join(workdir, "sanitize.db"))
+    responses = [_sdk_response(i) for i in range(100)]
+    index = [0]
+
+    def sanitize():
+        tm._sanitize_for_json(responses[index[0] % 100])
+        index[0] += 1
+
+    elapsed = _best_time(sanitize, number, repeat)
+    return [Result("sanitize.objects_per_sec", number / elapsed, "objects/s", True)]
+
+
+def _synthetic_rows(start, stop):
+    """Build synthetic completed trace rows, in ``TABLE_COLUMNS["traces"]`` order, with increasing timestamps."""
+    data = json.dumps({"args": {"prompt": "hello"}, "result": {"text": "world"}, "duration_ms": 12.5})
+    return [(f"bench-{i:012d}", f"session-{i // 20}", _synthetic_timestamp(i), "COMPLETE", f"function_{i % 25}",
+             json.dumps([f"tag{i % 10}"]), data, 12.5, "gpt-4o", 100, 50, 0, 150, None, None, None, None, None, None, None)
+            for i in range(start, stop)]
+
+
+def _synthetic_timestamp(i):
+    return f"2025-01-{1 + (i // 86400) % 28:02d}T{(i // 3600) % 24:02d}:{(i // 60) % 60:02d}:{i % 60:02d}.{i % 1000000:06d}"
+
+
+def _populate(db_path, rows, chunk=100000):
+    """Fill a trace database with ``rows`` synthetic completed traces."""
+    conn = sqlite3.connect(db_path)
+    create_trace_tables(conn.cursor())
+    columns = TABLE_COLUMNS["traces"]
+    insert = f"INSERT INTO traces ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    for offset in range(0, rows, chunk):
+        conn.executemany(insert, _synthetic_rows(offset, min(rows, offset + chunk)))
+        conn.commit()
+    conn.close()
+
+
+def bench_storage(workdir, rows=50000, batch=1000, **_):
+    """Write throughput and time-range query latency of the SQLite and segment log backends."""
+    from .logstore import SegmentLogBackend
+    from .storage import SQLiteBackend
+
+    backends = {
+        "sqlite": SQLiteBackend(os.path.join(workdir, "storage.db")),
+        "segment_log": SegmentLogBackend(os.path.join(workdir, "storage-log")),
+    }
+    batches = [_synthetic_rows(offset, min(rows, offset + batch)) for offset in range(0, rows, batch)]
+    since = _synthetic_timestamp(rows - rows // 100)
+    results = []
+    for label, backend in backends.items():
+        backend.open()
+        try:
+            start = time.perf_counter()
+            for rows_batch in batches:
+                backend.write_traces(rows_batch)
+            elapsed = time.perf_counter() - start
+            results.append(Result("storage.write_rows_per_sec", rows / elapsed, "rows/s", True,
+                                  backend=label, rows=rows))
+            elapsed = _best_time(lambda: backend.query_traces(limit=100, since=since), 1, 5)
+            results.append(Result("storage.recent_range_query", elapsed * 1000, "ms", False, backend=label, rows=rows))
+        finally:
+            backend.close()
+    return results
+
+
+def bench_get_traces(workdir, sizes=DEFAULT_SIZES, repeat=5, **_):
+    """Latency of get_traces queries at several database sizes."""
+    results = []
+    for size in sizes:
+        db_path = os.path.join(workdir, f"get_traces_{size}.db")
+        _populate(db_path, size)
+        tm = _manager(db_path)
+        last_session = f"session-{(size - 1) // 20}"
+        queries = {
+            "latest": {},
+            "function": {"function_name": "function_7"},
+            "session": {"session_id": last_session},
+            "tag": {"tag": "tag3"},
+        }
+        cache_size = tm.query_cache.max_entries
+        tm.query_cache.max_entries = 0
+        for label, filters in queries.items():
+            elapsed = _best_time(lambda: tm.get_traces(limit=100, **filters), 1, repeat)
+            results.append(Result(f"get_traces.{label}", elapsed * 1000, "ms", False, rows=size))
+        tm.query_cache.max_entries = cache_size
+        tm.get_traces(limit=100)
+        elapsed = _best_time(lambda: tm.get_traces(limit=100), 1, repeat)
+        results.append(Result("get_traces.cached", elapsed * 1000, "ms", False, rows=size))
+        _close_manager()
+        os.remove(db_path)
+    return results
+
+
+def bench_eval(workdir, cases=500, repeat=3, **_):
+    """Cases per second through TracerEval.run with a mocked task."""
+    from .agenttrace import TracerEval
+
+    tm = _manager(os.path.join(workdir, "eval.db"))
+
+    def task(prompt):
+        return f"answer to {prompt}"
+
+    def exact(output):
+        return {"score": 1.0 if output.startswith("answer") else 0.0}
+
+    exact.name = "exact"
+    dataset = [{"input": f"question {i}"} for i in range(cases)]
+    best = None
+    for _ in range(repeat):
+        evaluator = TracerEval(name="bench", data=lambda: dataset, task=task, scores=[exact], tracer=tm)
+        start = time.perf_counter()
+        asyncio.run(evaluator.run())
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return [Result("eval.cases_per_sec", cases / best, "cases/s", True, cases=cases)]
+
+
+BENCHMARKS = {
+    "decorator": bench_decorator,
+    "add_trace": bench_add_trace,
+    "save_traces": bench_save_traces,
+    "sanitize": bench_sanitize,
+    "get_traces": bench_get_traces,
+    "storage": bench_storage,
+    "eval": bench_eval,
+}
+
+
+def run_benchmarks(names=None, sizes=DEFAULT_SIZES, progress=None):
+    """
+    Run the selected benchmarks in a scratch directory.
+
+    Args:
+        names (list, optional): Benchmark names to run. Defaults to all of them.
+        sizes (tuple): Database sizes used by the get_traces benchmark.
+        progress (callable, optional): Called with each benchmark name before it runs.
+
+    Returns:
+        dict: Environment metadata and a list of result dictionaries.
+    """
+    unknown = set(names or ()) - set(BENCHMARKS)
+    if unknown:
+        raise ValueError(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    workdir = tempfile.mkdtemp(prefix="agenttrace-bench-")
+    results = []
+    try:
+        for name in names or BENCHMARKS:
+            if progress is not None:
+                progress(name)
+            results.extend(r.to_dict() for r in BENCHMARKS[name](workdir, sizes=sizes))
+    finally:
+        _close_manager()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        "environment": {
+            "python": sys.version.split()[0],
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "sqlite": sqlite3.sqlite_version,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def _key(result):
+    return (result["name"], json.dumps(result.get("params", {}), sort_keys=True))
+
+
+def compare(report, baseline, threshold=0.1):
+    """
+    Compare a benchmark report against a saved baseline.
+
+    Args:
+        report (dict): The value returned by ``run_benchmarks``.
+        baseline (dict): A previously saved report.
+        threshold (float): Relative slowdown tolerated before a result counts as a regression.
+
+    Returns:
+        list: One dictionary per result present in both reports with the baseline
+        value, the relative change (positive is better) and a regression flag.
+    """
+    previous = {_key(r): r for r in baseline.get("results", [])}
+    comparison = []
+    for result in report["results"]:
+        base = previous.get(_key(result))
+        if base is None or not base["value"]:
+            continue
+        change = (result["value"] - base["value"]) / abs(base["value"])
+        if not result["higher_is_better"]:
+            change = -change
+        comparison.append({
+            "name": result["name"],
+            "params": result.get("params", {}),
+            "unit": result["unit"],
+            "baseline": base["value"],
+            "value": result["value"],
+            "change": change,
+            "regression": change < -threshold,
+        })
+    return comparison
+
+
+def format_report(report, comparison=None):
+    """
+    Render a report (and optional baseline comparison) as a text table.
+
+    Args:
+        report (dict): The value returned by ``run_benchmarks``.
+        comparison (list, optional): The value returned by ``compare``.
+
+    Returns:
+        str: The formatted table.
+    """
+    changes = {(c["name"], json.dumps(c["params"], sort_keys=True)): c for c in comparison or []}
+    lines = [f"{'benchmark':<36} {'params':<20} {'value':>14} {'unit':<10} {'vs baseline':>12}"]
+    for result in report["results"]:
+        params = ",".join(f"{k}={v}" for k, v in result.get("params", {}).items())
+        change = changes.get(_key(result))
+        delta = ""
+        if change is not None:
+            delta = f"{change['change'] * 100:+.1f}%" + (" !" if change["regression"] else "")
+        lines.append(f"{result['name']:<36} {params:<20} {result['value']:>14,.2f} {result['unit']:<10} {delta:>12}")
+    return "\n".join(lines)
@@ -0,0 +1,289 @@
+"""
+Bulk JSON Lines import and export of traces and evaluation data.
+
+Each line is one row as a JSON object. A ``table`` key selects the target
+table (``traces`` when absent); the remaining keys are column values, with
+``tags`` and ``data`` written as nested JSON rather than encoded strings.
+"""
+
+import gzip
+import io
+import json
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+from .db import TABLE_COLUMNS, create_eval_tables, create_trace_tables, rebuild_sessions, rowid_filter
+from .ids import new_id
+
+CONFLICT_MODES = ("error", "skip", "replace")
+INDEX_MODES = ("auto", "always", "never")
+
+# Nested JSON columns, stored as encoded text in SQLite.
+_JSON_COLUMNS = {"tags", "data"}
+
+# Accept the key names returned by get_traces as aliases for column names.
+_ALIASES = {"type": "trace_type", "function": "function_name"}
+
+
+class ImportConflictError(ValueError):
+    """Raised when an imported row's ID already exists and conflicts are treated as errors."""
+
+    def __init__(self, table, row_id, line):
+        super().__init__(f"Row {row_id!r} on line {line} already exists in {table}")
+        self.table = table
+        self.row_id = row_id
+        self.line = line
+
+
+def _open_text(path, mode):
+    """Open a path (``-`` for stdin/stdout, ``.gz`` for gzip) in text mode."""
+    if path == "-":
+        return io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8") if "r" in mode else sys.stdout
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def export_jsonl(db_path, output, tables=("traces", "eval_events", "eval_results"), since=None,
+                 chunk_size=50000, progress=None):
+    """
+    Stream tables from a trace database into a JSON Lines file.
+
+    Rows are upserted by ``id``, as by ``import_jsonl --on-conflict replace``:
+    a row rewritten after it was exported is written again by a later
+    incremental export. Incremental exports skip START traces, which are
+    rewritten when their call completes.
+
+    Args:
+        db_path (str): Path to the SQLite trace database.
+        output (str): Output path, ``-`` for stdout. A ``.gz`` suffix enables gzip.
+        tables (iterable): Tables to export.
+        since (dict, optional): Watermark mapping table name to the last rowid
+            already exported. Only newer, finished rows are written.
+        chunk_size (int): Number of rows fetched per round trip.
+        progress (callable, optional): Called with ``(table, rows_written)`` after each chunk.
+
+    Returns:
+        dict: Per table, the number of rows written and the new watermark rowid.
+    """
+    incremental = since is not None
+    since = since or {}
+    summary = {}
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    out = _open_text(output, "w")
+    try:
+        existing_tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        for table in tables:
+            if table not in TABLE_COLUMNS:
+                raise ValueError(f"Unknown table: {table}")
+            watermark = int(since.get(table, 0))
+            summary[table] = {"rows": 0, "watermark": watermark}
+            if table not in existing_tables:
+                continue
+
+            existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()}
+            columns = [c for c in TABLE_COLUMNS[table] if c in existing]
+            scalar_columns = [c for c in columns if c not in _JSON_COLUMNS]
+            json_columns = [c for c in columns if c in _JSON_COLUMNS]
+            validity = [f"json_valid({c})" for c in json_columns]
+            cursor = conn.execute(
+                f"SELECT rowid, {', '.join(scalar_columns + json_columns + validity)} FROM {table} "
+                f"WHERE {rowid_filter(table, incremental)} ORDER BY rowid",
+                (watermark,)
+            )
+            split = 1 + len(scalar_columns)
+            flags = split + len(json_columns)
+            written = 0
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                lines = []
+                for row in rows:
+                    head = json.dumps({"table": table, **dict(zip(scalar_columns, row[1:split]))})
+                    # Stored JSON text is spliced in as-is instead of being decoded and re-encoded;
+                    # empty values become null and corrupt ones are written as JSON strings.
+                    tail = "".join(
+                        f', "{name}": {value if valid else json.dumps(value or None)}'
+                        for name, value, valid in zip(json_columns, row[split:flags], row[flags:])
+                    )
+                    lines.append(f"{head[:-1]}{tail}}}\n")
+                out.write("".join(lines))
+                written += len(rows)
+                summary[table] = {"rows": written, "watermark": rows[-1][0]}
+                if progress is not None:
+                    progress(table, written)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        else:
+            out.flush()
+        conn.close()
+    return summary
+
+
+def _normalize(record, table):
+    """Turn a decoded JSON line into a row tuple for ``table``."""
+    for alias, column in _ALIASES.items():
+        if alias in record and column not in record:
+            record[column] = record.pop(alias)
+    if not record.get("id"):
+        record["id"] = new_id()
+    if table != "eval_results" and not record.get("timestamp"):
+        record["timestamp"] = datetime.now().isoformat()
+    row = []
+    for column in TABLE_COLUMNS[table]:
+        value = record.get(column)
+        if column in _JSON_COLUMNS and value is not None and not isinstance(value, str):
+            value = json.dumps(value)
+        row.append(value)
+    return row
+
+
+def _deferred_indexes(conn, table, mode):
+    """Return the names and CREATE statements of indexes to drop for the duration of the import."""
+    if mode == "never":
+        return []
+    if mode == "auto" and conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone() is not None:
+        # Rebuilding indexes over a populated table costs more than maintaining them.
+        return []
+    return conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (table,)
+    ).fetchall()
+
+
+def import_jsonl(db_path, inputs, on_conflict="error", batch_size=10000, defer_indexes="auto", progress=None):
+    """
+    Load JSON Lines files into a trace database.
+
+    Rows are inserted with batched ``executemany`` calls inside a single
+    transaction, so a failed import leaves the database unchanged. Secondary
+    indexes on tables being loaded can be dropped up front and rebuilt once at
+    the end, and the sessions summary table is recomputed after loading.
+
+    Args:
+        db_path (str): Path to the SQLite trace database. Created if missing.
+        inputs (iterable): Input paths, ``-`` for stdin. ``.gz`` files are decompressed.
+        on_conflict (str): What to do when a row ID already exists: "error" aborts
+            the import, "skip" keeps the existing row, "replace" overwrites it.
+        batch_size (int): Number of rows per ``executemany`` batch.
+        defer_indexes (str): "always" rebuilds indexes after loading, "never"
+            maintains them during the load, and "auto" defers them only for
+            tables that are empty when the import starts.
+        progress (callable, optional): Called with ``(rows_read, elapsed_seconds)`` after each batch.
+
+    Returns:
+        dict: Rows read, inserted, skipped and replaced, with per-table counts.
+
+    Raises:
+        ImportConflictError: If ``on_conflict`` is "error" and a row ID already exists.
+    """
+    if on_conflict not in CONFLICT_MODES:
+        raise ValueError(f"on_conflict must be one of {CONFLICT_MODES}")
+    if defer_indexes not in INDEX_MODES:
+        raise ValueError(f"defer_indexes must be one of {INDEX_MODES}")
+
+    verb = {"error": "INSERT", "skip": "INSERT OR IGNORE", "replace": "INSERT OR REPLACE"}[on_conflict]
+    statements = {
+        table: f"{verb} INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        for table, columns in TABLE_COLUMNS.items()
+    }
+    stats = {"rows": 0, "inserted": 0, "skipped": 0, "replaced": 0,
+             "tables": {table: 0 for table in TABLE_COLUMNS}}
+
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    started = time.monotonic()
+    try:
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("BEGIN")
+        cursor = conn.cursor()
+        create_trace_tables(cursor)
+        create_eval_tables(cursor)
+
+        rebuild = {}
+
+        def flush(table, batch):
+            if table not in rebuild:
+                rebuild[table] = _deferred_indexes(conn, table, defer_indexes)
+                for name, _ in rebuild[table]:
+                    conn.execute(f"DROP INDEX {name}")
+
+            rows = [row for row, _ in batch]
+            if on_conflict == "replace":
+                ids = [row[0] for row in rows]
+                existing = 0
+                for i in range(0, len(ids), 500):
+                    chunk = ids[i:i + 500]
+                    existing += conn.execute(
+                        f"SELECT COUNT(*) FROM {table} WHERE id IN ({', '.join('?' * len(chunk))})", chunk
+                    ).fetchone()[0]
+                stats["replaced"] += existing
+            before = conn.total_changes
+            try:
+                cursor.executemany(statements[table], rows)
+            except sqlite3.IntegrityError:
+                # Find the offending row for the error message.
+                conn.execute("SAVEPOINT locate_conflict")
+                for row, line_number in batch:
+                    try:
+                        conn.execute(statements[table], row)
+                    except sqlite3.IntegrityError:
+                        conn.execute("ROLLBACK TO locate_conflict")
+                        raise ImportConflictError(table, row[0], line_number)
+                raise
+            changed = conn.total_changes - before
+            stats["inserted"] += changed
+            stats["skipped"] += len(rows) - changed
+            stats["tables"][table] += changed
+
+        batches = {}
+        line_number = 0
+        for path in inputs:
+            source = _open_text(path, "r")
+            try:
+                for line in source:
+                    line_number += 1
+                    if not line.strip():
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except ValueError as e:
+                        raise ValueError(f"Invalid JSON on line {line_number} of {path}: {e}") from e
+                    table = record.pop("table", "traces")
+                    if table not in TABLE_COLUMNS:
+                        raise ValueError(f"Unknown table {table!r} on line {line_number} of {path}")
+                    batch = batches.setdefault(table, [])
+                    batch.append((_normalize(record, table), line_number))
+                    stats["rows"] += 1
+                    if len(batch) >= batch_size:
+                        flush(table, batch)
+                        batches[table] = []
+                        if progress is not None:
+                            progress(stats["rows"], time.monotonic() - started)
+            finally:
+                if path != "-":
+                    source.close()
+
+        for table, batch in batches.items():
+            if batch:
+                flush(table, batch)
+        for indexes in rebuild.values():
+            for _, sql in indexes:
+                conn.execute(sql)
+        if stats["tables"]["traces"] or stats["tables"]["eval_results"]:
+            # One pass over the imported data is cheaper than updating summaries batch by batch.
+            rebuild_sessions(cursor)
+        conn.execute("COMMIT")
+        if progress is not None:
+            progress(stats["rows"], time.monotonic() - started)
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+    stats["inserted"] -= stats["replaced"]
+    stats["elapsed_seconds"] = time.monotonic() - started
+    return stats
@@ -0,0 +1,125 @@
+"""
+Read-side cache for trace and evaluation queries.
+"""
+
+import threading
+from collections import OrderedDict
+
+
+def query_key(kind, **params):
+    """
+    Build a cache key from a query name and its parameters.
+
+    Parameters that the query ignores (None or empty strings) are dropped so
+    that equivalent calls share an entry.
+
+    Args:
+        kind (str): Name of the query.
+        **params: The query's filter and limit arguments.
+
+    Returns:
+        tuple: A hashable key.
+    """
+    return (kind,) + tuple(sorted((name, value) for name, value in params.items() if value not in (None, "")))
+
+
+class QueryCache:
+    """
+    Size-bounded LRU cache of decoded query results.
+
+    Entries are tagged with the write generation current when their query
+    started. ``invalidate`` bumps the generation and empties the cache, and a
+    result computed before an invalidation is never stored, so readers only
+    ever see data at least as new as the last flush.
+    """
+
+    def __init__(self, max_entries=256):
+        """
+        Args:
+            max_entries (int): Maximum number of cached results. 0 disables caching.
+        """
+        self.max_entries = max_entries
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._data_version = None
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Look up a cached result, marking it as recently used.
+
+        Args:
+            key (tuple): Key built by ``query_key``.
+
+        Returns:
+            tuple: ``(True, value)`` on a hit, ``(False, None)`` on a miss.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value, generation):
+        """
+        Store a result unless the data changed while it was being computed.
+
+        Args:
+            key (tuple): Key built by ``query_key``.
+            value: The decoded result.
+            generation (int): The value of ``generation`` read before running the query.
+        """
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self):
+        """Drop every entry after a write."""
+        with self._lock:
+            self.generation += 1
+            self.invalidations += 1
+            self._entries.clear()
+
+    def observe_data_version(self, version):
+        """
+        Invalidate if SQLite reports a commit from another connection.
+
+        Args:
+            version (int): The current ``PRAGMA data_version`` of the reading connection.
+        """
+        if version != self._data_version:
+            if self._data_version is not None:
+                self.invalidate()
+            self._data_version = version
+
+    def stats(self):
+        """
+        Return cache statistics.
+
+        Returns:
+            dict: Hits, misses, hit rate, evictions, invalidations and current size.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+            }
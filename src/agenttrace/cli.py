@@ -5,11 +5,7 @@ Command-line interface for Tensorscope.
 import argparse
 import os
 import sys
-import webbrowser
-import subprocess
 import time
-import signal
-import importlib.resources as pkg_resources
 
 def get_frontend_dir():
     """Get the path to the frontend directory."""
@@ -18,6 +14,9 @@ def get_frontend_dir():
 
 def start_command(args):
     """Start the Tensorscope frontend server."""
+    import subprocess
+    import webbrowser
+
     print("Starting Tensorscope frontend...")
     
     frontend_dir = get_frontend_dir()
@@ -69,6 +68,267 @@ def start_command(args):
     
     return 0
 
+def export_command(args):
+    """Export traces and evaluation results from a trace database."""
+    from .export import export_tables, load_watermark, save_watermark
+
+    if not os.path.exists(args.db):
+        print(f"Error: Database not found at {args.db}", file=sys.stderr)
+        return 1
+
+    since = load_watermark(args.watermark) if args.watermark else None
+    quiet = args.quiet or args.output == "-"
+
+    def progress(table, rows):
+        if not quiet:
+            print(f"\r{table}: {rows} rows", end="", file=sys.stderr, flush=True)
+
+    try:
+        if args.format == "jsonl":
+            from .bulk import export_jsonl
+
+            output = args.output or "agenttrace-export.jsonl"
+            summary = export_jsonl(args.db, output, tables=args.tables, since=since,
+                                   chunk_size=args.chunk_size, progress=progress)
+            for info in summary.values():
+                info["path"] = output if info["rows"] else None
+        else:
+            summary = export_tables(
+                args.db,
+                args.output or "agenttrace-export",
+                format=args.format,
+                tables=args.tables,
+                since=since,
+                include_payloads=args.payloads,
+                chunk_size=args.chunk_size,
+                progress=progress,
+            )
+    except ImportError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    if not quiet:
+        print(file=sys.stderr)
+    for table, info in summary.items():
+        location = info["path"] or "nothing new"
+        print(f"{table}: {info['rows']} rows -> {location}", file=sys.stderr)
+    if args.watermark:
+        save_watermark(args.watermark, summary)
+    return 0
+
+def import_command(args):
+    """Import JSON Lines files into a trace database."""
+    from .bulk import ImportConflictError, import_jsonl
+
+    def progress(rows, elapsed):
+        if not args.quiet:
+            rate = rows / elapsed * 60 if elapsed else 0
+            print(f"\rImported {rows} rows ({rate:,.0f} rows/min)", end="", file=sys.stderr, flush=True)
+
+    try:
+        stats = import_jsonl(
+            args.db,
+            args.files,
+            on_conflict=args.on_conflict,
+            batch_size=args.batch_size,
+            defer_indexes=args.defer_indexes,
+            progress=progress,
+        )
+    except ImportConflictError as e:
+        print(f"\nError: {e}. Use --on-conflict skip or replace to continue past existing IDs.", file=sys.stderr)
+        return 1
+    except (OSError, ValueError) as e:
+        print(f"\nError importing traces: {e}", file=sys.stderr)
+        return 1
+
+    if not args.quiet:
+        print(file=sys.stderr)
+    print(f"Read {stats['rows']} rows: {stats['inserted']} inserted, {stats['replaced']} replaced, "
+          f"{stats['skipped']} skipped in {stats['elapsed_seconds']:.1f}s")
+    return 0
+
+def serve_command(args):
+    """Serve the read API and live tail over a trace database."""
+    from .server import serve
+
+    if not os.path.exists(args.db):
+        print(f"Error: Database not found at {args.db}", file=sys.stderr)
+        return 1
+    serve(args.db, host=args.host, port=args.port, poll_interval=args.poll_interval)
+    return 0
+
+def profile_command(args):
+    """Write the stacks profiled for slow or failed traces as folded stacks for flame graph tools."""
+    import json
+    import sqlite3
+
+    from .profiling import merge_profiles, to_folded
+
+    if not os.path.exists(args.db):
+        print(f"Error: Database not found at {args.db}", file=sys.stderr)
+        return 1
+
+    query = "SELECT data FROM traces WHERE data LIKE '%\"profile\": {%'"
+    params = []
+    for column, value in (("id", args.id), ("function_name", args.function), ("session_id", args.session_id)):
+        if value:
+            query += f" AND {column} = ?"
+            params.append(value)
+    query += " ORDER BY timestamp DESC LIMIT ?"
+    params.append(args.limit)
+    try:
+        conn = sqlite3.connect(f"file:{os.path.abspath(args.db)}?mode=ro", uri=True)
+        try:
+            traces = [json.loads(data) for (data,) in conn.execute(query, params)]
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"Error reading {args.db}: {e}", file=sys.stderr)
+        return 1
+
+    stacks = merge_profiles(traces)
+    if not stacks:
+        print("No profiled traces matched", file=sys.stderr)
+        return 1
+    if args.output and args.output != "-":
+        with open(args.output, "w") as f:
+            f.write(to_folded(stacks))
+        print(f"Wrote {len(stacks)} stacks from {len(traces)} traces to {args.output}", file=sys.stderr)
+    else:
+        sys.stdout.write(to_folded(stacks))
+    return 0
+
+def load_eval_target(target):
+    """Import ``module:attribute`` and return the TracerEval it names (or that calling it returns)."""
+    import importlib
+
+    module_name, _, attribute = target.partition(":")
+    if not module_name or not attribute:
+        raise ValueError(f"Invalid target {target!r}; expected MODULE:ATTRIBUTE")
+    if os.getcwd() not in sys.path:
+        sys.path.insert(0, os.getcwd())
+    evaluator = importlib.import_module(module_name)
+    for name in attribute.split("."):
+        evaluator = getattr(evaluator, name)
+    if callable(evaluator) and not hasattr(evaluator, "run_shard"):
+        evaluator = evaluator()
+    if not hasattr(evaluator, "run_shard"):
+        raise ValueError(f"{target} is not a TracerEval")
+    return evaluator
+
+def eval_command(args):
+    """Run an evaluation, one shard of it, or all shards in local worker processes."""
+    import asyncio
+    import glob
+    import json
+    import shutil
+    import tempfile
+    import uuid
+
+    from .agenttrace import TraceManager, TracerEval
+    from .sharding import launch_workers, parse_shard
+
+    def merge(partial_dir, tracer):
+        paths = sorted(glob.glob(os.path.join(partial_dir, "*.shard-*-of-*.jsonl")))
+        output = TracerEval.merge_shards(paths, tracer=tracer)
+        tracer.save_traces()
+        return output
+
+    def summarize(output):
+        metadata = output["metadata"]
+        print(f"Evaluation {metadata['name']}: {len(output['eval_results'])} results "
+              f"({metadata['test_case_count']} cases x {metadata['trial_count']} trials)", file=sys.stderr)
+        if args.json:
+            print(json.dumps(output, indent=2, default=repr))
+
+    try:
+        if args.merge:
+            if not args.partial_dir:
+                print("Error: --merge requires --partial-dir", file=sys.stderr)
+                return 1
+            summarize(merge(args.partial_dir, TraceManager(db_path=args.db)))
+            return 0
+        if not args.target:
+            print("Error: a MODULE:ATTRIBUTE target is required", file=sys.stderr)
+            return 1
+        evaluator = load_eval_target(args.target)
+        if args.session_id:
+            evaluator.session_id = args.session_id
+        if evaluator.tracer is None:
+            evaluator.tracer = TraceManager(db_path=args.db)
+        tracer = evaluator.tracer if isinstance(evaluator.tracer, TraceManager) else TraceManager.get(evaluator.tracer)
+
+        if args.shard:
+            index, count = parse_shard(args.shard)
+            path = asyncio.run(evaluator.run_shard(index, count, args.partial_dir or "."))
+            tracer.save_traces()
+            print(f"Wrote shard {index}/{count} to {path}", file=sys.stderr)
+            return 0
+
+        if args.workers > 1:
+            partial_dir = args.partial_dir or tempfile.mkdtemp(prefix="agenttrace-eval-")
+            extra_args = ["--db", args.db]
+            codes = launch_workers(args.target, args.workers, partial_dir, evaluator.session_id, extra_args)
+            failed = [index for index, code in enumerate(codes) if code != 0]
+            if failed:
+                print(f"Error: shard(s) {', '.join(map(str, failed))} failed; partial results kept in {partial_dir}",
+                      file=sys.stderr)
+                return 1
+            output = merge(partial_dir, tracer)
+            if not args.partial_dir:
+                shutil.rmtree(partial_dir, ignore_errors=True)
+            summarize(output)
+            return 0
+
+        output = asyncio.run(evaluator.run())
+        tracer.save_traces()
+        summarize(output)
+        return 0
+    except (ImportError, AttributeError, ValueError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+def bench_command(args):
+    """Run the benchmark suite and optionally compare it against a saved baseline."""
+    import json
+
+    from .bench import BENCHMARKS, QUICK_SIZES, compare, format_report, run_benchmarks
+
+    baseline = None
+    if args.baseline:
+        try:
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error reading baseline {args.baseline}: {e}", file=sys.stderr)
+            return 1
+
+    def progress(name):
+        if not args.quiet:
+            print(f"Running {name} benchmark...", file=sys.stderr, flush=True)
+
+    sizes = QUICK_SIZES if args.quick else args.sizes
+    report = run_benchmarks(args.only or list(BENCHMARKS), sizes=sizes, progress=progress)
+    comparison = compare(report, baseline, args.threshold) if baseline else None
+    if comparison is not None:
+        report["comparison"] = comparison
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(format_report(report, comparison))
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({key: value for key, value in report.items() if key != "comparison"}, f, indent=2)
+        print(f"Saved baseline to {args.save_baseline}", file=sys.stderr)
+
+    regressions = [c for c in comparison or [] if c["regression"]]
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%} "
+              f"against {args.baseline}", file=sys.stderr)
+        return 1
+    return 0
+
 def main():
     """Main entry point for the CLI."""
     parser = argparse.ArgumentParser(description="Tensorscope command-line interface")
@@ -80,10 +340,94 @@ def main():
     start_parser.add_argument("--install", action="store_true", help="Install dependencies before starting")
     start_parser.add_argument("--quiet", action="store_true", help="Suppress npm output")
     
+    # Export command
+    export_parser = subparsers.add_parser("export", help="Export traces and evaluation results to files")
+    export_parser.add_argument("--db", default="traces.db", help="Path to the trace database")
+    export_parser.add_argument("--format", choices=["parquet", "arrow", "jsonl"], default="parquet", help="Output format")
+    export_parser.add_argument("--output", "-o",
+                               help="Output directory for parquet/arrow, or file for jsonl ('-' for stdout, .gz to compress)")
+    export_parser.add_argument("--tables", nargs="+", default=["traces", "eval_events", "eval_results"],
+                               choices=["traces", "eval_events", "eval_results"], help="Tables to export")
+    export_parser.add_argument("--watermark", help="JSON file tracking exported rows; only newer, finished rows are exported "
+                                                        "and rewritten rows are exported again, so keep the last row per id")
+    export_parser.add_argument("--payloads", action="store_true", help="Include the raw JSON data column")
+    export_parser.add_argument("--chunk-size", type=int, default=50000, help="Rows per record batch")
+    export_parser.add_argument("--quiet", action="store_true", help="Suppress progress output")
+
+    # Import command
+    import_parser = subparsers.add_parser("import", help="Import traces from JSON Lines files")
+    import_parser.add_argument("files", nargs="+", help="JSON Lines files to import ('-' for stdin, .gz supported)")
+    import_parser.add_argument("--db", default="traces.db", help="Path to the trace database")
+    import_parser.add_argument("--on-conflict", choices=["error", "skip", "replace"], default="error",
+                               help="How to handle rows whose ID already exists")
+    import_parser.add_argument("--batch-size", type=int, default=10000, help="Rows per insert batch")
+    import_parser.add_argument("--defer-indexes", choices=["auto", "always", "never"], default="auto",
+                               help="Rebuild indexes after loading instead of maintaining them row by row")
+    import_parser.add_argument("--quiet", action="store_true", help="Suppress progress output")
+
+    # Serve command
+    serve_parser = subparsers.add_parser("serve", help="Serve a read-only HTTP API and live tail over a trace database")
+    serve_parser.add_argument("--db", default="traces.db", help="Path to the trace database")
+    serve_parser.add_argument("--host", default="127.0.0.1", help="Interface to bind")
+    serve_parser.add_argument("--port", type=int, default=3033, help="Port to listen on")
+    serve_parser.add_argument("--poll-interval", type=float, default=0.25,
+                              help="Seconds between checks for newly committed traces")
+
+    # Profile command
+    profile_parser = subparsers.add_parser("profile", help="Export profiled stacks of slow or failed traces as folded stacks")
+    profile_parser.add_argument("--db", default="traces.db", help="Path to the trace database")
+    profile_parser.add_argument("--id", help="Only this trace")
+    profile_parser.add_argument("--function", help="Only traces of this function")
+    profile_parser.add_argument("--session-id", help="Only traces from this session")
+    profile_parser.add_argument("--limit", type=int, default=100, help="Most recent profiled traces to merge")
+    profile_parser.add_argument("--output", "-o", help="Output file for flamegraph.pl, speedscope or inferno (default: stdout)")
+
+    # Eval command
+    eval_parser = subparsers.add_parser("eval", help="Run an evaluation, optionally split across worker processes")
+    eval_parser.add_argument("target", nargs="?",
+                             help="MODULE:ATTRIBUTE of a TracerEval, or of a function returning one")
+    eval_parser.add_argument("--db", default="traces.db", help="Path to the trace database")
+    eval_parser.add_argument("--workers", type=int, default=1, help="Run the shards in this many local worker processes")
+    eval_parser.add_argument("--shard", help="Only run shard INDEX/COUNT and write its partial results")
+    eval_parser.add_argument("--partial-dir", help="Directory for partial shard results (default: a temporary directory)")
+    eval_parser.add_argument("--merge", action="store_true",
+                             help="Merge the partial results in --partial-dir into one evaluation")
+    eval_parser.add_argument("--session-id", help="Session ID for the evaluation")
+    eval_parser.add_argument("--json", action="store_true", help="Print the evaluation results as JSON")
+
+    # Bench command
+    bench_parser = subparsers.add_parser("bench", help="Benchmark tracing, storage and evaluation throughput")
+    bench_parser.add_argument("--only", nargs="+",
+                              choices=["decorator", "add_trace", "save_traces", "sanitize", "get_traces", "storage", "eval"],
+                              help="Benchmarks to run (default: all)")
+    bench_parser.add_argument("--sizes", nargs="+", type=int, default=[10_000, 1_000_000, 10_000_000],
+                              help="Database sizes in rows for the get_traces benchmark")
+    bench_parser.add_argument("--quick", action="store_true",
+                              help="Run get_traces against a 10k-row database only, ignoring --sizes; "
+                                   "other benchmarks are unchanged")
+    bench_parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    bench_parser.add_argument("--save-baseline", help="Write the results to a baseline file")
+    bench_parser.add_argument("--baseline", help="Compare against a saved baseline; exit 1 on regressions")
+    bench_parser.add_argument("--threshold", type=float, default=0.1,
+                              help="Relative slowdown tolerated before a result counts as a regression")
+    bench_parser.add_argument("--quiet", action="store_true", help="Suppress progress output")
+
     args = parser.parse_args()
     
     if args.command == "start":
         return start_command(args)
+    elif args.command == "export":
+        return export_command(args)
+    elif args.command == "import":
+        return import_command(args)
+    elif args.command == "serve":
+        return serve_command(args)
+    elif args.command == "profile":
+        return profile_command(args)
+    elif args.command == "eval":
+        return eval_command(args)
+    elif args.command == "bench":
+        return bench_command(args)
     else:
         parser.print_help()
         return 1
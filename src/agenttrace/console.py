@@ -0,0 +1,196 @@
+"""
+Event-driven live view of in-flight traced calls for interactive terminals.
+"""
+
+import collections
+import sys
+import threading
+import time
+
+# ANSI color codes for terminal output
+class Colors:
+    RESET = "\033[0m"
+    CYAN = "\033[36m"
+    GREEN = "\033[32m"
+    RED = "\033[31m"
+    BOLD = "\033[1m"
+
+SPINNER_CHARS = ['⠋', '⠙', '⠹', '⠸', '⠼', '⠴', '⠦', '⠧', '⠇', '⠏']
+
+_START = 0
+_END = 1
+
+
+class LiveView:
+    """
+    Renders a table of in-flight spans and a line per completed span.
+
+    Traced calls only append an event to a deque and set a flag, so the hot path
+    never waits on the renderer. A single background thread drains the events,
+    redraws at most once per ``min_interval`` when something changed, refreshes
+    elapsed times every ``refresh_interval`` while spans are open, and sleeps
+    indefinitely when nothing is in flight.
+    """
+
+    def __init__(self, stream=None, min_interval=0.1, refresh_interval=1.0, max_rows=10, max_tracked=1000):
+        """
+        Args:
+            stream (file, optional): Terminal to draw on. Defaults to ``sys.stdout``.
+            min_interval (float): Minimum seconds between redraws.
+            refresh_interval (float): Seconds between elapsed-time refreshes while spans are open.
+            max_rows (int): Maximum number of in-flight spans shown in the table.
+            max_tracked (int): Maximum number of in-flight spans remembered; the oldest are forgotten first.
+        """
+        self.stream = stream or sys.stdout
+        self.min_interval = min_interval
+        self.refresh_interval = refresh_interval
+        self.max_rows = max_rows
+        self.max_tracked = max_tracked
+        self._events = collections.deque()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._running = False
+        self._closed = False
+        # Only touched by the render thread: (session_id, function_name) -> deque of start times.
+        self._active = collections.OrderedDict()
+        self._active_count = 0
+        self._lines_drawn = 0
+        self._frame = 0
+        self._last_render = 0.0
+
+    @staticmethod
+    def supported(stream=None):
+        """Return True if the stream is an interactive terminal."""
+        stream = stream or sys.stdout
+        return hasattr(stream, "isatty") and stream.isatty()
+
+    def span_started(self, func_name, session_id):
+        """Record that a traced call started. Safe to call from any thread."""
+        if self._closed:
+            return
+        self._events.append((_START, func_name, session_id, time.time(), None, None))
+        if self._thread is None:
+            self._start()
+        self._wakeup.set()
+
+    def span_ended(self, func_name, session_id, duration_ms, success=True):
+        """Record that a traced call finished. Safe to call from any thread."""
+        if self._closed:
+            return
+        self._events.append((_END, func_name, session_id, time.time(), duration_ms, success))
+        if self._thread is None:
+            self._start()
+        self._wakeup.set()
+
+    def close(self):
+        """Stop the render thread and clear the in-flight table."""
+        self._closed = True
+        self._running = False
+        self._wakeup.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=1)
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is not None or self._closed:
+                return
+            if not self.supported(self.stream):
+                self._closed = True
+                self._events.clear()
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="agenttrace-live-view", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while self._running:
+            self._wakeup.wait(self.refresh_interval if self._active_count else None)
+            self._wakeup.clear()
+            if not self._running:
+                break
+
+            wait = self.min_interval - (time.monotonic() - self._last_render)
+            if wait > 0:
+                # Coalesce bursts of events into a single redraw.
+                time.sleep(wait)
+            finished = self._drain()
+            try:
+                if not self.supported(self.stream):
+                    break
+                self._render(finished)
+            except (OSError, ValueError):
+                break
+        self._running = False
+        self._closed = True
+        finished = self._drain()
+        self._active.clear()
+        self._active_count = 0
+        try:
+            self._render(finished)
+        except (OSError, ValueError):
+            pass
+
+    def _drain(self):
+        """Apply queued events to the in-flight table and return completed lines."""
+        finished = []
+        while True:
+            try:
+                kind, func_name, session_id, at, duration_ms, success = self._events.popleft()
+            except IndexError:
+                break
+            key = (session_id, func_name)
+            if kind == _START:
+                self._active.setdefault(key, collections.deque()).append(at)
+                self._active_count += 1
+                while self._active_count > self.max_tracked:
+                    oldest_key, starts = next(iter(self._active.items()))
+                    starts.popleft()
+                    self._active_count -= 1
+                    if not starts:
+                        del self._active[oldest_key]
+            else:
+                starts = self._active.get(key)
+                if starts:
+                    starts.popleft()
+                    self._active_count -= 1
+                    if not starts:
+                        del self._active[key]
+                finished.append((func_name, duration_ms, success))
+        return finished
+
+    def _render(self, finished):
+        out = []
+        if self._lines_drawn:
+            out.append(f"\033[{self._lines_drawn}F\033[J")
+        for func_name, duration_ms, success in finished:
+            color = Colors.GREEN if success else Colors.RED
+            status = "✓" if success else "✗"
+            duration = f"{duration_ms:.2f}ms" if duration_ms is not None else "?"
+            out.append(f"{color}{status} {func_name} completed in {duration}{Colors.RESET}\n")
+
+        lines = 0
+        if self._active_count:
+            now = time.time()
+            spinner = SPINNER_CHARS[self._frame % len(SPINNER_CHARS)]
+            rows = []
+            for (session_id, func_name), starts in self._active.items():
+                for start in starts:
+                    rows.append((start, func_name, session_id))
+            rows.sort()
+            out.append(f"{Colors.BOLD}{'':2}{'function':<32} {'session':<38} {'elapsed':>9}{Colors.RESET}\n")
+            lines += 1
+            for start, func_name, session_id in rows[:self.max_rows]:
+                out.append(f"{Colors.CYAN}{spinner} {func_name[:32]:<32} {str(session_id)[:38]:<38} "
+                           f"{now - start:>8.2f}s{Colors.RESET}\n")
+                lines += 1
+            if len(rows) > self.max_rows:
+                out.append(f"  … {len(rows) - self.max_rows} more in flight\n")
+                lines += 1
+            self._frame += 1
+
+        self.stream.write("".join(out))
+        self.stream.flush()
+        self._lines_drawn = lines
+        self._last_render = time.monotonic()
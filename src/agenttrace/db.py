@@ -0,0 +1,201 @@
+"""
+SQLite schema for the trace database, shared by the tracer, the evaluator and the CLI tools.
+"""
+
+TRACES_TABLE = '''
+    CREATE TABLE IF NOT EXISTS traces (
+        id TEXT PRIMARY KEY,
+        session_id TEXT,
+        timestamp TEXT,
+        trace_type TEXT,
+        function_name TEXT,
+        tags TEXT,
+        data JSON
+    )
+'''
+
+# Columns promoted out of the JSON payload so they can be aggregated or looked up in SQL,
+# plus the encoded result of recorded calls whose JSON form would not replay faithfully.
+# Added to older databases with ALTER TABLE when they are opened.
+METRIC_COLUMNS = [
+    ("duration_ms", "REAL"),
+    ("model", "TEXT"),
+    ("prompt_tokens", "INTEGER"),
+    ("completion_tokens", "INTEGER"),
+    ("cached_tokens", "INTEGER"),
+    ("total_tokens", "INTEGER"),
+    ("cpu_ms", "REAL"),
+    ("thread_cpu_ms", "REAL"),
+    ("running_ms", "REAL"),
+    ("suspended_ms", "REAL"),
+    ("memory_peak_bytes", "INTEGER"),
+    ("args_hash", "TEXT"),
+    ("replay_result", "TEXT"),
+]
+
+TRACES_INDEXES = [
+    'CREATE INDEX IF NOT EXISTS idx_timestamp ON traces(timestamp)',
+    'CREATE INDEX IF NOT EXISTS idx_type ON traces(trace_type)',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_token_usage
+    ON traces(function_name, session_id, total_tokens)
+    WHERE total_tokens IS NOT NULL
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_args_hash
+    ON traces(args_hash, function_name)
+    WHERE args_hash IS NOT NULL
+    ''',
+]
+
+# One row per session, kept up to date as traces and evaluation results are
+# written, so session listings read an index instead of grouping every trace.
+SESSIONS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS sessions (
+        session_id TEXT PRIMARY KEY,
+        first_timestamp TEXT,
+        last_timestamp TEXT,
+        span_count INTEGER,
+        error_count INTEGER,
+        total_duration_ms REAL,
+        tags TEXT,
+        eval_ids TEXT
+    )
+'''
+
+SESSIONS_INDEXES = [
+    'CREATE INDEX IF NOT EXISTS idx_sessions_recent ON sessions(last_timestamp)',
+]
+
+SESSION_COLUMNS = ["session_id", "first_timestamp", "last_timestamp", "span_count", "error_count",
+                   "total_duration_ms", "tags", "eval_ids"]
+
+# Rows that will be rewritten in place once their call finishes, in SQL. Rewriting
+# gives a row a new rowid, so incremental exports leave these for a later run.
+_UNFINISHED_ROW_SQL = {"traces": "trace_type = 'START'"}
+
+# Whether a trace recorded an error, in SQL; matches ``storage.trace_is_error``.
+TRACE_ERROR_SQL = "(CASE WHEN json_valid(data) THEN json_extract(data, '$.error') IS NOT NULL ELSE 0 END)"
+
+EVAL_EVENTS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS eval_events (
+        id TEXT PRIMARY KEY,
+        eval_id TEXT,
+        session_id TEXT,
+        timestamp TEXT,
+        event_type TEXT,
+        name TEXT,
+        data JSON
+    )
+'''
+
+EVAL_RESULTS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS eval_results (
+        id TEXT PRIMARY KEY,
+        name TEXT,
+        timestamp TEXT,
+        trial_count INTEGER,
+        session_id TEXT,
+        data JSON
+    )
+'''
+
+# Column order used for inserts into each table.
+TABLE_COLUMNS = {
+    "traces": ["id", "session_id", "timestamp", "trace_type", "function_name", "tags", "data"]
+              + [column for column, _ in METRIC_COLUMNS],
+    "eval_events": ["id", "eval_id", "session_id", "timestamp", "event_type", "name", "data"],
+    "eval_results": ["id", "name", "timestamp", "trial_count", "session_id", "data"],
+}
+
+
+def _table_exists(cursor, name):
+    return cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone() is not None
+
+
+def create_trace_tables(cursor):
+    """
+    Create the traces and sessions tables and their indexes.
+
+    Metric columns missing from older databases are added, and the sessions
+    table is filled from the existing traces when it is first created.
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor on the trace database.
+    """
+    cursor.execute(TRACES_TABLE)
+    existing = {row[1] for row in cursor.execute("PRAGMA table_info(traces)").fetchall()}
+    for column, column_type in METRIC_COLUMNS:
+        if column not in existing:
+            cursor.execute(f"ALTER TABLE traces ADD COLUMN {column} {column_type}")
+    for index in TRACES_INDEXES:
+        cursor.execute(index)
+    backfill = not _table_exists(cursor, "sessions")
+    cursor.execute(SESSIONS_TABLE)
+    for index in SESSIONS_INDEXES:
+        cursor.execute(index)
+    if backfill:
+        rebuild_sessions(cursor)
+
+
+def rebuild_sessions(cursor):
+    """
+    Recompute every row of the sessions table from the traces and eval_results tables.
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor on the trace database.
+    """
+    cursor.execute("DELETE FROM sessions")
+    cursor.execute(f'''
+        INSERT INTO sessions ({", ".join(SESSION_COLUMNS)})
+        SELECT session_id, MIN(timestamp), MAX(timestamp), COUNT(*), SUM({TRACE_ERROR_SQL}),
+               COALESCE(SUM(duration_ms), 0), '[]', '[]'
+        FROM traces WHERE session_id IS NOT NULL GROUP BY session_id
+    ''')
+    tags = cursor.execute('''
+        SELECT session_id, json_group_array(value) FROM (
+            SELECT DISTINCT traces.session_id, tag.value FROM traces, json_each(traces.tags) AS tag
+            WHERE traces.session_id IS NOT NULL AND json_valid(traces.tags) ORDER BY 1, 2
+        ) GROUP BY session_id
+    ''').fetchall()
+    cursor.executemany("UPDATE sessions SET tags = ? WHERE session_id = ?", [(value, key) for key, value in tags])
+    if not _table_exists(cursor, "eval_results"):
+        return
+    evals = cursor.execute('''
+        SELECT session_id, MIN(timestamp), MAX(timestamp), json_group_array(id) FROM (
+            SELECT session_id, timestamp, id FROM eval_results WHERE session_id IS NOT NULL ORDER BY timestamp
+        ) GROUP BY session_id
+    ''').fetchall()
+    cursor.executemany(
+        "INSERT OR IGNORE INTO sessions VALUES (?, NULL, NULL, 0, 0, 0, '[]', '[]')", [(row[0],) for row in evals]
+    )
+    cursor.executemany('''
+        UPDATE sessions SET first_timestamp = MIN(COALESCE(first_timestamp, ?2), ?2),
+                            last_timestamp = MAX(COALESCE(last_timestamp, ?3), ?3), eval_ids = ?4
+        WHERE session_id = ?1
+    ''', evals)
+
+
+def create_eval_tables(cursor):
+    """
+    Create the eval_events and eval_results tables.
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor on the trace database.
+    """
+    cursor.execute(EVAL_EVENTS_TABLE)
+    cursor.execute(EVAL_RESULTS_TABLE)
+
+
+def rowid_filter(table, incremental):
+    """
+    Return the SQL condition selecting rows of ``table`` past a ``?`` rowid watermark.
+
+    Args:
+        table (str): Table being exported.
+        incremental (bool): Whether the export resumes from a watermark, in which case
+            unfinished rows are left for a later run.
+    """
+    if incremental and table in _UNFINISHED_ROW_SQL:
+        return f"rowid > ? AND NOT ({_UNFINISHED_ROW_SQL[table]})"
+    return "rowid > ?"
@@ -0,0 +1,326 @@
+"""
+Columnar (Parquet / Arrow IPC) export of traces and evaluation results.
+
+Rows are streamed out of SQLite in chunks and written as record batches, so
+memory use is bounded by the chunk size rather than the size of the database.
+Requires the optional ``pyarrow`` dependency (``pip install agenttrace[arrow]``).
+"""
+
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+from .db import TABLE_COLUMNS, rowid_filter
+
+EXPORT_TABLES = ("traces", "eval_events", "eval_results")
+FORMATS = ("parquet", "arrow")
+
+_EXTENSIONS = {"parquet": "parquet", "arrow": "arrows"}
+
+# Columns read from each table, in the order ``_build_batch`` unpacks them. Listed
+# explicitly so that columns added to the schema later (such as the replay
+# bookkeeping ones) do not change what is exported.
+_EXPORT_COLUMNS = {
+    "traces": ["id", "session_id", "timestamp", "trace_type", "function_name", "tags", "data",
+               "duration_ms", "model", "prompt_tokens", "completion_tokens", "cached_tokens", "total_tokens",
+               "cpu_ms", "thread_cpu_ms", "running_ms", "suspended_ms", "memory_peak_bytes"],
+    "eval_events": TABLE_COLUMNS["eval_events"],
+    "eval_results": TABLE_COLUMNS["eval_results"],
+}
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        import pyarrow.ipc
+    except ImportError as e:
+        raise ImportError("Arrow/Parquet export requires pyarrow: pip install agenttrace[arrow]") from e
+    return pyarrow
+
+
+def _schema(pa, table, include_payloads):
+    """Return the Arrow schema written for a table."""
+    dict_string = pa.dictionary(pa.int32(), pa.string())
+    if table == "traces":
+        fields = [
+            ("rowid", pa.int64()),
+            ("id", pa.string()),
+            ("session_id", dict_string),
+            ("timestamp", pa.timestamp("us")),
+            ("trace_type", dict_string),
+            ("function_name", dict_string),
+            ("tags", pa.list_(dict_string)),
+            ("duration_ms", pa.float64()),
+            ("model", dict_string),
+            ("prompt_tokens", pa.int64()),
+            ("completion_tokens", pa.int64()),
+            ("cached_tokens", pa.int64()),
+            ("total_tokens", pa.int64()),
+            ("cpu_ms", pa.float64()),
+            ("thread_cpu_ms", pa.float64()),
+            ("running_ms", pa.float64()),
+            ("suspended_ms", pa.float64()),
+            ("memory_peak_bytes", pa.int64()),
+        ]
+    elif table == "eval_events":
+        fields = [
+            ("rowid", pa.int64()),
+            ("id", pa.string()),
+            ("eval_id", dict_string),
+            ("session_id", dict_string),
+            ("timestamp", pa.timestamp("us")),
+            ("event_type", dict_string),
+            ("name", dict_string),
+            ("trial", pa.int64()),
+            ("duration_ms", pa.float64()),
+        ]
+    else:
+        fields = [
+            ("rowid", pa.int64()),
+            ("id", pa.string()),
+            ("name", dict_string),
+            ("timestamp", pa.timestamp("us")),
+            ("trial_count", pa.int64()),
+            ("session_id", dict_string),
+            ("test_case_count", pa.int64()),
+            ("tool_score", pa.float64()),
+        ]
+    if include_payloads:
+        fields.append(("data", pa.string()))
+    return pa.schema(fields)
+
+
+def _dict_array(pa, values):
+    return pa.array(values, type=pa.string()).dictionary_encode()
+
+
+def _timestamp_array(pa, values):
+    try:
+        return pa.array(values, type=pa.string()).cast(pa.timestamp("us"))
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        return pa.array([datetime.fromisoformat(v) if v else None for v in values], type=pa.timestamp("us"))
+
+
+def _tags_array(pa, values):
+    tag_lists = []
+    for raw in values:
+        try:
+            tags = json.loads(raw) if raw else []
+        except (TypeError, ValueError):
+            tags = []
+        tag_lists.append([str(t) for t in tags] if isinstance(tags, list) else [])
+    lists = pa.array(tag_lists, type=pa.list_(pa.string()))
+    return pa.ListArray.from_arrays(lists.offsets, lists.values.dictionary_encode())
+
+
+def _payloads(values):
+    parsed = []
+    for raw in values:
+        try:
+            data = json.loads(raw) if raw else {}
+        except (TypeError, ValueError):
+            data = {}
+        parsed.append(data if isinstance(data, dict) else {})
+    return parsed
+
+
+def _number(value, kind):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return kind(value)
+
+
+def _build_batch(pa, table, rows, schema, include_payloads):
+    """Convert a chunk of SQLite rows into an Arrow record batch."""
+    columns = list(zip(*rows))
+    if table == "traces":
+        (rowid, ids, sessions, timestamps, trace_types, functions, tags, data,
+         duration, model, prompt, completion, cached, total,
+         cpu, thread_cpu, running, suspended, memory_peak) = columns
+        arrays = [
+            pa.array(rowid, type=pa.int64()),
+            pa.array(ids, type=pa.string()),
+            _dict_array(pa, sessions),
+            _timestamp_array(pa, timestamps),
+            _dict_array(pa, trace_types),
+            _dict_array(pa, functions),
+            _tags_array(pa, tags),
+            pa.array(duration, type=pa.float64()),
+            _dict_array(pa, model),
+            pa.array(prompt, type=pa.int64()),
+            pa.array(completion, type=pa.int64()),
+            pa.array(cached, type=pa.int64()),
+            pa.array(total, type=pa.int64()),
+            pa.array(cpu, type=pa.float64()),
+            pa.array(thread_cpu, type=pa.float64()),
+            pa.array(running, type=pa.float64()),
+            pa.array(suspended, type=pa.float64()),
+            pa.array(memory_peak, type=pa.int64()),
+        ]
+    elif table == "eval_events":
+        rowid, ids, eval_ids, sessions, timestamps, event_types, names, data = columns
+        payloads = _payloads(data)
+        arrays = [
+            pa.array(rowid, type=pa.int64()),
+            pa.array(ids, type=pa.string()),
+            _dict_array(pa, eval_ids),
+            _dict_array(pa, sessions),
+            _timestamp_array(pa, timestamps),
+            _dict_array(pa, event_types),
+            _dict_array(pa, names),
+            pa.array([_number(p.get("trial"), int) for p in payloads], type=pa.int64()),
+            pa.array([_number(p.get("duration_ms"), float) for p in payloads], type=pa.float64()),
+        ]
+    else:
+        rowid, ids, names, timestamps, trial_counts, sessions, data = columns
+        payloads = _payloads(data)
+        arrays = [
+            pa.array(rowid, type=pa.int64()),
+            pa.array(ids, type=pa.string()),
+            _dict_array(pa, names),
+            _timestamp_array(pa, timestamps),
+            pa.array(trial_counts, type=pa.int64()),
+            _dict_array(pa, sessions),
+            pa.array([_number((p.get("metadata") or {}).get("test_case_count"), int) for p in payloads],
+                     type=pa.int64()),
+            pa.array([_number((p.get("tool_summary") or {}).get("score"), float) for p in payloads],
+                     type=pa.float64()),
+        ]
+    if include_payloads:
+        arrays.append(pa.array(data, type=pa.string()))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _select_columns(conn, table):
+    """Return the SELECT list for a table, substituting NULL for columns an older database lacks."""
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()}
+    return ", ".join(col if col in existing else f"NULL AS {col}" for col in _EXPORT_COLUMNS[table])
+
+
+def export_tables(db_path, output_dir, format="parquet", tables=EXPORT_TABLES, since=None,
+                  include_payloads=False, chunk_size=50000, progress=None):
+    """
+    Export trace and evaluation tables to columnar files.
+
+    Each table is written to ``<output_dir>/<table>/part-<first>-<last>.<ext>``,
+    named after the first and last SQLite rowid in the file, so repeated
+    incremental exports add new part files to the same dataset directories.
+
+    Rows are upserted by ``id``: SQLite gives a rewritten row a new rowid, so
+    a row changed after it was exported appears again in a later part file,
+    and readers should keep the last row per ``id``. Incremental exports
+    skip START traces, which are rewritten when their call completes.
+
+    Args:
+        db_path (str): Path to the SQLite trace database.
+        output_dir (str): Directory to write the dataset into.
+        format (str): "parquet" or "arrow" (Arrow IPC stream, which allows
+            per-batch dictionaries).
+        tables (iterable): Tables to export.
+        since (dict, optional): Watermark mapping table name to the last rowid
+            already exported. Only newer, finished rows are written.
+        include_payloads (bool): Whether to include the raw JSON ``data`` column.
+        chunk_size (int): Number of rows read and written per record batch.
+        progress (callable, optional): Called with ``(table, rows_written)`` after each batch.
+
+    Returns:
+        dict: Per table, the number of rows written, the output path (or None)
+        and the new watermark rowid.
+    """
+    if format not in FORMATS:
+        raise ValueError(f"format must be one of {FORMATS}")
+    pa = _require_pyarrow()
+    import pyarrow.parquet as pq
+
+    incremental = since is not None
+    since = since or {}
+    summary = {}
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        existing_tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        for table in tables:
+            if table not in TABLE_COLUMNS:
+                raise ValueError(f"Unknown table: {table}")
+            watermark = int(since.get(table, 0))
+            summary[table] = {"rows": 0, "path": None, "watermark": watermark}
+            if table not in existing_tables:
+                continue
+
+            schema = _schema(pa, table, include_payloads)
+            cursor = conn.execute(
+                f"SELECT rowid, {_select_columns(conn, table)} FROM {table} "
+                f"WHERE {rowid_filter(table, incremental)} ORDER BY rowid",
+                (watermark,)
+            )
+            writer = None
+            tmp_path = None
+            first_rowid = last_rowid = None
+            rows_written = 0
+            try:
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    if writer is None:
+                        os.makedirs(os.path.join(output_dir, table), exist_ok=True)
+                        first_rowid = rows[0][0]
+                        tmp_path = os.path.join(output_dir, table, f".part-{first_rowid:012d}.tmp")
+                        if format == "parquet":
+                            writer = pq.ParquetWriter(tmp_path, schema, compression="zstd")
+                        else:
+                            writer = pa.ipc.new_stream(tmp_path, schema)
+                    batch = _build_batch(pa, table, rows, schema, include_payloads)
+                    if format == "parquet":
+                        writer.write_batch(batch)
+                    else:
+                        writer.write(batch)
+                    last_rowid = rows[-1][0]
+                    rows_written += len(rows)
+                    if progress is not None:
+                        progress(table, rows_written)
+            finally:
+                if writer is not None:
+                    writer.close()
+
+            if writer is not None:
+                path = os.path.join(output_dir, table,
+                                    f"part-{first_rowid:012d}-{last_rowid:012d}.{_EXTENSIONS[format]}")
+                os.replace(tmp_path, path)
+                summary[table] = {"rows": rows_written, "path": path, "watermark": last_rowid}
+    finally:
+        conn.close()
+    return summary
+
+
+def load_watermark(path):
+    """
+    Read an export watermark file.
+
+    Args:
+        path (str): Path to the JSON watermark file.
+
+    Returns:
+        dict: Mapping of table name to last exported rowid (empty if the file does not exist).
+    """
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_watermark(path, summary):
+    """
+    Write the watermark produced by an export.
+
+    Args:
+        path (str): Path to the JSON watermark file.
+        summary (dict): The value returned by ``export_tables``.
+    """
+    watermark = load_watermark(path)
+    watermark.update({table: info["watermark"] for table, info in summary.items()})
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(watermark, f, indent=2)
+    os.replace(tmp_path, path)
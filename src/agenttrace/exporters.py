@@ -0,0 +1,357 @@
+"""
+Span exporters that ship completed traces to external collectors.
+"""
+
+import hashlib
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from datetime import datetime
+
+SCOPE_NAME = "agenttrace"
+
+# OTLP status codes
+STATUS_UNSET = 0
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+# OTLP span kind for spans that are neither clients nor servers.
+SPAN_KIND_INTERNAL = 1
+
+
+class SpanExporter:
+    """
+    Base class for span exporters.
+
+    ``export`` is called from the tracing path with a list of trace rows (the
+    dictionaries persisted by ``TraceManager.save_traces``) and must return
+    without waiting on the network or disk.
+    """
+
+    def export(self, spans):
+        """
+        Accept a batch of completed trace rows for export.
+
+        Args:
+            spans (list): Trace row dictionaries.
+        """
+        raise NotImplementedError
+
+    def shutdown(self, timeout=None):
+        """
+        Flush anything still queued and release resources.
+
+        Args:
+            timeout (float, optional): Maximum seconds to wait for the flush.
+        """
+
+
+def _hex_id(value, length):
+    """Derive a stable hex identifier of ``length`` characters from a string."""
+    return hashlib.sha256(str(value).encode("utf-8")).hexdigest()[:length]
+
+
+def _attribute(key, value):
+    """Encode a single OTLP/JSON key-value attribute."""
+    if isinstance(value, bool):
+        encoded = {"boolValue": value}
+    elif isinstance(value, int):
+        encoded = {"intValue": str(value)}
+    elif isinstance(value, float):
+        encoded = {"doubleValue": value}
+    elif isinstance(value, (list, tuple)):
+        encoded = {"arrayValue": {"values": [_attribute("", v)["value"] for v in value]}}
+    else:
+        encoded = {"stringValue": str(value)}
+    return {"key": key, "value": encoded}
+
+
+def _unix_nanos(timestamp):
+    """Convert an ISO-8601 trace timestamp to nanoseconds since the epoch."""
+    return int(datetime.fromisoformat(timestamp).timestamp() * 1_000_000_000)
+
+
+def _status(data):
+    """
+    Return the OTLP status of a trace from its ``data`` payload.
+
+    Calls that raised, streams that failed and tool outputs that failed schema
+    validation are errors; everything else is left unset.
+    """
+    if isinstance(data, str):
+        if '"error"' not in data and '"tool_eval"' not in data:
+            return {"code": STATUS_UNSET}
+        try:
+            data = json.loads(data)
+        except ValueError:
+            return {"code": STATUS_UNSET}
+    if not isinstance(data, dict):
+        return {"code": STATUS_UNSET}
+    error = data.get("error")
+    if error is not None:
+        if isinstance(error, dict):
+            error = f"{error.get('type')}: {error.get('message')}"
+        return {"code": STATUS_ERROR, "message": str(error)}
+    streaming = data.get("streaming")
+    if isinstance(streaming, dict) and streaming.get("error"):
+        return {"code": STATUS_ERROR, "message": str(streaming["error"])}
+    tool_eval = data.get("tool_eval")
+    if isinstance(tool_eval, dict) and tool_eval.get("success") is False:
+        errors = "; ".join(str(e) for e in tool_eval.get("errors") or [])
+        return {"code": STATUS_ERROR, "message": f"Tool output failed schema validation: {errors}"}
+    return {"code": STATUS_UNSET}
+
+
+def span_to_otlp(span):
+    """
+    Map a trace row onto an OTLP span.
+
+    Each ``session_id`` becomes an OTLP trace, so all spans of a session are
+    grouped together by collectors. Tags, durations and token usage are
+    carried as attributes, and failed calls get an error status.
+
+    Args:
+        span (dict): A trace row dictionary.
+
+    Returns:
+        dict: The OTLP/JSON span.
+    """
+    duration_ms = span.get("duration_ms") or 0.0
+    timestamp_ns = _unix_nanos(span["timestamp"])
+    if span.get("trace_type") == "END":
+        # Orphaned END rows are stamped when the call finished.
+        end_ns = timestamp_ns
+        start_ns = end_ns - int(duration_ms * 1_000_000)
+    else:
+        start_ns = timestamp_ns
+        end_ns = start_ns + int(duration_ms * 1_000_000)
+
+    attributes = [
+        _attribute("session.id", span.get("session_id")),
+        _attribute("code.function", span.get("function_name")),
+        _attribute("agenttrace.trace_type", span.get("trace_type")),
+        _attribute("agenttrace.duration_ms", float(duration_ms)),
+    ]
+    tags = span.get("tags")
+    if tags:
+        attributes.append(_attribute("agenttrace.tags", json.loads(tags) if isinstance(tags, str) else tags))
+    if span.get("model"):
+        attributes.append(_attribute("gen_ai.request.model", span["model"]))
+    if span.get("prompt_tokens") is not None:
+        attributes.append(_attribute("gen_ai.usage.input_tokens", span["prompt_tokens"]))
+    if span.get("completion_tokens") is not None:
+        attributes.append(_attribute("gen_ai.usage.output_tokens", span["completion_tokens"]))
+
+    return {
+        "traceId": _hex_id(span.get("session_id"), 32),
+        "spanId": _hex_id(span["id"], 16),
+        "name": span.get("function_name") or "unknown",
+        "kind": SPAN_KIND_INTERNAL,
+        "startTimeUnixNano": str(start_ns),
+        "endTimeUnixNano": str(end_ns),
+        "attributes": attributes,
+        "status": _status(span.get("data")),
+    }
+
+
+def encode_otlp(spans, service_name="agenttrace", resource_attributes=None):
+    """
+    Build an OTLP/JSON ``ExportTraceServiceRequest`` body for a batch of trace rows.
+
+    Args:
+        spans (list): Trace row dictionaries.
+        service_name (str): Value of the ``service.name`` resource attribute.
+        resource_attributes (dict, optional): Additional resource attributes.
+
+    Returns:
+        dict: The request body.
+    """
+    resource = [_attribute("service.name", service_name)]
+    for key, value in (resource_attributes or {}).items():
+        resource.append(_attribute(key, value))
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": resource},
+            "scopeSpans": [{
+                "scope": {"name": SCOPE_NAME},
+                "spans": [span_to_otlp(span) for span in spans],
+            }],
+        }]
+    }
+
+
+class OTLPHttpExporter(SpanExporter):
+    """
+    Batches spans in a bounded queue and posts them as OTLP/JSON over HTTP.
+
+    A background thread sends a batch whenever ``max_batch_size`` spans are
+    queued or ``schedule_delay`` seconds have passed. Failed requests are
+    retried with exponential backoff and jitter. When the queue is full new
+    spans are dropped and counted rather than blocking the traced call.
+    """
+
+    def __init__(self, endpoint="http://localhost:4318/v1/traces", headers=None, service_name="agenttrace",
+                 resource_attributes=None, max_queue_size=2048, max_batch_size=512, schedule_delay=1.0,
+                 max_retries=5, initial_backoff=0.5, max_backoff=30.0, timeout=10.0):
+        """
+        Args:
+            endpoint (str): OTLP/HTTP traces endpoint of the collector.
+            headers (dict, optional): Extra HTTP headers, e.g. for authentication.
+            service_name (str): Value of the ``service.name`` resource attribute.
+            resource_attributes (dict, optional): Additional resource attributes.
+            max_queue_size (int): Maximum number of spans held in memory.
+            max_batch_size (int): Maximum number of spans sent per request.
+            schedule_delay (float): Maximum seconds a span waits before being sent.
+            max_retries (int): Retries per batch before it is dropped.
+            initial_backoff (float): Seconds to wait before the first retry.
+            max_backoff (float): Upper bound on the wait between retries.
+            timeout (float): HTTP request timeout in seconds.
+        """
+        self.endpoint = endpoint
+        self.headers = {"Content-Type": "application/json", **(headers or {})}
+        self.service_name = service_name
+        self.resource_attributes = resource_attributes
+        self.max_batch_size = max_batch_size
+        self.schedule_delay = schedule_delay
+        self.max_retries = max_retries
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+
+        self.exported = 0
+        self.dropped = 0
+        self.failed_requests = 0
+
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def export(self, spans):
+        """
+        Queue spans for export without blocking.
+
+        Args:
+            spans (list): Trace row dictionaries.
+        """
+        if self._stopped.is_set():
+            self.dropped += len(spans)
+            return
+        if self._thread is None:
+            self._start()
+        for span in spans:
+            try:
+                self._queue.put_nowait(span)
+            except queue.Full:
+                self.dropped += 1
+        if self._queue.qsize() >= self.max_batch_size:
+            self._wakeup.set()
+
+    def force_flush(self, timeout=None):
+        """
+        Send everything queued so far.
+
+        Args:
+            timeout (float, optional): Maximum seconds to wait.
+
+        Returns:
+            bool: True if the queue was drained within the timeout.
+        """
+        if self._thread is None:
+            return self._queue.empty()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self._queue.empty() or not self._idle.is_set():
+            self._wakeup.set()
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def shutdown(self, timeout=5.0):
+        """
+        Flush queued spans and stop the background thread.
+
+        Args:
+            timeout (float): Maximum seconds to wait for the final flush.
+        """
+        self.force_flush(timeout)
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="agenttrace-otlp-exporter", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.schedule_delay)
+            self._wakeup.clear()
+            while True:
+                self._idle.clear()
+                batch = []
+                try:
+                    while len(batch) < self.max_batch_size:
+                        batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    pass
+                if not batch:
+                    self._idle.set()
+                    break
+                self._send(batch)
+                self._idle.set()
+
+    def _send(self, batch):
+        """Post one batch, retrying transient failures with exponential backoff."""
+        import urllib.error
+        import urllib.request
+
+        try:
+            body = json.dumps(encode_otlp(batch, self.service_name, self.resource_attributes)).encode("utf-8")
+        except Exception as e:
+            logging.error(f"Error encoding spans for OTLP export: {str(e)}")
+            self.dropped += len(batch)
+            return
+
+        backoff = self.initial_backoff
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                request = urllib.request.Request(self.endpoint, data=body, headers=self.headers, method="POST")
+                with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                    response.read()
+                self.exported += len(batch)
+                return
+            except urllib.error.HTTPError as e:
+                self.failed_requests += 1
+                if e.code not in (408, 429) and e.code < 500:
+                    logging.error(f"OTLP collector rejected {len(batch)} spans: HTTP {e.code}")
+                    self.dropped += len(batch)
+                    return
+                retry_after = e.headers.get("Retry-After") if e.headers else None
+            except Exception as e:
+                self.failed_requests += 1
+                logging.debug(f"OTLP export attempt {attempt + 1} failed: {str(e)}")
+
+            if attempt == self.max_retries or self._stopped.is_set():
+                break
+            delay = backoff * random.uniform(0.5, 1.5)
+            if retry_after is not None:
+                try:
+                    delay = max(delay, float(retry_after))
+                except ValueError:
+                    pass
+            time.sleep(min(delay, self.max_backoff))
+            backoff = min(backoff * 2, self.max_backoff)
+
+        logging.error(f"Dropping {len(batch)} spans after {self.max_retries + 1} failed OTLP export attempts")
+        self.dropped += len(batch)
@@ -0,0 +1,90 @@
+"""
+Fixed-memory latency histogram used for percentile summaries.
+"""
+
+import math
+
+# Buckets grow geometrically by ~5%, which bounds the relative error of any
+# reported percentile while keeping the bucket count small.
+_BUCKETS_PER_E = 20
+
+
+class LatencyHistogram:
+    """
+    Log-bucketed histogram of non-negative values (typically milliseconds).
+
+    Values are folded into buckets as they arrive, so memory use depends on the
+    spread of the values rather than on how many were recorded.
+    """
+
+    __slots__ = ("count", "total", "min", "max", "_buckets", "_zeros")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self._buckets = {}
+        self._zeros = 0
+
+    def record(self, value):
+        """
+        Record a single observation.
+
+        Args:
+            value (float): The observed value.
+        """
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        if value <= 0:
+            self._zeros += 1
+            return
+        idx = math.floor(math.log(value) * _BUCKETS_PER_E)
+        self._buckets[idx] = self._buckets.get(idx, 0) + 1
+
+    def percentile(self, q):
+        """
+        Estimate a percentile of the recorded values.
+
+        Args:
+            q (float): The percentile to estimate, between 0 and 100.
+
+        Returns:
+            float: The estimated value, or None if nothing was recorded.
+        """
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(self.count * q / 100.0))
+        seen = self._zeros
+        if seen >= rank:
+            return 0.0
+        for idx in sorted(self._buckets):
+            seen += self._buckets[idx]
+            if seen >= rank:
+                # Report the bucket midpoint, clamped to the observed range.
+                estimate = math.exp((idx + 0.5) / _BUCKETS_PER_E)
+                return min(max(estimate, self.min), self.max)
+        return self.max
+
+    def summary(self):
+        """
+        Summarize the distribution.
+
+        Returns:
+            dict: Count, mean, min, max and p50/p90/p99 estimates.
+        """
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean": self.total / self.count,
+            "min": self.min,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+        }
@@ -0,0 +1,218 @@
+"""
+Crash-safe spill journal for traces that have not reached the database yet.
+"""
+
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+from .db import TABLE_COLUMNS
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+_MAGIC = b"ATSPILL1"
+# File header: magic, epoch.
+_FILE_HEADER = struct.Struct("<8sI")
+# Entry header: payload length, epoch, CRC-32 of epoch and payload.
+_ENTRY_HEADER = struct.Struct("<III")
+# Position of the JSON ``data`` column, which is embedded in entries without re-encoding.
+_DATA = TABLE_COLUMNS["traces"].index("data")
+
+
+class SpillJournal:
+    """
+    Append-only journal of trace rows in a memory-mapped, preallocated file.
+
+    Each row is written into the shared mapping as it is buffered, so it
+    survives the process being killed: the kernel writes the pages back even
+    if Python never runs another line. After a successful flush the journal
+    is cleared by bumping an epoch stored in the file header; entries from an
+    older epoch, or cut short by a crash (bad CRC), end the journal when it is
+    read back.
+
+    Later entries for the same trace ID supersede earlier ones, so replaying
+    the journal in order with ``INSERT OR REPLACE`` restores the latest state
+    of every trace. The journal is meant for a single writing process.
+    """
+
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Open or create the journal, keeping any entries left by a previous process.
+
+        Args:
+            path (str): Path of the journal file.
+            max_bytes (int): Size of the file; rows that do not fit are refused.
+        """
+        self.path = path
+        self.max_bytes = max(int(max_bytes), _FILE_HEADER.size + _ENTRY_HEADER.size + 64)
+        self._lock = threading.Lock()
+
+        exists = os.path.exists(path) and os.path.getsize(path) >= _FILE_HEADER.size
+        self._file = open(path, "r+b" if exists else "w+b")
+        size = max(os.fstat(self._file.fileno()).st_size, self.max_bytes)
+        self._file.truncate(size)
+        self.max_bytes = size
+        self._map = mmap.mmap(self._file.fileno(), size)
+
+        magic, epoch = _FILE_HEADER.unpack_from(self._map, 0)
+        if magic != _MAGIC:
+            epoch = 0
+            _FILE_HEADER.pack_into(self._map, 0, _MAGIC, epoch)
+        self._epoch = epoch
+        self._end = _FILE_HEADER.size
+        for _ in self._scan():
+            pass
+
+    def _scan(self, start=_FILE_HEADER.size):
+        """Yield the payloads of valid entries from ``start``, leaving ``_end`` after the last one."""
+        offset = start
+        while offset + _ENTRY_HEADER.size <= self.max_bytes:
+            length, epoch, crc = _ENTRY_HEADER.unpack_from(self._map, offset)
+            payload_start = offset + _ENTRY_HEADER.size
+            if length == 0 or epoch != self._epoch or payload_start + length > self.max_bytes:
+                break
+            payload = self._map[payload_start:payload_start + length]
+            if zlib.crc32(payload, epoch) != crc:
+                break
+            offset = payload_start + length
+            self._end = offset
+            yield payload
+
+    def _write(self, payload):
+        """Write one entry at the end of the journal. Caller holds the lock."""
+        offset = self._end
+        payload_start = offset + _ENTRY_HEADER.size
+        if payload_start + len(payload) > self.max_bytes:
+            return False
+        self._map[payload_start:payload_start + len(payload)] = payload
+        # The header goes last, so a torn write is never mistaken for an entry.
+        _ENTRY_HEADER.pack_into(self._map, offset, len(payload), self._epoch, zlib.crc32(payload, self._epoch))
+        self._end = payload_start + len(payload)
+        if self._end + _ENTRY_HEADER.size <= self.max_bytes:
+            _ENTRY_HEADER.pack_into(self._map, self._end, 0, 0, 0)
+        return True
+
+    def append(self, row):
+        """
+        Journal a trace row.
+
+        Args:
+            row (tuple): A row in ``db.TABLE_COLUMNS["traces"]`` order.
+
+        Returns:
+            bool: False if the journal is full and the row was not written.
+        """
+        payload = _encode_row(row)
+        with self._lock:
+            if self._map is None:
+                return False
+            return self._write(payload)
+
+    def mark(self):
+        """
+        Return the current end of the journal, to pass to ``read`` and ``discard``.
+
+        Returns:
+            int: An offset into the journal.
+        """
+        with self._lock:
+            return self._end
+
+    def read(self, mark=None):
+        """
+        Decode the journaled rows, oldest first.
+
+        Args:
+            mark (int, optional): Stop at this offset, as returned by ``mark``.
+
+        Returns:
+            list: Rows as tuples.
+        """
+        rows = []
+        with self._lock:
+            if self._map is None:
+                return rows
+            end = self._end
+            for payload in self._scan():
+                if mark is not None and self._end > mark:
+                    break
+                try:
+                    rows.append(_decode_row(payload))
+                except ValueError as e:
+                    logging.error(f"Skipping unreadable spill journal entry: {str(e)}")
+            self._end = end
+        return rows
+
+    def discard(self, mark):
+        """
+        Drop entries written before ``mark``, keeping any appended since.
+
+        Args:
+            mark (int): The value returned by ``mark`` before the rows were persisted.
+        """
+        with self._lock:
+            if self._map is None:
+                return
+            kept = []
+            end = self._end
+            for payload in self._scan():
+                if self._end > mark:
+                    kept.append(payload)
+            self._end = end
+            self._epoch = (self._epoch + 1) & 0xFFFFFFFF
+            _FILE_HEADER.pack_into(self._map, 0, _MAGIC, self._epoch)
+            self._end = _FILE_HEADER.size
+            _ENTRY_HEADER.pack_into(self._map, self._end, 0, 0, 0)
+            for payload in kept:
+                self._write(payload)
+
+    def is_empty(self):
+        """Return whether the journal holds no entries."""
+        with self._lock:
+            return self._end == _FILE_HEADER.size
+
+    def close(self, remove_if_empty=True):
+        """
+        Unmap and close the journal file.
+
+        Args:
+            remove_if_empty (bool): Delete the file if it holds no entries.
+        """
+        with self._lock:
+            if self._map is None:
+                return
+            empty = self._end == _FILE_HEADER.size
+            self._map.flush()
+            self._map.close()
+            self._map = None
+            self._file.close()
+        if empty and remove_if_empty:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+
+def _encode_row(row):
+    """
+    Encode a row as a JSON array, splicing in the already-encoded ``data`` column
+    as a nested value instead of escaping it as a string.
+    """
+    data = row[_DATA]
+    if not isinstance(data, str) or not data.startswith("{"):
+        return json.dumps(row, separators=(",", ":")).encode("utf-8")
+    head = json.dumps(row[:_DATA], separators=(",", ":"))[:-1]
+    tail = json.dumps(row[_DATA + 1:], separators=(",", ":"))[1:]
+    return f"{head},{data}{',' if len(row) > _DATA + 1 else ''}{tail}".encode("utf-8")
+
+
+def _decode_row(payload):
+    """Decode an entry written by ``_encode_row`` back into a row with ``data`` as JSON text."""
+    row = json.loads(payload)
+    if len(row) > _DATA and row[_DATA] is not None and not isinstance(row[_DATA], str):
+        row[_DATA] = json.dumps(row[_DATA])
+    return tuple(row)
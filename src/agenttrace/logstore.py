@@ -0,0 +1,353 @@
+"""
+Append-only segmented log storage for write-heavy trace ingestion.
+"""
+
+import glob
+import heapq
+import json
+import logging
+import os
+import struct
+import threading
+import zlib
+
+from .storage import ARGS_HASH, REPLAY_RESULT, StorageBackend, newest, summarize_sessions, trace_matches
+
+DEFAULT_SEGMENT_BYTES = 64 * 1024 * 1024
+DEFAULT_BATCH_ROWS = 1000
+
+_MAGIC = b"ATLB"
+# Batch header: magic, compressed payload length, CRC-32 of the payload, row
+# count, then the lengths of the batch's oldest and newest timestamps, which
+# follow the header ahead of the payload.
+_BATCH_HEADER = struct.Struct("<4sIIIHH")
+
+
+class _Batch:
+    """Location and time range of one compressed batch; the entries of a segment's sparse index."""
+
+    __slots__ = ("path", "offset", "length", "count", "min_ts", "max_ts", "max_ts_so_far")
+
+    def __init__(self, path, offset, length, count, min_ts, max_ts, max_ts_so_far):
+        self.path = path
+        self.offset = offset
+        self.length = length
+        self.count = count
+        self.min_ts = min_ts
+        self.max_ts = max_ts
+        # Newest timestamp in this batch or any batch written before it, so a
+        # newest-first scan knows when nothing older can still qualify.
+        self.max_ts_so_far = max_ts_so_far
+
+
+class SegmentLog:
+    """
+    A directory of segment files holding zlib-compressed batches of rows.
+
+    Rows are only ever appended: writing a row whose ID already exists adds a
+    new version, and reads return the latest version of each ID. Each batch
+    records the oldest and newest timestamp it contains, and that index is
+    kept in memory, so time-range reads skip batches without decompressing
+    them. Segments roll over at ``segment_bytes``; a batch torn by a crash is
+    cut off the end of the last segment when the log is reopened.
+    """
+
+    def __init__(self, directory, timestamp_index, segment_bytes=DEFAULT_SEGMENT_BYTES,
+                 batch_rows=DEFAULT_BATCH_ROWS, compress_level=1, fsync=False):
+        """
+        Args:
+            directory (str): Directory holding the segment files.
+            timestamp_index (int): Position of the ISO timestamp in each row.
+            segment_bytes (int): Size at which a new segment file is started.
+            batch_rows (int): Maximum rows per compressed batch.
+            compress_level (int): zlib compression level.
+            fsync (bool): Whether to fsync after every write.
+        """
+        self.directory = directory
+        self.timestamp_index = timestamp_index
+        self.segment_bytes = segment_bytes
+        self.batch_rows = max(1, batch_rows)
+        self.compress_level = compress_level
+        self.fsync = fsync
+        self._batches = []
+        self._file = None
+        self._path = None
+        self._segment = 0
+        self._lock = threading.Lock()
+
+    def open(self):
+        """Load the batch index from the segment files and open the last segment for appending."""
+        os.makedirs(self.directory, exist_ok=True)
+        paths = sorted(glob.glob(os.path.join(self.directory, "*.seg")))
+        for i, path in enumerate(paths):
+            end = self._load_segment(path)
+            if end < os.path.getsize(path):
+                if i == len(paths) - 1:
+                    logging.warning(f"Truncating incomplete batch at offset {end} of {path}")
+                    with open(path, "r+b") as f:
+                        f.truncate(end)
+                else:
+                    logging.error(f"Ignoring unreadable data after offset {end} of {path}")
+        if paths:
+            self._segment = int(os.path.basename(paths[-1]).split(".")[0])
+            self._open_segment(paths[-1])
+        else:
+            self._roll()
+
+    def _load_segment(self, path):
+        """Index the valid batches of a segment. Returns the offset just past the last one."""
+        offset = 0
+        with open(path, "rb") as f:
+            while True:
+                header = f.read(_BATCH_HEADER.size)
+                if len(header) < _BATCH_HEADER.size:
+                    return offset
+                magic, length, crc, count, min_len, max_len = _BATCH_HEADER.unpack(header)
+                if magic != _MAGIC:
+                    return offset
+                bounds = f.read(min_len + max_len)
+                payload = f.read(length)
+                if len(bounds) < min_len + max_len or len(payload) < length or zlib.crc32(payload) != crc:
+                    return offset
+                self._index(path, offset, _BATCH_HEADER.size + min_len + max_len + length, count,
+                            bounds[:min_len].decode("utf-8"), bounds[min_len:].decode("utf-8"))
+                offset = f.tell()
+
+    def _index(self, path, offset, length, count, min_ts, max_ts):
+        previous = self._batches[-1].max_ts_so_far if self._batches else ""
+        self._batches.append(_Batch(path, offset, length, count, min_ts, max_ts, max(previous, max_ts)))
+
+    def _open_segment(self, path):
+        if self._file is not None:
+            self._file.close()
+        self._path = path
+        self._file = open(path, "ab")
+
+    def _roll(self):
+        self._segment += 1
+        self._open_segment(os.path.join(self.directory, f"{self._segment:010d}.seg"))
+
+    def append(self, rows):
+        """
+        Append rows as one or more compressed batches.
+
+        Args:
+            rows (list): Rows to write.
+        """
+        if not rows:
+            return
+        encoded = []
+        for start in range(0, len(rows), self.batch_rows):
+            chunk = rows[start:start + self.batch_rows]
+            timestamps = [row[self.timestamp_index] or "" for row in chunk]
+            min_ts, max_ts = min(timestamps).encode("utf-8"), max(timestamps).encode("utf-8")
+            payload = zlib.compress(json.dumps(chunk, separators=(",", ":")).encode("utf-8"), self.compress_level)
+            header = _BATCH_HEADER.pack(_MAGIC, len(payload), zlib.crc32(payload), len(chunk), len(min_ts), len(max_ts))
+            encoded.append((header + min_ts + max_ts + payload, len(chunk), min_ts, max_ts))
+
+        with self._lock:
+            if self._file is None:
+                raise RuntimeError(f"Segment log {self.directory} is closed")
+            if self._file.tell() >= self.segment_bytes:
+                self._roll()
+            offset = self._file.tell()
+            try:
+                self._file.write(b"".join(batch for batch, _, _, _ in encoded))
+                self._file.flush()
+                if self.fsync:
+                    os.fsync(self._file.fileno())
+            except Exception:
+                # Cut off a partial write so later batches stay readable.
+                self._file.close()
+                with open(self._path, "r+b") as f:
+                    f.truncate(offset)
+                self._file = open(self._path, "ab")
+                raise
+            for batch, count, min_ts, max_ts in encoded:
+                self._index(self._path, offset, len(batch), count, min_ts.decode("utf-8"), max_ts.decode("utf-8"))
+                offset += len(batch)
+
+    def _read(self, batch, files):
+        f = files.get(batch.path)
+        if f is None:
+            f = files[batch.path] = open(batch.path, "rb")
+        f.seek(batch.offset)
+        data = f.read(batch.length)
+        _, length, _, _, min_len, max_len = _BATCH_HEADER.unpack_from(data)
+        start = _BATCH_HEADER.size + min_len + max_len
+        return json.loads(zlib.decompress(data[start:start + length]))
+
+    def query(self, predicate=None, limit=100, since=None, until=None):
+        """
+        Return the latest version of each row that matches, newest first.
+
+        Batches are read newest first. Batches entirely outside ``since`` and
+        ``until`` are skipped, and the scan stops once ``limit`` rows are found
+        and no older batch can hold a newer one.
+
+        Args:
+            predicate (callable, optional): Called with each row; rows for which it is false are skipped.
+            limit (int): Maximum number of rows.
+            since (str, optional): Only rows with an ISO timestamp at or after this value.
+            until (str, optional): Only rows with an ISO timestamp before this value.
+
+        Returns:
+            list: Matching rows as tuples.
+        """
+        with self._lock:
+            batches = list(self._batches)
+        ts = self.timestamp_index
+        seen = set()
+        matches = []
+        heap = []
+        files = {}
+        try:
+            for batch in reversed(batches):
+                if since and batch.max_ts_so_far < since:
+                    break
+                if heap and len(heap) >= limit and batch.max_ts_so_far < heap[0]:
+                    break
+                if (since and batch.max_ts < since) or (until and batch.min_ts >= until):
+                    continue
+                for row in reversed(self._read(batch, files)):
+                    if row[0] in seen:
+                        continue
+                    seen.add(row[0])
+                    timestamp = row[ts] or ""
+                    if (since and timestamp < since) or (until and timestamp >= until):
+                        continue
+                    if predicate is not None and not predicate(row):
+                        continue
+                    matches.append(tuple(row))
+                    if limit is not None:
+                        if len(heap) < limit:
+                            heapq.heappush(heap, timestamp)
+                        elif timestamp > heap[0]:
+                            heapq.heapreplace(heap, timestamp)
+        finally:
+            for f in files.values():
+                f.close()
+        return newest(matches, limit, ts)
+
+    def stats(self):
+        """
+        Return the size of the log.
+
+        Returns:
+            dict: Segment, batch and row counts, and bytes on disk.
+        """
+        with self._lock:
+            return {
+                "segments": len({batch.path for batch in self._batches}),
+                "batches": len(self._batches),
+                "rows": sum(batch.count for batch in self._batches),
+                "bytes": sum(batch.length for batch in self._batches),
+            }
+
+    def close(self):
+        """Close the active segment."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class SegmentLogBackend(StorageBackend):
+    """
+    Stores traces and evaluation data in append-only segmented logs.
+
+    Every flush becomes one sequential write of compressed batches, with no
+    B-tree or index maintenance, which suits high-volume ingestion and reads
+    over recent time ranges. Rewritten traces (a START later completed) keep
+    their superseded versions on disk. The directory is meant for a single
+    writing process, and it cannot be read by ``agenttrace serve`` or the
+    SQL-based exports.
+    """
+
+    def __init__(self, directory, segment_bytes=DEFAULT_SEGMENT_BYTES, batch_rows=DEFAULT_BATCH_ROWS,
+                 compress_level=1, fsync=False):
+        """
+        Args:
+            directory (str): Directory for the logs; created if missing.
+            segment_bytes (int): Size at which a new segment file is started.
+            batch_rows (int): Maximum rows per compressed batch.
+            compress_level (int): zlib compression level.
+            fsync (bool): Whether to fsync after every write.
+        """
+        self.directory = directory
+        options = dict(segment_bytes=segment_bytes, batch_rows=batch_rows, compress_level=compress_level, fsync=fsync)
+        self.traces = SegmentLog(os.path.join(directory, "traces"), 2, **options)
+        self.eval_events = SegmentLog(os.path.join(directory, "eval_events"), 3, **options)
+        self.eval_results = SegmentLog(os.path.join(directory, "eval_results"), 2, **options)
+        self._by_args_hash = None
+        self._eval_event_ids = None
+        self._eval_event_lock = threading.Lock()
+
+    def __str__(self):
+        return f"segment log at {self.directory}"
+
+    def open(self):
+        self._by_args_hash = None
+        self._eval_event_ids = None
+        for log in (self.traces, self.eval_events, self.eval_results):
+            log.open()
+
+    def close(self):
+        for log in (self.traces, self.eval_events, self.eval_results):
+            log.close()
+
+    def write_traces(self, rows):
+        self.traces.append(rows)
+        if self._by_args_hash is not None:
+            self._index_args_hashes(rows)
+
+    def _index_args_hashes(self, rows):
+        for row in rows:
+            if len(row) > ARGS_HASH and row[ARGS_HASH]:
+                replay_result = row[REPLAY_RESULT] if len(row) > REPLAY_RESULT else None
+                self._by_args_hash[(row[4], row[ARGS_HASH])] = tuple(row[:7]) + (replay_result,)
+
+    def find_by_args_hash(self, function_name, args_hash):
+        # The index is built from one scan on first use and then kept up to date by writes.
+        if self._by_args_hash is None:
+            self._by_args_hash = {}
+            self._index_args_hashes(reversed(self.traces.query(lambda row: len(row) > ARGS_HASH and row[ARGS_HASH],
+                                                               limit=None)))
+        return self._by_args_hash.get((function_name, args_hash))
+
+    def query_traces(self, limit=100, trace_type=None, tag=None, function_name=None, session_id=None,
+                     since=None, until=None):
+        def predicate(row):
+            return trace_matches(row, trace_type, tag, function_name, session_id)
+        return [row[:7] for row in self.traces.query(predicate, limit, since, until)]
+
+    def query_sessions(self, limit=100, since=None, until=None):
+        # Aggregated from a full scan on every call; the logs keep no summary table.
+        return summarize_sessions(self.traces.query(limit=None), self.eval_results.query(limit=None),
+                                  limit, since, until)
+
+    def write_eval_event(self, row):
+        # Event IDs are unique, as in the other backends. The set of IDs is built
+        # from one scan on first use and then kept up to date by writes.
+        with self._eval_event_lock:
+            if self._eval_event_ids is None:
+                self._eval_event_ids = {event[0] for event in self.eval_events.query(limit=None)}
+            if row[0] in self._eval_event_ids:
+                raise ValueError(f"Duplicate eval event id {row[0]!r}")
+            self.eval_events.append([row])
+            self._eval_event_ids.add(row[0])
+
+    def write_eval_result(self, row):
+        self.eval_results.append([row])
+
+    def query_eval_results(self, eval_id=None, name=None, session_id=None, limit=10):
+        def predicate(row):
+            return ((not eval_id or row[0] == eval_id) and (not name or row[1] == name)
+                    and (not session_id or row[4] == session_id))
+        return self.eval_results.query(predicate, limit)
+
+    def query_eval_events(self, eval_id=None, session_id=None, event_type=None, limit=100):
+        def predicate(row):
+            return ((not eval_id or row[1] == eval_id) and (not session_id or row[2] == session_id)
+                    and (not event_type or row[4] == event_type))
+        return self.eval_events.query(predicate, limit)
@@ -0,0 +1,156 @@
+"""
+Event-loop lag monitor that attributes stalls to the coroutine blocking the loop.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+
+from .spans import running_span
+
+DEFAULT_INTERVAL_MS = 50.0
+DEFAULT_THRESHOLD_MS = 100.0
+
+
+class LoopMonitor:
+    """
+    Measures how late an asyncio event loop runs its callbacks.
+
+    A heartbeat callback is scheduled on the loop every ``interval_ms``; how
+    late it runs is the loop's scheduling lag. A watchdog thread notices when a
+    heartbeat is more than ``threshold_ms`` overdue, while the loop is still
+    blocked, and records a ``loop.stall`` event on the traced coroutine that is
+    executing at that moment. The event's ``blocked_ms`` grows until the loop
+    is released. Stalls while the tracer is flushing on the loop's thread are
+    reported with ``flushing=True``.
+    """
+
+    def __init__(self, tracer, loop, interval_ms=DEFAULT_INTERVAL_MS, threshold_ms=DEFAULT_THRESHOLD_MS):
+        """
+        Args:
+            tracer (TraceManager): Tracer whose metrics record the lag and stalls.
+            loop (asyncio.AbstractEventLoop): The loop to monitor.
+            interval_ms (float): Time between heartbeats.
+            threshold_ms (float): Lag above which the loop counts as stalled.
+        """
+        self.tracer = tracer
+        self.loop = loop
+        self.interval = interval_ms / 1000
+        self.threshold_ms = threshold_ms
+        self.stalls = 0
+        self._loop_thread = None
+        self._due = None
+        self._handle = None
+        self._stall = None
+        self._stall_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._watchdog = None
+
+    def start(self):
+        """
+        Start the heartbeat and the watchdog thread.
+
+        Returns:
+            LoopMonitor: This monitor.
+        """
+        self._stopped.clear()
+        self.loop.call_soon_threadsafe(self._first_beat)
+        self._watchdog = threading.Thread(target=self._watch, name="agenttrace-loop-monitor", daemon=True)
+        self._watchdog.start()
+        return self
+
+    def stop(self):
+        """Stop monitoring. Safe to call from any thread, and after the loop has closed."""
+        self._stopped.set()
+        handle, self._handle = self._handle, None
+        if handle is not None and not self.loop.is_closed():
+            try:
+                self.loop.call_soon_threadsafe(handle.cancel)
+            except RuntimeError:
+                pass
+        if self._watchdog is not None and self._watchdog is not threading.current_thread():
+            self._watchdog.join(timeout=1.0)
+        self._watchdog = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.stop()
+
+    def _first_beat(self):
+        self._loop_thread = threading.get_ident()
+        self._schedule(time.perf_counter())
+
+    def _schedule(self, now):
+        if self._stopped.is_set():
+            return
+        self._due = now + self.interval
+        self._handle = self.loop.call_later(self.interval, self._beat)
+
+    def _beat(self):
+        now = time.perf_counter()
+        lag_ms = max((now - self._due) * 1000, 0)
+        metrics = self.tracer._metrics
+        metrics.loop_lag_ms.record(lag_ms)
+        if lag_ms >= self.threshold_ms:
+            self.stalls += 1
+            metrics.loop_stalls += 1
+            metrics.loop_stall_ms.record(lag_ms)
+            stall, self._stall = self._stall, None
+            if stall is not None and stall["due"] == self._due:
+                self._update_blocked(stall, lag_ms)
+                if stall["flushing"]:
+                    metrics.loop_stalls_in_flush += 1
+                logging.warning(f"Event loop blocked for {lag_ms:.0f} ms by {stall['culprit']}")
+            else:
+                logging.warning(f"Event loop blocked for {lag_ms:.0f} ms")
+        self._schedule(now)
+
+    def _watch(self):
+        check = min(self.interval, self.threshold_ms / 1000) / 2
+        while not self._stopped.wait(check):
+            due = self._due
+            if due is None or self._loop_thread is None:
+                continue
+            overdue_ms = (time.perf_counter() - due) * 1000
+            if overdue_ms < self.threshold_ms:
+                continue
+            stall = self._stall
+            if stall is not None and stall["due"] == due:
+                self._update_blocked(stall, overdue_ms)
+                continue
+            self._stall = self._attribute(due, overdue_ms)
+
+    def _update_blocked(self, stall, blocked_ms):
+        """Raise the ``blocked_ms`` of a stall's event, from the watchdog or the loop thread."""
+        with self._stall_lock:
+            attributes = stall["attributes"]
+            if attributes is None:
+                return
+            # The watchdog's last reading can land after the heartbeat's final one; keep the larger.
+            blocked_ms = max(round(blocked_ms, 3), attributes["blocked_ms"])
+            stall["attributes"] = stall["span"].update_event(attributes, blocked_ms=blocked_ms)
+
+    def _attribute(self, due, overdue_ms):
+        """Record which task and span are blocking the loop right now."""
+        try:
+            task = asyncio.current_task(self.loop)
+        except RuntimeError:
+            task = None
+        task_name = task.get_name() if task is not None and hasattr(task, "get_name") else None
+        flushing = self._loop_thread in self.tracer._flush_threads
+        span = running_span(self._loop_thread)
+        attributes = None
+        if span is not None:
+            details = {"blocked_ms": round(overdue_ms, 3), "task": task_name}
+            if flushing:
+                details["flushing"] = True
+            attributes = span.add_event("loop.stall", **details)
+            culprit = f"{span.name} (task {task_name})"
+        elif flushing:
+            culprit = "the tracer flushing traces"
+        else:
+            culprit = f"task {task_name}" if task_name else "code outside any task"
+        return {"due": due, "span": span, "attributes": attributes, "flushing": flushing, "culprit": culprit}
@@ -0,0 +1,177 @@
+"""
+Self-instrumentation for the tracer: counters and histograms describing its own overhead.
+"""
+
+import logging
+import threading
+
+from .histogram import LatencyHistogram
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+COUNTERS = {
+    "spans_recorded": "Spans added to the trace buffer.",
+    "spans_dropped": "Spans discarded because the trace buffer was full.",
+    "spans_sampled_out": "Traced calls skipped by sampling.",
+    "spans_spilled": "Spans kept only in the spill journal because the trace buffer was full.",
+    "spill_overflows": "Spans not written to the spill journal because it was full.",
+    "flushes": "Successful flushes of the trace buffer to the database.",
+    "rows_written": "Trace rows written to the database.",
+    "bytes_written": "Bytes of serialized trace data written to the database.",
+    "db_errors": "Database errors raised while opening or writing the trace database.",
+    "export_dropped": "Spans dropped by exporters.",
+    "loop_stalls": "Monitored event-loop heartbeats delayed past the stall threshold.",
+    "loop_stalls_in_flush": "Event-loop stalls during which the tracer was flushing on the loop's thread.",
+    "replay_hits": "Traced calls answered from a recorded call instead of running.",
+    "replay_misses": "Replay lookups that found no recorded call with the same arguments.",
+}
+
+GAUGES = {
+    "buffer_depth": "Traces currently held in the in-memory buffer.",
+    "max_buffer_depth": "Largest buffer depth seen at flush time.",
+}
+
+HISTOGRAMS = {
+    "flush_duration_ms": "Time spent encoding and writing one buffer flush, in milliseconds.",
+    "rows_per_flush": "Rows written per buffer flush.",
+    "serialization_ms": "Time spent sanitizing one trace into the buffer, in milliseconds.",
+    "loop_lag_ms": "Delay of monitored event-loop heartbeats, in milliseconds.",
+    "loop_stall_ms": "Length of event-loop stalls past the threshold, in milliseconds.",
+}
+
+_QUANTILES = (("0.5", "p50"), ("0.9", "p90"), ("0.99", "p99"))
+
+
+class TracerMetrics:
+    """
+    Counters and histograms updated by ``TraceManager`` as it records and flushes traces.
+
+    Updates are plain attribute increments, so values may be slightly
+    undercounted when many threads record traces at once, but they never
+    block the traced call.
+    """
+
+    def __init__(self):
+        for name in COUNTERS:
+            setattr(self, name, 0)
+        self.max_buffer_depth = 0
+        self.flush_duration_ms = LatencyHistogram()
+        self.rows_per_flush = LatencyHistogram()
+        self.serialization_ms = LatencyHistogram()
+        self.loop_lag_ms = LatencyHistogram()
+        self.loop_stall_ms = LatencyHistogram()
+
+    def record_flush(self, rows, nbytes, duration_ms, buffer_depth):
+        """
+        Record a successful flush.
+
+        Args:
+            rows (int): Number of rows written.
+            nbytes (int): Serialized size of the rows written.
+            duration_ms (float): Time taken by the flush.
+            buffer_depth (int): Buffer size when the flush started.
+        """
+        self.flushes += 1
+        self.rows_written += rows
+        self.bytes_written += nbytes
+        self.flush_duration_ms.record(duration_ms)
+        self.rows_per_flush.record(rows)
+        if buffer_depth > self.max_buffer_depth:
+            self.max_buffer_depth = buffer_depth
+
+    def snapshot(self, buffer_depth=0, exporters=()):
+        """
+        Return the current values.
+
+        Args:
+            buffer_depth (int): Current number of buffered traces.
+            exporters (iterable): Exporters whose ``dropped`` counts are included.
+
+        Returns:
+            dict: Counter and gauge values, plus a summary (count, sum, mean,
+            min, max, p50, p90, p99) for each histogram.
+        """
+        values = {name: getattr(self, name) for name in COUNTERS}
+        values["export_dropped"] = sum(getattr(exporter, "dropped", 0) for exporter in exporters)
+        values["buffer_depth"] = buffer_depth
+        values["max_buffer_depth"] = max(self.max_buffer_depth, buffer_depth)
+        for name in HISTOGRAMS:
+            histogram = getattr(self, name)
+            values[name] = {**histogram.summary(), "sum": histogram.total}
+        return values
+
+
+def render_prometheus(snapshot, prefix="agenttrace"):
+    """
+    Render a metrics snapshot in the Prometheus text exposition format.
+
+    Counters get a ``_total`` suffix and histograms are exposed as summaries
+    with 0.5, 0.9 and 0.99 quantiles.
+
+    Args:
+        snapshot (dict): The value returned by ``TracerMetrics.snapshot``.
+        prefix (str): Prefix for every metric name.
+
+    Returns:
+        str: The exposition text.
+    """
+    lines = []
+    for name, help_text in COUNTERS.items():
+        metric = f"{prefix}_{name}_total"
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter", f"{metric} {snapshot.get(name, 0)}"]
+    for name, help_text in GAUGES.items():
+        metric = f"{prefix}_{name}"
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} gauge", f"{metric} {snapshot.get(name, 0)}"]
+    for name, help_text in HISTOGRAMS.items():
+        metric = f"{prefix}_{name}"
+        summary = snapshot.get(name) or {}
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} summary"]
+        for quantile, key in _QUANTILES:
+            if summary.get(key) is not None:
+                lines.append(f'{metric}{{quantile="{quantile}"}} {summary[key]}')
+        lines.append(f"{metric}_sum {summary.get('sum', 0)}")
+        lines.append(f"{metric}_count {summary.get('count', 0)}")
+    return "\n".join(lines) + "\n"
+
+
+def start_metrics_server(source, host="127.0.0.1", port=9464, path="/metrics"):
+    """
+    Serve metrics for Prometheus scraping from a background thread.
+
+    Args:
+        source (callable): Returns the snapshot to render on each scrape.
+        host (str): Interface to bind.
+        port (int): Port to listen on. Use 0 to pick a free port.
+        path (str): URL path that serves the metrics.
+
+    Returns:
+        ThreadingHTTPServer: The running server. Call ``shutdown()`` to stop it;
+        ``server_address`` holds the bound host and port.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != path:
+                self.send_error(404)
+                return
+            try:
+                body = render_prometheus(source()).encode("utf-8")
+            except Exception as e:
+                logging.error(f"Error rendering tracer metrics: {str(e)}")
+                self.send_error(500)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", PROMETHEUS_CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logging.debug(f"metrics: {format % args}")
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="agenttrace-metrics", daemon=True)
+    thread.start()
+    return server
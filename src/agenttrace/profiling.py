@@ -0,0 +1,198 @@
+"""
+Sampling stack profiler that records what slow or failing spans were doing.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+DEFAULT_INTERVAL_MS = 5.0
+DEFAULT_SLOW_MS = 1000.0
+MAX_DEPTH = 128
+MAX_STACKS = 1000
+
+
+def _label(code):
+    """Name a code object for a folded stack frame."""
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+
+class SpanProfile:
+    """
+    Stack samples collected for one running span.
+
+    ``frame`` is set to the coroutine's frame for async calls, so samples are
+    matched to that coroutine rather than to any call of the same function.
+    """
+
+    __slots__ = ("code", "frame", "thread_id", "samples", "count")
+
+    def __init__(self, code, thread_id):
+        self.code = code
+        self.frame = None
+        self.thread_id = thread_id
+        self.samples = Counter()
+        self.count = 0
+
+    def folded(self, max_stacks=MAX_STACKS):
+        """
+        Return the samples as folded stacks, rooted at the traced function.
+
+        Args:
+            max_stacks (int): Keep only this many of the most frequent stacks.
+
+        Returns:
+            dict: ``"outer;inner;leaf"`` stack strings mapped to sample counts.
+        """
+        labels = {}
+        stacks = {}
+        for frames, count in self.samples.most_common(max_stacks):
+            parts = []
+            for code in reversed(frames):
+                label = labels.get(code)
+                if label is None:
+                    label = labels[code] = _label(code)
+                parts.append(label)
+            stacks[";".join(parts)] = count
+        return stacks
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of threads that are running profiled spans.
+
+    A single daemon thread wakes every ``interval_ms`` while at least one span
+    is being profiled and sleeps otherwise. Each sample of a thread is credited
+    to every open span on it whose call is on the sampled stack, so nested
+    spans include their children. A synchronous call is sampled for its whole
+    duration, so time blocked on I/O or a lock shows where it was waiting. A
+    coroutine is matched by its own frame, which is only on the stack while
+    that coroutine is running, so concurrent asyncio tasks on one thread, even
+    of the same function, are kept apart.
+    """
+
+    def __init__(self, interval_ms=DEFAULT_INTERVAL_MS):
+        """
+        Args:
+            interval_ms (float): Time between samples, in milliseconds.
+        """
+        self.interval = interval_ms / 1000
+        self._active = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread = None
+
+    def start(self, code):
+        """
+        Begin profiling a span on the current thread.
+
+        Args:
+            code (types.CodeType): Code object of the traced function.
+
+        Returns:
+            SpanProfile: Pass to ``stop`` when the span ends.
+        """
+        profile = SpanProfile(code, threading.get_ident())
+        with self._lock:
+            self._active.setdefault(profile.thread_id, []).append(profile)
+            if self._thread is None:
+                self._stopped = False
+                self._thread = threading.Thread(target=self._run, name="agenttrace-profiler", daemon=True)
+                self._thread.start()
+            self._wake.set()
+        return profile
+
+    def stop(self, profile):
+        """
+        Stop profiling a span. Stopping a span twice is harmless.
+
+        Args:
+            profile (SpanProfile): The value returned by ``start``.
+        """
+        with self._lock:
+            profiles = self._active.get(profile.thread_id)
+            profile.frame = None
+            if profiles and profile in profiles:
+                profiles.remove(profile)
+                if not profiles:
+                    del self._active[profile.thread_id]
+            if not self._active:
+                self._wake.clear()
+
+    def shutdown(self):
+        """Stop the sampling thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            self._stopped = True
+            self._wake.set()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=1.0)
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            if self._stopped:
+                return
+            time.sleep(self.interval)
+            with self._lock:
+                if self._stopped:
+                    return
+                if self._active:
+                    self._sample()
+
+    def _sample(self):
+        frames = sys._current_frames()
+        for thread_id, profiles in self._active.items():
+            frame = frames.get(thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None and len(stack) < MAX_DEPTH:
+                stack.append(frame)
+                frame = frame.f_back
+            codes = None
+            for profile in profiles:
+                # Keep the frames from the outermost call of the traced function down to the leaf.
+                for depth in range(len(stack) - 1, -1, -1):
+                    if (stack[depth] is profile.frame if profile.frame is not None
+                            else stack[depth].f_code is profile.code):
+                        if codes is None:
+                            codes = [f.f_code for f in stack]
+                        profile.samples[tuple(codes[:depth + 1])] += 1
+                        profile.count += 1
+                        break
+
+
+def to_folded(stacks):
+    """
+    Render folded stacks in the text format read by flamegraph.pl, speedscope and inferno.
+
+    Args:
+        stacks (dict): Stack strings mapped to sample counts, as stored in a trace's
+            ``profile["stacks"]``. Several traces can be merged by summing counts first.
+
+    Returns:
+        str: One ``stack count`` line per stack.
+    """
+    return "".join(f"{stack} {count}\n" for stack, count in sorted(stacks.items()))
+
+
+def merge_profiles(traces):
+    """
+    Sum the profile stacks of several traces.
+
+    Args:
+        traces (list): Trace dictionaries, as returned by ``TraceManager.get_traces``.
+
+    Returns:
+        Counter: Stack strings mapped to total sample counts.
+    """
+    merged = Counter()
+    for trace in traces:
+        profile = trace.get("profile") or {}
+        merged.update(profile.get("stacks") or {})
+    return merged
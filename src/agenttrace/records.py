@@ -0,0 +1,163 @@
+"""
+Compact in-memory representation of buffered traces.
+
+Payloads are kept as sanitized Python values and only encoded to JSON rows
+by the writer, so merging an END into its START costs a few attribute
+assignments instead of a JSON decode and re-encode.
+"""
+
+import json
+import sys
+import time
+from datetime import datetime
+
+from .ids import new_id
+from .timing import TIMING_FIELDS
+from .usage import USAGE_FIELDS
+
+START = sys.intern("START")
+END = sys.intern("END")
+COMPLETE = sys.intern("COMPLETE")
+
+_tag_cache = {}
+
+
+def intern_tags(tags):
+    """
+    Return tags as a shared tuple of interned strings.
+
+    Args:
+        tags (list, optional): Tags passed to the tracer.
+
+    Returns:
+        tuple: The interned tags, or None if there are none.
+    """
+    if not tags:
+        return None
+    key = tuple(tags)
+    interned = _tag_cache.get(key)
+    if interned is None:
+        interned = tuple(sys.intern(tag) if isinstance(tag, str) else tag for tag in key)
+        if len(_tag_cache) < 4096:
+            _tag_cache[key] = interned
+    return interned
+
+
+def wall_time(wall_ns):
+    """
+    Convert a record's wall-clock timestamp to a local datetime.
+
+    Args:
+        wall_ns (int): ``time.time_ns()`` value stored on a record.
+
+    Returns:
+        datetime: The corresponding local time.
+    """
+    return datetime.fromtimestamp(wall_ns / 1e9)
+
+
+class SpanRecord:
+    """
+    A buffered trace: a running call (START), a finished one (COMPLETE), or an
+    END whose START was not found.
+
+    ``encoded`` keeps the row last written to the spill journal, so the next
+    flush reuses it instead of encoding the record again.
+
+    ``wall_ns`` is the wall-clock time stored in the ``timestamp`` column, read
+    when the record is created like the timestamps of evaluation rows.
+    ``timestamp_ns`` is the monotonic time the record's ID is derived from.
+    """
+
+    __slots__ = ("id", "session_id", "timestamp_ns", "wall_ns", "trace_type", "function_name", "tags",
+                 "args", "kwargs", "result", "duration_ms", "tool_eval", "streaming", "usage",
+                 "timing", "events", "events_dropped", "error", "profile", "args_hash", "replay_result",
+                 "replayed_from", "flushed", "encoded")
+
+    def __init__(self, trace_type, function_name, session_id, tags=None, timestamp_ns=None):
+        self.id = None
+        self.session_id = session_id
+        self.timestamp_ns = time.perf_counter_ns() if timestamp_ns is None else timestamp_ns
+        self.wall_ns = time.time_ns()
+        self.trace_type = trace_type
+        self.function_name = sys.intern(function_name) if isinstance(function_name, str) else function_name
+        self.tags = intern_tags(tags)
+        self.args = None
+        self.kwargs = None
+        self.result = None
+        self.duration_ms = None
+        self.tool_eval = None
+        self.streaming = None
+        self.usage = None
+        self.timing = None
+        self.events = None
+        self.events_dropped = 0
+        self.error = None
+        self.profile = None
+        self.args_hash = None
+        self.replay_result = None
+        self.replayed_from = None
+        self.flushed = False
+        self.encoded = None
+
+    def data(self):
+        """
+        Build the JSON payload stored in the ``data`` column.
+
+        Returns:
+            dict: The payload, with keys in the order they were historically written.
+        """
+        data = {}
+        if self.args is not None:
+            data["args"] = self.args
+        if self.kwargs is not None:
+            data["kwargs"] = self.kwargs
+        if self.result is not None:
+            data["result"] = self.result
+        if self.duration_ms is not None:
+            data["duration_ms"] = self.duration_ms
+        if self.tool_eval is not None:
+            data["tool_eval"] = self.tool_eval
+        if self.streaming is not None:
+            data["streaming"] = self.streaming
+        if self.usage is not None:
+            data["usage"] = self.usage
+        if self.timing is not None:
+            data["timing"] = self.timing
+        if self.events:
+            data["events"] = self.events
+            if self.events_dropped:
+                data["events_dropped"] = self.events_dropped
+        if self.error is not None:
+            data["error"] = self.error
+        if self.profile is not None:
+            data["profile"] = self.profile
+        if self.replayed_from is not None:
+            data["replayed_from"] = self.replayed_from
+        return data
+
+    def to_row(self):
+        """
+        Encode the record as a ``traces`` row, assigning its ID on first use.
+
+        Returns:
+            tuple: Values in ``db.TABLE_COLUMNS["traces"]`` order.
+        """
+        timestamp = wall_time(self.wall_ns).isoformat()
+        if self.id is None:
+            self.id = new_id(self.timestamp_ns)
+        usage = self.usage or {}
+        timing = self.timing or {}
+        return (
+            self.id,
+            self.session_id,
+            timestamp,
+            self.trace_type,
+            self.function_name,
+            json.dumps(list(self.tags)) if self.tags else None,
+            json.dumps(self.data()),
+            self.duration_ms,
+        ) + tuple(usage.get(field) for field in USAGE_FIELDS) + tuple(timing.get(field) for field in TIMING_FIELDS) + (
+            self.args_hash,
+            self.replay_result,
+        )
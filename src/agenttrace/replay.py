@@ -0,0 +1,162 @@
+"""
+Record and replay of traced calls, keyed by a hash of their bound arguments.
+"""
+
+import base64
+import hashlib
+import inspect
+import json
+
+RECORD = "record"
+REPLAY = "replay"
+RECORD_MISSING = "record_missing"
+REPLAY_MODES = (RECORD, REPLAY, RECORD_MISSING)
+
+# Parameters that identify the receiver rather than the call.
+_RECEIVER_NAMES = ("self", "cls")
+
+# Key marking a JSON object that stands for a value JSON has no type for.
+_TAG = "__replay__"
+_SETS = {"set": set, "frozenset": frozenset}
+
+
+class ReplayMissError(LookupError):
+    """Raised in replay mode when no recorded call matches the arguments."""
+
+
+def check_mode(mode):
+    """
+    Validate a replay mode.
+
+    Args:
+        mode (str, optional): One of ``REPLAY_MODES``, or None for no replay.
+
+    Returns:
+        str: The mode.
+
+    Raises:
+        ValueError: If the mode is not recognized.
+    """
+    if mode is not None and mode not in REPLAY_MODES:
+        raise ValueError(f"Unknown replay mode {mode!r}; expected one of {', '.join(REPLAY_MODES)}")
+    return mode
+
+
+def args_hash(func, signature, args, kwargs, sanitize, ignore=()):
+    """
+    Hash a call's bound arguments, with defaults applied.
+
+    ``self``/``cls`` and the ``ignore``d parameters are left out, so calls that
+    differ only in a client object or a request ID still match.
+
+    Args:
+        func (callable): The traced function; its module and qualified name are part of the hash.
+        signature (inspect.Signature): The function's signature.
+        args (tuple): Positional arguments of the call.
+        kwargs (dict): Keyword arguments of the call.
+        sanitize (callable): Converts argument values into JSON-serializable data.
+        ignore (iterable): Names of parameters to leave out.
+
+    Returns:
+        str: Hex digest, or None if the arguments do not bind to the signature.
+    """
+    try:
+        bound = signature.bind(*args, **kwargs)
+    except TypeError:
+        return None
+    bound.apply_defaults()
+    arguments = {name: value for name, value in bound.arguments.items()
+                 if name not in _RECEIVER_NAMES and name not in ignore}
+    payload = json.dumps([func.__module__, func.__qualname__, sanitize(arguments)], sort_keys=True, default=repr)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def signature_of(func):
+    """Return the signature used for hashing, or None if it cannot be determined."""
+    try:
+        return inspect.signature(func)
+    except (TypeError, ValueError):
+        return None
+
+
+def _encode(value):
+    """Return the tagged JSON form of ``value``; raise TypeError if it has no faithful one."""
+    kind = type(value)
+    if value is None or kind in (str, int, float, bool):
+        return value
+    if kind is list:
+        return [_encode(item) for item in value]
+    if kind is dict:
+        if all(type(key) is str for key in value) and _TAG not in value:
+            return {key: _encode(item) for key, item in value.items()}
+        return {_TAG: "dict", "items": [[_encode(key), _encode(item)] for key, item in value.items()]}
+    if kind in (tuple, set, frozenset):
+        return {_TAG: kind.__name__, "items": [_encode(item) for item in value]}
+    if kind is bytes:
+        return {_TAG: "bytes", "base64": base64.b64encode(value).decode("ascii")}
+    raise TypeError(f"{kind.__name__} has no faithful JSON form")
+
+
+def _decode(obj):
+    """``json.loads`` object hook undoing the tags added by ``_encode``."""
+    tag = obj.get(_TAG)
+    if tag is None:
+        return obj
+    if tag == "bytes":
+        return base64.b64decode(obj["base64"])
+    if tag == "dict":
+        return {_hashable(key): item for key, item in obj["items"]}
+    if tag == "tuple":
+        return tuple(obj["items"])
+    return _SETS[tag](_hashable(item) for item in obj["items"])
+
+
+def _hashable(value):
+    """Turn lists decoded inside set members and dict keys back into the tuples they were."""
+    return tuple(_hashable(item) for item in value) if type(value) is list else value
+
+
+def encode_result(result, sanitized):
+    """
+    Encode a call's result so that replaying it returns an equal value.
+
+    Results that come back unchanged from their JSON form (``sanitized``) are
+    replayed from the stored ``result``. Tuples, sets, bytes and dicts with
+    non-string keys, at any depth, are stored as tagged JSON. Other objects,
+    such as SDK response classes, cannot be stored faithfully and are not
+    recorded. Nothing is ever unpickled or evaluated on replay, so a trace
+    database from an untrusted source cannot run code.
+
+    Args:
+        result: The value the traced function returned.
+        sanitized: The JSON form of ``result`` stored in the trace.
+
+    Returns:
+        tuple: ``(replayable, encoded)``. ``encoded`` is JSON text, or None when the
+        JSON form is faithful; ``replayable`` is False if the result cannot be stored faithfully.
+    """
+    if type(result) is type(sanitized) and result == sanitized:
+        return True, None
+    try:
+        return True, json.dumps(_encode(result), separators=(",", ":"))
+    except (TypeError, ValueError, RecursionError):
+        return False, None
+
+
+def decode_result(encoded):
+    """
+    Restore a result encoded by ``encode_result``.
+
+    Args:
+        encoded (str): Tagged JSON from the ``replay_result`` column.
+
+    Returns:
+        A new copy of the original result.
+
+    Raises:
+        ValueError: If ``encoded`` is not a value written by ``encode_result``.
+    """
+    try:
+        return json.loads(encoded, object_hook=_decode)
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Malformed replay result: {e}") from e
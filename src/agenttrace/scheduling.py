@@ -0,0 +1,444 @@
+"""
+Adaptive concurrency, rate limiting and retries for calls made by evaluations.
+
+``EvalScheduler`` runs task calls with an in-flight limit that an AIMD
+controller adjusts from what it observes: every successful call adds a
+little to the limit, while rate-limit errors, timeouts and calls much
+slower than the recent average cut it in half. Optional token buckets
+cap requests per second and tokens per minute, and failed calls are retried
+with exponential backoff and full jitter, honouring ``Retry-After``.
+"""
+
+import asyncio
+import collections
+import concurrent.futures
+import functools
+import inspect
+import random
+import time
+
+from .usage import extract_llm_usage
+
+DEFAULT_INITIAL_CONCURRENCY = 4
+DEFAULT_MAX_CONCURRENCY = 64
+DEFAULT_LATENCY_TOLERANCE = 3.0
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BASE_DELAY = 0.5
+DEFAULT_MAX_DELAY = 30.0
+
+# HTTP statuses worth retrying: timeouts, conflicts, rate limits and server or overload errors.
+RETRYABLE_STATUSES = frozenset((408, 409, 429, 500, 502, 503, 504, 529))
+# Exception class names used by provider SDKs (OpenAI, Anthropic, httpx) for transient failures.
+_RETRYABLE_NAMES = ("RateLimitError", "APITimeoutError", "APIConnectionError", "InternalServerError",
+                    "OverloadedError", "ServiceUnavailableError", "TimeoutException", "ConnectError")
+
+# Weight of each successful call in the moving average of latency.
+_LATENCY_SMOOTHING = 0.1
+
+
+def _status(error):
+    """Return the HTTP status carried by an exception, if any."""
+    for holder in (error, getattr(error, "response", None)):
+        for name in ("status_code", "status"):
+            value = getattr(holder, name, None)
+            if isinstance(value, int):
+                return value
+    return None
+
+
+def _is_async(func):
+    """Return True for coroutine functions, including callables with an ``async def __call__``."""
+    return inspect.iscoroutinefunction(func) or inspect.iscoroutinefunction(getattr(func, "__call__", None))
+
+
+def is_rate_limit(error):
+    """
+    Return True if an exception reports that a rate limit was hit.
+
+    Args:
+        error (BaseException): The exception raised by a task call.
+
+    Returns:
+        bool: True for HTTP 429 responses and ``RateLimitError`` exceptions.
+    """
+    return _status(error) == 429 or type(error).__name__ == "RateLimitError"
+
+
+def is_retryable(error):
+    """
+    Default retry predicate: rate limits, timeouts, connection failures and server errors.
+
+    Args:
+        error (BaseException): The exception raised by a task call.
+
+    Returns:
+        bool: True if the call is worth retrying.
+    """
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    if _status(error) in RETRYABLE_STATUSES:
+        return True
+    return any(cls.__name__ in _RETRYABLE_NAMES for cls in type(error).__mro__)
+
+
+def retry_after(error):
+    """
+    Return the delay a rate-limited response asked for, in seconds.
+
+    Args:
+        error (BaseException): The exception raised by a task call.
+
+    Returns:
+        float: The ``retry_after`` attribute or ``Retry-After`` header value, or None.
+    """
+    value = getattr(error, "retry_after", None)
+    if value is None:
+        headers = getattr(getattr(error, "response", None), "headers", None)
+        if headers is not None:
+            try:
+                value = headers.get("retry-after") or headers.get("Retry-After")
+            except AttributeError:
+                value = None
+    try:
+        return max(float(value), 0.0) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """
+    Token bucket that makes callers wait until enough capacity has accumulated.
+
+    Waiters are served in arrival order. The bucket may go into debt when a
+    call turns out to use more than it reserved, which delays later callers.
+    """
+
+    def __init__(self, rate, capacity=None):
+        """
+        Args:
+            rate (float): Tokens added per second.
+            capacity (float, optional): Largest burst. Defaults to one second's worth (at least 1).
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(rate, 1))
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = None
+        self._loop = None
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount=1):
+        """
+        Wait until ``amount`` tokens are available and take them.
+
+        Args:
+            amount (float): Tokens to take; amounts above the capacity wait for a full bucket.
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._lock = loop, asyncio.Lock()
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def adjust(self, amount):
+        """
+        Take (or, if negative, return) tokens after the fact.
+
+        Args:
+            amount (float): Tokens used beyond what was acquired.
+        """
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class AIMDController:
+    """
+    Additive-increase, multiplicative-decrease controller for an in-flight limit.
+
+    Each successful call raises the limit by ``increase / limit``, i.e. by
+    ``increase`` per window of ``limit`` calls. Overload signals multiply it
+    by ``decrease``; calls already in flight when the limit was last cut do
+    not cut it again, so a burst of 429s counts as one signal.
+    """
+
+    def __init__(self, initial=DEFAULT_INITIAL_CONCURRENCY, minimum=1, maximum=DEFAULT_MAX_CONCURRENCY,
+                 increase=1.0, decrease=0.5, latency_tolerance=DEFAULT_LATENCY_TOLERANCE):
+        """
+        Args:
+            initial (int): Starting limit.
+            minimum (int): Lowest limit.
+            maximum (int): Highest limit.
+            increase (float): Limit added per window of successful calls.
+            decrease (float): Factor applied to the limit on overload.
+            latency_tolerance (float, optional): A successful call slower than this multiple of the
+                moving average latency counts as overload. None uses errors only.
+        """
+        if not 1 <= minimum <= maximum:
+            raise ValueError("expected 1 <= minimum <= maximum")
+        if not 0 < decrease < 1:
+            raise ValueError("decrease must be between 0 and 1")
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self.limit = float(min(max(initial, minimum), maximum))
+        self.baseline = None
+        self.decreases = 0
+        self._last_decrease = float("-inf")
+
+    @property
+    def allowed(self):
+        """The current number of calls allowed in flight."""
+        return max(int(self.limit), self.minimum)
+
+    def on_success(self, latency, started):
+        """
+        Record a successful call.
+
+        Args:
+            latency (float): Duration of the call, in seconds.
+            started (float): ``time.monotonic()`` when the call started.
+        """
+        baseline = self.baseline
+        self.baseline = latency if baseline is None else baseline + (latency - baseline) * _LATENCY_SMOOTHING
+        if self.latency_tolerance and baseline and latency > baseline * self.latency_tolerance:
+            self.on_overload(started)
+            return
+        self.limit = min(self.maximum, self.limit + self.increase / self.limit)
+
+    def on_overload(self, started):
+        """
+        Record a rate limit, timeout or other sign that the provider is saturated.
+
+        Args:
+            started (float): ``time.monotonic()`` when the failing call started.
+        """
+        if started < self._last_decrease:
+            return
+        self.limit = max(self.minimum, self.limit * self.decrease)
+        self.decreases += 1
+        self._last_decrease = time.monotonic()
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter, honouring ``Retry-After`` on rate limits."""
+
+    def __init__(self, max_retries=DEFAULT_MAX_RETRIES, base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY,
+                 retry_on=is_retryable):
+        """
+        Args:
+            max_retries (int): Retries after the first attempt.
+            base_delay (float): Backoff ceiling of the first retry, in seconds.
+            max_delay (float): Largest delay between attempts, in seconds.
+            retry_on (callable): Predicate deciding whether an exception is retried.
+        """
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_on = retry_on
+
+    def should_retry(self, error, retries):
+        """Return True if a call that has been retried ``retries`` times and raised ``error`` should run again."""
+        return retries < self.max_retries and self.retry_on(error)
+
+    def delay(self, retries, error=None):
+        """
+        Return how long to wait before the next attempt.
+
+        Args:
+            retries (int): Retries made so far, including the upcoming one.
+            error (BaseException, optional): The exception that caused the retry.
+
+        Returns:
+            float: Delay in seconds.
+        """
+        requested = retry_after(error) if error is not None else None
+        if requested is not None:
+            return min(self.max_delay, requested)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (retries - 1)))
+
+
+class EvalScheduler:
+    """
+    Runs evaluation task calls at the highest rate the provider accepts.
+
+    Pass one to ``TracerEval(scheduler=...)`` to run cases concurrently. A
+    scheduler can be shared by several evaluations to keep them under one
+    provider's limits together. Synchronous task functions run on the
+    scheduler's own thread pool, sized to ``max_concurrency``; ``close`` shuts
+    it down.
+    """
+
+    def __init__(self, initial_concurrency=DEFAULT_INITIAL_CONCURRENCY, min_concurrency=1,
+                 max_concurrency=DEFAULT_MAX_CONCURRENCY, requests_per_second=None, tokens_per_minute=None,
+                 estimate_tokens=None, retry=None, latency_tolerance=DEFAULT_LATENCY_TOLERANCE):
+        """
+        Args:
+            initial_concurrency (int): Calls allowed in flight at the start.
+            min_concurrency (int): Lowest in-flight limit.
+            max_concurrency (int): Highest in-flight limit.
+            requests_per_second (float, optional): Cap on calls started per second.
+            tokens_per_minute (float, optional): Cap on tokens used per minute. Each call reserves
+                ``estimate_tokens(input)`` tokens, and the reservation is corrected from the usage
+                block of the response once it returns.
+            estimate_tokens (callable, optional): Estimates the tokens a call will use from its input.
+                Defaults to one token per four characters.
+            retry (RetryPolicy, optional): Retry policy. Defaults to ``RetryPolicy()``.
+            latency_tolerance (float, optional): Calls slower than this multiple of the recent average
+                latency reduce the in-flight limit. None adapts to errors only.
+        """
+        self.controller = AIMDController(initial=initial_concurrency, minimum=min_concurrency,
+                                         maximum=max_concurrency, latency_tolerance=latency_tolerance)
+        self.requests = TokenBucket(requests_per_second) if requests_per_second else None
+        self.tokens = TokenBucket(tokens_per_minute / 60, capacity=tokens_per_minute) if tokens_per_minute else None
+        self.estimate_tokens = estimate_tokens or (lambda value: max(1, len(str(value)) // 4))
+        self.retry = retry or RetryPolicy()
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.peak_concurrency = 0
+        self._paused_until = 0.0
+        self._waiters = collections.deque()
+        self._executor = None
+
+    @property
+    def max_concurrency(self):
+        """The highest in-flight limit; evaluations start this many workers."""
+        return self.controller.maximum
+
+    def close(self):
+        """Shut down the thread pool used for synchronous task functions, if one was started."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _run_sync(self, func, *args, **kwargs):
+        """Run a synchronous function on the scheduler's thread pool."""
+        if self._executor is None:
+            # The loop's default executor has at most 32 threads, fewer than the limit may allow.
+            self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.controller.maximum,
+                                                                   thread_name_prefix="agenttrace-eval")
+        return asyncio.get_running_loop().run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    def stats(self):
+        """
+        Return counters describing the scheduler's work so far.
+
+        Returns:
+            dict: Current limit and in-flight calls, completed and failed calls, retries,
+            rate-limit errors, limit decreases and the peak number of concurrent calls.
+        """
+        return {
+            "limit": self.controller.allowed,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "failed": self.failed,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "decreases": self.controller.decreases,
+            "peak_concurrency": self.peak_concurrency,
+        }
+
+    async def _acquire_slot(self):
+        while self.in_flight >= self.controller.allowed:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    self._wake()
+                else:
+                    self._waiters.remove(waiter)
+                raise
+        self.in_flight += 1
+        self.peak_concurrency = max(self.peak_concurrency, self.in_flight)
+
+    def _release_slot(self):
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        """Wake as many waiting calls as the current limit has room for."""
+        room = self.controller.allowed - self.in_flight
+        while room > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                room -= 1
+
+    async def call(self, func, *args, **kwargs):
+        """
+        Call ``func`` under the concurrency and rate limits, retrying transient failures.
+
+        Synchronous functions run on the scheduler's thread pool.
+
+        Args:
+            func (callable): The task function.
+            *args: Positional arguments for the call.
+            **kwargs: Keyword arguments for the call.
+
+        Returns:
+            tuple: ``(result, error, retries)``. ``error`` is the last exception if every attempt
+            failed (``result`` is then None), and ``retries`` the number of retries made.
+        """
+        retries = 0
+        estimate = self.estimate_tokens(args[0] if args else kwargs) if self.tokens is not None else 0
+        while True:
+            pause = self._paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+            await self._acquire_slot()
+            started = time.monotonic()
+            try:
+                if self.requests is not None:
+                    await self.requests.acquire()
+                if self.tokens is not None:
+                    await self.tokens.acquire(estimate)
+                started = time.monotonic()
+                if _is_async(func):
+                    result = await func(*args, **kwargs)
+                else:
+                    result = await self._run_sync(func, *args, **kwargs)
+            except Exception as error:
+                if is_retryable(error):
+                    self.controller.on_overload(started)
+                self._release_slot()
+                if is_rate_limit(error):
+                    self.rate_limited += 1
+                    requested = retry_after(error)
+                    if requested:
+                        self._paused_until = max(self._paused_until, time.monotonic() + requested)
+                if not self.retry.should_retry(error, retries):
+                    self.failed += 1
+                    return None, error, retries
+                retries += 1
+                self.retries += 1
+                await asyncio.sleep(self.retry.delay(retries, error))
+                continue
+            except BaseException:
+                self._release_slot()
+                raise
+            self.controller.on_success(time.monotonic() - started, started)
+            self._release_slot()
+            if self.tokens is not None:
+                usage = extract_llm_usage(result)
+                if usage and usage.get("total_tokens") is not None:
+                    self.tokens.adjust(usage["total_tokens"] - estimate)
+            self.completed += 1
+            return result, None, retries
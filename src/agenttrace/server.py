@@ -0,0 +1,449 @@
+"""
+Read-only HTTP API over a trace database, with a Server-Sent-Events live tail.
+
+Serves the same ``/api/traces`` and ``/api/evals`` routes as the Node server
+in ``frontend/server`` from a single asyncio process. JSON responses carry an
+ETag that changes only when the database does, list endpoints page with a
+rowid cursor instead of OFFSET, and ``/api/traces/stream`` pushes new rows
+as they are committed.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from .db import SESSION_COLUMNS
+
+_REASONS = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found",
+            405: "Method Not Allowed", 500: "Internal Server Error"}
+
+# Columns returned for each list endpoint, with the key used in the response.
+# Stored ``data`` objects are merged into each row, as the Node server does.
+_LISTS = {
+    "traces": (
+        [("id", "id"), ("session_id", "session_id"), ("timestamp", "timestamp"),
+         ("trace_type", "type"), ("function_name", "function")],
+        {"type": "trace_type", "function": "function_name", "session_id": "session_id"},
+    ),
+    "eval_results": (
+        [("id", "id"), ("name", "name"), ("timestamp", "timestamp"),
+         ("trial_count", "trial_count"), ("session_id", "session_id")],
+        {"eval_id": "id", "name": "name", "session_id": "session_id"},
+    ),
+    "eval_events": (
+        [("id", "id"), ("eval_id", "eval_id"), ("session_id", "session_id"), ("timestamp", "timestamp"),
+         ("event_type", "event_type"), ("name", "name")],
+        {"eval_id": "eval_id", "session_id": "session_id", "event_type": "event_type"},
+    ),
+}
+
+_DISTINCT = {
+    "/api/traces/sessions": ("sessions", "SELECT session_id FROM sessions ORDER BY last_timestamp DESC LIMIT ?", True),
+    "/api/traces/types": ("types", "SELECT DISTINCT trace_type FROM traces", False),
+    "/api/traces/functions": ("functions", "SELECT DISTINCT function_name FROM traces", False),
+    "/api/traces/tags": ("tags", "SELECT DISTINCT tag_values.value FROM traces, json_each(traces.tags) AS tag_values "
+                                 "WHERE traces.tags IS NOT NULL AND json_valid(traces.tags)", False),
+    "/api/evals/ids": ("eval_ids", "SELECT id FROM eval_results ORDER BY rowid DESC LIMIT ?", True),
+    "/api/evals/names": ("names", "SELECT DISTINCT name FROM eval_results", False),
+    "/api/evals/event-types": ("event_types", "SELECT DISTINCT event_type FROM eval_events", False),
+}
+
+# Queries for databases last written by versions without the sessions table.
+_DISTINCT_FALLBACKS = {
+    "/api/traces/sessions": "SELECT session_id FROM traces GROUP BY session_id ORDER BY MAX(rowid) DESC LIMIT ?",
+}
+
+_LIST_ROUTES = {
+    "/api/traces": ("traces", "traces", 100),
+    "/api/evals/results": ("eval_results", "results", 10),
+    "/api/evals/events": ("eval_events", "events", 100),
+}
+
+
+def _encode_row(fields, tags, data):
+    """
+    Encode a row as JSON, splicing in the stored tags and data JSON without decoding them.
+
+    Later keys win when a JSON object repeats a key, so fields from ``data``
+    override the fixed columns just like ``Object.assign`` in the Node server.
+    """
+    head = json.dumps(fields)[:-1]
+    if tags is not None:
+        head += f', "tags": {tags if tags.startswith("[") and tags.endswith("]") else "null"}'
+    data = (data or "").strip()
+    if len(data) > 2 and data.startswith("{") and data.endswith("}") and data[1:-1].strip():
+        return f"{head}, {data[1:]}"
+    return head + "}"
+
+
+class TraceServer:
+    """
+    Asyncio HTTP server for the trace database.
+
+    Queries run on a small thread pool, each thread holding its own read-only
+    SQLite connection, so slow queries do not block the event loop or the
+    live-tail streams.
+    """
+
+    def __init__(self, db_path, host="127.0.0.1", port=3033, poll_interval=0.25, heartbeat=15.0,
+                 max_limit=1000, workers=4):
+        """
+        Args:
+            db_path (str): Path to the SQLite trace database.
+            host (str): Interface to bind.
+            port (int): Port to listen on. Use 0 to pick a free port.
+            poll_interval (float): Seconds between checks for new commits.
+            heartbeat (float): Seconds between keep-alive comments on idle streams.
+            max_limit (int): Largest page size a client may request.
+            workers (int): Number of query threads.
+        """
+        self.db_path = db_path
+        self.host = host
+        self.port = port
+        self.poll_interval = poll_interval
+        self.heartbeat = heartbeat
+        self.max_limit = max_limit
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="agenttrace-serve")
+        self._local = threading.local()
+        self._nonce = f"{os.getpid()}-{time.time()}"
+        self._generation = 0
+        self._data_version = None
+        self._watch_conn = None
+        self._changed = None
+        self._server = None
+        self._poller = None
+        self._connections = set()
+
+    def _connect(self):
+        conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
+        conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    def _conn(self):
+        """Return the calling thread's read-only connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def _check_for_writes(self):
+        """Bump the write generation if another connection committed since the last check."""
+        version = self._watch_conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._data_version:
+            self._data_version = version
+            self._generation += 1
+            changed, self._changed = self._changed, asyncio.Event()
+            if changed is not None:
+                changed.set()
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                self._check_for_writes()
+            except sqlite3.Error as e:
+                logging.error(f"Error polling trace database: {str(e)}")
+
+    async def start(self):
+        """Open the database and start listening."""
+        self._watch_conn = self._connect()
+        self._check_for_writes()
+        self._poller = asyncio.ensure_future(self._poll())
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        """Start the server if needed and serve until cancelled."""
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        """Stop listening and release the database connections."""
+        if self._poller is not None:
+            self._poller.cancel()
+        if self._server is not None:
+            self._server.close()
+        # Live-tail streams never finish on their own.
+        for task in list(self._connections):
+            task.cancel()
+        if self._connections:
+            await asyncio.wait(list(self._connections), timeout=5)
+        if self._server is not None:
+            await self._server.wait_closed()
+        self._executor.shutdown(wait=False)
+        if self._watch_conn is not None:
+            self._watch_conn.close()
+
+    async def _query(self, fn, *args):
+        return await asyncio.get_event_loop().run_in_executor(self._executor, fn, *args)
+
+    def _list_rows(self, table, filters, tag, cursor, limit):
+        """Fetch one page of a list endpoint, newest first, as encoded JSON rows."""
+        columns, _ = _LISTS[table]
+        select = ["rowid"] + [column for column, _ in columns]
+        if table == "traces":
+            select.append("tags")
+        select.append("data")
+        conditions = [f"{column} = ?" for column in filters]
+        params = list(filters.values())
+        if tag:
+            conditions.append("tags LIKE ?")
+            params.append(f'%"{tag}"%')
+        if cursor is not None:
+            conditions.append("rowid < ?")
+            params.append(cursor)
+        query = f"SELECT {', '.join(select)} FROM {table}"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY rowid DESC LIMIT ?"
+        params.append(limit)
+        try:
+            rows = self._conn().execute(query, params).fetchall()
+        except sqlite3.OperationalError as e:
+            if "no such table" in str(e):
+                return [], None
+            raise
+        encoded = []
+        for row in rows:
+            fields = {key: value for (_, key), value in zip(columns, row[1:])}
+            tags = (row[-2] or "null") if table == "traces" else None
+            encoded.append(_encode_row(fields, tags, row[-1]))
+        next_cursor = rows[-1][0] if len(rows) == limit else None
+        return encoded, next_cursor
+
+    def _tail_rows(self, filters, tag, after, limit):
+        """Fetch traces committed after a rowid, oldest first."""
+        conditions = ["rowid > ?"] + [f"{column} = ?" for column in filters]
+        params = [after] + list(filters.values())
+        if tag:
+            conditions.append("tags LIKE ?")
+            params.append(f'%"{tag}"%')
+        query = (f"SELECT rowid, id, session_id, timestamp, trace_type, function_name, tags, data FROM traces "
+                 f"WHERE {' AND '.join(conditions)} ORDER BY rowid LIMIT ?")
+        rows = self._conn().execute(query, params + [limit]).fetchall()
+        columns, _ = _LISTS["traces"]
+        return [(row[0], _encode_row({key: value for (_, key), value in zip(columns, row[1:6])}, row[6] or "null",
+                                     row[7]))
+                for row in rows]
+
+    def _distinct(self, query, limit, fallback=None):
+        try:
+            rows = self._conn().execute(query, (limit,) if "?" in query else ()).fetchall()
+        except sqlite3.OperationalError as e:
+            if "no such table" in str(e):
+                return self._distinct(fallback, limit) if fallback else []
+            raise
+        return [row[0] for row in rows]
+
+    def _session_summaries(self, limit):
+        try:
+            rows = self._conn().execute(
+                f"SELECT {', '.join(SESSION_COLUMNS)} FROM sessions ORDER BY last_timestamp DESC LIMIT ?", (limit,)
+            ).fetchall()
+        except sqlite3.OperationalError as e:
+            if "no such table" in str(e):
+                return []
+            raise
+        summaries = []
+        for row in rows:
+            summary = dict(zip(SESSION_COLUMNS, row))
+            summary["tags"] = json.loads(summary["tags"] or "[]")
+            summary["eval_ids"] = json.loads(summary["eval_ids"] or "[]")
+            summaries.append(summary)
+        return summaries
+
+    def _max_rowid(self):
+        return self._conn().execute("SELECT COALESCE(MAX(rowid), 0) FROM traces").fetchone()[0]
+
+    def _limit(self, params, default):
+        try:
+            limit = int(params.get("limit") or default)
+        except ValueError:
+            raise ValueError("limit must be an integer")
+        return max(1, min(limit, self.max_limit))
+
+    async def _route(self, path, params):
+        """Run the query for a JSON endpoint and return the response body."""
+        if path == "/health":
+            return b'{"status": "ok"}'
+        if path == "/api/db/path":
+            return json.dumps({"path": self.db_path}).encode("utf-8")
+        if path in _LIST_ROUTES:
+            table, key, default_limit = _LIST_ROUTES[path]
+            _, filter_columns = _LISTS[table]
+            filters = {column: params[name] for name, column in filter_columns.items() if params.get(name)}
+            cursor = params.get("cursor")
+            if cursor is not None:
+                try:
+                    cursor = int(cursor)
+                except ValueError:
+                    raise ValueError("cursor must be an integer")
+            limit = self._limit(params, default_limit)
+            rows, next_cursor = await self._query(self._list_rows, table, filters, params.get("tag"), cursor, limit)
+            return (f'{{"success": true, "count": {len(rows)}, "next_cursor": {json.dumps(next_cursor)}, '
+                    f'"{key}": [{", ".join(rows)}]}}').encode("utf-8")
+        if path in _DISTINCT:
+            key, query, limited = _DISTINCT[path]
+            values = await self._query(self._distinct, query, self._limit(params, 100) if limited else None,
+                                       _DISTINCT_FALLBACKS.get(path))
+            return json.dumps({"success": True, "count": len(values), key: values}).encode("utf-8")
+        if path == "/api/traces/sessions/summary":
+            sessions = await self._query(self._session_summaries, self._limit(params, 100))
+            return json.dumps({"success": True, "count": len(sessions), "sessions": sessions}).encode("utf-8")
+        return None
+
+    async def _handle(self, reader, writer):
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, target, headers = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                url = urlsplit(target)
+                params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+                if method not in ("GET", "HEAD"):
+                    self._respond(writer, 405, b'{"success": false, "error": "This API is read-only"}', keep_alive)
+                elif url.path == "/api/traces/stream":
+                    await self._stream(writer, params, headers)
+                    break
+                else:
+                    await self._respond_json(writer, method, url.path, target, params, headers, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    async def _read_request(self, reader):
+        """Read a request line and headers, or return None at end of stream."""
+        line = await reader.readline()
+        if not line.strip():
+            return None
+        method, target, _ = line.decode("latin-1").split(" ", 2)
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+            if len(headers) > 100:
+                raise ValueError("Too many headers")
+        length = int(headers.get("content-length") or 0)
+        if length:
+            await reader.readexactly(length)
+        return method, target, headers
+
+    def _respond(self, writer, status, body, keep_alive, extra_headers=(), head=False):
+        lines = [
+            f"HTTP/1.1 {status} {_REASONS[status]}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(body)}",
+            "Access-Control-Allow-Origin: *",
+            "Access-Control-Expose-Headers: ETag",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        lines.extend(extra_headers)
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        if not head and status != 304:
+            writer.write(body)
+
+    async def _respond_json(self, writer, method, path, target, params, headers, keep_alive):
+        self._check_for_writes()
+        etag = f'W/"{hashlib.sha1(f"{self._nonce}:{self._generation}:{target}".encode("utf-8")).hexdigest()}"'
+        cache_headers = [f"ETag: {etag}", "Cache-Control: no-cache"]
+        if_none_match = headers.get("if-none-match")
+        if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]):
+            self._respond(writer, 304, b"", keep_alive, cache_headers)
+            return
+        try:
+            body = await self._route(path, params)
+        except ValueError as e:
+            self._respond(writer, 400, json.dumps({"success": False, "error": str(e)}).encode("utf-8"), keep_alive)
+            return
+        except sqlite3.Error as e:
+            logging.error(f"Error querying trace database: {str(e)}")
+            self._respond(writer, 500, b'{"success": false, "error": "Database query failed"}', keep_alive)
+            return
+        if body is None:
+            self._respond(writer, 404, b'{"success": false, "error": "Not found"}', keep_alive)
+            return
+        self._respond(writer, 200, body, keep_alive, cache_headers, head=method == "HEAD")
+
+    async def _stream(self, writer, params, headers):
+        """
+        Push traces committed after the client's cursor as Server-Sent Events.
+
+        The cursor is the ``Last-Event-ID`` header (sent automatically by
+        ``EventSource`` on reconnect), the ``after`` parameter, or otherwise the
+        newest row at connect time. Each event's ``id`` is the row's rowid.
+        """
+        _, filter_columns = _LISTS["traces"]
+        filters = {column: params[name] for name, column in filter_columns.items() if params.get(name)}
+        tag = params.get("tag")
+        after = headers.get("last-event-id") or params.get("after")
+        try:
+            after = int(after) if after is not None else await self._query(self._max_rowid)
+        except ValueError:
+            self._respond(writer, 400, b'{"success": false, "error": "after must be an integer"}', False)
+            return
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+                     b"Access-Control-Allow-Origin: *\r\nConnection: close\r\n\r\n")
+        writer.write(b"retry: 2000\n\n")
+        await writer.drain()
+        while True:
+            changed = self._changed
+            rows = await self._query(self._tail_rows, filters, tag, after, 500)
+            if rows:
+                writer.write("".join(f"id: {rowid}\nevent: trace\ndata: {row}\n\n" for rowid, row in rows)
+                             .encode("utf-8"))
+                after = rows[-1][0]
+                await writer.drain()
+                if len(rows) == 500:
+                    continue
+            try:
+                await asyncio.wait_for(changed.wait(), self.heartbeat)
+            except asyncio.TimeoutError:
+                writer.write(b": keep-alive\n\n")
+                await writer.drain()
+
+
+def serve(db_path, host="127.0.0.1", port=3033, **options):
+    """
+    Run the read API until interrupted.
+
+    Args:
+        db_path (str): Path to the SQLite trace database.
+        host (str): Interface to bind.
+        port (int): Port to listen on.
+        **options: Further ``TraceServer`` options.
+    """
+    server = TraceServer(db_path, host, port, **options)
+
+    async def main():
+        await server.start()
+        print(f"Serving {db_path} at http://{host}:{server.port} (live tail at /api/traces/stream)")
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
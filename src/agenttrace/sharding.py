@@ -0,0 +1,246 @@
+"""
+Splitting one evaluation across worker processes and merging the partial results.
+
+Every case is assigned to a shard by a stable key, so any number of workers,
+on one machine or several, can each run ``TracerEval.run_shard`` without
+coordinating. Each shard writes a JSON Lines partial file; ``merge_partials``
+checks that the shards cover the whole dataset exactly once and returns the
+results in the order a single-process run produces them.
+"""
+
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+PARTIAL_FORMAT = "agenttrace-eval-shard"
+PARTIAL_VERSION = 1
+
+
+def parse_shard(value):
+    """
+    Parse a ``"i/n"`` shard specification.
+
+    Args:
+        value (str): Zero-based shard index and shard count, e.g. ``"0/4"``.
+
+    Returns:
+        tuple: ``(index, count)``.
+
+    Raises:
+        ValueError: If the value is malformed or the index is out of range.
+    """
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except (AttributeError, ValueError):
+        raise ValueError(f"Invalid shard {value!r}; expected INDEX/COUNT, e.g. 0/4") from None
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard {value!r}; INDEX must be between 0 and COUNT - 1")
+    return index, count
+
+
+def case_key(case):
+    """
+    Return the stable key of a test case: its ``"id"`` if it has one, else a hash of its contents.
+
+    Args:
+        case (dict): The test case.
+
+    Returns:
+        str: The key.
+    """
+    if isinstance(case, dict) and case.get("id") is not None:
+        return str(case["id"])
+    payload = json.dumps(case, sort_keys=True, default=repr)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def shard_of(key, count):
+    """
+    Assign a case key to one of ``count`` shards.
+
+    Args:
+        key (str): The case key.
+        count (int): Number of shards.
+
+    Returns:
+        int: The shard index.
+    """
+    return int.from_bytes(hashlib.sha256(key.encode("utf-8")).digest()[:8], "big") % count
+
+
+def dataset_digest(keys):
+    """Fingerprint the ordered case keys, so shards of different datasets are not merged."""
+    return hashlib.sha256("\n".join(keys).encode("utf-8")).hexdigest()[:16]
+
+
+def partial_path(directory, name, index, count):
+    """
+    Return the conventional partial file path for a shard.
+
+    Args:
+        directory (str): Directory holding the partial files.
+        name (str): Evaluation name.
+        index (int): Shard index.
+        count (int): Number of shards.
+
+    Returns:
+        str: The path.
+    """
+    safe_name = "".join(c if c.isalnum() or c in "-_." else "_" for c in name)
+    return os.path.join(directory, f"{safe_name}.shard-{index:04d}-of-{count:04d}.jsonl")
+
+
+class PartialWriter:
+    """
+    Writes a shard's results to a partial file.
+
+    The file is written under a temporary name and renamed when the shard
+    finishes, so a crashed worker never leaves a partial that looks complete.
+    """
+
+    def __init__(self, path, header):
+        """
+        Args:
+            path (str): Final path of the partial file.
+            header (dict): Evaluation and shard metadata written as the first line.
+        """
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, self._tmp_path = tempfile.mkstemp(prefix=".shard-", suffix=".tmp", dir=directory)
+        self._file = os.fdopen(fd, "w", encoding="utf-8")
+        self._write({"format": PARTIAL_FORMAT, "version": PARTIAL_VERSION, **header})
+
+    def _write(self, obj):
+        self._file.write(json.dumps(obj) + "\n")
+
+    def add(self, trial, case_index, result):
+        """
+        Append one case result.
+
+        Args:
+            trial (int): Trial number.
+            case_index (int): Position of the case in the dataset.
+            result (dict): The sanitized result entry.
+        """
+        self._write({"trial": trial, "case": case_index, "result": result})
+
+    def commit(self):
+        """Finish the file and move it into place."""
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        """Discard the file."""
+        self._file.close()
+        try:
+            os.unlink(self._tmp_path)
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+
+
+def read_partial(path):
+    """
+    Read a partial file.
+
+    Args:
+        path (str): Path of the partial file.
+
+    Returns:
+        tuple: The header dict and a list of ``(trial, case_index, result)`` tuples.
+
+    Raises:
+        ValueError: If the file is not a shard partial file.
+    """
+    with open(path, encoding="utf-8") as f:
+        header = json.loads(f.readline() or "null")
+        if not isinstance(header, dict) or header.get("format") != PARTIAL_FORMAT:
+            raise ValueError(f"{path} is not an evaluation shard file")
+        if header.get("version") != PARTIAL_VERSION:
+            raise ValueError(f"{path} has unsupported shard format version {header.get('version')}")
+        entries = []
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                entries.append((entry["trial"], entry["case"], entry["result"]))
+    return header, entries
+
+
+def merge_partials(paths):
+    """
+    Combine the partial files of every shard of one evaluation.
+
+    Args:
+        paths (list): Partial file paths, one per shard, in any order.
+
+    Returns:
+        tuple: The header of shard 0 and the result entries ordered by trial, then case.
+
+    Raises:
+        ValueError: If shards are missing or duplicated, come from different evaluations
+            or datasets, or do not cover every case exactly once.
+    """
+    if not paths:
+        raise ValueError("No shard files to merge")
+    headers = {}
+    entries = []
+    for path in paths:
+        header, shard_entries = read_partial(path)
+        if header["shard"] in headers:
+            raise ValueError(f"Shard {header['shard']} appears more than once ({path})")
+        headers[header["shard"]] = header
+        entries.extend(shard_entries)
+
+    first = headers[min(headers)]
+    for header in headers.values():
+        for field in ("name", "shards", "trial_count", "test_case_count", "dataset"):
+            if header[field] != first[field]:
+                raise ValueError(f"Shard {header['shard']} has {field}={header[field]!r}, "
+                                 f"but shard {first['shard']} has {first[field]!r}")
+    missing = sorted(set(range(first["shards"])) - set(headers))
+    if missing:
+        raise ValueError(f"Missing shard(s) {', '.join(map(str, missing))} of {first['shards']}")
+
+    entries.sort(key=lambda entry: (entry[0], entry[1]))
+    expected = [(trial, case) for trial in range(first["trial_count"]) for case in range(first["test_case_count"])]
+    if [(trial, case) for trial, case, _ in entries] != expected:
+        raise ValueError("Shard results do not cover every case exactly once")
+    return first, [result for _, _, result in entries]
+
+
+def launch_workers(target, workers, partial_dir, session_id, extra_args=(), env=None):
+    """
+    Run every shard of an evaluation in local worker processes.
+
+    Each worker is ``python -m agenttrace.cli eval TARGET --shard i/N``, so the
+    target is imported, not pickled, and workers run fully in parallel.
+
+    Args:
+        target (str): ``module:attribute`` of the TracerEval, or of a function returning one.
+        workers (int): Number of worker processes (and shards).
+        partial_dir (str): Directory the workers write their partial files to.
+        session_id (str): Session ID shared by every shard.
+        extra_args (iterable): Further arguments for each worker command.
+        env (dict, optional): Environment for the workers. Defaults to this process's.
+
+    Returns:
+        list: Exit codes of the workers, by shard.
+    """
+    processes = []
+    for index in range(workers):
+        command = [sys.executable, "-m", "agenttrace.cli", "eval", target, "--shard", f"{index}/{workers}",
+                   "--partial-dir", partial_dir, "--session-id", session_id, *extra_args]
+        processes.append(subprocess.Popen(command, env=env))
+    return [process.wait() for process in processes]
@@ -0,0 +1,232 @@
+"""
+In-flight span handles for recording events inside a traced call.
+"""
+
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_MAX_EVENTS = 128
+
+_current_span = contextvars.ContextVar("agenttrace_current_span", default=None)
+
+# Span of the traced coroutine whose step is executing, by thread. Read from
+# other threads, which cannot see a task's context variables.
+_running_steps = {}
+
+
+class Span:
+    """
+    Handle for a traced call that is still running.
+
+    Events are kept as ``(offset_ms, name, attributes)`` tuples and written
+    with the span's END trace, so any number of intermediate steps costs a
+    single row. Events past ``max_events`` are counted but not kept.
+
+    Each span has its own lock, since the loop monitor's watchdog thread
+    updates events while the traced call keeps running on the loop thread.
+    """
+
+    __slots__ = ("name", "session_id", "max_events", "events", "dropped_events", "_start", "_lock")
+
+    is_recording = True
+
+    def __init__(self, name, session_id, max_events=DEFAULT_MAX_EVENTS, start=None):
+        """
+        Args:
+            name (str): Name of the traced function.
+            session_id (str): Session the span belongs to.
+            max_events (int): Maximum number of events kept on the span.
+            start (float, optional): ``time.perf_counter()`` value at which the call started.
+        """
+        self.name = name
+        self.session_id = session_id
+        self.max_events = max_events
+        self.events = []
+        self.dropped_events = 0
+        self._start = time.perf_counter() if start is None else start
+        self._lock = threading.Lock()
+
+    def add_event(self, name, **attributes):
+        """
+        Record a point-in-time event, such as a tool call, retry or partial output.
+
+        Args:
+            name (str): Event name.
+            **attributes: JSON-serializable details of the event.
+
+        Returns:
+            dict: The event's attributes, which can still be updated until the span ends
+            (from another thread, with ``update_event``), or None if the event was not kept.
+        """
+        with self._lock:
+            if len(self.events) >= self.max_events:
+                self.dropped_events += 1
+                return None
+            self.events.append(((time.perf_counter() - self._start) * 1000, name, attributes or None))
+        return attributes
+
+    def update_event(self, attributes, **updates):
+        """
+        Replace the attributes of an event recorded with ``add_event``.
+
+        The event gets a new dict rather than having ``attributes`` changed in
+        place, so it can be called from another thread while the events are
+        being serialized.
+
+        Args:
+            attributes (dict): The attributes returned by ``add_event`` or by a previous update.
+            **updates: Attributes to set.
+
+        Returns:
+            dict: The event's new attributes, or None if the event is no longer on the span.
+        """
+        with self._lock:
+            for index in range(len(self.events) - 1, -1, -1):
+                offset, name, attrs = self.events[index]
+                if attrs is attributes:
+                    attrs = {**attrs, **updates}
+                    self.events[index] = (offset, name, attrs)
+                    return attrs
+        return None
+
+    @contextmanager
+    def measure(self, name, **attributes):
+        """
+        Record an event for a block of code, with its duration and any exception.
+
+        Example:
+            with span.measure("tool:search", query=query):
+                results = search(query)
+
+        Args:
+            name (str): Event name.
+            **attributes: JSON-serializable details of the event.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            attributes["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            attributes["duration_ms"] = (time.perf_counter() - start) * 1000
+            self.add_event(name, **attributes)
+
+    def serialize_events(self, sanitize):
+        """
+        Encode the events for storage.
+
+        Args:
+            sanitize (callable): Converts attribute values into JSON-serializable data.
+
+        Returns:
+            list: ``[offset_ms, name, attributes]`` triples.
+        """
+        with self._lock:
+            events = list(self.events)
+        return [[round(offset, 3), name, sanitize(attrs) if attrs else None] for offset, name, attrs in events]
+
+
+class _NonRecordingSpan:
+    """Stand-in returned by ``current_span()`` outside a traced call; events are discarded."""
+
+    __slots__ = ()
+
+    is_recording = False
+    name = None
+    session_id = None
+    events = ()
+    dropped_events = 0
+
+    def add_event(self, name, **attributes):
+        return None
+
+    def update_event(self, attributes, **updates):
+        return None
+
+    @contextmanager
+    def measure(self, name, **attributes):
+        yield
+
+
+NON_RECORDING_SPAN = _NonRecordingSpan()
+
+
+def current_span():
+    """
+    Return the span of the innermost traced call running in this thread or task.
+
+    Returns:
+        Span: The active span, or a non-recording span whose methods do nothing
+        if no traced call is running.
+    """
+    span = _current_span.get()
+    return NON_RECORDING_SPAN if span is None else span
+
+
+def running_span(thread_id):
+    """
+    Return the span of the traced coroutine currently executing a step on a thread.
+
+    Args:
+        thread_id (int): ``threading.get_ident()`` of the thread running the event loop.
+
+    Returns:
+        Span: The span, or None if no traced coroutine is executing there.
+    """
+    return _running_steps.get(thread_id)
+
+
+def enter_step(span):
+    """
+    Mark ``span`` as executing on the current thread, for ``running_span``.
+
+    Args:
+        span (Span): Span of the coroutine about to run a step.
+
+    Returns:
+        Span: The span that was executing before, to pass to ``exit_step``.
+    """
+    thread_id = threading.get_ident()
+    previous = _running_steps.get(thread_id)
+    _running_steps[thread_id] = span
+    return previous
+
+
+def exit_step(previous):
+    """
+    Restore the executing span after a coroutine step.
+
+    Args:
+        previous (Span): The value returned by ``enter_step``.
+    """
+    thread_id = threading.get_ident()
+    if previous is None:
+        _running_steps.pop(thread_id, None)
+    else:
+        _running_steps[thread_id] = previous
+
+
+def activate(span):
+    """
+    Make ``span`` the current span.
+
+    Args:
+        span (Span): The span to activate.
+
+    Returns:
+        contextvars.Token: Pass to ``deactivate`` to restore the previous span.
+    """
+    return _current_span.set(span)
+
+
+def deactivate(token):
+    """
+    Restore the span that was current before ``activate``.
+
+    Args:
+        token (contextvars.Token): The value returned by ``activate``.
+    """
+    _current_span.reset(token)
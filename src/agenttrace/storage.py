@@ -0,0 +1,540 @@
+"""
+Storage backends that persist traces and evaluation data for ``TraceManager`` and ``TracerEval``.
+
+Rows are tuples in ``db.TABLE_COLUMNS`` order. Queries return the same
+tuples, minus the promoted metric columns for traces, newest first.
+"""
+
+import json
+import logging
+import os
+import threading
+
+from .db import SESSION_COLUMNS, TABLE_COLUMNS, TRACE_ERROR_SQL, create_eval_tables, create_trace_tables
+
+# Databases whose tables have already been created by this process, keyed by
+# absolute path and table group, so each schema check runs once per connection.
+_schemas_ready = set()
+
+# Trace columns returned by ``query_traces``.
+TRACE_QUERY_COLUMNS = TABLE_COLUMNS["traces"][:7]
+
+_ID, _SESSION_ID, _TIMESTAMP, _TRACE_TYPE, _FUNCTION_NAME, _TAGS = range(6)
+ARGS_HASH = TABLE_COLUMNS["traces"].index("args_hash")
+REPLAY_RESULT = TABLE_COLUMNS["traces"].index("replay_result")
+# Trace columns returned by ``find_by_args_hash``.
+REPLAY_QUERY_COLUMNS = TRACE_QUERY_COLUMNS + ["replay_result"]
+_DURATION_MS = TABLE_COLUMNS["traces"].index("duration_ms")
+
+
+class StorageBackend:
+    """
+    Base class for trace storage.
+
+    Writes replace any existing row with the same ID, so a trace written as
+    START and later as COMPLETE is stored once. Backends are opened on first
+    use by ``TraceManager`` and may raise from any method; callers log the error.
+    """
+
+    def open(self):
+        """Create or connect to the underlying store."""
+
+    def close(self):
+        """Release the underlying store."""
+
+    def data_version(self):
+        """
+        Return a value that changes when another process writes to the store.
+
+        Returns:
+            The version, or None if the backend cannot detect outside writes.
+        """
+        return None
+
+    def write_traces(self, rows):
+        """
+        Atomically write a batch of trace rows.
+
+        Args:
+            rows (list): Rows in ``TABLE_COLUMNS["traces"]`` order.
+        """
+        raise NotImplementedError
+
+    def query_traces(self, limit=100, trace_type=None, tag=None, function_name=None, session_id=None,
+                     since=None, until=None):
+        """
+        Return the newest traces matching every given filter.
+
+        Args:
+            limit (int): Maximum number of rows.
+            trace_type (str, optional): Filter by trace type.
+            tag (str, optional): Filter by tag.
+            function_name (str, optional): Filter by function name.
+            session_id (str, optional): Filter by session identifier.
+            since (str, optional): Only traces with an ISO timestamp at or after this value.
+            until (str, optional): Only traces with an ISO timestamp before this value.
+
+        Returns:
+            list: Rows in ``TRACE_QUERY_COLUMNS`` order, newest first.
+        """
+        raise NotImplementedError
+
+    def find_by_args_hash(self, function_name, args_hash):
+        """
+        Return the newest trace of a function recorded with the given arguments hash.
+
+        Args:
+            function_name (str): Name of the traced function.
+            args_hash (str): Hash of the call's bound arguments.
+
+        Returns:
+            tuple: Row in ``REPLAY_QUERY_COLUMNS`` order, or None if there is none.
+        """
+        raise NotImplementedError
+
+    def query_sessions(self, limit=100, since=None, until=None):
+        """
+        Return summaries of the most recently active sessions.
+
+        Args:
+            limit (int): Maximum number of sessions.
+            since (str, optional): Only sessions last active at or after this ISO timestamp.
+            until (str, optional): Only sessions last active before this ISO timestamp.
+
+        Returns:
+            list: Rows in ``db.SESSION_COLUMNS`` order, most recently active first, with
+            tags and eval IDs as JSON arrays.
+        """
+        raise NotImplementedError
+
+    def write_eval_event(self, row):
+        """
+        Write one evaluation event. Unlike traces, events are never replaced.
+
+        Args:
+            row (tuple): Row in ``TABLE_COLUMNS["eval_events"]`` order.
+
+        Raises:
+            Exception: If an event with the same ID has already been written.
+        """
+        raise NotImplementedError
+
+    def write_eval_result(self, row):
+        """
+        Write or replace one evaluation result.
+
+        Args:
+            row (tuple): Row in ``TABLE_COLUMNS["eval_results"]`` order.
+        """
+        raise NotImplementedError
+
+    def query_eval_results(self, eval_id=None, name=None, session_id=None, limit=10):
+        """
+        Return the newest evaluation results matching every given filter.
+
+        Returns:
+            list: Rows in ``TABLE_COLUMNS["eval_results"]`` order, newest first.
+        """
+        raise NotImplementedError
+
+    def query_eval_events(self, eval_id=None, session_id=None, event_type=None, limit=100):
+        """
+        Return the newest evaluation events matching every given filter.
+
+        Returns:
+            list: Rows in ``TABLE_COLUMNS["eval_events"]`` order, newest first.
+        """
+        raise NotImplementedError
+
+
+def trace_matches(row, trace_type=None, tag=None, function_name=None, session_id=None, since=None, until=None):
+    """
+    Apply ``query_traces`` filters to a trace row, with the same semantics as the SQLite backend.
+
+    Args:
+        row (tuple): Row in ``TABLE_COLUMNS["traces"]`` order.
+
+    Returns:
+        bool: Whether the row matches.
+    """
+    if trace_type and row[_TRACE_TYPE] != trace_type:
+        return False
+    if function_name and row[_FUNCTION_NAME] != function_name:
+        return False
+    if session_id and row[_SESSION_ID] != session_id:
+        return False
+    if since and (row[_TIMESTAMP] or "") < since:
+        return False
+    if until and (row[_TIMESTAMP] or "") >= until:
+        return False
+    if tag and f'"{tag}"' not in (row[_TAGS] or ""):
+        return False
+    return True
+
+
+def trace_is_error(data):
+    """Return True if a trace's ``data`` JSON records an error."""
+    if not data or '"error"' not in data:
+        return False
+    try:
+        return json.loads(data).get("error") is not None
+    except (ValueError, AttributeError):
+        return False
+
+
+def _session(sessions, session_id):
+    summary = sessions.get(session_id)
+    if summary is None:
+        summary = sessions[session_id] = {
+            "session_id": session_id, "first_timestamp": None, "last_timestamp": None, "span_count": 0,
+            "error_count": 0, "total_duration_ms": 0.0, "tags": set(), "eval_ids": [],
+        }
+    return summary
+
+
+def _seen_at(summary, timestamp):
+    if timestamp:
+        if summary["first_timestamp"] is None or timestamp < summary["first_timestamp"]:
+            summary["first_timestamp"] = timestamp
+        if summary["last_timestamp"] is None or timestamp > summary["last_timestamp"]:
+            summary["last_timestamp"] = timestamp
+
+
+def add_trace_to_sessions(sessions, row, sign=1):
+    """
+    Add (or, with ``sign=-1``, remove) a trace row's contribution to its session's summary.
+
+    Removing leaves the timestamps and tags alone, since a rewritten trace keeps them.
+
+    Args:
+        sessions (dict): Summaries by session ID, updated in place.
+        row (tuple): Row in ``TABLE_COLUMNS["traces"]`` order.
+        sign (int): 1 to add, -1 to remove.
+    """
+    if row[_SESSION_ID] is None:
+        return
+    summary = _session(sessions, row[_SESSION_ID])
+    summary["span_count"] += sign
+    summary["error_count"] += sign * trace_is_error(row[6])
+    summary["total_duration_ms"] += sign * ((row[_DURATION_MS] if len(row) > _DURATION_MS else None) or 0)
+    if sign > 0:
+        _seen_at(summary, row[_TIMESTAMP])
+        try:
+            tags = json.loads(row[_TAGS]) if row[_TAGS] else ()
+        except ValueError:
+            tags = ()
+        summary["tags"].update(tag for tag in (tags if isinstance(tags, list) else ()) if isinstance(tag, str))
+
+
+def add_eval_to_sessions(sessions, row):
+    """
+    Link an evaluation result row to its session's summary.
+
+    Args:
+        sessions (dict): Summaries by session ID, updated in place.
+        row (tuple): Row in ``TABLE_COLUMNS["eval_results"]`` order.
+    """
+    if row[4] is None:
+        return
+    summary = _session(sessions, row[4])
+    _seen_at(summary, row[2])
+    if row[0] not in summary["eval_ids"]:
+        summary["eval_ids"].append(row[0])
+
+
+def session_row(summary):
+    """Encode a session summary as a row in ``db.SESSION_COLUMNS`` order."""
+    return (summary["session_id"], summary["first_timestamp"], summary["last_timestamp"], summary["span_count"],
+            summary["error_count"], summary["total_duration_ms"],
+            json.dumps(sorted(summary["tags"])) if summary["tags"] else "[]",
+            json.dumps(summary["eval_ids"]) if summary["eval_ids"] else "[]")
+
+
+def summarize_sessions(trace_rows, eval_rows, limit=100, since=None, until=None):
+    """
+    Build ``query_sessions`` results by aggregating stored rows, for backends without a sessions table.
+
+    Args:
+        trace_rows (iterable): The current version of every trace row.
+        eval_rows (iterable): The current version of every evaluation result row.
+
+    Returns:
+        list: Rows in ``db.SESSION_COLUMNS`` order, most recently active first.
+    """
+    sessions = {}
+    for row in trace_rows:
+        add_trace_to_sessions(sessions, row)
+    for row in eval_rows:
+        add_eval_to_sessions(sessions, row)
+    rows = [session_row(summary) for summary in sessions.values()
+            if (not since or (summary["last_timestamp"] or "") >= since)
+            and (not until or (summary["last_timestamp"] or "") < until)]
+    return newest(rows, limit, 2)
+
+
+def newest(rows, limit, timestamp_index):
+    """Sort rows newest first by their timestamp column and keep ``limit`` of them."""
+    rows = sorted(rows, key=lambda row: row[timestamp_index] or "", reverse=True)
+    return rows[:limit] if limit is not None and limit >= 0 else rows
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    The default backend: a single SQLite database file.
+
+    The database also serves ``agenttrace serve``, the exporters in
+    ``agenttrace.export`` and ``TraceManager.get_token_usage``.
+    """
+
+    def __init__(self, db_path="traces2.db"):
+        """
+        Args:
+            db_path (str): Path to the SQLite database file.
+        """
+        self.db_path = db_path
+        self.conn = None
+        self.cursor = None
+        self._lock = threading.RLock()
+
+    def __str__(self):
+        return f"SQLite at {self.db_path}"
+
+    def open(self):
+        import sqlite3
+
+        # The file may have been deleted or recreated since the tables were last checked.
+        path = os.path.abspath(self.db_path)
+        _schemas_ready.difference_update({(path, "traces"), (path, "eval")})
+        # Flushes and queries may come from any thread; every use of the connection holds self._lock.
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        try:
+            conn.execute("PRAGMA foreign_keys = ON")
+            self.conn, self.cursor = conn, conn.cursor()
+            self._ensure_schema("traces", create_trace_tables)
+        except Exception:
+            self.conn = self.cursor = None
+            conn.close()
+            raise
+        logging.info(f"Initialized SQLite database at {self.db_path}")
+
+    def close(self):
+        with self._lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = self.cursor = None
+
+    def _ensure_schema(self, group, create):
+        """Run ``create`` for a table group unless it already ran since this database was opened."""
+        key = (os.path.abspath(self.db_path), group)
+        if key in _schemas_ready:
+            return
+        with self._lock:
+            create(self.cursor)
+            self.conn.commit()
+        _schemas_ready.add(key)
+
+    def data_version(self):
+        with self._lock:
+            return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _write(self, table, rows, replace=True, sessions=None):
+        columns = TABLE_COLUMNS[table]
+        sql = (f"INSERT {'OR REPLACE ' if replace else ''}INTO {table} ({', '.join(columns)}) "
+               f"VALUES ({', '.join('?' * len(columns))})")
+        with self._lock:
+            try:
+                self.conn.execute("BEGIN TRANSACTION")
+                if sessions is not None:
+                    self._update_sessions(sessions(rows))
+                self.cursor.executemany(sql, rows)
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+
+    def _query(self, table, columns, filters, limit, order="timestamp"):
+        query = f"SELECT {', '.join(columns)} FROM {table}"
+        conditions = []
+        params = []
+        for condition, value in filters:
+            if value:
+                conditions.append(condition)
+                params.append(value)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += f" ORDER BY {order} DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            self.cursor.execute(query, params)
+            return self.cursor.fetchall()
+
+    def _trace_session_changes(self, rows):
+        """Return how writing ``rows`` changes each session, given the versions they replace."""
+        sessions = {}
+        latest = {row[_ID]: row for row in rows}
+        ids = list(latest)
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            self.cursor.execute(
+                f"SELECT session_id, duration_ms, {TRACE_ERROR_SQL} FROM traces "
+                f"WHERE id IN ({', '.join('?' * len(chunk))}) AND session_id IS NOT NULL", chunk
+            )
+            for session_id, duration_ms, error in self.cursor.fetchall():
+                summary = _session(sessions, session_id)
+                summary["span_count"] -= 1
+                summary["error_count"] -= error
+                summary["total_duration_ms"] -= duration_ms or 0
+        for row in latest.values():
+            add_trace_to_sessions(sessions, row)
+        return sessions
+
+    def _eval_session_changes(self, rows):
+        sessions = {}
+        for row in rows:
+            add_eval_to_sessions(sessions, row)
+        return sessions
+
+    def _update_sessions(self, changes):
+        """Apply per-session changes to the sessions table, inside the caller's transaction."""
+        ids = list(changes)
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            self.cursor.execute(
+                f"SELECT {', '.join(SESSION_COLUMNS)} FROM sessions WHERE session_id IN ({', '.join('?' * len(chunk))})",
+                chunk
+            )
+            for row in self.cursor.fetchall():
+                change = changes[row[0]]
+                _seen_at(change, row[1])
+                _seen_at(change, row[2])
+                change["span_count"] += row[3] or 0
+                change["error_count"] += row[4] or 0
+                change["total_duration_ms"] += row[5] or 0
+                change["tags"].update(tag for tag in json.loads(row[6] or "[]") if isinstance(tag, str))
+                eval_ids = json.loads(row[7] or "[]")
+                change["eval_ids"] = eval_ids + [eval_id for eval_id in change["eval_ids"] if eval_id not in eval_ids]
+        self.cursor.executemany(
+            f"INSERT OR REPLACE INTO sessions ({', '.join(SESSION_COLUMNS)}) "
+            f"VALUES ({', '.join('?' * len(SESSION_COLUMNS))})",
+            [session_row(change) for change in changes.values()]
+        )
+
+    def write_traces(self, rows):
+        self._write("traces", rows, sessions=self._trace_session_changes)
+
+    def query_traces(self, limit=100, trace_type=None, tag=None, function_name=None, session_id=None,
+                     since=None, until=None):
+        return self._query("traces", TRACE_QUERY_COLUMNS, [
+            ("trace_type = ?", trace_type),
+            ("tags LIKE ?", f'%"{tag}"%' if tag else None),
+            ("function_name = ?", function_name),
+            ("session_id = ?", session_id),
+            ("timestamp >= ?", since),
+            ("timestamp < ?", until),
+        ], limit)
+
+    def find_by_args_hash(self, function_name, args_hash):
+        rows = self._query("traces", REPLAY_QUERY_COLUMNS, [
+            ("args_hash = ?", args_hash),
+            ("function_name = ?", function_name),
+        ], 1)
+        return rows[0] if rows else None
+
+    def write_eval_event(self, row):
+        self._ensure_schema("eval", create_eval_tables)
+        self._write("eval_events", [row], replace=False)
+
+    def write_eval_result(self, row):
+        self._ensure_schema("eval", create_eval_tables)
+        self._write("eval_results", [row], sessions=self._eval_session_changes)
+
+    def query_sessions(self, limit=100, since=None, until=None):
+        return self._query("sessions", SESSION_COLUMNS, [
+            ("last_timestamp >= ?", since),
+            ("last_timestamp < ?", until),
+        ], limit, order="last_timestamp")
+
+    def query_eval_results(self, eval_id=None, name=None, session_id=None, limit=10):
+        self._ensure_schema("eval", create_eval_tables)
+        return self._query("eval_results", TABLE_COLUMNS["eval_results"], [
+            ("id = ?", eval_id),
+            ("name = ?", name),
+            ("session_id = ?", session_id),
+        ], limit)
+
+    def query_eval_events(self, eval_id=None, session_id=None, event_type=None, limit=100):
+        self._ensure_schema("eval", create_eval_tables)
+        return self._query("eval_events", TABLE_COLUMNS["eval_events"], [
+            ("eval_id = ?", eval_id),
+            ("session_id = ?", session_id),
+            ("event_type = ?", event_type),
+        ], limit)
+
+
+class MemoryBackend(StorageBackend):
+    """
+    Keeps everything in process memory. Intended for tests; nothing survives the process.
+    """
+
+    def __init__(self):
+        self.traces = {}
+        self.eval_events = {}
+        self.eval_results = {}
+        self._by_args_hash = {}
+        self._lock = threading.Lock()
+
+    def __str__(self):
+        return "memory"
+
+    def write_traces(self, rows):
+        with self._lock:
+            for row in rows:
+                self.traces[row[_ID]] = tuple(row)
+                if row[ARGS_HASH]:
+                    self._by_args_hash[(row[_FUNCTION_NAME], row[ARGS_HASH])] = row[_ID]
+
+    def find_by_args_hash(self, function_name, args_hash):
+        with self._lock:
+            trace_id = self._by_args_hash.get((function_name, args_hash))
+            if trace_id is None:
+                return None
+            row = self.traces[trace_id]
+            return row[:7] + (row[REPLAY_RESULT],)
+
+    def query_traces(self, limit=100, trace_type=None, tag=None, function_name=None, session_id=None,
+                     since=None, until=None):
+        with self._lock:
+            rows = [row[:7] for row in self.traces.values()
+                    if trace_matches(row, trace_type, tag, function_name, session_id, since, until)]
+        return newest(rows, limit, _TIMESTAMP)
+
+    def write_eval_event(self, row):
+        with self._lock:
+            if row[0] in self.eval_events:
+                raise ValueError(f"Duplicate eval event id {row[0]!r}")
+            self.eval_events[row[0]] = tuple(row)
+
+    def write_eval_result(self, row):
+        with self._lock:
+            self.eval_results[row[0]] = tuple(row)
+
+    def query_sessions(self, limit=100, since=None, until=None):
+        with self._lock:
+            return summarize_sessions(list(self.traces.values()), list(self.eval_results.values()),
+                                      limit, since, until)
+
+    def query_eval_results(self, eval_id=None, name=None, session_id=None, limit=10):
+        with self._lock:
+            rows = [row for row in self.eval_results.values()
+                    if (not eval_id or row[0] == eval_id) and (not name or row[1] == name)
+                    and (not session_id or row[4] == session_id)]
+        return newest(rows, limit, 2)
+
+    def query_eval_events(self, eval_id=None, session_id=None, event_type=None, limit=100):
+        with self._lock:
+            rows = [row for row in self.eval_events.values()
+                    if (not eval_id or row[1] == eval_id) and (not session_id or row[2] == session_id)
+                    and (not event_type or row[4] == event_type)]
+        return newest(rows, limit, 3)
@@ -0,0 +1,320 @@
+"""
+Transparent wrappers that trace generators and streaming responses as they are consumed.
+"""
+
+import inspect
+import time
+
+from .histogram import LatencyHistogram
+from .spans import activate, deactivate
+from .usage import has_usage
+
+# Cap on distinct chunk ``type`` values counted per stream.
+_MAX_EVENT_TYPES = 32
+
+
+class StreamStats:
+    """
+    Running statistics for a single stream, updated per chunk without keeping the chunks.
+    """
+
+    __slots__ = ("start", "first_chunk", "last_chunk", "chunk_count", "gaps", "event_types", "usage_chunks")
+
+    def __init__(self, start=None):
+        """
+        Args:
+            start (float, optional): ``time.perf_counter()`` value at which the
+                traced call started. Defaults to now.
+        """
+        self.start = time.perf_counter() if start is None else start
+        self.first_chunk = None
+        self.last_chunk = None
+        self.chunk_count = 0
+        self.gaps = LatencyHistogram()
+        self.event_types = {}
+        self.usage_chunks = []
+
+    def on_chunk(self, chunk):
+        """Record the arrival of a chunk."""
+        now = time.perf_counter()
+        if self.first_chunk is None:
+            self.first_chunk = now
+        else:
+            self.gaps.record((now - self.last_chunk) * 1000)
+        self.last_chunk = now
+        self.chunk_count += 1
+
+        event_type = getattr(chunk, "type", None)
+        if isinstance(event_type, str):
+            if event_type in self.event_types or len(self.event_types) < _MAX_EVENT_TYPES:
+                self.event_types[event_type] = self.event_types.get(event_type, 0) + 1
+
+        # Keep only the first and latest events carrying token usage.
+        if has_usage(chunk):
+            if len(self.usage_chunks) < 2:
+                self.usage_chunks.append(chunk)
+            else:
+                self.usage_chunks[1] = chunk
+
+    def summary(self, completed, error=None):
+        """
+        Build the streaming summary stored with the END trace.
+
+        Args:
+            completed (bool): Whether the stream was consumed to exhaustion.
+            error (BaseException, optional): The exception that ended the stream.
+
+        Returns:
+            dict: Chunk count, time to first chunk, inter-chunk latency
+            percentiles and total stream duration in milliseconds.
+        """
+        now = time.perf_counter()
+        summary = {
+            "is_streaming": True,
+            "completed": completed,
+            "chunk_count": self.chunk_count,
+            "time_to_first_chunk_ms": (self.first_chunk - self.start) * 1000 if self.first_chunk is not None else None,
+            "stream_duration_ms": (now - self.start) * 1000,
+            "inter_chunk_ms": self.gaps.summary(),
+        }
+        if self.event_types:
+            summary["event_types"] = dict(self.event_types)
+        if error is not None:
+            summary["error"] = f"{type(error).__name__}: {error}"
+        return summary
+
+
+class _TracedStreamBase:
+    """Shared bookkeeping for the sync and async stream wrappers."""
+
+    def __init__(self, stream, stats, on_finish, span=None):
+        self._stream = stream
+        self._stats = stats
+        self._on_finish = on_finish
+        self._span = span
+        self._finished = False
+
+    def _activate(self):
+        # The generator body runs on each step, after the traced call has returned,
+        # so the call's span is made current again for the duration of the step.
+        return activate(self._span) if self._span is not None else None
+
+    @staticmethod
+    def _deactivate(token):
+        if token is not None:
+            deactivate(token)
+
+    def _finish(self, completed, error=None):
+        if self._finished:
+            return
+        self._finished = True
+        self._on_finish(self._stats.summary(completed, error), self._stats)
+
+    def __getattr__(self, name):
+        stream = self.__dict__.get("_stream")
+        if stream is None:
+            raise AttributeError(name)
+        return getattr(stream, name)
+
+    def __del__(self):
+        # A stream abandoned without being exhausted or closed still gets its END trace.
+        try:
+            self._finish(False)
+        except Exception:
+            pass
+
+
+class TracedStream(_TracedStreamBase):
+    """
+    Proxy for a synchronous generator or iterator that records chunk timings on the fly.
+    """
+
+    def __init__(self, stream, stats, on_finish, span=None):
+        super().__init__(stream, stats, on_finish, span)
+        self._iterator = iter(stream)
+
+    def __iter__(self):
+        return self
+
+    def _advance(self, step):
+        token = self._activate()
+        try:
+            chunk = step()
+        except StopIteration:
+            self._finish(True)
+            raise
+        except BaseException as e:
+            self._finish(False, e)
+            raise
+        finally:
+            self._deactivate(token)
+        self._stats.on_chunk(chunk)
+        return chunk
+
+    def __next__(self):
+        return self._advance(self._iterator.__next__)
+
+    def send(self, value):
+        return self._advance(lambda: self._stream.send(value))
+
+    def throw(self, *args):
+        return self._advance(lambda: self._stream.throw(*args))
+
+    def close(self):
+        token = self._activate()
+        try:
+            close = getattr(self._stream, "close", None)
+            if close is not None:
+                close()
+        finally:
+            self._deactivate(token)
+            self._finish(False)
+
+    def __enter__(self):
+        enter = getattr(self._stream, "__enter__", None)
+        if enter is not None:
+            enter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        exit_ = getattr(self._stream, "__exit__", None)
+        try:
+            if exit_ is not None:
+                return exit_(exc_type, exc, tb)
+            self.close()
+        finally:
+            self._finish(False, exc)
+
+
+class TracedAsyncStream(_TracedStreamBase):
+    """
+    Proxy for an asynchronous generator or iterator that records chunk timings on the fly.
+    """
+
+    def __init__(self, stream, stats, on_finish, span=None):
+        super().__init__(stream, stats, on_finish, span)
+        self._iterator = stream.__aiter__()
+
+    def __aiter__(self):
+        return self
+
+    async def _advance(self, step):
+        token = self._activate()
+        try:
+            chunk = await step()
+        except StopAsyncIteration:
+            self._finish(True)
+            raise
+        except BaseException as e:
+            self._finish(False, e)
+            raise
+        finally:
+            self._deactivate(token)
+        self._stats.on_chunk(chunk)
+        return chunk
+
+    async def __anext__(self):
+        return await self._advance(self._iterator.__anext__)
+
+    async def asend(self, value):
+        return await self._advance(lambda: self._stream.asend(value))
+
+    async def athrow(self, *args):
+        return await self._advance(lambda: self._stream.athrow(*args))
+
+    async def aclose(self):
+        token = self._activate()
+        try:
+            aclose = getattr(self._stream, "aclose", None) or getattr(self._stream, "close", None)
+            if aclose is not None:
+                result = aclose()
+                if inspect.isawaitable(result):
+                    await result
+        finally:
+            self._deactivate(token)
+            self._finish(False)
+
+    async def __aenter__(self):
+        aenter = getattr(self._stream, "__aenter__", None)
+        if aenter is not None:
+            await aenter()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        aexit = getattr(self._stream, "__aexit__", None)
+        try:
+            if aexit is not None:
+                return await aexit(exc_type, exc, tb)
+            await self.aclose()
+        finally:
+            self._finish(False, exc)
+
+
+def is_stream_result(result, kwargs=None):
+    """
+    Decide whether a traced call returned a stream that should be traced lazily.
+
+    Generators and async generators always qualify. Other iterators (such as SDK
+    stream objects) qualify when the call was made with ``stream=True``.
+
+    Args:
+        result: The value returned by the traced function.
+        kwargs (dict, optional): The keyword arguments of the traced call.
+
+    Returns:
+        bool: True if the result should be wrapped.
+    """
+    if inspect.isgenerator(result) or inspect.isasyncgen(result):
+        return True
+    if kwargs and kwargs.get("stream") is True:
+        return hasattr(result, "__next__") or hasattr(result, "__anext__")
+    return False
+
+
+def wrap_stream(stream, on_finish, start=None, span=None):
+    """
+    Wrap a stream so that its consumption is timed and reported when it ends.
+
+    Args:
+        stream: The generator, async generator or iterator to wrap.
+        on_finish (callable): Called once with the streaming summary and the
+            StreamStats when the stream is exhausted, closed, fails or is
+            garbage collected.
+        start (float, optional): ``time.perf_counter()`` value at which the
+            traced call started.
+        span (Span, optional): Span made current while the stream produces each
+            chunk, so events added inside a traced generator reach its trace.
+
+    Returns:
+        TracedStream or TracedAsyncStream: The wrapped stream.
+    """
+    stats = StreamStats(start)
+    if hasattr(stream, "__aiter__"):
+        return TracedAsyncStream(stream, stats, on_finish, span)
+    return TracedStream(stream, stats, on_finish, span)
+
+
+def summarize_streaming_events(result):
+    """
+    Summarize a returned dict that carries a ``streaming_events`` list.
+
+    Args:
+        result (dict): The value returned by the traced function.
+
+    Returns:
+        tuple: The result with the event list replaced by a count, and the summary dict.
+    """
+    events = result.get("streaming_events") or []
+    event_types = {}
+    for event in events:
+        event_type = getattr(event, "type", str(type(event)))
+        event_types[event_type] = event_types.get(event_type, 0) + 1
+    summary = {
+        "is_streaming": True,
+        "completed": True,
+        "chunk_count": len(events),
+        "event_types": event_types,
+    }
+    result_copy = result.copy()
+    result_copy["streaming_events"] = f"[{len(events)} events]"
+    return result_copy, summary
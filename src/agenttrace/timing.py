@@ -0,0 +1,188 @@
+"""
+Wall-clock, CPU and memory measurements for traced calls.
+
+All durations come from monotonic clocks. For coroutines, the time spent
+running is measured step by step, so a call waiting on a model provider shows
+a long ``suspended_ms`` while a call burning CPU in our own code shows a long
+``running_ms`` and ``thread_cpu_ms``.
+"""
+
+import threading
+import time
+import tracemalloc
+
+from .spans import enter_step, exit_step
+
+TIMING_FIELDS = ("cpu_ms", "thread_cpu_ms", "running_ms", "suspended_ms", "memory_peak_bytes")
+
+
+class MemoryPeaks:
+    """
+    Tracks the peak traced allocation of overlapping calls.
+
+    ``tracemalloc`` keeps a single process-wide peak. Before the peak is reset
+    for a new call, it is folded into every call still open, so nested and
+    concurrent calls each see the highest allocation reached while they ran.
+    """
+
+    supported = hasattr(tracemalloc, "reset_peak")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._open = {}
+        self._next = 0
+
+    def start(self):
+        """
+        Begin measuring a call, starting ``tracemalloc`` if it is not already running.
+
+        Returns:
+            int: Token to pass to ``stop``.
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        with self._lock:
+            current, peak = tracemalloc.get_traced_memory()
+            for entry in self._open.values():
+                entry[1] = max(entry[1], peak)
+            tracemalloc.reset_peak()
+            token = self._next
+            self._next += 1
+            self._open[token] = [current, current]
+        return token
+
+    def stop(self, token):
+        """
+        Finish measuring a call.
+
+        Args:
+            token (int): The value returned by ``start``.
+
+        Returns:
+            int: Bytes allocated above the level at the start of the call at its peak,
+                or None if tracing was stopped in the meantime.
+        """
+        with self._lock:
+            baseline, peak = self._open.pop(token)
+            if not tracemalloc.is_tracing():
+                return None
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            for entry in self._open.values():
+                entry[1] = max(entry[1], peak)
+        return max(peak - baseline, 0)
+
+
+memory_peaks = MemoryPeaks()
+
+
+class CallTimer:
+    """Measures one traced call from construction until ``finish``."""
+
+    __slots__ = ("start_ns", "cpu_start_ns", "thread_start_ns", "thread_id", "running_ns", "thread_running_ns",
+                 "memory_token", "coroutine")
+
+    def __init__(self, start_ns, trace_memory=False):
+        """
+        Args:
+            start_ns (int): ``time.perf_counter_ns()`` value at which the call started.
+            trace_memory (bool): Also measure the call's peak traced allocation.
+        """
+        self.start_ns = start_ns
+        self.cpu_start_ns = time.process_time_ns()
+        self.thread_start_ns = time.thread_time_ns()
+        self.thread_id = threading.get_ident()
+        self.running_ns = 0
+        self.thread_running_ns = 0
+        self.coroutine = False
+        self.memory_token = memory_peaks.start() if trace_memory else None
+
+    def run(self, coro, span=None):
+        """
+        Wrap a coroutine so that only the time it spends running is counted as running.
+
+        Args:
+            coro (coroutine): The coroutine returned by the traced function.
+            span (Span, optional): The call's span, reported by ``spans.running_span``
+                while a step of the coroutine executes.
+
+        Returns:
+            TimedCoroutine: An awaitable that runs ``coro``.
+        """
+        self.coroutine = True
+        return TimedCoroutine(coro, self, span)
+
+    def finish(self):
+        """
+        Stop the measurement.
+
+        Returns:
+            tuple: The wall-clock duration in milliseconds and a dict of ``TIMING_FIELDS``.
+                ``cpu_ms`` is process-wide; for coroutines, ``thread_cpu_ms`` only counts
+                the steps of this call, and it is left out when a call such as a stream
+                finishes on a different thread from the one it started on.
+        """
+        duration_ns = time.perf_counter_ns() - self.start_ns
+        timing = {"cpu_ms": (time.process_time_ns() - self.cpu_start_ns) / 1e6}
+        if self.coroutine:
+            timing["thread_cpu_ms"] = self.thread_running_ns / 1e6
+            timing["running_ms"] = self.running_ns / 1e6
+            timing["suspended_ms"] = max(duration_ns - self.running_ns, 0) / 1e6
+        elif threading.get_ident() == self.thread_id:
+            timing["thread_cpu_ms"] = (time.thread_time_ns() - self.thread_start_ns) / 1e6
+        if self.memory_token is not None:
+            timing["memory_peak_bytes"] = self.release()
+        return duration_ns / 1e6, timing
+
+    def release(self):
+        """
+        Stop measuring memory, if the call still is.
+
+        Safe to call more than once, e.g. from ``finish`` and from the finalizer of a stream.
+
+        Returns:
+            int: The call's peak allocation, as returned by ``MemoryPeaks.stop``, or None.
+        """
+        token, self.memory_token = self.memory_token, None
+        return memory_peaks.stop(token) if token is not None else None
+
+
+class TimedCoroutine:
+    """Awaitable that drives a coroutine and adds the time spent in each step to a ``CallTimer``."""
+
+    __slots__ = ("coro", "timer", "span")
+
+    def __init__(self, coro, timer, span=None):
+        self.coro = coro
+        self.timer = timer
+        self.span = span
+
+    def __await__(self):
+        coro = self.coro
+        timer = self.timer
+        span = self.span
+        value = None
+        error = None
+        while True:
+            step_start = time.perf_counter_ns()
+            thread_start = time.thread_time_ns()
+            previous = enter_step(span)
+            try:
+                if error is None:
+                    yielded = coro.send(value)
+                else:
+                    yielded = coro.throw(error)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                exit_step(previous)
+                timer.running_ns += time.perf_counter_ns() - step_start
+                timer.thread_running_ns += time.thread_time_ns() - thread_start
+            try:
+                value = yield yielded
+                error = None
+            except GeneratorExit:
+                coro.close()
+                raise
+            except BaseException as e:
+                value = None
+                error = e
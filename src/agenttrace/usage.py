@@ -0,0 +1,153 @@
+"""
+Extraction of token usage and model names from LLM SDK responses.
+
+Extractors are plain callables that take a traced result and return a usage
+dictionary (or None if they do not recognise it). The default extractor
+understands OpenAI Chat Completions, OpenAI Responses and Anthropic Messages
+objects, as well as their plain-dict equivalents.
+"""
+
+USAGE_FIELDS = ("model", "prompt_tokens", "completion_tokens", "cached_tokens", "total_tokens")
+
+
+def _get(obj, name):
+    """Read an attribute or key from an SDK object or dict."""
+    if obj is None:
+        return None
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+def _int(value):
+    """Return value if it is a real integer token count, else None."""
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    return None
+
+
+def _first_int(obj, *names):
+    for name in names:
+        value = _int(_get(obj, name))
+        if value is not None:
+            return value
+    return None
+
+
+def _find_usage(obj):
+    """
+    Locate the usage block on a response, a stream event or a wrapped message.
+
+    Returns:
+        tuple: The object holding the usage (used for the model name) and the usage itself.
+    """
+    for holder in (obj, _get(obj, "response"), _get(obj, "message")):
+        if holder is None or isinstance(holder, (str, bytes, int, float, bool)):
+            continue
+        usage = _get(holder, "usage")
+        if usage is not None and not isinstance(usage, (str, bytes, int, float, bool)):
+            return holder, usage
+    return None, None
+
+
+def has_usage(obj):
+    """
+    Check whether an object carries a token usage block.
+
+    Args:
+        obj: A response object, stream event or dict.
+
+    Returns:
+        bool: True if a usage block was found.
+    """
+    return _find_usage(obj)[1] is not None
+
+
+def extract_llm_usage(result):
+    """
+    Default extractor for OpenAI- and Anthropic-style responses.
+
+    ``prompt_tokens`` counts every input token, including cached ones, and
+    ``cached_tokens`` is the subset served from the provider's prompt cache.
+
+    Args:
+        result: The traced result. Tuples of ``(processed, raw)`` and dicts with
+            a ``raw_response`` key are searched as well.
+
+    Returns:
+        dict: Usage fields, or None if no usage block was found.
+    """
+    candidates = [result]
+    if isinstance(result, (tuple, list)):
+        candidates = list(result[:2])
+    elif isinstance(result, dict) and "raw_response" in result:
+        candidates.append(result["raw_response"])
+
+    for candidate in candidates:
+        holder, usage = _find_usage(candidate)
+        if usage is None:
+            continue
+
+        cached = _int(_get(_get(usage, "prompt_tokens_details"), "cached_tokens"))
+        if cached is None:
+            cached = _int(_get(_get(usage, "input_tokens_details"), "cached_tokens"))
+        prompt = _first_int(usage, "prompt_tokens")
+        if prompt is None:
+            prompt = _int(_get(usage, "input_tokens"))
+            cache_read = _int(_get(usage, "cache_read_input_tokens"))
+            cache_write = _int(_get(usage, "cache_creation_input_tokens"))
+            if cache_read is not None:
+                # Anthropic reports cache reads and writes separately from input_tokens.
+                cached = cache_read if cached is None else cached
+                prompt = (prompt or 0) + cache_read
+            if cache_write is not None:
+                prompt = (prompt or 0) + cache_write
+        completion = _first_int(usage, "completion_tokens", "output_tokens")
+        total = _int(_get(usage, "total_tokens"))
+        if total is None and (prompt is not None or completion is not None):
+            total = (prompt or 0) + (completion or 0)
+
+        model = _get(holder, "model")
+        return {
+            "model": model if isinstance(model, str) else None,
+            "prompt_tokens": prompt,
+            "completion_tokens": completion,
+            "cached_tokens": cached,
+            "total_tokens": total,
+        }
+    return None
+
+
+def merge_usage(parts):
+    """
+    Combine usage dictionaries from several stream events into one.
+
+    Streaming APIs may split usage across events (for example input tokens on
+    the first event and output tokens on the last), so each field keeps the
+    largest value reported.
+
+    Args:
+        parts (iterable): Usage dictionaries, possibly containing None.
+
+    Returns:
+        dict: The merged usage, or None if there was nothing to merge.
+    """
+    merged = None
+    for part in parts:
+        if not part:
+            continue
+        if merged is None:
+            merged = dict(part)
+            continue
+        for field in USAGE_FIELDS:
+            value = part.get(field)
+            if value is None:
+                continue
+            if field == "model":
+                merged[field] = merged.get(field) or value
+            elif merged.get(field) is None or value > merged[field]:
+                merged[field] = value
+    if merged is not None and merged.get("prompt_tokens") is not None and merged.get("completion_tokens") is not None:
+        merged["total_tokens"] = max(merged.get("total_tokens") or 0,
+                                     merged["prompt_tokens"] + merged["completion_tokens"])
+    return merged
@@ -0,0 +1,342 @@
+"""
+Compiled JSON-schema validation for tool outputs.
+
+Schemas are compiled once into nested validator closures and cached by a hash
+of their canonical JSON form, so repeated validation against the same tool
+schema only pays for walking the output. A schema edited in place hashes
+to a new key, so it is recompiled rather than served a stale validator.
+
+Types follow JSON Schema: ``integer`` accepts whole-number floats such as
+``3.0`` and, like ``number``, rejects booleans.
+"""
+
+import json
+import hashlib
+import re
+import threading
+
+_CACHE_SIZE = 256
+_cache = {}
+_cache_lock = threading.Lock()
+
+_TYPE_CHECKS = {
+    "string": lambda v: isinstance(v, str),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "integer": lambda v: (isinstance(v, int) and not isinstance(v, bool))
+                         or (isinstance(v, float) and v.is_integer()),
+    "boolean": lambda v: isinstance(v, bool),
+    "array": lambda v: isinstance(v, (list, tuple)),
+    "object": lambda v: isinstance(v, dict),
+    "null": lambda v: v is None,
+}
+
+_TYPE_NAMES = {
+    "string": "a string",
+    "number": "a number",
+    "integer": "an integer",
+    "boolean": "a boolean",
+    "array": "an array",
+    "object": "an object",
+    "null": "null",
+}
+
+
+def _join(path, name):
+    """Append a property name to a dotted field path."""
+    return f"{path}.{name}" if path else str(name)
+
+
+def _label(path):
+    """Return the human-readable subject used in error messages."""
+    return f"Field {path}" if path else "Output"
+
+
+def _value_key(value):
+    """Return a type-aware, hashable key for enum and const comparisons."""
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+def _accept(value, path, errors):
+    return None
+
+
+def _compile_node(schema):
+    """
+    Compile a schema node into a validator closure.
+
+    The returned callable has the signature ``check(value, path, errors)`` and
+    appends a message to ``errors`` for every violation it finds.
+    """
+    if schema is True or schema is None or schema == {}:
+        return _accept
+    if schema is False:
+        def reject(value, path, errors):
+            errors.append(f"{_label(path)} is not allowed")
+        return reject
+
+    type_check = None
+    if "type" in schema:
+        types = schema["type"] if isinstance(schema["type"], list) else [schema["type"]]
+        preds = [_TYPE_CHECKS[t] for t in types if t in _TYPE_CHECKS]
+        expected = " or ".join(_TYPE_NAMES.get(t, str(t)) for t in types)
+
+        def type_check(value, path, errors):
+            for pred in preds:
+                if pred(value):
+                    return True
+            errors.append(f"{_label(path)} should be {expected}")
+            return False
+
+    checks = []
+
+    if "enum" in schema:
+        allowed = {_value_key(v) for v in schema["enum"]}
+        allowed_repr = ", ".join(json.dumps(v, default=str) for v in schema["enum"])
+
+        def check_enum(value, path, errors):
+            if _value_key(value) not in allowed:
+                errors.append(f"{_label(path)} should be one of: {allowed_repr}")
+        checks.append(check_enum)
+
+    if "const" in schema:
+        const_key = _value_key(schema["const"])
+        const_repr = json.dumps(schema["const"], default=str)
+
+        def check_const(value, path, errors):
+            if _value_key(value) != const_key:
+                errors.append(f"{_label(path)} should be {const_repr}")
+        checks.append(check_const)
+
+    properties = {name: _compile_node(sub) for name, sub in schema.get("properties", {}).items()}
+    required = list(schema.get("required", []))
+    additional = schema.get("additionalProperties", True)
+    additional_check = None if additional is True else _compile_node(additional)
+
+    if properties or required or additional_check is not None:
+        def check_object(value, path, errors):
+            if not isinstance(value, dict):
+                return
+            for name in required:
+                if name not in value:
+                    errors.append(f"Missing required field: {_join(path, name)}")
+            for name, check in properties.items():
+                if name in value:
+                    check(value[name], _join(path, name), errors)
+            if additional_check is not None:
+                for name in value:
+                    if name in properties:
+                        continue
+                    if additional is False:
+                        errors.append(f"Unexpected field: {_join(path, name)}")
+                    else:
+                        additional_check(value[name], _join(path, name), errors)
+        checks.append(check_object)
+
+    if "items" in schema:
+        items = schema["items"]
+        if isinstance(items, list):
+            positional = [_compile_node(sub) for sub in items]
+
+            def check_items(value, path, errors):
+                if not isinstance(value, (list, tuple)):
+                    return
+                for i, (item, check) in enumerate(zip(value, positional)):
+                    check(item, f"{path}[{i}]", errors)
+        else:
+            item_check = _compile_node(items)
+
+            def check_items(value, path, errors):
+                if not isinstance(value, (list, tuple)):
+                    return
+                for i, item in enumerate(value):
+                    item_check(item, f"{path}[{i}]", errors)
+        checks.append(check_items)
+
+    if "minItems" in schema or "maxItems" in schema:
+        min_items = schema.get("minItems")
+        max_items = schema.get("maxItems")
+
+        def check_item_count(value, path, errors):
+            if not isinstance(value, (list, tuple)):
+                return
+            if min_items is not None and len(value) < min_items:
+                errors.append(f"{_label(path)} should have at least {min_items} items")
+            if max_items is not None and len(value) > max_items:
+                errors.append(f"{_label(path)} should have at most {max_items} items")
+        checks.append(check_item_count)
+
+    if "minLength" in schema or "maxLength" in schema or "pattern" in schema:
+        min_length = schema.get("minLength")
+        max_length = schema.get("maxLength")
+        pattern = re.compile(schema["pattern"]) if "pattern" in schema else None
+
+        def check_string(value, path, errors):
+            if not isinstance(value, str):
+                return
+            if min_length is not None and len(value) < min_length:
+                errors.append(f"{_label(path)} should be at least {min_length} characters")
+            if max_length is not None and len(value) > max_length:
+                errors.append(f"{_label(path)} should be at most {max_length} characters")
+            if pattern is not None and not pattern.search(value):
+                errors.append(f"{_label(path)} should match pattern {pattern.pattern}")
+        checks.append(check_string)
+
+    if "minimum" in schema or "maximum" in schema:
+        minimum = schema.get("minimum")
+        maximum = schema.get("maximum")
+
+        def check_range(value, path, errors):
+            if not _TYPE_CHECKS["number"](value):
+                return
+            if minimum is not None and value < minimum:
+                errors.append(f"{_label(path)} should be >= {minimum}")
+            if maximum is not None and value > maximum:
+                errors.append(f"{_label(path)} should be <= {maximum}")
+        checks.append(check_range)
+
+    if "allOf" in schema:
+        all_of = [_compile_node(sub) for sub in schema["allOf"]]
+
+        def check_all_of(value, path, errors):
+            for check in all_of:
+                check(value, path, errors)
+        checks.append(check_all_of)
+
+    for keyword in ("anyOf", "oneOf"):
+        if keyword not in schema:
+            continue
+        branches = [_compile_node(sub) for sub in schema[keyword]]
+        exactly_one = keyword == "oneOf"
+
+        def check_branches(value, path, errors, branches=branches, exactly_one=exactly_one):
+            matches = 0
+            for check in branches:
+                branch_errors = []
+                check(value, path, branch_errors)
+                if not branch_errors:
+                    matches += 1
+                    if not exactly_one:
+                        return
+            if matches == 0:
+                errors.append(f"{_label(path)} does not match any of the allowed schemas")
+            elif exactly_one and matches > 1:
+                errors.append(f"{_label(path)} matches more than one of the allowed schemas")
+        checks.append(check_branches)
+
+    if not checks:
+        if type_check is None:
+            return _accept
+        return type_check
+
+    def check_node(value, path, errors):
+        if type_check is not None and not type_check(value, path, errors):
+            return
+        for check in checks:
+            check(value, path, errors)
+    return check_node
+
+
+def schema_hash(schema):
+    """
+    Compute the cache key for a schema.
+
+    Args:
+        schema (dict): The JSON schema.
+
+    Returns:
+        str: A hex digest of the schema's canonical JSON form.
+    """
+    canonical = json.dumps(schema, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+
+def compile_schema(schema):
+    """
+    Compile a JSON schema into a reusable validator, reusing cached compilations.
+
+    Args:
+        schema (dict): The JSON schema the output is expected to satisfy.
+
+    Returns:
+        callable: A function taking an output (dict or JSON string) and returning
+        a dictionary with the evaluation status and all validation errors. A
+        malformed schema gives a validator that reports it as an error.
+    """
+    try:
+        key = schema_hash(schema)
+    except Exception as e:
+        return _failing_validator(e)
+    validator = _cache.get(key)
+    if validator is None:
+        validator = _build_validator(schema)
+        with _cache_lock:
+            if len(_cache) >= _CACHE_SIZE:
+                _cache.pop(next(iter(_cache)))
+            _cache[key] = validator
+    return validator
+
+
+def _failing_validator(error):
+    """Return a validator that reports a schema compilation error for every output."""
+    errors = [f"Error evaluating tool output: {str(error)}"]
+
+    def validator(output):
+        return {"success": False, "errors": list(errors)}
+    return validator
+
+
+def _build_validator(schema):
+    """Compile a schema into a validator for ``compile_schema``."""
+    try:
+        check = _compile_node(schema)
+    except Exception as e:
+        return _failing_validator(e)
+
+    def validator(output):
+        try:
+            if isinstance(output, str):
+                try:
+                    output = json.loads(output)
+                except json.JSONDecodeError:
+                    return {"success": False, "errors": ["Output is not valid JSON"]}
+            errors = []
+            check(output, "", errors)
+            return {"success": not errors, "errors": errors}
+        except Exception as e:
+            return {"success": False, "errors": [f"Error evaluating tool output: {str(e)}"]}
+    return validator
+
+
+def validate(output, schema):
+    """
+    Validate a single output against a schema.
+
+    Args:
+        output: The output from a tool, as a dict or JSON string.
+        schema (dict): The JSON schema the output is expected to satisfy.
+
+    Returns:
+        dict: A dictionary with the evaluation status and error details if applicable.
+    """
+    return compile_schema(schema)(output)
+
+
+def validate_many(outputs, schema):
+    """
+    Validate many outputs against one schema, compiling it only once.
+
+    Args:
+        outputs (iterable): Tool outputs, as dicts or JSON strings.
+        schema (dict): The JSON schema the outputs are expected to satisfy.
+
+    Returns:
+        list: One evaluation dictionary per output, in input order.
+    """
+    validator = compile_schema(schema)
+    return [validator(output) for output in outputs]
+
+
+def clear_cache():
+    """Drop all cached schema compilations."""
+    with _cache_lock:
+        _cache.clear()
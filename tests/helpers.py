@@ -0,0 +1,35 @@
+"""
+Shared fixtures for the test suite.
+"""
+
+import os
+import tempfile
+import unittest
+from agenttrace import TraceManager
+
+
+class TracerTestCase(unittest.TestCase):
+    """
+    Base class for tests that trace calls into a named TraceManager backed by a temporary database.
+
+    Subclasses set ``tracer_name`` and pass extra ``TraceManager`` arguments in ``tracer_options``.
+    """
+
+    tracer_name = "test"
+    tracer_options = {}
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, f"{self.tracer_name}.db")
+        self.tm = TraceManager(name=self.tracer_name, db_path=self.db_path, colored_logging=False,
+                               **self.tracer_options)
+
+    def tearDown(self):
+        self.tm.close()
+        self.tmpdir.cleanup()
+
+    def stored(self, function_name):
+        """Flush the tracer and return the single stored trace of ``function_name``."""
+        self.tm.save_traces()
+        [row] = self.tm.get_traces(function_name=function_name)
+        return row
@@ -0,0 +1,48 @@
+"""
+Tests for the benchmark suite and baseline comparison.
+"""
+
+import unittest
+from agenttrace import TraceManager
+from agenttrace.bench import compare, format_report, run_benchmarks
+
+
+class TestBench(unittest.TestCase):
+    """Test running benchmarks and comparing them against a baseline."""
+
+    def test_run_restores_default_manager(self):
+        """Benchmarks leave the process-wide TraceManager as they found it."""
+        before = TraceManager()
+        report = run_benchmarks(["sanitize"])
+        self.assertIs(TraceManager(), before)
+        self.assertIsNotNone(before.conn)
+        [result] = report["results"]
+        self.assertEqual(result["name"], "sanitize.objects_per_sec")
+        self.assertGreater(result["value"], 0)
+        self.assertIn("sanitize.objects_per_sec", format_report(report))
+
+    def test_unknown_benchmark(self):
+        """Unknown benchmark names are rejected."""
+        with self.assertRaises(ValueError):
+            run_benchmarks(["nope"])
+
+    def test_compare_flags_regressions(self):
+        """Only slowdowns beyond the threshold count as regressions."""
+        baseline = {"results": [
+            {"name": "save", "value": 1000.0, "unit": "rows/s", "higher_is_better": True, "params": {}},
+            {"name": "query", "value": 1.0, "unit": "ms", "higher_is_better": False, "params": {"rows": 10}},
+        ]}
+        report = {"results": [
+            {"name": "save", "value": 950.0, "unit": "rows/s", "higher_is_better": True, "params": {}},
+            {"name": "query", "value": 1.5, "unit": "ms", "higher_is_better": False, "params": {"rows": 10}},
+            {"name": "new", "value": 1.0, "unit": "ms", "higher_is_better": False, "params": {}},
+        ]}
+        by_name = {c["name"]: c for c in compare(report, baseline, threshold=0.1)}
+        self.assertEqual(set(by_name), {"save", "query"})
+        self.assertFalse(by_name["save"]["regression"])
+        self.assertTrue(by_name["query"]["regression"])
+        self.assertAlmostEqual(by_name["query"]["change"], -0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
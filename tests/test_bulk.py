@@ -0,0 +1,108 @@
+"""
+Tests for bulk JSON Lines import and export.
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from agenttrace.bulk import ImportConflictError, export_jsonl, import_jsonl
+
+
+class TestBulkJsonl(unittest.TestCase):
+    """Test round-tripping, conflict handling and index deferral."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "traces.db")
+        self.input = os.path.join(self.tmp.name, "in.jsonl")
+        with open(self.input, "w") as f:
+            for i in range(25):
+                f.write(json.dumps({"id": f"trace-{i}", "session_id": "s", "timestamp": f"2025-01-01T00:00:{i:02d}",
+                                    "type": "COMPLETE", "function": "step", "tags": ["bulk"],
+                                    "data": {"result": i}}) + "\n")
+            f.write(json.dumps({"table": "eval_results", "id": "eval-1", "name": "bulk-eval", "trial_count": 1,
+                                "data": {"eval_results": []}}) + "\n")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        """Exported rows import back unchanged, with indexes rebuilt afterwards."""
+        stats = import_jsonl(self.db_path, [self.input], batch_size=10)
+        self.assertEqual(stats["inserted"], 26)
+        self.assertEqual(stats["tables"]["traces"], 25)
+
+        output = os.path.join(self.tmp.name, "out.jsonl.gz")
+        summary = export_jsonl(self.db_path, output)
+        self.assertEqual(summary["traces"]["rows"], 25)
+        self.assertEqual(summary["eval_results"]["rows"], 1)
+
+        copy_path = os.path.join(self.tmp.name, "copy.db")
+        import_jsonl(copy_path, [output])
+        conn = sqlite3.connect(copy_path)
+        row = conn.execute("SELECT function_name, tags, data FROM traces WHERE id = 'trace-3'").fetchone()
+        self.assertEqual((row[0], json.loads(row[1]), json.loads(row[2])), ("step", ["bulk"], {"result": 3}))
+        indexes = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        self.assertIn("idx_timestamp", indexes)
+        conn.close()
+
+    def test_conflicts(self):
+        """Existing IDs raise by default and can be skipped or replaced."""
+        import_jsonl(self.db_path, [self.input])
+        with self.assertRaises(ImportConflictError) as ctx:
+            import_jsonl(self.db_path, [self.input])
+        self.assertEqual(ctx.exception.row_id, "trace-0")
+
+        stats = import_jsonl(self.db_path, [self.input], on_conflict="skip")
+        self.assertEqual((stats["inserted"], stats["skipped"]), (0, 26))
+        stats = import_jsonl(self.db_path, [self.input], on_conflict="replace")
+        self.assertEqual((stats["inserted"], stats["replaced"]), (0, 26))
+
+        conn = sqlite3.connect(self.db_path)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM traces").fetchone()[0], 25)
+        conn.close()
+
+    def test_corrupt_and_empty_values(self):
+        """Corrupt or empty stored JSON still exports as valid JSON Lines."""
+        import_jsonl(self.db_path, [self.input])
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("UPDATE traces SET data = '{\"result\": 1' WHERE id = 'trace-1'")
+        conn.execute("UPDATE traces SET data = '', tags = NULL WHERE id = 'trace-2'")
+        conn.commit()
+        conn.close()
+
+        output = os.path.join(self.tmp.name, "out.jsonl")
+        export_jsonl(self.db_path, output, tables=["traces"])
+        with open(output) as f:
+            records = {record["id"]: record for record in map(json.loads, f)}
+        self.assertEqual(records["trace-1"]["data"], '{"result": 1')
+        self.assertEqual((records["trace-2"]["data"], records["trace-2"]["tags"]), (None, None))
+        self.assertEqual(records["trace-3"]["data"], {"result": 3})
+
+    def test_incremental_export_skips_unfinished_rows(self):
+        """Incremental exports leave START traces until they complete, then export them once."""
+        import_jsonl(self.db_path, [self.input])
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("INSERT INTO traces (id, session_id, timestamp, trace_type, function_name, data) "
+                     "VALUES ('running', 's', '2025-01-01T00:01:00', 'START', 'step', '{}')")
+        conn.commit()
+
+        output = os.path.join(self.tmp.name, "out.jsonl")
+        summary = export_jsonl(self.db_path, output, tables=["traces"], since={})
+        self.assertEqual(summary["traces"]["rows"], 25)
+
+        conn.execute("INSERT OR REPLACE INTO traces (id, session_id, timestamp, trace_type, function_name, data) "
+                     "VALUES ('running', 's', '2025-01-01T00:01:00', 'COMPLETE', 'step', '{}')")
+        conn.commit()
+        conn.close()
+        watermark = {"traces": summary["traces"]["watermark"]}
+        export_jsonl(self.db_path, output, tables=["traces"], since=watermark)
+        with open(output) as f:
+            self.assertEqual([(r["id"], r["trace_type"]) for r in map(json.loads, f)], [("running", "COMPLETE")])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+"""
+Tests for the read query cache.
+"""
+
+import json
+import sqlite3
+import unittest
+import uuid
+from agenttrace import TraceManager
+from agenttrace.cache import QueryCache, query_key
+
+
+class TestQueryCache(unittest.TestCase):
+    """Test the LRU query cache."""
+
+    def test_lru_eviction_and_stats(self):
+        """The least recently used entry is evicted and hits and misses are counted."""
+        cache = QueryCache(max_entries=2)
+        for name in ("a", "b"):
+            cache.put(query_key(name), [name], cache.generation)
+        self.assertEqual(cache.get(query_key("a")), (True, ["a"]))
+        cache.put(query_key("c"), ["c"], cache.generation)
+        self.assertEqual(cache.get(query_key("b")), (False, None))
+        self.assertEqual(cache.get(query_key("c")), (True, ["c"]))
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["evictions"], stats["entries"]), (2, 1, 1, 2))
+
+    def test_stale_results_are_not_stored(self):
+        """Results read before an invalidation are not cached."""
+        cache = QueryCache()
+        generation = cache.generation
+        cache.invalidate()
+        cache.put(query_key("traces"), [], generation)
+        self.assertEqual(cache.get(query_key("traces")), (False, None))
+
+    def test_key_ignores_unset_filters(self):
+        """Unset filters do not change the cache key."""
+        self.assertEqual(query_key("traces", limit=10, tag=None, session_id=""), query_key("traces", limit=10))
+        self.assertNotEqual(query_key("traces", limit=10), query_key("traces", limit=20))
+
+
+class TestTraceManagerCache(unittest.TestCase):
+    """Test query caching in TraceManager reads."""
+
+    def setUp(self):
+        self.tm = TraceManager()
+        self.session_id = str(uuid.uuid4())
+        self.tm.add_trace("START", "cached_fn", args={"x": 1}, session_id=self.session_id)
+        self.tm.add_trace("END", "cached_fn", result="ok", duration=1.0, session_id=self.session_id)
+        self.tm.save_traces()
+
+    def test_repeated_reads_hit_until_flush(self):
+        """Repeated reads are served from the cache until the next flush."""
+        first = self.tm.get_traces(session_id=self.session_id)
+        hits = self.tm.query_cache.hits
+        first[0]["result"] = "mutated"
+        second = self.tm.get_traces(session_id=self.session_id)
+        self.assertEqual(self.tm.query_cache.hits, hits + 1)
+        self.assertEqual(second[0]["result"], "ok")
+
+        self.tm.add_trace("START", "cached_fn", session_id=self.session_id)
+        self.tm.save_traces()
+        self.assertEqual(len(self.tm.get_traces(session_id=self.session_id)), 2)
+        self.assertEqual(self.tm.query_cache.hits, hits + 1)
+
+    def test_nested_values_are_not_shared(self):
+        """Mutating nested values of a cached result does not change later reads."""
+        self.tm.add_trace("END", "nested_fn", result={"choices": [{"text": "ok"}]}, duration=1.0,
+                          tags=["a"], session_id=self.session_id)
+        self.tm.save_traces()
+        first = self.tm.get_traces(function_name="nested_fn")
+        first[0]["result"]["choices"][0]["text"] = "mutated"
+        first[0]["tags"].append("b")
+        hits = self.tm.query_cache.hits
+        second = self.tm.get_traces(function_name="nested_fn")
+        self.assertEqual(self.tm.query_cache.hits, hits + 1)
+        self.assertEqual(second[0]["result"], {"choices": [{"text": "ok"}]})
+        self.assertEqual(second[0]["tags"], ["a"])
+
+    def test_writes_from_other_connections_invalidate(self):
+        """Writes from another connection invalidate the cache."""
+        self.assertEqual(len(self.tm.get_traces(session_id=self.session_id)), 1)
+        other = sqlite3.connect(self.tm.db_path)
+        try:
+            other.execute(
+                "INSERT INTO traces (id, session_id, timestamp, trace_type, function_name, tags, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (str(uuid.uuid4()), self.session_id, "2099-01-01T00:00:00", "COMPLETE", "cached_fn", None,
+                 json.dumps({}))
+            )
+            other.commit()
+        finally:
+            other.close()
+        self.assertEqual(len(self.tm.get_traces(session_id=self.session_id)), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+"""
+Tests for the live terminal view.
+"""
+
+import io
+import time
+import unittest
+from agenttrace.console import LiveView
+
+
+class FakeTerminal(io.StringIO):
+    def isatty(self):
+        return True
+
+
+class TestLiveView(unittest.TestCase):
+    """Test the event-driven live view."""
+
+    def test_not_started_without_tty(self):
+        """No render thread is started when the stream is not a terminal."""
+        view = LiveView(stream=io.StringIO())
+        view.span_started("func", "session")
+        self.assertIsNone(view._thread)
+        self.assertEqual(len(view._events), 0)
+
+    def test_concurrent_spans_in_one_session(self):
+        """Concurrent calls in one session are tracked separately and pruned when they finish."""
+        terminal = FakeTerminal()
+        view = LiveView(stream=terminal, min_interval=0.01)
+        view.span_started("fetch", "session-1")
+        view.span_started("fetch", "session-1")
+        view.span_ended("fetch", "session-1", 12.5)
+        deadline = time.time() + 2
+        while (view._events or not terminal.getvalue()) and time.time() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.05)
+        self.assertEqual(view._active_count, 1)
+        self.assertIn("fetch completed in 12.50ms", terminal.getvalue())
+
+        view.span_ended("fetch", "session-1", 3.0, success=False)
+        view.close()
+        self.assertEqual(view._active_count, 0)
+        self.assertFalse(view._active)
+        self.assertFalse(view._thread.is_alive())
+
+
+if __name__ == '__main__':
+    unittest.main()
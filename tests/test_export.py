@@ -0,0 +1,97 @@
+"""
+Tests for columnar export of the trace database.
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+from agenttrace import TraceManager
+from agenttrace.export import export_tables
+
+
+def make_db(path, start, count):
+    """Create a pre-usage-columns traces table and append rows to it."""
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE IF NOT EXISTS traces (id TEXT PRIMARY KEY, session_id TEXT, timestamp TEXT, "
+                 "trace_type TEXT, function_name TEXT, tags TEXT, data JSON)")
+    conn.executemany("INSERT INTO traces VALUES (?, ?, ?, ?, ?, ?, ?)", [
+        (f"id-{i}", f"session-{i % 3}", f"2025-01-01T00:00:{i % 60:02d}.000001", "COMPLETE",
+         f"func_{i % 2}", json.dumps(["tag", f"t{i % 2}"]), json.dumps({"duration_ms": i}))
+        for i in range(start, start + count)
+    ])
+    conn.commit()
+    conn.close()
+
+
+@unittest.skipUnless(pyarrow, "pyarrow is not installed")
+class TestArrowExport(unittest.TestCase):
+    """Test chunked, incremental Parquet and Arrow export."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "traces.db")
+        self.out = os.path.join(self.tmp.name, "export")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_parquet_incremental(self):
+        """Parquet export writes dictionary-encoded columns and resumes from a watermark."""
+        import pyarrow.parquet as pq
+
+        make_db(self.db_path, 0, 250)
+        summary = export_tables(self.db_path, self.out, chunk_size=100)
+        self.assertEqual(summary["traces"]["rows"], 250)
+        self.assertEqual(summary["eval_events"]["rows"], 0)
+        table = pq.read_table(summary["traces"]["path"])
+        self.assertEqual(table.num_rows, 250)
+        self.assertNotIn("data", table.column_names)
+        self.assertEqual(str(table.schema.field("function_name").type), "dictionary<values=string, indices=int32, ordered=0>")
+        self.assertEqual(table.column("tags")[1].as_py(), ["tag", "t1"])
+
+        make_db(self.db_path, 250, 10)
+        watermark = {t: info["watermark"] for t, info in summary.items()}
+        summary = export_tables(self.db_path, self.out, since=watermark, include_payloads=True)
+        self.assertEqual(summary["traces"]["rows"], 10)
+        self.assertEqual(pq.read_table(summary["traces"]["path"]).column("id")[0].as_py(), "id-250")
+        self.assertEqual(len(os.listdir(os.path.join(self.out, "traces"))), 2)
+
+    def test_arrow_stream(self):
+        """Arrow export writes every row to an IPC stream."""
+        make_db(self.db_path, 0, 30)
+        summary = export_tables(self.db_path, self.out, format="arrow", tables=["traces"], chunk_size=7)
+        with pyarrow.ipc.open_stream(summary["traces"]["path"]) as reader:
+            self.assertEqual(reader.read_all().num_rows, 30)
+
+    def test_current_schema_includes_timing_columns(self):
+        """Databases written by TraceManager export their timing columns."""
+        import pyarrow.parquet as pq
+
+        tm = TraceManager(name="export", db_path=self.db_path, colored_logging=False)
+        try:
+            @tm.trace
+            def step(x):
+                return x
+
+            step(1)
+            summary = tm.export_arrow(self.out, tables=["traces"])
+        finally:
+            tm.close()
+        table = pq.read_table(summary["traces"]["path"])
+        self.assertEqual(table.num_rows, 1)
+        for column in ("cpu_ms", "thread_cpu_ms", "running_ms", "suspended_ms", "memory_peak_bytes"):
+            self.assertIn(column, table.column_names)
+        self.assertGreaterEqual(table.column("cpu_ms")[0].as_py(), 0)
+        self.assertNotIn("replay_result", table.column_names)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+"""
+Tests for the OTLP span exporter against a local stand-in collector.
+"""
+
+import json
+import threading
+import unittest
+import uuid
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from agenttrace import OTLPHttpExporter, TraceManager
+from agenttrace.exporters import STATUS_ERROR, STATUS_UNSET, span_to_otlp
+
+
+class StandInCollector(HTTPServer):
+    """Minimal OTLP/HTTP collector that records request bodies and can fail on demand."""
+
+    def __init__(self, failures=0):
+        super().__init__(("127.0.0.1", 0), CollectorHandler)
+        self.failures = failures
+        self.requests = []
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def endpoint(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/v1/traces"
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class CollectorHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        if self.server.failures:
+            self.server.failures -= 1
+            self.send_response(503)
+            self.end_headers()
+            return
+        self.server.requests.append(json.loads(body))
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def make_row(session_id, function_name="step", tags=None, duration_ms=25.0):
+    return {
+        "id": str(uuid.uuid4()),
+        "session_id": session_id,
+        "timestamp": datetime.now().isoformat(),
+        "trace_type": "COMPLETE",
+        "function_name": function_name,
+        "tags": json.dumps(tags) if tags else None,
+        "data": "{}",
+        "duration_ms": duration_ms,
+        "model": "gpt-4o",
+        "prompt_tokens": 10,
+        "completion_tokens": 5,
+    }
+
+
+class TestOTLPHttpExporter(unittest.TestCase):
+    """Test batching, retries and the OTLP/JSON mapping."""
+
+    def setUp(self):
+        self.collector = StandInCollector()
+
+    def tearDown(self):
+        self.collector.stop()
+
+    def test_batches_and_maps_attributes(self):
+        """Spans are sent in batches of max_batch_size with their attributes mapped."""
+        exporter = OTLPHttpExporter(endpoint=self.collector.endpoint, max_batch_size=2, schedule_delay=10)
+        exporter.export([make_row("s1", tags=["a", "b"]) for _ in range(5)])
+        self.assertTrue(exporter.force_flush(timeout=5))
+        exporter.shutdown()
+
+        self.assertEqual([len(r["resourceSpans"][0]["scopeSpans"][0]["spans"]) for r in self.collector.requests], [2, 2, 1])
+        span = self.collector.requests[0]["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+        attributes = {a["key"]: a["value"] for a in span["attributes"]}
+        self.assertEqual(attributes["session.id"], {"stringValue": "s1"})
+        self.assertEqual(attributes["agenttrace.tags"]["arrayValue"]["values"], [{"stringValue": "a"}, {"stringValue": "b"}])
+        self.assertEqual(attributes["gen_ai.usage.output_tokens"], {"intValue": "5"})
+        self.assertEqual(int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"]), 25_000_000)
+        self.assertEqual(len(span["traceId"]), 32)
+        self.assertEqual(exporter.exported, 5)
+
+    def test_failed_calls_have_error_status(self):
+        """Errors, failed streams and failed tool validation map to an ERROR status with a message."""
+        rows = [make_row("s4") for _ in range(4)]
+        rows[1]["data"] = json.dumps({"error": {"type": "ValueError", "message": "bad input"}})
+        rows[2]["data"] = json.dumps({"streaming": {"completed": False, "error": "TimeoutError: slow"}})
+        rows[3]["data"] = json.dumps({"tool_eval": {"success": False, "errors": ["Missing required field: city"]}})
+        self.assertEqual([span_to_otlp(row)["status"] for row in rows], [
+            {"code": STATUS_UNSET},
+            {"code": STATUS_ERROR, "message": "ValueError: bad input"},
+            {"code": STATUS_ERROR, "message": "TimeoutError: slow"},
+            {"code": STATUS_ERROR, "message": "Tool output failed schema validation: Missing required field: city"},
+        ])
+
+    def test_retries_transient_failures(self):
+        """Requests failing with a 503 are retried until they succeed."""
+        self.collector.failures = 2
+        exporter = OTLPHttpExporter(endpoint=self.collector.endpoint, initial_backoff=0.01, schedule_delay=0.01)
+        exporter.export([make_row("s2")])
+        exporter.shutdown()
+        self.assertEqual(exporter.failed_requests, 2)
+        self.assertEqual(exporter.exported, 1)
+        self.assertEqual(len(self.collector.requests), 1)
+
+    def test_bounded_queue_drops_instead_of_blocking(self):
+        """Spans beyond max_queue_size are dropped and counted."""
+        exporter = OTLPHttpExporter(endpoint=self.collector.endpoint, max_queue_size=3, schedule_delay=10,
+                                    max_batch_size=100)
+        exporter.export([make_row("s3") for _ in range(5)])
+        self.assertEqual(exporter.dropped, 2)
+        exporter.shutdown()
+        self.assertEqual(exporter.exported, 3)
+
+    def test_trace_manager_exports_on_flush(self):
+        """A TraceManager hands flushed traces to its exporters."""
+        tm = TraceManager()
+        exporter = OTLPHttpExporter(endpoint=self.collector.endpoint, schedule_delay=0.01)
+        tm.add_exporter(exporter)
+        try:
+            @tm.trace(session_id="export-session")
+            def exported_function():
+                return 1
+
+            exported_function()
+            tm.save_traces()
+            exporter.shutdown()
+        finally:
+            tm.exporters.remove(exporter)
+        spans = [s for r in self.collector.requests for s in r["resourceSpans"][0]["scopeSpans"][0]["spans"]]
+        self.assertIn("exported_function", [s["name"] for s in spans])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+"""
+Tests for time-ordered trace and event IDs.
+"""
+
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import unittest
+import uuid
+from datetime import datetime
+from unittest import mock
+from agenttrace import TraceManager, TracerEval
+from agenttrace.ids import id_time, new_id
+from agenttrace.records import SpanRecord, wall_time
+
+
+class TestIds(unittest.TestCase):
+    """Test the format, ordering and uniqueness of IDs."""
+
+    def test_ids_are_uuid7_and_ordered(self):
+        """IDs are version 7 UUIDs that sort in creation order."""
+        ids = [new_id() for _ in range(10000)]
+        self.assertEqual(ids, sorted(ids))
+        self.assertEqual(len(set(ids)), len(ids))
+        parsed = uuid.UUID(ids[0])
+        self.assertEqual(parsed.version, 7)
+        self.assertEqual(parsed.variant, uuid.RFC_4122)
+        self.assertAlmostEqual(id_time(ids[0]), time.time(), delta=5)
+
+    def test_record_timestamps_follow_the_wall_clock(self):
+        """Record timestamps read the wall clock when created, while IDs stay on the monotonic clock."""
+        record = SpanRecord("END", "step", "s")
+        self.assertAlmostEqual(id_time(record.to_row()[0]), wall_time(record.wall_ns).timestamp(), delta=0.01)
+
+        with mock.patch("time.time_ns", return_value=time.time_ns() + 3600 * 10**9):
+            record = SpanRecord("END", "step", "s")
+        row = record.to_row()
+        self.assertAlmostEqual(datetime.fromisoformat(row[2]).timestamp(), time.time() + 3600, delta=5)
+        self.assertAlmostEqual(id_time(row[0]), time.time(), delta=5)
+
+    def test_unique_across_threads(self):
+        """Threads generating IDs at once never produce the same one."""
+        results = [[] for _ in range(8)]
+
+        def generate(out):
+            out.extend(new_id() for _ in range(5000))
+
+        threads = [threading.Thread(target=generate, args=(out,)) for out in results]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        all_ids = [i for out in results for i in out]
+        self.assertEqual(len(set(all_ids)), len(all_ids))
+
+    @unittest.skipUnless(hasattr(os, "fork"), "requires fork")
+    def test_forked_children_do_not_repeat_ids(self):
+        """A forked child does not repeat the parent's next ID."""
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            os.write(write_fd, new_id().encode())
+            os._exit(0)
+        os.close(write_fd)
+        child_id = os.read(read_fd, 64).decode()
+        os.close(read_fd)
+        os.waitpid(pid, 0)
+        self.assertNotEqual(child_id, new_id())
+        self.assertEqual(len(child_id), 36)
+
+
+class TestNoCollisions(unittest.TestCase):
+    """Test that rows created in bursts keep distinct IDs."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.tm = TraceManager(name="ids", db_path=os.path.join(self.tmpdir.name, "ids.db"), colored_logging=False)
+        self.tm.save_interval = float("inf")
+
+    def tearDown(self):
+        self.tm.close()
+        self.tmpdir.cleanup()
+
+    def test_burst_of_traces_is_not_overwritten(self):
+        """Traces added within the same millisecond all get stored."""
+        for i in range(2000):
+            self.tm.add_trace("END", "burst", result=i, duration=0.0, session_id="s")
+        self.tm.save_traces()
+        self.assertEqual(len(self.tm.get_traces(function_name="burst", limit=5000)), 2000)
+
+    def test_eval_events_are_not_overwritten(self):
+        """Evaluation events recorded in quick succession all get stored."""
+        evaluator = TracerEval(name="fast", data=lambda: [{"input": i} for i in range(50)], task=lambda x: x,
+                               scores=[], tracer=self.tm)
+        asyncio.run(evaluator.run())
+        events = TracerEval.get_eval_events(session_id=evaluator.session_id, limit=1000, tracer=self.tm)
+        self.assertEqual(len(events), 52)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+"""
+Tests for the spill journal.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+from agenttrace import TraceManager
+from agenttrace.journal import SpillJournal
+from agenttrace.records import SpanRecord
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+
+def row(trace_id, trace_type="START"):
+    return (trace_id, "s", "2025-01-01T00:00:00", trace_type, "f", None, "{}", None, None, None, None, None, None)
+
+
+class TestSpillJournal(unittest.TestCase):
+    """Test the memory-mapped spill journal."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "journal.spill")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_entries_survive_reopen(self):
+        """Journaled rows are read back after the journal is reopened."""
+        journal = SpillJournal(self.path, 4096)
+        self.assertTrue(journal.append(row("a")))
+        self.assertTrue(journal.append(row("a", "COMPLETE")))
+        journal.close()
+
+        journal = SpillJournal(self.path, 4096)
+        self.assertEqual([r[3] for r in journal.read()], ["START", "COMPLETE"])
+        journal.close()
+
+    def test_discard_keeps_later_entries(self):
+        """Discarding up to a mark keeps later rows and removes an empty journal."""
+        journal = SpillJournal(self.path, 4096)
+        journal.append(row("a"))
+        mark = journal.mark()
+        journal.append(row("b"))
+        journal.discard(mark)
+        journal.append(row("c"))
+        self.assertEqual([r[0] for r in journal.read()], ["b", "c"])
+        journal.discard(journal.mark())
+        self.assertTrue(journal.is_empty())
+        journal.close()
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_full_journal_refuses_rows(self):
+        """Rows that do not fit are refused instead of overwriting earlier ones."""
+        journal = SpillJournal(self.path, 256)
+        results = [journal.append(row(f"id-{i}")) for i in range(10)]
+        self.assertIn(False, results)
+        self.assertEqual(len(journal.read()), results.index(False))
+        journal.close()
+
+    def test_torn_entry_ends_journal(self):
+        """A corrupt entry ends the journal without losing the entries before it."""
+        journal = SpillJournal(self.path, 4096)
+        journal.append(row("a"))
+        end = journal.mark()
+        journal.append(row("b"))
+        journal._map[end + 20] ^= 0xFF
+        journal.close()
+
+        journal = SpillJournal(self.path, 4096)
+        self.assertEqual([r[0] for r in journal.read()], ["a"])
+        journal.close()
+
+
+class TestTraceManagerSpill(unittest.TestCase):
+    """Test spilling and replaying unflushed traces in TraceManager."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, "spill.db")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_traces_from_killed_process_are_replayed(self):
+        """Traces journaled by a killed process are stored by the next tracer."""
+        code = (
+            "import os\n"
+            "from agenttrace import TraceManager\n"
+            f"tm = TraceManager(db_path={self.db_path!r}, colored_logging=False, spill_journal=True)\n"
+            "tm.save_interval = float('inf')\n"
+            "sid = tm.add_trace('START', 'crashy', args={'x': 1}, session_id='s1')\n"
+            "tm.add_trace('END', 'crashy', result='partial', duration=2.0, session_id=sid)\n"
+            "tm.add_trace('START', 'unfinished', session_id='s1')\n"
+            "os._exit(1)\n"
+        )
+        env = dict(os.environ, PYTHONPATH=SRC + os.pathsep + os.environ.get("PYTHONPATH", ""))
+        subprocess.run([sys.executable, "-c", code], env=env, cwd=self.tmpdir.name)
+        self.assertTrue(os.path.exists(self.db_path + ".spill"))
+
+        tm = TraceManager(name="spill-replay", db_path=self.db_path, colored_logging=False, spill_journal=True)
+        try:
+            traces = {t["function"]: t for t in tm.get_traces(session_id="s1")}
+            self.assertEqual(traces["crashy"]["type"], "COMPLETE")
+            self.assertEqual(traces["crashy"]["result"], "partial")
+            self.assertEqual(traces["unfinished"]["type"], "START")
+        finally:
+            tm.close()
+        self.assertFalse(os.path.exists(self.db_path + ".spill"))
+
+    def test_each_state_is_encoded_once(self):
+        """Journaled rows are reused at flush and their data is not re-encoded as a string."""
+        tm = TraceManager(name="spill-encode", db_path=self.db_path, colored_logging=False, spill_journal=True)
+        tm.save_interval = float("inf")
+        try:
+            with mock.patch.object(SpanRecord, "to_row", autospec=True, side_effect=SpanRecord.to_row) as to_row:
+                sid = tm.add_trace("START", "encoded", args={"q": "x"}, session_id="enc")
+                tm.add_trace("END", "encoded", result={"text": "y"}, duration=1.0, session_id=sid)
+                self.assertIn(b'"result": {"text": "y"}', bytes(tm._spill._map[:tm._spill.mark()]))
+                tm.save_traces()
+            self.assertEqual(to_row.call_count, 2)
+            [trace] = tm.get_traces(session_id="enc")
+            self.assertEqual(trace["result"], {"text": "y"})
+        finally:
+            tm.close()
+
+    def test_full_buffer_spills_instead_of_dropping(self):
+        """Traces past max_buffer_size go to the journal instead of being dropped."""
+        tm = TraceManager(name="spill-burst", db_path=self.db_path, colored_logging=False,
+                          spill_journal=True, max_buffer_size=2)
+        tm.save_interval = float("inf")
+        try:
+            for i in range(5):
+                sid = tm.add_trace("START", f"burst_{i}", session_id="burst")
+                tm.add_trace("END", f"burst_{i}", result=i, duration=1.0, session_id=sid)
+            metrics = tm.metrics()
+            self.assertEqual(metrics["spans_dropped"], 0)
+            self.assertEqual(metrics["spans_spilled"], 3)
+            self.assertEqual(len(tm.traces), 2)
+
+            tm.save_traces()
+            traces = tm.get_traces(session_id="burst")
+            self.assertEqual(len(traces), 5)
+            self.assertTrue(all(t["type"] == "COMPLETE" for t in traces))
+            self.assertTrue(tm._spill.is_empty())
+        finally:
+            tm.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
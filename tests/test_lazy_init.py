@@ -0,0 +1,64 @@
+"""
+Tests for lazy imports and deferred database setup.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from agenttrace.db import METRIC_COLUMNS
+from agenttrace.storage import SQLiteBackend
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+
+def run_python(code, cwd):
+    env = dict(os.environ, PYTHONPATH=SRC + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    return subprocess.run([sys.executable, "-c", code], cwd=cwd, env=env, capture_output=True, text=True, check=True)
+
+
+class TestLazyInit(unittest.TestCase):
+    def test_cli_does_not_import_engine(self):
+        """Importing the package and the CLI loads neither the tracing engine nor sqlite3."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            result = run_python(
+                "import sys, agenttrace, agenttrace.cli; "
+                "print('agenttrace.agenttrace' in sys.modules, 'sqlite3' in sys.modules)",
+                tmpdir,
+            )
+        self.assertEqual(result.stdout.split(), ["False", "False"])
+
+    def test_database_opened_on_first_use(self):
+        """The database file is only created when the first trace is saved."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            result = run_python(
+                "import os\n"
+                "from agenttrace import TraceManager\n"
+                "tm = TraceManager(db_path='lazy.db', colored_logging=False)\n"
+                "print(os.path.exists('lazy.db'))\n"
+                "tm.add_trace('START', 'f', session_id='s')\n"
+                "tm.save_traces()\n"
+                "print(os.path.exists('lazy.db'), len(tm.get_traces(session_id='s')))\n",
+                tmpdir,
+            )
+        self.assertEqual(result.stdout.split(), ["False", "True", "1"])
+
+    def test_recreated_database_gets_its_tables(self):
+        """Reopening a database that was deleted in the meantime creates its tables again."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db_path = os.path.join(tmpdir, "traces.db")
+            for _ in range(2):
+                backend = SQLiteBackend(db_path)
+                backend.open()
+                backend.write_traces([("t1", "s", "2025-01-01T00:00:00", "COMPLETE", "f", "[]", "{}")
+                                      + (None,) * len(METRIC_COLUMNS)])
+                backend.write_eval_event(("e1", "eval", "s", "2025-01-01T00:00:00", "start", "eval", "{}"))
+                self.assertEqual(len(backend.query_traces(session_id="s")), 1)
+                backend.close()
+                os.remove(db_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
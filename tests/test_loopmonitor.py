@@ -0,0 +1,102 @@
+"""
+Tests for the event-loop lag monitor.
+"""
+
+import asyncio
+import threading
+import time
+import unittest
+from unittest import mock
+from agenttrace.spans import Span
+from helpers import TracerTestCase
+
+
+class TestLoopMonitor(TracerTestCase):
+    """Test stall detection and attribution."""
+
+    tracer_name = "loop-monitor"
+
+    def setUp(self):
+        super().setUp()
+        self.tm.save_interval = float("inf")
+
+    def test_stall_is_attributed_to_blocking_coroutine(self):
+        """A stall is recorded as an event on the coroutine that blocked the loop."""
+        @self.tm.trace
+        async def blocker():
+            await asyncio.sleep(0.05)
+            time.sleep(0.25)
+            await asyncio.sleep(0.05)
+
+        @self.tm.trace
+        async def polite():
+            for _ in range(10):
+                await asyncio.sleep(0.02)
+
+        async def main():
+            async with self.tm.monitor_event_loop(interval_ms=10, threshold_ms=80) as monitor:
+                await asyncio.gather(asyncio.create_task(blocker(), name="blocker-task"), polite())
+                await asyncio.sleep(0.05)
+            return monitor
+
+        before = self.tm.metrics()["loop_stalls"]
+        monitor = asyncio.run(main())
+        self.assertGreaterEqual(monitor.stalls, 1)
+        self.assertEqual(self.tm.metrics()["loop_stalls"], before + monitor.stalls)
+        self.assertGreaterEqual(self.tm.metrics()["loop_stall_ms"]["max"], 150)
+
+        [stall] = [event for event in self.stored("blocker").get("events", []) if event[1] == "loop.stall"]
+        self.assertEqual(stall[2]["task"], "blocker-task")
+        self.assertGreaterEqual(stall[2]["blocked_ms"], 150)
+        self.assertNotIn("events", self.stored("polite"))
+
+    def test_quiet_loop_records_lag_without_stalls(self):
+        """A loop that is never blocked records lag but no stalls."""
+        async def main():
+            monitor = self.tm.monitor_event_loop(interval_ms=5, threshold_ms=200)
+            try:
+                await asyncio.sleep(0.1)
+            finally:
+                monitor.stop()
+            return monitor
+
+        before = self.tm.metrics()["loop_lag_ms"]["count"]
+        monitor = asyncio.run(main())
+        self.assertEqual(monitor.stalls, 0)
+        self.assertGreater(self.tm.metrics()["loop_lag_ms"]["count"], before)
+
+    def test_overlapping_flushes(self):
+        """A flush finishing on one thread does not hide a flush still running on another."""
+        release = threading.Event()
+        flushing = []
+
+        def slow_flush():
+            flushing.append(threading.get_ident())
+            release.wait(5)
+
+        self.tm.add_trace("COMPLETE", "f", session_id="s")
+        with mock.patch.object(self.tm, "_flush", slow_flush):
+            slow = threading.Thread(target=self.tm.save_traces)
+            slow.start()
+            while not flushing:
+                time.sleep(0.001)
+            with mock.patch.object(self.tm, "_flush", lambda: None):
+                self.tm.save_traces()
+            self.assertEqual(self.tm._flush_threads, {slow.ident})
+            release.set()
+            slow.join()
+        self.assertEqual(self.tm._flush_threads, set())
+
+    def test_stall_updates_replace_event_attributes(self):
+        """Updating a stall's duration gives the event a new dict instead of changing the old one."""
+        span = Span("f", "s")
+        attributes = span.add_event("loop.stall", blocked_ms=100.0, task=None)
+        updated = span.update_event(attributes, blocked_ms=250.0)
+        self.assertEqual(attributes["blocked_ms"], 100.0)
+        self.assertEqual(updated, {"blocked_ms": 250.0, "task": None})
+        self.assertIs(span.events[0][2], updated)
+        self.assertIsNone(span.update_event(attributes, blocked_ms=300.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+"""
+Tests for the tracer's self-instrumentation metrics.
+"""
+
+import unittest
+import urllib.request
+import uuid
+from agenttrace import TraceManager
+from agenttrace.metrics import PROMETHEUS_CONTENT_TYPE, TracerMetrics, render_prometheus
+
+
+class TestTracerMetrics(unittest.TestCase):
+    """Test the tracer self-instrumentation metrics."""
+
+    def setUp(self):
+        self.tm = TraceManager()
+        # Keep the timed auto-flush of the shared default tracer out of the counts.
+        self.save_interval = self.tm.save_interval
+        self.tm.save_interval = float("inf")
+
+    def tearDown(self):
+        self.tm.save_interval = self.save_interval
+
+    def test_flush_updates_counters_and_histograms(self):
+        """A flush updates the span, byte and flush counters and the timing histograms."""
+        before = self.tm.metrics()
+        session_id = str(uuid.uuid4())
+        self.tm.add_trace("START", "measured", args={"x": 1}, session_id=session_id)
+        self.tm.add_trace("END", "measured", result={"y": 2}, duration=1.0, session_id=session_id)
+        self.assertEqual(self.tm.metrics()["spans_recorded"], before["spans_recorded"] + 1)
+        self.assertGreaterEqual(self.tm.metrics()["buffer_depth"], 1)
+
+        self.tm.save_traces()
+        after = self.tm.metrics()
+        self.assertEqual(after["buffer_depth"], 0)
+        self.assertEqual(after["flushes"], before["flushes"] + 1)
+        self.assertGreater(after["bytes_written"], before["bytes_written"])
+        self.assertEqual(after["flush_duration_ms"]["count"], before["flush_duration_ms"]["count"] + 1)
+        self.assertEqual(after["serialization_ms"]["count"], before["serialization_ms"]["count"] + 2)
+
+    def test_sampling_and_buffer_limit(self):
+        """Sampled-out calls and buffer overflows are counted."""
+        @self.tm.trace
+        def sampled(x):
+            return x
+
+        before = self.tm.metrics()
+        self.tm.sample_rate = 0.0
+        try:
+            self.assertEqual(sampled(3), 3)
+        finally:
+            self.tm.sample_rate = 1.0
+        self.assertEqual(self.tm.metrics()["spans_sampled_out"], before["spans_sampled_out"] + 1)
+        self.assertEqual(self.tm.metrics()["buffer_depth"], before["buffer_depth"])
+
+        self.tm.max_buffer_size = len(self.tm.traces)
+        try:
+            self.tm.add_trace("START", "dropped", session_id=str(uuid.uuid4()))
+        finally:
+            self.tm.max_buffer_size = None
+        self.assertEqual(self.tm.metrics()["spans_dropped"], before["spans_dropped"] + 1)
+
+    def test_prometheus_rendering(self):
+        """Metrics render in the Prometheus text format."""
+        metrics = TracerMetrics()
+        metrics.spans_recorded = 5
+        metrics.record_flush(rows=5, nbytes=100, duration_ms=2.0, buffer_depth=5)
+        text = render_prometheus(metrics.snapshot(buffer_depth=3))
+        self.assertIn("# TYPE agenttrace_spans_recorded_total counter", text)
+        self.assertIn("agenttrace_spans_recorded_total 5\n", text)
+        self.assertIn("agenttrace_buffer_depth 3\n", text)
+        self.assertIn("agenttrace_max_buffer_depth 5\n", text)
+        self.assertIn('agenttrace_flush_duration_ms{quantile="0.5"} 2.0', text)
+        self.assertIn("agenttrace_rows_per_flush_count 1\n", text)
+
+    def test_metrics_endpoint(self):
+        """serve_metrics exposes the metrics over HTTP."""
+        server = self.tm.serve_metrics(port=0)
+        try:
+            host, port = server.server_address[:2]
+            with urllib.request.urlopen(f"http://{host}:{port}/metrics", timeout=5) as response:
+                self.assertEqual(response.headers["Content-Type"], PROMETHEUS_CONTENT_TYPE)
+                body = response.read().decode("utf-8")
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertIn("agenttrace_spans_recorded_total", body)
+
+
+if __name__ == "__main__":
+    unittest.main()
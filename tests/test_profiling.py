@@ -0,0 +1,133 @@
+"""
+Tests for tail-triggered stack profiling of slow and failing spans.
+"""
+
+import asyncio
+import os
+import sys
+import time
+import unittest
+from unittest import mock
+from agenttrace.cli import main
+from agenttrace.profiling import merge_profiles, to_folded
+from helpers import TracerTestCase
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class TestProfiling(TracerTestCase):
+    """Test tail-triggered profiling of traced calls."""
+
+    tracer_name = "profiling"
+    tracer_options = {"profile_slow_ms": 50, "profile_interval_ms": 1}
+
+    def test_slow_call_keeps_stacks_and_fast_call_discards_them(self):
+        """Only calls slower than the threshold keep their stack samples."""
+        @self.tm.trace
+        def slow():
+            busy(0.15)
+
+        @self.tm.trace
+        def fast():
+            return 1
+
+        slow()
+        fast()
+        profile = self.stored("slow")["profile"]
+        self.assertGreater(profile["samples"], 0)
+        self.assertEqual(sum(profile["stacks"].values()), profile["samples"])
+        for stack in profile["stacks"]:
+            self.assertTrue(stack.startswith("TestProfiling.test_slow_call_keeps_stacks_and_fast_call_discards_them.<locals>.slow"
+                                             if sys.version_info >= (3, 11) else "slow"))
+        self.assertTrue(any("busy" in stack for stack in profile["stacks"]))
+        self.assertNotIn("profile", self.stored("fast"))
+
+    def test_failed_call_is_recorded_with_error_and_profile(self):
+        """A call that raises keeps its profile regardless of the threshold."""
+        @self.tm.trace(profile=10_000)
+        def broken():
+            busy(0.03)
+            raise ValueError("bad input")
+
+        with self.assertRaises(ValueError):
+            broken()
+        row = self.stored("broken")
+        self.assertEqual(row["type"], "COMPLETE")
+        self.assertEqual(row["error"], {"type": "ValueError", "message": "bad input"})
+        self.assertIn("profile", row)
+
+    def test_profiling_can_be_disabled_per_function(self):
+        """profile=False turns sampling off for one function."""
+        @self.tm.trace(profile=False)
+        def slow():
+            busy(0.1)
+
+        slow()
+        self.assertNotIn("profile", self.stored("slow"))
+
+    def test_async_tasks_are_sampled_while_running(self):
+        """Coroutines are sampled while one of their steps is running."""
+        @self.tm.trace
+        async def worker():
+            busy(0.08)
+            await asyncio.sleep(0.08)
+
+        asyncio.run(worker())
+        profile = self.stored("worker")["profile"]
+        self.assertGreater(profile["samples"], 0)
+        # Time spent suspended in sleep is not attributed to the coroutine.
+        busy_samples = sum(count for stack, count in profile["stacks"].items() if "busy" in stack)
+        self.assertGreaterEqual(busy_samples, 0.9 * profile["samples"])
+
+    def test_concurrent_calls_of_one_coroutine_are_kept_apart(self):
+        """Samples go to the call that was running, not to every call of the same coroutine."""
+        @self.tm.trace
+        async def call(work):
+            await asyncio.sleep(0)
+            if work:
+                busy(0.15)
+            else:
+                await asyncio.sleep(0.15)
+
+        async def main():
+            await asyncio.gather(call(True), call(False))
+
+        asyncio.run(main())
+        self.tm.save_traces()
+        profiles = {t["args"]["work"]: t.get("profile") for t in self.tm.get_traces(function_name="call")}
+        self.assertTrue(any("busy" in stack for stack in profiles[True]["stacks"]))
+        idle = profiles[False] or {"samples": 0, "stacks": {}}
+        self.assertFalse(any("busy" in stack for stack in idle["stacks"]))
+        self.assertLess(idle["samples"], 0.1 * profiles[True]["samples"])
+
+    def test_folded_export(self):
+        """agenttrace profile writes merged stacks in folded format."""
+        @self.tm.trace
+        def slow():
+            busy(0.1)
+
+        slow()
+        slow()
+        self.tm.save_traces()
+        traces = self.tm.get_traces(function_name="slow")
+        merged = merge_profiles(traces)
+        self.assertEqual(sum(merged.values()), sum(t["profile"]["samples"] for t in traces))
+        for line in to_folded(merged).splitlines():
+            stack, count = line.rsplit(" ", 1)
+            self.assertGreater(int(count), 0)
+            self.assertNotIn("\n", stack)
+
+        output = os.path.join(self.tmpdir.name, "out.folded")
+        with mock.patch.object(sys, "argv", ["agenttrace", "profile", "--db", self.db_path, "--function", "slow",
+                                             "-o", output]):
+            self.assertEqual(main(), 0)
+        with open(output) as f:
+            self.assertEqual(f.read(), to_folded(merged))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+"""
+Tests for the compact buffered trace records.
+"""
+
+import os
+import tempfile
+import unittest
+from agenttrace import TraceManager
+from agenttrace.records import SpanRecord, intern_tags
+
+
+class TestSpanRecords(unittest.TestCase):
+    """Test buffering traces as slotted span records."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.tm = TraceManager(name="records", db_path=os.path.join(self.tmpdir.name, "records.db"),
+                               colored_logging=False)
+        self.tm.save_interval = float("inf")
+
+    def tearDown(self):
+        self.tm.close()
+        self.tmpdir.cleanup()
+
+    def test_end_completes_start_in_place(self):
+        """An END completes its buffered START record instead of adding a row."""
+        session_id = self.tm.add_trace("START", "step", args={"x": 1}, tags=["agent"])
+        self.tm.add_trace("START", "other", args={"x": 2}, session_id=session_id)
+        self.tm.add_trace("END", "step", result={"y": 2}, duration=3.0, session_id=session_id)
+
+        self.assertEqual(len(self.tm.traces), 2)
+        record = self.tm.traces[0]
+        self.assertIsInstance(record, SpanRecord)
+        self.assertEqual(record.trace_type, "COMPLETE")
+
+        self.tm.save_traces()
+        [row] = self.tm.get_traces(function_name="step")
+        self.assertEqual(row["type"], "COMPLETE")
+        self.assertEqual(row["args"], {"x": 1})
+        self.assertEqual(row["result"], {"y": 2})
+        self.assertEqual(row["duration_ms"], 3.0)
+        self.assertEqual(row["tags"], ["agent"])
+
+    def test_end_after_flush_replaces_start_row(self):
+        """An END arriving after its START was flushed rewrites the stored row."""
+        session_id = self.tm.add_trace("START", "slow", args={"x": 1})
+        self.tm.save_traces()
+        self.assertEqual(self.tm.get_traces(function_name="slow")[0]["type"], "START")
+
+        self.tm.add_trace("END", "slow", result="done", duration=5.0, session_id=session_id)
+        self.tm.save_traces()
+        [row] = self.tm.get_traces(function_name="slow")
+        self.assertEqual(row["type"], "COMPLETE")
+        self.assertEqual(row["args"], {"x": 1})
+        self.assertEqual(row["result"], "done")
+
+    def test_decorated_call_flushed_midway(self):
+        """A traced call that flushes while running is stored as one COMPLETE row."""
+        tm = self.tm
+
+        @tm.trace
+        def long_call():
+            tm.save_traces()
+            return "ok"
+
+        long_call()
+        tm.save_traces()
+        [row] = tm.get_traces(function_name="long_call")
+        self.assertEqual(row["type"], "COMPLETE")
+        self.assertEqual(row["result"], "ok")
+
+    def test_unmatched_end_is_stored_on_its_own(self):
+        """An END without a START is stored as its own row."""
+        self.tm.add_trace("END", "orphan", result=1, duration=1.0, session_id="s")
+        self.tm.save_traces()
+        [row] = self.tm.get_traces(function_name="orphan")
+        self.assertEqual(row["type"], "END")
+
+    def test_names_and_tags_are_interned(self):
+        """Equal function names and tag lists share one object."""
+        first = SpanRecord("START", "".join(["tool", "_call"]), "s", ["a", "b"])
+        second = SpanRecord("START", "".join(["tool", "_", "call"]), "s", ["a", "b"])
+        self.assertIs(first.function_name, second.function_name)
+        self.assertIs(first.tags, second.tags)
+        self.assertIsNone(intern_tags([]))
+
+
+if __name__ == "__main__":
+    unittest.main()
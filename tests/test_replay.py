@@ -0,0 +1,194 @@
+"""
+Tests for record/replay of traced calls.
+"""
+
+import asyncio
+import os
+import sqlite3
+import tempfile
+import unittest
+from agenttrace import ReplayMissError, TraceManager
+
+
+class Choice:
+    def __init__(self, content):
+        self.content = content
+
+
+class Response:
+    def __init__(self, choices):
+        self.choices = choices
+
+
+class TestReplay(unittest.TestCase):
+    """Test recording and replaying traced calls."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, "replay.db")
+        self.calls = []
+
+    def tracer(self, mode, name="replay"):
+        tm = TraceManager(name=name, db_path=self.db_path, colored_logging=False, replay_mode=mode)
+        self.addCleanup(tm.close)
+        return tm
+
+    def decorate(self, tm, **options):
+        @tm.trace(**options)
+        def complete(prompt, temperature=0.0, client=None):
+            self.calls.append(prompt)
+            return {"text": prompt.upper(), "temperature": temperature}
+        return complete
+
+    def test_record_then_replay_from_store(self):
+        """Calls recorded by one tracer are replayed from the database by another."""
+        recorder = self.tracer("record", name="recorder")
+        complete = self.decorate(recorder, replay_ignore=["client"])
+        self.assertEqual(complete("hi", client=object()), {"text": "HI", "temperature": 0.0})
+        recorder.close()
+
+        replayer = self.tracer("replay", name="replayer")
+        complete = self.decorate(replayer, replay_ignore=["client"])
+        # Same bound arguments, passed differently.
+        self.assertEqual(complete(prompt="hi", temperature=0.0, client=object()), {"text": "HI", "temperature": 0.0})
+        self.assertEqual(self.calls, ["hi"])
+        with self.assertRaises(ReplayMissError):
+            complete("other")
+        self.assertEqual(self.calls, ["hi"])
+        self.assertEqual(replayer.metrics()["replay_hits"], 1)
+
+        replayer.save_traces()
+        replayed = [t for t in replayer.get_traces(function_name="complete") if "replayed_from" in t]
+        self.assertEqual(len(replayed), 1)
+
+    def test_record_missing_calls_through_once(self):
+        """record_missing calls through for new arguments and replays repeats."""
+        tm = self.tracer("record_missing")
+        complete = self.decorate(tm)
+        first = complete("a")
+        first["text"] = "mutated"
+        self.assertEqual(complete("a"), {"text": "A", "temperature": 0.0})
+        self.assertEqual(complete("a", 0.5)["temperature"], 0.5)
+        self.assertEqual(self.calls, ["a", "a"])
+
+    def test_replay_returns_original_container_types(self):
+        """Tuples, sets and bytes replay as themselves, including the standard (processed, raw) tuple."""
+        recorder = self.tracer("record", name="recorder")
+
+        @recorder.trace
+        def chat(prompt):
+            self.calls.append(prompt)
+            return f"hi {prompt}", {"ids": (1, 2), "tags": {"a"}, "raw": b"\x00\xff", 3: None}
+
+        expected = chat("a")
+        recorder.close()
+
+        replayer = self.tracer("replay", name="replayer")
+
+        @replayer.trace
+        def chat(prompt):
+            self.calls.append(prompt)
+
+        for _ in range(2):
+            replayed = chat("a")
+            self.assertEqual(replayed, expected)
+            self.assertIsInstance(replayed, tuple)
+            self.assertIsInstance(replayed[1]["ids"], tuple)
+        self.assertEqual(self.calls, ["a"])
+
+    def test_objects_without_json_form_are_not_recorded(self):
+        """Results that cannot be stored as JSON are skipped with a warning and miss in replay."""
+        recorder = self.tracer("record", name="recorder")
+
+        @recorder.trace
+        def chat(prompt):
+            return Response([Choice(f"hi {prompt}")])
+
+        with self.assertLogs(level="WARNING") as logs:
+            chat("a")
+        self.assertTrue(any("Not recording chat for replay" in line for line in logs.output))
+        recorder.close()
+
+        replayer = self.tracer("replay", name="replayer")
+        chat = replayer.trace(chat.__wrapped__)
+        with self.assertRaises(ReplayMissError):
+            chat("a")
+
+    def test_pickled_results_are_never_loaded(self):
+        """A replay_result that is not tagged JSON, such as a pickle, is ignored rather than loaded."""
+        recorder = self.tracer("record", name="recorder")
+        self.decorate(recorder)("a")
+        recorder.close()
+        conn = sqlite3.connect(self.db_path)
+        with conn:
+            conn.execute("UPDATE traces SET replay_result = ? WHERE args_hash IS NOT NULL",
+                         ("gASVIAAAAAAAAACMCGJ1aWx0aW5zlIwEZXZhbJSTlIwBMZSFlFKULg==",))
+        conn.close()
+
+        complete = self.decorate(self.tracer("replay", name="replayer"))
+        with self.assertLogs(level="WARNING"), self.assertRaises(ReplayMissError):
+            complete("a")
+
+    def test_unbindable_arguments_raise_type_error_in_replay(self):
+        """Arguments that do not match the signature raise the call's TypeError, not a replay miss."""
+        complete = self.decorate(self.tracer("replay"))
+        with self.assertRaises(TypeError):
+            complete("a", unknown=1)
+
+    def test_per_function_override_and_async(self):
+        """replay=False opts a function out, and coroutines are replayed too."""
+        tm = self.tracer("record_missing")
+        untouched = self.decorate(tm, replay=False)
+        untouched("x")
+        untouched("x")
+        self.assertEqual(self.calls, ["x", "x"])
+
+        @tm.trace
+        async def fetch(query):
+            self.calls.append(query)
+            await asyncio.sleep(0)
+            return [query]
+
+        self.assertEqual(asyncio.run(fetch("q")), ["q"])
+        self.assertEqual(asyncio.run(fetch("q")), ["q"])
+        self.assertEqual(self.calls.count("q"), 1)
+
+    def test_failed_calls_are_not_replayed(self):
+        """Calls that raised are called again instead of being replayed."""
+        tm = self.tracer("record_missing")
+
+        @tm.trace
+        def flaky(x):
+            self.calls.append(x)
+            if len(self.calls) == 1:
+                raise RuntimeError("transient")
+            return x
+
+        with self.assertRaises(RuntimeError):
+            flaky(1)
+        self.assertEqual(flaky(1), 1)
+        self.assertEqual(flaky(1), 1)
+        self.assertEqual(len(self.calls), 2)
+
+    def test_lookup_uses_index(self):
+        """Replay lookups use the args_hash index."""
+        tm = self.tracer("record")
+        self.decorate(tm)("hi")
+        tm.save_traces()
+        conn = sqlite3.connect(self.db_path)
+        try:
+            plan = " ".join(str(row) for row in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT id FROM traces WHERE args_hash = ? AND function_name = ? "
+                "ORDER BY timestamp DESC LIMIT 1", ("h", "complete")))
+        finally:
+            conn.close()
+        self.assertIn("idx_args_hash", plan)
+
+    def test_unknown_mode(self):
+        """An unknown replay mode is rejected."""
+        with self.assertRaises(ValueError):
+            TraceManager(name="bad-replay", db_path=self.db_path, replay_mode="sometimes")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,225 @@
+"""
+Tests for adaptive concurrency, rate limiting and retries in evaluations.
+"""
+
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import unittest
+from agenttrace import EvalScheduler, RetryPolicy, TraceManager, TracerEval
+from agenttrace.scheduling import AIMDController, TokenBucket, is_rate_limit, is_retryable, retry_after
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class FakeProvider:
+    """Accepts at most ``capacity`` concurrent calls and rejects the rest with a 429."""
+
+    def __init__(self, capacity, latency=0.01):
+        self.capacity = capacity
+        self.latency = latency
+        self.in_flight = 0
+        self.peak = 0
+        self.rejected = 0
+
+    async def __call__(self, question):
+        if self.in_flight >= self.capacity:
+            self.rejected += 1
+            raise RateLimitError("Too many requests")
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+        return question.upper()
+
+
+class TestController(unittest.TestCase):
+    def test_additive_increase_multiplicative_decrease(self):
+        """The limit grows per window of successes and halves once per overload burst."""
+        controller = AIMDController(initial=4, maximum=10, latency_tolerance=None)
+        for _ in range(8):
+            controller.on_success(0.01, time.monotonic())
+        self.assertEqual(controller.allowed, 5)
+
+        started = time.monotonic()
+        controller.on_overload(started)
+        self.assertEqual(controller.allowed, 2)
+        controller.on_overload(started)
+        self.assertEqual(controller.allowed, 2)
+        controller.on_overload(time.monotonic())
+        self.assertEqual(controller.allowed, 1)
+        controller.on_overload(time.monotonic())
+        self.assertEqual(controller.allowed, 1)
+
+    def test_slow_calls_count_as_overload(self):
+        """A call far slower than the moving average halves the limit."""
+        controller = AIMDController(initial=8, latency_tolerance=3.0)
+        for _ in range(5):
+            controller.on_success(0.01, time.monotonic())
+        controller.on_success(0.5, time.monotonic())
+        self.assertEqual(controller.allowed, 4)
+        self.assertEqual(controller.decreases, 1)
+
+
+class TestRetryPolicy(unittest.TestCase):
+    def test_classification(self):
+        """Rate limits and timeouts are retryable, and Retry-After is parsed."""
+        self.assertTrue(is_rate_limit(RateLimitError("slow down")))
+        self.assertTrue(is_retryable(RateLimitError("slow down")))
+        self.assertTrue(is_retryable(asyncio.TimeoutError()))
+        self.assertFalse(is_retryable(ValueError("bad input")))
+        self.assertEqual(retry_after(RateLimitError("slow down", retry_after="2")), 2.0)
+        self.assertIsNone(retry_after(ValueError()))
+
+    def test_delay(self):
+        """Backoff stays under its ceiling and honours capped Retry-After values."""
+        policy = RetryPolicy(base_delay=1.0, max_delay=5.0)
+        for retries in range(1, 8):
+            self.assertTrue(0 <= policy.delay(retries) <= min(5.0, 2 ** (retries - 1)))
+        self.assertEqual(policy.delay(1, RateLimitError("slow down", retry_after=3)), 3.0)
+        self.assertEqual(policy.delay(1, RateLimitError("slow down", retry_after=60)), 5.0)
+        self.assertFalse(RetryPolicy(max_retries=2).should_retry(RateLimitError("x"), 2))
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_rate(self):
+        """Acquiring beyond the capacity waits for the bucket to refill."""
+        async def main():
+            bucket = TokenBucket(rate=100, capacity=1)
+            start = time.monotonic()
+            for _ in range(6):
+                await bucket.acquire()
+            return time.monotonic() - start
+
+        self.assertGreaterEqual(asyncio.run(main()), 0.045)
+
+
+class TestScheduler(unittest.TestCase):
+    def test_adapts_to_provider_limit(self):
+        """Calls converge on the provider's capacity and every one eventually succeeds."""
+        provider = FakeProvider(capacity=4)
+        scheduler = EvalScheduler(initial_concurrency=2, max_concurrency=16, latency_tolerance=None,
+                                  retry=RetryPolicy(max_retries=20, base_delay=0.005))
+
+        async def main():
+            return await asyncio.gather(*(scheduler.call(provider, f"q{i}") for i in range(60)))
+
+        outcomes = asyncio.run(main())
+        self.assertEqual([result for result, _, _ in outcomes], [f"Q{i}" for i in range(60)])
+        self.assertTrue(all(error is None for _, error, _ in outcomes))
+        stats = scheduler.stats()
+        self.assertEqual(stats["completed"], 60)
+        self.assertEqual(stats["retries"], sum(retries for _, _, retries in outcomes))
+        self.assertEqual(stats["rate_limited"], provider.rejected)
+        self.assertGreater(stats["decreases"], 0)
+        self.assertEqual(stats["in_flight"], 0)
+        self.assertLessEqual(provider.peak, 4)
+
+    def test_requests_per_second(self):
+        """Calls beyond the request rate wait their turn."""
+        scheduler = EvalScheduler(initial_concurrency=8, requests_per_second=20)
+
+        async def main():
+            start = time.monotonic()
+            await asyncio.gather(*(scheduler.call(lambda x: x, i) for i in range(25)))
+            return time.monotonic() - start
+
+        # A second's worth of requests may start at once; the other five wait 50 ms each.
+        self.assertGreaterEqual(asyncio.run(main()), 0.2)
+
+    def test_sync_calls_use_a_pool_sized_to_the_limit(self):
+        """Synchronous calls are not capped by the loop's default executor."""
+        scheduler = EvalScheduler(initial_concurrency=48, max_concurrency=48, latency_tolerance=None)
+        barrier = threading.Barrier(48, timeout=5)
+
+        async def main():
+            return await asyncio.gather(*(scheduler.call(barrier.wait) for _ in range(48)))
+
+        try:
+            outcomes = asyncio.run(main())
+        finally:
+            scheduler.close()
+        self.assertTrue(all(error is None for _, error, _ in outcomes))
+        self.assertEqual(scheduler.stats()["peak_concurrency"], 48)
+
+
+class TestScheduledEval(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.tm = TraceManager(name="scheduling", db_path=os.path.join(self.tmpdir.name, "eval.db"),
+                               colored_logging=False)
+
+    def tearDown(self):
+        self.tm.close()
+        self.tmpdir.cleanup()
+
+    def test_failures_become_error_results(self):
+        """Cases that keep failing are recorded as error results in order."""
+        provider = FakeProvider(capacity=3)
+
+        async def task(question):
+            if question == "bad":
+                raise ValueError("cannot answer")
+            return await provider(question)
+
+        cases = [{"input": f"q{i}"} for i in range(20)] + [{"input": "bad"}]
+        scheduler = EvalScheduler(initial_concurrency=6, latency_tolerance=None,
+                                  retry=RetryPolicy(max_retries=20, base_delay=0.005))
+        evaluator = TracerEval(name="scheduled", data=lambda: cases, task=task, scores=[lambda output: 1.0],
+                               trial_count=2, tracer=self.tm, scheduler=scheduler)
+        output = asyncio.run(evaluator.run())
+
+        results = output["eval_results"]
+        self.assertEqual([(r["trial"], r["input"]) for r in results],
+                         [(trial, case["input"]) for trial in range(2) for case in cases])
+        failed = [r for r in results if "error" in r]
+        self.assertEqual([(r["input"], r["error"]["type"], r["retries"]) for r in failed],
+                         [("bad", "ValueError", 0)] * 2)
+        self.assertTrue(all(r["output"] == r["input"].upper() for r in results if "error" not in r))
+        self.assertEqual(sum(r["retries"] for r in results), scheduler.stats()["retries"])
+        self.assertLessEqual(provider.peak, 3)
+
+        [stored] = TracerEval.get_eval_results(name="scheduled", tracer=self.tm)
+        self.assertEqual(len(stored["eval_results"]), 42)
+        steps = TracerEval.get_eval_events(event_type="EVAL_STEP", limit=100, tracer=self.tm)
+        self.assertEqual(sum(1 for step in steps if "error" in step), 2)
+
+    def test_failing_worker_cancels_the_others(self):
+        """When one case raises, the cases still running are cancelled."""
+        started, finished = [], []
+
+        async def task(question):
+            started.append(question)
+            await asyncio.sleep(0.01 if question == "q0" else 0.2)
+            finished.append(question)
+            return question
+
+        def on_result(trial, index, result_entry, output):
+            raise RuntimeError("stop")
+
+        cases = [{"input": f"q{i}"} for i in range(8)]
+        evaluator = TracerEval(name="cancelled", data=lambda: cases, task=task, scores=[], tracer=self.tm,
+                               scheduler=EvalScheduler(initial_concurrency=4, max_concurrency=4))
+
+        async def main():
+            with self.assertRaises(RuntimeError):
+                await evaluator._run_cases(self.tm, cases, range(len(cases)), on_result)
+            await asyncio.sleep(0.3)
+
+        asyncio.run(main())
+        self.assertEqual(finished, ["q0"])
+        self.assertEqual(len(started), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,150 @@
+"""
+Tests for the read API server and its live tail.
+"""
+
+import asyncio
+import http.client
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+import urllib.error
+import urllib.request
+
+from agenttrace.db import create_eval_tables, create_trace_tables, rebuild_sessions
+from agenttrace.server import TraceServer
+
+
+def insert_trace(conn, trace_id, function_name="fetch", tags=None, data=None):
+    conn.execute(
+        "INSERT INTO traces (id, session_id, timestamp, trace_type, function_name, tags, data) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (trace_id, "s1", "2025-01-01T00:00:00", "COMPLETE", function_name,
+         json.dumps(tags) if tags else None, json.dumps(data or {"duration_ms": 1.5}))
+    )
+    conn.commit()
+
+
+class TestTraceServer(unittest.TestCase):
+    """Test the read API served by agenttrace serve."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, "traces.db")
+        self.conn = sqlite3.connect(self.db_path)
+        create_trace_tables(self.conn.cursor())
+        create_eval_tables(self.conn.cursor())
+        for i in range(5):
+            insert_trace(self.conn, f"t{i}", tags=["prod"] if i % 2 else None, data={"result": i})
+
+        self.loop = asyncio.new_event_loop()
+        self.server = TraceServer(self.db_path, port=0, poll_interval=0.02, heartbeat=0.5)
+        self.loop.run_until_complete(self.server.start())
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.base = f"http://127.0.0.1:{self.server.port}"
+
+    def tearDown(self):
+        asyncio.run_coroutine_threadsafe(self.server.close(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(5)
+        self.loop.close()
+        self.conn.close()
+        self.tmpdir.cleanup()
+
+    def get(self, path, headers=None):
+        request = urllib.request.Request(self.base + path, headers=headers or {})
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status, dict(response.headers), json.loads(response.read())
+
+    def test_keyset_pagination(self):
+        """Trace listings page newest first through an opaque cursor."""
+        _, _, first = self.get("/api/traces?limit=2")
+        self.assertEqual([t["id"] for t in first["traces"]], ["t4", "t3"])
+        self.assertEqual(first["traces"][1]["tags"], ["prod"])
+        self.assertEqual(first["traces"][0]["result"], 4)
+        self.assertEqual(first["traces"][0]["type"], "COMPLETE")
+
+        _, _, second = self.get(f"/api/traces?limit=2&cursor={first['next_cursor']}")
+        self.assertEqual([t["id"] for t in second["traces"]], ["t2", "t1"])
+        _, _, last = self.get(f"/api/traces?limit=2&cursor={second['next_cursor']}")
+        self.assertEqual([t["id"] for t in last["traces"]], ["t0"])
+        self.assertIsNone(last["next_cursor"])
+
+        _, _, tagged = self.get("/api/traces?tag=prod")
+        self.assertEqual(tagged["count"], 2)
+        _, _, tags = self.get("/api/traces/tags")
+        self.assertEqual(tags["tags"], ["prod"])
+        _, _, results = self.get("/api/evals/results")
+        self.assertEqual(results["results"], [])
+
+    def test_sessions(self):
+        """Session listings read the sessions table and fall back to grouping traces."""
+        rebuild_sessions(self.conn.cursor())
+        self.conn.commit()
+        _, _, sessions = self.get("/api/traces/sessions")
+        self.assertEqual(sessions["sessions"], ["s1"])
+        _, _, summaries = self.get("/api/traces/sessions/summary")
+        [summary] = summaries["sessions"]
+        self.assertEqual((summary["session_id"], summary["span_count"], summary["tags"]), ("s1", 5, ["prod"]))
+
+        self.conn.execute("DROP TABLE sessions")
+        self.conn.commit()
+        _, _, sessions = self.get("/api/traces/sessions")
+        self.assertEqual(sessions["sessions"], ["s1"])
+
+    def test_etag_changes_only_after_writes(self):
+        """Unchanged listings answer 304 until the database is written to."""
+        _, headers, _ = self.get("/api/traces")
+        etag = headers["ETag"]
+        with self.assertRaises(urllib.error.HTTPError) as ctx:
+            self.get("/api/traces", {"If-None-Match": etag})
+        self.assertEqual(ctx.exception.code, 304)
+
+        insert_trace(self.conn, "t5")
+        status, headers, body = self.get("/api/traces", {"If-None-Match": etag})
+        self.assertEqual(status, 200)
+        self.assertNotEqual(headers["ETag"], etag)
+        self.assertEqual(body["traces"][0]["id"], "t5")
+
+    def test_bad_parameters(self):
+        """Invalid parameters answer 400 and unknown paths 404."""
+        with self.assertRaises(urllib.error.HTTPError) as ctx:
+            self.get("/api/traces?limit=abc")
+        self.assertEqual(ctx.exception.code, 400)
+        with self.assertRaises(urllib.error.HTTPError) as ctx:
+            self.get("/api/nothing")
+        self.assertEqual(ctx.exception.code, 404)
+
+    def test_live_tail(self):
+        """The SSE stream resumes after Last-Event-ID and delivers new traces."""
+        connection = http.client.HTTPConnection("127.0.0.1", self.server.port, timeout=5)
+        connection.request("GET", "/api/traces/stream?function=fetch", headers={"Last-Event-ID": "3"})
+        response = connection.getresponse()
+        self.assertEqual(response.headers["Content-Type"], "text/event-stream")
+
+        def next_event():
+            fields = {}
+            while True:
+                line = response.fp.readline().decode("utf-8").rstrip("\n")
+                if not line:
+                    if "data" in fields:
+                        return fields
+                    continue
+                name, _, value = line.partition(": ")
+                fields[name] = value
+
+        event = next_event()
+        self.assertEqual(event["id"], "4")
+        self.assertEqual(json.loads(event["data"])["id"], "t3")
+        next_event()
+        insert_trace(self.conn, "live", data={"result": "new"})
+        insert_trace(self.conn, "other", function_name="skip")
+        event = next_event()
+        self.assertEqual(json.loads(event["data"])["id"], "live")
+        connection.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
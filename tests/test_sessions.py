@@ -0,0 +1,111 @@
+"""
+Tests for the sessions summary table and TraceManager.get_sessions.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+from agenttrace import TraceManager, TracerEval
+from agenttrace.bulk import import_jsonl
+from agenttrace.db import TRACES_TABLE
+
+
+class TestSessions(unittest.TestCase):
+    """Test the sessions summary table."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, "sessions.db")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def tracer(self, name):
+        tm = TraceManager(name=name, db_path=self.db_path, colored_logging=False)
+        self.addCleanup(tm.close)
+        return tm
+
+    def test_summaries_follow_traces_and_evals(self):
+        """Session summaries are kept up to date as traces and evaluations are written."""
+        tm = self.tracer("sessions")
+
+        @tm.trace(tags=["prod"], session_id="run-1")
+        def ok(x):
+            return x
+
+        @tm.trace(session_id="run-1")
+        def fails():
+            raise ValueError("no")
+
+        ok(1)
+        ok(2)
+        with self.assertRaises(ValueError):
+            fails()
+        tm.save_traces()
+        evaluator = TracerEval(name="linked", data=lambda: [{"input": "q"}], task=str.upper, scores=[],
+                               session_id="run-1", tracer=tm)
+        asyncio.run(evaluator.run())
+        [eval_row] = TracerEval.get_eval_results(name="linked", tracer=tm)
+
+        [session] = tm.get_sessions()
+        self.assertEqual(session["session_id"], "run-1")
+        self.assertEqual((session["span_count"], session["error_count"]), (3, 1))
+        self.assertEqual(session["tags"], ["prod"])
+        self.assertEqual(session["eval_ids"], [eval_row["id"]])
+        self.assertLessEqual(session["first_timestamp"], session["last_timestamp"])
+        self.assertGreaterEqual(session["last_timestamp"], eval_row["timestamp"])
+        traces = tm.get_traces(session_id="run-1")
+        self.assertAlmostEqual(session["total_duration_ms"], sum(t.get("duration_ms") or 0 for t in traces))
+
+        @tm.trace(session_id="run-2")
+        def later():
+            return None
+
+        later()
+        tm.save_traces()
+        self.assertEqual([s["session_id"] for s in tm.get_sessions()], ["run-2", "run-1"])
+        self.assertEqual([s["session_id"] for s in tm.get_sessions(limit=1)], ["run-2"])
+
+    def test_existing_database_is_backfilled(self):
+        """Opening an older database fills the sessions table from its traces."""
+        conn = sqlite3.connect(self.db_path)
+        conn.execute(TRACES_TABLE)
+        conn.executemany("INSERT INTO traces VALUES (?, ?, ?, ?, ?, ?, ?)", [
+            ("a", "old", "2024-01-01T00:00:00", "COMPLETE", "f", '["x", "y"]', '{"duration_ms": 2.0}'),
+            ("b", "old", "2024-01-02T00:00:00", "COMPLETE", "f", '["y"]', '{"error": {"type": "E"}}'),
+            ("c", "other", "2024-01-03T00:00:00", "START", "g", None, "not json"),
+        ])
+        conn.commit()
+        conn.close()
+
+        tm = self.tracer("sessions-backfill")
+        sessions = {s["session_id"]: s for s in tm.get_sessions()}
+        self.assertEqual(list(sessions), ["other", "old"])
+        old = sessions["old"]
+        self.assertEqual((old["first_timestamp"], old["last_timestamp"]), ("2024-01-01T00:00:00", "2024-01-02T00:00:00"))
+        self.assertEqual((old["span_count"], old["error_count"], old["tags"]), (2, 1, ["x", "y"]))
+        self.assertEqual(sessions["other"]["error_count"], 0)
+
+    def test_bulk_import_rebuilds_summaries(self):
+        """Session summaries match the rows brought in by a bulk import."""
+        source = os.path.join(self.tmpdir.name, "in.jsonl")
+        with open(source, "w") as f:
+            for i in range(4):
+                f.write(json.dumps({"id": f"t{i}", "session_id": f"s{i % 2}", "timestamp": f"2025-01-01T00:00:0{i}",
+                                    "trace_type": "COMPLETE", "function_name": "f", "duration_ms": 1.5}) + "\n")
+            f.write(json.dumps({"table": "eval_results", "id": "e1", "name": "n", "timestamp": "2025-01-02T00:00:00",
+                                "trial_count": 1, "session_id": "s0", "data": "{}"}) + "\n")
+        import_jsonl(self.db_path, [source])
+
+        tm = self.tracer("sessions-import")
+        sessions = tm.get_sessions()
+        self.assertEqual([(s["session_id"], s["span_count"], s["eval_ids"]) for s in sessions],
+                         [("s0", 2, ["e1"]), ("s1", 2, [])])
+        self.assertEqual(sessions[0]["total_duration_ms"], 3.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
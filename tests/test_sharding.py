@@ -0,0 +1,148 @@
+"""
+Tests for sharded evaluations and merging their partial results.
+"""
+
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
+import unittest
+from agenttrace import TraceManager, TracerEval
+from agenttrace.sharding import case_key, merge_partials, parse_shard, partial_path, shard_of
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+CASES = [{"id": f"case-{i}", "input": f"question {i}"} for i in range(12)]
+
+
+def exact(output):
+    return {"score": float(output.endswith("?"))}
+
+
+def make_eval(tracer, name="sharded", session_id="shard-session"):
+    return TracerEval(name=name, data=lambda: CASES, task=lambda q: q.upper() + "?", scores=[exact],
+                      trial_count=2, session_id=session_id, tracer=tracer)
+
+
+def comparable(results):
+    return [{key: value for key, value in result.items() if key != "duration_ms"} for result in results]
+
+
+class TestShardAssignment(unittest.TestCase):
+    """Test parsing shard specifications and assigning cases to shards."""
+
+    def test_parse_shard(self):
+        """Shard specifications are parsed as index/count and invalid ones rejected."""
+        self.assertEqual(parse_shard("2/4"), (2, 4))
+        for value in ("4/4", "-1/4", "0/0", "1", "a/b"):
+            with self.assertRaises(ValueError):
+                parse_shard(value)
+
+    def test_assignment_is_stable_and_complete(self):
+        """Cases are assigned to shards by a stable hash that uses every shard."""
+        keys = [case_key(case) for case in CASES]
+        shards = [shard_of(key, 3) for key in keys]
+        self.assertEqual(shards, [shard_of(key, 3) for key in keys])
+        self.assertEqual(set(shards), {0, 1, 2})
+        self.assertEqual(case_key({"input": "x"}), case_key({"input": "x"}))
+        self.assertNotEqual(case_key({"input": "x"}), case_key({"input": "y"}))
+
+
+class TestShardedEval(unittest.TestCase):
+    """Test running shards and merging their partial results."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.tm = TraceManager(name="sharding", db_path=os.path.join(self.tmpdir.name, "eval.db"),
+                               colored_logging=False)
+
+    def tearDown(self):
+        self.tm.close()
+        self.tmpdir.cleanup()
+
+    def run_shards(self, count, name="sharded"):
+        return [asyncio.run(make_eval(self.tm, name=name).run_shard(index, count, self.tmpdir.name))
+                for index in range(count)]
+
+    def test_merge_matches_single_process_run(self):
+        """Merging every shard gives the same results and events as one run."""
+        single = asyncio.run(make_eval(self.tm, name="single").run())
+        merged = TracerEval.merge_shards(self.run_shards(3), tracer=self.tm)
+
+        self.assertEqual(comparable(merged["eval_results"]), comparable(single["eval_results"]))
+        self.assertIn("def exact", merged["score_functions_code"][str(exact)])
+        self.assertEqual(merged["score_functions_code"], single["score_functions_code"])
+        self.assertEqual({k: v for k, v in merged["metadata"].items() if k not in ("name", "timestamp")},
+                         {k: v for k, v in single["metadata"].items() if k not in ("name", "timestamp")})
+        [stored] = TracerEval.get_eval_results(name="sharded", tracer=self.tm)
+        self.assertEqual(stored["session_id"], "shard-session")
+        self.assertEqual(comparable(stored["eval_results"]), comparable(single["eval_results"]))
+        self.assertEqual(stored["score_functions_code"], single["score_functions_code"])
+
+        def steps(eval_id):
+            events = TracerEval.get_eval_events(eval_id=eval_id, limit=1000, tracer=self.tm)
+            return sorted((event["event_type"], event.get("trial"), event.get("input"), str(event.get("output")))
+                          for event in events)
+        [single_row] = TracerEval.get_eval_results(name="single", tracer=self.tm)
+        self.assertEqual(steps(stored["id"]), steps(single_row["id"]))
+
+    def test_missing_or_mismatched_shards_are_rejected(self):
+        """Merging refuses missing, repeated or foreign shards without storing anything."""
+        paths = self.run_shards(3)
+        with self.assertRaisesRegex(ValueError, "Missing shard"):
+            merge_partials(paths[:2])
+        with self.assertRaisesRegex(ValueError, "more than once"):
+            merge_partials(paths + paths[:1])
+        other = asyncio.run(make_eval(self.tm, name="other").run_shard(0, 2, self.tmpdir.name))
+        with self.assertRaises(ValueError):
+            merge_partials([other] + paths[1:])
+        self.assertEqual(TracerEval.get_eval_results(name="sharded", tracer=self.tm), [])
+
+    def test_failed_shard_leaves_no_partial(self):
+        """A shard that raises leaves no partial or temporary file behind."""
+        def task(question):
+            raise RuntimeError("boom")
+
+        evaluator = TracerEval(name="failing", data=lambda: CASES, task=task, scores=[], tracer=self.tm)
+        with self.assertRaises(RuntimeError):
+            asyncio.run(evaluator.run_shard(0, 1, self.tmpdir.name))
+        self.assertFalse(os.path.exists(partial_path(self.tmpdir.name, "failing", 0, 1)))
+        self.assertEqual([name for name in os.listdir(self.tmpdir.name) if name.endswith(".tmp")], [])
+
+
+class TestEvalCommand(unittest.TestCase):
+    """Test the agenttrace eval command."""
+
+    def test_local_workers(self):
+        """agenttrace eval --workers runs the shards in subprocesses and stores one merged result."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with open(os.path.join(tmpdir, "my_eval.py"), "w") as f:
+                f.write(textwrap.dedent("""
+                    from agenttrace import TracerEval
+
+                    def exact(output):
+                        return {"score": 1.0}
+
+                    def build():
+                        cases = [{"id": i, "input": f"q{i}"} for i in range(7)]
+                        return TracerEval(name="cli_eval", data=lambda: cases, task=str.upper, scores=[exact])
+                """))
+            env = dict(os.environ, PYTHONPATH=SRC + os.pathsep + os.environ.get("PYTHONPATH", ""))
+            subprocess.run([sys.executable, "-m", "agenttrace.cli", "eval", "my_eval:build", "--workers", "2",
+                            "--db", "cli.db"], cwd=tmpdir, env=env, capture_output=True, text=True, check=True)
+
+            tm = TraceManager(name="sharding-cli", db_path=os.path.join(tmpdir, "cli.db"), colored_logging=False)
+            try:
+                [stored] = TracerEval.get_eval_results(name="cli_eval", tracer=tm)
+                events = TracerEval.get_eval_events(eval_id=stored["id"], limit=100, tracer=tm)
+            finally:
+                tm.close()
+        self.assertEqual([result["output"] for result in stored["eval_results"]], [f"Q{i}" for i in range(7)])
+        self.assertEqual(sorted(event["event_type"] for event in events),
+                         ["EVAL_END", "EVAL_START"] + ["EVAL_STEP"] * 7)
+
+
+if __name__ == "__main__":
+    unittest.main()
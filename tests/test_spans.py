@@ -0,0 +1,115 @@
+"""
+Tests for in-flight span events.
+"""
+
+import asyncio
+import unittest
+from agenttrace import current_span
+from helpers import TracerTestCase
+
+
+class TestSpanEvents(TracerTestCase):
+    """Test recording events on the span of a running call."""
+
+    tracer_name = "span-events"
+    tracer_options = {"max_span_events": 3}
+
+    def test_events_are_stored_with_the_span(self):
+        """Events, measured blocks and nested calls end up on the right span."""
+        tm = self.tm
+
+        @tm.trace
+        def tool(query):
+            current_span().add_event("tool.inner", query=query)
+            return "found"
+
+        @tm.trace
+        def agent_step(prompt):
+            span = tm.current_span()
+            span.add_event("retry", attempt=1, reason="rate_limited")
+            with span.measure("tool:search", query=prompt):
+                tool(prompt)
+            with self.assertRaises(ValueError):
+                with span.measure("tool:broken"):
+                    raise ValueError("bad input")
+            return "done"
+
+        agent_step("capital of France")
+        self.assertFalse(current_span().is_recording)
+
+        row = self.stored("agent_step")
+        names = [event[1] for event in row["events"]]
+        self.assertEqual(names, ["retry", "tool:search", "tool:broken"])
+        offset, _, attrs = row["events"][1]
+        self.assertGreaterEqual(offset, 0)
+        self.assertEqual(attrs["query"], "capital of France")
+        self.assertIn("duration_ms", attrs)
+        self.assertEqual(row["events"][2][2]["error"], "ValueError: bad input")
+        self.assertEqual(self.stored("tool")["events"][0][1:], ["tool.inner", {"query": "capital of France"}])
+
+    def test_event_cap(self):
+        """Events past max_span_events are counted instead of kept."""
+        @self.tm.trace
+        def chatty():
+            for i in range(5):
+                current_span().add_event("step", i=i)
+
+        chatty()
+        row = self.stored("chatty")
+        self.assertEqual(len(row["events"]), 3)
+        self.assertEqual(row["events_dropped"], 2)
+
+    def test_concurrent_tasks_have_separate_spans(self):
+        """Concurrent tasks each record events on their own span."""
+        @self.tm.trace
+        async def worker(label):
+            current_span().add_event("begin", label=label)
+            await asyncio.sleep(0.01)
+            current_span().add_event("end", label=label)
+            return label
+
+        async def main():
+            return await asyncio.gather(worker("a"), worker("b"))
+
+        self.assertEqual(asyncio.run(main()), ["a", "b"])
+        self.tm.save_traces()
+        for row in self.tm.get_traces(function_name="worker"):
+            labels = {event[2]["label"] for event in row["events"]}
+            self.assertEqual(len(labels), 1)
+            self.assertEqual(len(row["events"]), 2)
+
+    def test_events_from_inside_traced_generators(self):
+        """Events added while a traced generator produces chunks are stored with its span."""
+        @self.tm.trace
+        def numbers():
+            for i in range(2):
+                current_span().add_event("chunk", i=i)
+                yield i
+
+        @self.tm.trace
+        async def letters():
+            for letter in "ab":
+                current_span().add_event("chunk", letter=letter)
+                await asyncio.sleep(0)
+                yield letter
+
+        async def consume():
+            return [letter async for letter in letters()]
+
+        self.assertEqual(list(numbers()), [0, 1])
+        self.assertEqual(asyncio.run(consume()), ["a", "b"])
+        self.assertFalse(current_span().is_recording)
+        self.assertEqual([event[2] for event in self.stored("numbers")["events"]], [{"i": 0}, {"i": 1}])
+        self.assertEqual([event[2] for event in self.stored("letters")["events"]], [{"letter": "a"}, {"letter": "b"}])
+
+    def test_non_recording_outside_traced_calls(self):
+        """Outside a traced call, current_span() discards events."""
+        span = current_span()
+        self.assertFalse(span.is_recording)
+        span.add_event("ignored")
+        with span.measure("ignored"):
+            pass
+
+
+if __name__ == "__main__":
+    unittest.main()
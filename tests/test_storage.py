@@ -0,0 +1,212 @@
+"""
+Tests for the storage backends.
+"""
+
+import asyncio
+import os
+import tempfile
+import threading
+import unittest
+from agenttrace import MemoryBackend, SegmentLogBackend, SQLiteBackend, TraceManager, TracerEval
+from agenttrace.logstore import SegmentLog
+
+
+def trace_row(i, trace_type="COMPLETE", function_name="f", tags=None, args_hash=None):
+    return (f"id-{i}", f"session-{i % 3}", f"2025-01-01T00:00:{i:02d}", trace_type, function_name,
+            tags, "{}", 1.0, None, None, None, None, None, None, None, None, None, None, args_hash, None)
+
+
+class BackendContract:
+    """Behaviour every backend must share; mixed into one TestCase per backend."""
+
+    def make_backend(self, tmpdir):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.backend = self.make_backend(self.tmpdir.name)
+        self.backend.open()
+
+    def tearDown(self):
+        self.backend.close()
+        self.tmpdir.cleanup()
+
+    def test_filters_and_order(self):
+        """Trace queries filter by tag and session and return newest first."""
+        self.backend.write_traces([trace_row(i, tags='["even"]' if i % 2 == 0 else None) for i in range(10)])
+        rows = self.backend.query_traces(limit=3)
+        self.assertEqual([row[0] for row in rows], ["id-9", "id-8", "id-7"])
+        self.assertEqual(len(rows[0]), 7)
+        self.assertEqual({row[0] for row in self.backend.query_traces(tag="even", session_id="session-0")},
+                         {"id-0", "id-6"})
+        self.assertEqual([row[0] for row in self.backend.query_traces(since="2025-01-01T00:00:03",
+                                                                      until="2025-01-01T00:00:05")],
+                         ["id-4", "id-3"])
+
+    def test_rewrite_replaces_row(self):
+        """Writing a row with an existing ID replaces it."""
+        self.backend.write_traces([trace_row(1, "START")])
+        self.backend.write_traces([trace_row(1, "COMPLETE")])
+        [row] = self.backend.query_traces()
+        self.assertEqual(row[3], "COMPLETE")
+        self.assertEqual(self.backend.query_traces(trace_type="START"), [])
+
+    def test_find_by_args_hash(self):
+        """Lookups by argument hash return the newest matching call of the function."""
+        self.backend.write_traces([trace_row(1, args_hash="h1"), trace_row(2, args_hash="h2"), trace_row(3)])
+        self.assertEqual(self.backend.find_by_args_hash("f", "h2")[0], "id-2")
+        self.assertIsNone(self.backend.find_by_args_hash("g", "h2"))
+        self.backend.write_traces([trace_row(4, args_hash="h2")])
+        self.assertEqual(self.backend.find_by_args_hash("f", "h2")[0], "id-4")
+        self.assertIsNone(self.backend.find_by_args_hash("f", "missing"))
+
+    def test_sessions(self):
+        """Session summaries follow trace and evaluation writes."""
+        self.backend.write_traces([trace_row(i, tags='["a"]' if i == 1 else None) for i in range(6)])
+        self.backend.write_traces([trace_row(6, trace_type="START")])
+        completed = trace_row(6)
+        self.backend.write_traces([completed[:6] + ('{"error": {"type": "ValueError"}}', 4.0) + completed[8:]])
+        self.backend.write_eval_result(("eval-1", "n", "2025-01-01T00:01:00", 1, "session-1", "{}"))
+        self.backend.write_eval_result(("eval-1", "n", "2025-01-01T00:01:00", 1, "session-1", "{}"))
+
+        rows = self.backend.query_sessions()
+        self.assertEqual([row[0] for row in rows], ["session-1", "session-0", "session-2"])
+        sessions = {row[0]: row for row in rows}
+        self.assertEqual(sessions["session-0"],
+                         ("session-0", "2025-01-01T00:00:00", "2025-01-01T00:00:06", 3, 1, 6.0, "[]", "[]"))
+        self.assertEqual(sessions["session-1"],
+                         ("session-1", "2025-01-01T00:00:01", "2025-01-01T00:01:00", 2, 0, 2.0, '["a"]', '["eval-1"]'))
+        self.assertEqual([row[0] for row in self.backend.query_sessions(limit=1)], ["session-1"])
+        self.assertEqual([row[0] for row in self.backend.query_sessions(since="2025-01-01T00:00:06")],
+                         ["session-1", "session-0"])
+
+    def test_eval_rows(self):
+        """Evaluation events and results are stored and filtered."""
+        self.backend.write_eval_event(("e1", "eval-1", "s", "2025-01-01T00:00:01", "EVAL_START", "n", "{}"))
+        self.backend.write_eval_event(("e2", "eval-1", "s", "2025-01-01T00:00:02", "EVAL_END", "n", "{}"))
+        self.backend.write_eval_result(("eval-1", "n", "2025-01-01T00:00:02", 1, "s", '{"a": 1}'))
+        self.backend.write_eval_result(("eval-1", "n", "2025-01-01T00:00:02", 1, "s", '{"a": 2}'))
+        self.assertEqual([row[0] for row in self.backend.query_eval_events(eval_id="eval-1")], ["e2", "e1"])
+        self.assertEqual([row[0] for row in self.backend.query_eval_events(event_type="EVAL_START")], ["e1"])
+        [result] = self.backend.query_eval_results(name="n")
+        self.assertEqual(result[5], '{"a": 2}')
+
+    def test_duplicate_eval_event_ids_are_rejected(self):
+        """Writing an evaluation event ID twice raises and keeps the first event."""
+        event = ("e1", "eval-1", "s", "2025-01-01T00:00:01", "EVAL_START", "n", "{}")
+        self.backend.write_eval_event(event)
+        with self.assertRaises(Exception):
+            self.backend.write_eval_event(event[:4] + ("EVAL_END",) + event[5:])
+        self.assertEqual([row[4] for row in self.backend.query_eval_events(eval_id="eval-1")], ["EVAL_START"])
+
+    def test_unlimited_queries(self):
+        """A limit of None returns every row."""
+        self.backend.write_traces([trace_row(i) for i in range(5)])
+        self.assertEqual(len(self.backend.query_traces(limit=None)), 5)
+        self.assertEqual(len(self.backend.query_sessions(limit=None)), 3)
+
+    def test_trace_manager_round_trip(self):
+        """TraceManager and TracerEval read back what they wrote through the backend."""
+        tm = TraceManager(name=f"storage-{type(self.backend).__name__}", storage=self.backend, colored_logging=False)
+        try:
+            @tm.trace(tags=["stored"])
+            def step(x):
+                return x * 2
+
+            step(21)
+            tm.save_traces()
+            [trace] = tm.get_traces(function_name="step")
+            self.assertEqual(trace["type"], "COMPLETE")
+            self.assertEqual(trace["result"], 42)
+            self.assertEqual(trace["tags"], ["stored"])
+
+            evaluator = TracerEval(name="double", data=lambda: [{"input": 2}], task=lambda x: x * 2,
+                                   scores=[], tracer=tm)
+            asyncio.run(evaluator.run())
+            [result] = TracerEval.get_eval_results(name="double", tracer=tm)
+            self.assertEqual(result["eval_results"][0]["output"], 4)
+            self.assertEqual(len(TracerEval.get_eval_events(eval_id=result["id"], tracer=tm)), 3)
+        finally:
+            tm.close()
+
+
+class TestSQLiteBackend(BackendContract, unittest.TestCase):
+    """Run the backend contract against SQLite."""
+
+    def make_backend(self, tmpdir):
+        return SQLiteBackend(os.path.join(tmpdir, "traces.db"))
+
+
+    def test_flushes_from_another_thread(self):
+        """A database first written from one thread can be flushed and read from another."""
+        tm = TraceManager(name="storage-threads", storage=self.backend, colored_logging=False)
+        try:
+            @tm.trace
+            def step(x):
+                return x * 2
+
+            def worker():
+                step(1)
+                tm.save_traces()
+
+            thread = threading.Thread(target=worker)
+            thread.start()
+            thread.join()
+            step(2)
+            tm.save_traces()
+            self.assertEqual(sorted(t["result"] for t in tm.get_traces(function_name="step")), [2, 4])
+        finally:
+            tm.close()
+
+
+class TestMemoryBackend(BackendContract, unittest.TestCase):
+    """Run the backend contract against the in-memory backend."""
+
+    def make_backend(self, tmpdir):
+        return MemoryBackend()
+
+
+class TestSegmentLogBackend(BackendContract, unittest.TestCase):
+    """Run the backend contract against the segmented log."""
+
+    def make_backend(self, tmpdir):
+        return SegmentLogBackend(os.path.join(tmpdir, "log"), batch_rows=4)
+
+    def test_reopen_and_torn_tail(self):
+        """Reopening the log ignores a torn final batch and keeps appending."""
+        self.backend.write_traces([trace_row(i) for i in range(6)])
+        self.backend.close()
+        [segment] = [os.path.join(self.backend.traces.directory, name)
+                     for name in os.listdir(self.backend.traces.directory)]
+        with open(segment, "ab") as f:
+            f.write(b"ATLB\x00\x01partial")
+
+        self.backend = self.make_backend(self.tmpdir.name)
+        self.backend.open()
+        self.assertEqual(len(self.backend.query_traces(limit=None)), 6)
+        self.backend.write_traces([trace_row(6)])
+        self.assertEqual(self.backend.query_traces(limit=1)[0][0], "id-6")
+
+    def test_segments_roll_over_and_range_scan_skips_batches(self):
+        """Segments roll over by size and newest-first reads only decode the batches they need."""
+        log = SegmentLog(os.path.join(self.tmpdir.name, "rolled"), 2, segment_bytes=200, batch_rows=5)
+        log.open()
+        try:
+            for start in range(0, 50, 5):
+                log.append([trace_row(i) for i in range(start, start + 5)])
+            stats = log.stats()
+            self.assertEqual(stats["rows"], 50)
+            self.assertGreater(stats["segments"], 1)
+
+            reads = []
+            original = log._read
+            log._read = lambda batch, files: reads.append(batch) or original(batch, files)
+            rows = log.query(limit=3)
+            self.assertEqual([row[0] for row in rows], ["id-49", "id-48", "id-47"])
+            self.assertEqual(len(reads), 1)
+        finally:
+            log.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
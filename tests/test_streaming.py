@@ -0,0 +1,90 @@
+"""
+Tests for tracing of generators and streaming responses.
+"""
+
+import asyncio
+import time
+import unittest
+from agenttrace import TraceManager
+from agenttrace.histogram import LatencyHistogram
+
+
+class TestStreaming(unittest.TestCase):
+    """Test that traced streams are timed as they are consumed."""
+
+    def _latest(self, tm, function_name):
+        tm.save_traces()
+        return tm.get_traces(limit=1, function_name=function_name)[0]
+
+    def test_sync_generator(self):
+        """A traced generator records its END trace once exhausted."""
+        tm = TraceManager()
+
+        @tm.trace(session_id="stream-sync")
+        def stream_tokens(n):
+            for i in range(n):
+                time.sleep(0.01)
+                yield f"token{i}"
+
+        stream = stream_tokens(3)
+        time.sleep(0.02)
+        self.assertEqual(list(stream), ["token0", "token1", "token2"])
+        trace = self._latest(tm, "stream_tokens")
+        self.assertEqual(trace["type"], "COMPLETE")
+        streaming = trace["streaming"]
+        self.assertTrue(streaming["completed"])
+        self.assertEqual(streaming["chunk_count"], 3)
+        self.assertEqual(streaming["inter_chunk_ms"]["count"], 2)
+        self.assertGreaterEqual(streaming["time_to_first_chunk_ms"], 25)
+        self.assertGreaterEqual(trace["duration_ms"], streaming["time_to_first_chunk_ms"])
+
+    def test_async_generator(self):
+        """A traced async generator is wrapped and timed."""
+        tm = TraceManager()
+
+        @tm.trace(session_id="stream-async")
+        async def stream_async(n):
+            for i in range(n):
+                await asyncio.sleep(0)
+                yield i
+
+        async def consume():
+            return [chunk async for chunk in stream_async(4)]
+
+        self.assertEqual(asyncio.run(consume()), [0, 1, 2, 3])
+        streaming = self._latest(tm, "stream_async")["streaming"]
+        self.assertEqual(streaming["chunk_count"], 4)
+        self.assertTrue(streaming["completed"])
+
+    def test_closed_early(self):
+        """Closing a stream early records it as incomplete."""
+        tm = TraceManager()
+
+        @tm.trace(session_id="stream-closed")
+        def endless():
+            while True:
+                yield 1
+
+        stream = endless()
+        next(stream)
+        stream.close()
+        streaming = self._latest(tm, "endless")["streaming"]
+        self.assertFalse(streaming["completed"])
+        self.assertEqual(streaming["chunk_count"], 1)
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    """Test the fixed-memory percentile estimator."""
+
+    def test_percentiles(self):
+        """Percentile estimates stay within the histogram bucket error."""
+        hist = LatencyHistogram()
+        for value in range(1, 1001):
+            hist.record(float(value))
+        self.assertAlmostEqual(hist.percentile(50), 500, delta=500 * 0.05)
+        self.assertAlmostEqual(hist.percentile(99), 990, delta=990 * 0.05)
+        self.assertEqual(hist.summary()["max"], 1000)
+
+
+if __name__ == '__main__':
+    unittest.main()
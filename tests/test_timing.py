@@ -0,0 +1,156 @@
+"""
+Tests for per-call CPU, running, suspended and memory measurements.
+"""
+
+import asyncio
+import gc
+import sqlite3
+import threading
+import time
+import tracemalloc
+import unittest
+from agenttrace.timing import MemoryPeaks, memory_peaks
+from helpers import TracerTestCase
+
+
+def burn(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class TestTiming(TracerTestCase):
+    """Test the timing fields recorded for traced calls."""
+
+    tracer_name = "timing"
+    tracer_options = {"trace_memory": MemoryPeaks.supported}
+
+    def tearDown(self):
+        super().tearDown()
+        tracemalloc.stop()
+
+    def test_sync_cpu_versus_waiting(self):
+        """CPU-bound calls record thread CPU time that sleeping calls do not."""
+        @self.tm.trace
+        def compute():
+            burn(0.05)
+
+        @self.tm.trace
+        def wait():
+            time.sleep(0.05)
+
+        compute()
+        wait()
+        computed = self.stored("compute")
+        waited = self.stored("wait")
+        self.assertGreaterEqual(computed["duration_ms"], 50)
+        self.assertGreater(computed["timing"]["thread_cpu_ms"], 25)
+        self.assertGreaterEqual(waited["duration_ms"], 50)
+        self.assertLess(waited["timing"]["thread_cpu_ms"], 25)
+        self.assertNotIn("running_ms", computed["timing"])
+
+    def test_async_running_versus_suspended(self):
+        """Coroutines split their duration into running and suspended time."""
+        @self.tm.trace
+        async def step():
+            burn(0.04)
+            await asyncio.sleep(0.06)
+            burn(0.02)
+
+        async def other():
+            await asyncio.sleep(0.01)
+            burn(0.03)
+
+        async def main():
+            await asyncio.gather(step(), other())
+
+        asyncio.run(main())
+        timing = self.stored("step")["timing"]
+        self.assertAlmostEqual(timing["running_ms"], 60, delta=20)
+        self.assertGreaterEqual(timing["suspended_ms"], 50)
+        # CPU burnt by the other task while this one was suspended is not counted.
+        self.assertLess(timing["thread_cpu_ms"], 80)
+
+    def test_failed_call_is_timed(self):
+        """Calls that raise are still timed."""
+        @self.tm.trace
+        def broken():
+            burn(0.01)
+            raise RuntimeError("boom")
+
+        with self.assertRaises(RuntimeError):
+            broken()
+        row = self.stored("broken")
+        self.assertGreaterEqual(row["duration_ms"], 10)
+        self.assertIn("cpu_ms", row["timing"])
+
+    @unittest.skipUnless(MemoryPeaks.supported, "requires tracemalloc.reset_peak")
+    def test_memory_peak_of_nested_calls(self):
+        """Nested calls each record the peak allocation reached while they ran."""
+        @self.tm.trace
+        def inner():
+            return len(bytearray(4_000_000))
+
+        @self.tm.trace
+        def outer():
+            block = bytearray(8_000_000)
+            inner()
+            return len(block)
+
+        outer()
+        self.assertGreaterEqual(self.stored("outer")["timing"]["memory_peak_bytes"], 12_000_000)
+        self.assertAlmostEqual(self.stored("inner")["timing"]["memory_peak_bytes"], 4_000_000, delta=500_000)
+        self.assertEqual(memory_peaks._open, {})
+
+    def test_stream_finished_on_another_thread(self):
+        """A stream consumed on another thread records no thread CPU time."""
+        @self.tm.trace
+        def chunks():
+            yield from range(3)
+
+        stream = chunks()
+        consumer = threading.Thread(target=lambda: list(stream))
+        consumer.start()
+        consumer.join()
+        timing = self.stored("chunks")["timing"]
+        self.assertIn("cpu_ms", timing)
+        self.assertNotIn("thread_cpu_ms", timing)
+
+    @unittest.skipUnless(MemoryPeaks.supported, "requires tracemalloc.reset_peak")
+    def test_unfinished_streams_release_memory_tracking(self):
+        """Streams that are closed or dropped before they are exhausted stop measuring memory."""
+        @self.tm.trace
+        def chunks():
+            yield from range(3)
+
+        closed = chunks()
+        next(closed)
+        closed.close()
+        dropped = chunks()
+        next(dropped)
+        self.assertEqual(len(memory_peaks._open), 1)
+        del dropped
+        gc.collect()
+        self.assertEqual(memory_peaks._open, {})
+
+    def test_numeric_columns(self):
+        """Timing measurements are stored in their own columns."""
+        @self.tm.trace
+        def compute():
+            burn(0.01)
+
+        compute()
+        self.tm.save_traces()
+        conn = sqlite3.connect(self.db_path)
+        try:
+            cpu_ms, thread_cpu_ms, running_ms = conn.execute(
+                "SELECT cpu_ms, thread_cpu_ms, running_ms FROM traces WHERE function_name = 'compute'").fetchone()
+        finally:
+            conn.close()
+        self.assertGreater(cpu_ms, 0)
+        self.assertGreater(thread_cpu_ms, 0)
+        self.assertIsNone(running_ms)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+"""
+Tests for named TraceManager instances with separate stores.
+"""
+
+import asyncio
+import os
+import tempfile
+import unittest
+from agenttrace import TraceManager, TracerEval, trace
+
+
+class TestNamedTracers(unittest.TestCase):
+    """Test named TraceManager instances."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.tenant_a = TraceManager(name="tenant-a", db_path=os.path.join(self.tmpdir.name, "a.db"),
+                                     colored_logging=False)
+        self.tenant_b = TraceManager(name="tenant-b", db_path=os.path.join(self.tmpdir.name, "b.db"),
+                                     colored_logging=False)
+
+    def tearDown(self):
+        self.tenant_a.close()
+        self.tenant_b.close()
+        self.tmpdir.cleanup()
+
+    def test_instances_are_independent(self):
+        """Named tracers are distinct instances that write to their own databases."""
+        self.assertIs(TraceManager(name="tenant-a"), self.tenant_a)
+        self.assertIs(TraceManager.get("tenant-b"), self.tenant_b)
+        self.assertIsNot(self.tenant_a, TraceManager())
+        self.assertIs(TraceManager.get(), TraceManager())
+        with self.assertRaises(KeyError):
+            TraceManager.get("missing")
+
+        @trace(tracer=self.tenant_a, tags=["a"])
+        def handle_a(x):
+            return x + 1
+
+        @trace(tracer="tenant-b")
+        def handle_b(x):
+            return x * 2
+
+        self.assertEqual(handle_a(1), 2)
+        self.assertEqual(handle_b(2), 4)
+        self.tenant_a.save_traces()
+        self.tenant_b.save_traces()
+        self.assertEqual([t["function"] for t in self.tenant_a.get_traces()], ["handle_a"])
+        self.assertEqual([t["function"] for t in self.tenant_b.get_traces()], ["handle_b"])
+
+    def test_eval_writes_to_chosen_tracer(self):
+        """An evaluation given a tracer name stores its results there."""
+        def exact(output):
+            return {"score": 1.0}
+
+        evaluator = TracerEval(name="tenant_eval", data=lambda: [{"input": "q"}], task=lambda q: q.upper(),
+                               scores=[exact], tracer="tenant-a")
+        asyncio.run(evaluator.run())
+        results = TracerEval.get_eval_results(name="tenant_eval", tracer=self.tenant_a)
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]["eval_results"][0]["output"], "Q")
+        self.assertEqual(TracerEval.get_eval_results(name="tenant_eval", tracer=self.tenant_b), [])
+
+    def test_close_unregisters(self):
+        """Closing a named tracer lets the name be created again."""
+        self.tenant_b.close()
+        with self.assertRaises(KeyError):
+            TraceManager.get("tenant-b")
+        fresh = TraceManager(name="tenant-b", db_path=self.tenant_b.db_path)
+        self.assertIsNot(fresh, self.tenant_b)
+        fresh.close()
+
+    def test_conflicting_db_path_is_reported(self):
+        """Reusing a name with a different database path logs a warning."""
+        with self.assertLogs(level="WARNING"):
+            TraceManager(name="tenant-a", db_path="elsewhere.db")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+"""
+Tests for token usage extraction and aggregation.
+"""
+
+import unittest
+import uuid
+from types import SimpleNamespace
+from agenttrace import TraceManager
+from agenttrace.usage import extract_llm_usage
+
+
+def openai_response(prompt, completion, cached=0):
+    return SimpleNamespace(
+        model="gpt-4o",
+        usage=SimpleNamespace(prompt_tokens=prompt, completion_tokens=completion,
+                              total_tokens=prompt + completion,
+                              prompt_tokens_details=SimpleNamespace(cached_tokens=cached)),
+    )
+
+
+class TestUsageExtraction(unittest.TestCase):
+    """Test the default OpenAI/Anthropic usage extractor."""
+
+    def test_openai(self):
+        """OpenAI usage blocks, including cached prompt tokens, are extracted."""
+        self.assertEqual(extract_llm_usage(openai_response(10, 5, cached=4)), {
+            "model": "gpt-4o", "prompt_tokens": 10, "completion_tokens": 5, "cached_tokens": 4, "total_tokens": 15,
+        })
+
+    def test_anthropic_dict(self):
+        """Anthropic cache reads count towards prompt and cached tokens."""
+        response = {"model": "claude", "usage": {"input_tokens": 7, "output_tokens": 3, "cache_read_input_tokens": 20}}
+        usage = extract_llm_usage(response)
+        self.assertEqual(usage["prompt_tokens"], 27)
+        self.assertEqual(usage["cached_tokens"], 20)
+        self.assertEqual(usage["total_tokens"], 30)
+
+    def test_unrecognised(self):
+        """Responses without a usage block yield None."""
+        self.assertIsNone(extract_llm_usage("plain text"))
+
+
+class TestTokenUsageQuery(unittest.TestCase):
+    """Test that usage lands in numeric columns and can be aggregated."""
+
+    def test_group_by_function_and_tag(self):
+        """Token usage can be summed per function or per tag."""
+        tm = TraceManager()
+        session_id = f"usage-{uuid.uuid4()}"
+
+        @tm.trace(tags=["usage-test"], session_id=session_id)
+        def chat(prompt):
+            return openai_response(100, 50)
+
+        chat("hi")
+        chat("there")
+        tm.save_traces()
+
+        by_function = tm.get_token_usage(group_by="function", function_name="chat", session_id=session_id)
+        self.assertEqual(by_function[0]["calls"], 2)
+        self.assertEqual(by_function[0]["completion_tokens"], 100)
+        self.assertEqual(by_function[0]["total_tokens"], 300)
+
+        by_tag = tm.get_token_usage(group_by="tag", session_id=session_id)
+        self.assertEqual([row["tag"] for row in by_tag], ["usage-test"])
+
+        with self.assertRaises(ValueError):
+            tm.get_token_usage(group_by="nope")
+
+
+if __name__ == '__main__':
+    unittest.main()
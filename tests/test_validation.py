@@ -0,0 +1,93 @@
+"""
+Tests for compiled tool output schema validation.
+"""
+
+import unittest
+from agenttrace import TraceManager
+from agenttrace.validation import compile_schema, validate, validate_many
+
+SCHEMA = {
+    "type": "object",
+    "required": ["country", "cities"],
+    "properties": {
+        "country": {"type": "string"},
+        "continent": {"enum": ["Europe", "Asia"]},
+        "cities": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "required": ["name"],
+                "properties": {
+                    "name": {"type": "string"},
+                    "population": {"anyOf": [{"type": "integer"}, {"type": "null"}]},
+                },
+                "additionalProperties": False,
+            },
+        },
+    },
+}
+
+
+class TestValidation(unittest.TestCase):
+    """Test the compiled schema validator."""
+
+    def test_valid_output(self):
+        """A conforming output passes with no errors."""
+        output = {"country": "France", "continent": "Europe",
+                  "cities": [{"name": "Paris", "population": 2100000}, {"name": "Lyon", "population": None}]}
+        self.assertEqual(validate(output, SCHEMA), {"success": True, "errors": []})
+
+    def test_collects_all_errors(self):
+        """Nested violations are all reported, not just the first."""
+        output = '{"country": 1, "continent": "Mars", "cities": [{"population": "many", "mayor": "x"}]}'
+        result = validate(output, SCHEMA)
+        self.assertFalse(result["success"])
+        self.assertEqual(result["errors"], [
+            "Field country should be a string",
+            "Field continent should be one of: \"Europe\", \"Asia\"",
+            "Missing required field: cities[0].name",
+            "Field cities[0].population does not match any of the allowed schemas",
+            "Unexpected field: cities[0].mayor",
+        ])
+
+    def test_invalid_json(self):
+        """Unparseable string outputs are rejected."""
+        self.assertEqual(validate("{nope", SCHEMA)["errors"], ["Output is not valid JSON"])
+
+    def test_compiled_once(self):
+        """Equal schemas share one cached validator."""
+        self.assertIs(compile_schema(SCHEMA), compile_schema(dict(SCHEMA)))
+
+    def test_malformed_schema_is_reported(self):
+        """Schemas that fail to compile give an error result instead of raising."""
+        for schema in ({"properties": {"name": "string"}}, {"type": "string", "pattern": "("}):
+            result = validate("x" if "pattern" in schema else {"name": "x"}, schema)
+            self.assertFalse(result["success"])
+            self.assertEqual(len(result["errors"]), 1)
+            self.assertTrue(result["errors"][0].startswith("Error evaluating tool output"))
+
+    def test_mutated_schema_is_recompiled(self):
+        """Editing a schema in place changes how outputs are validated."""
+        schema = {"type": "object", "properties": {"n": {"type": "string"}}}
+        self.assertFalse(validate({"n": 1}, schema)["success"])
+        schema["properties"]["n"]["type"] = "integer"
+        self.assertEqual(validate({"n": 1}, schema), {"success": True, "errors": []})
+
+    def test_integer_follows_json_schema(self):
+        """Whole-number floats are integers and booleans are not."""
+        schema = {"type": "integer"}
+        self.assertTrue(validate(3.0, schema)["success"])
+        self.assertFalse(validate(3.5, schema)["success"])
+        self.assertEqual(validate(True, schema)["errors"], ["Output should be an integer"])
+        self.assertFalse(validate(False, {"type": "number"})["success"])
+
+    def test_batch(self):
+        """Batch validation returns one result per output."""
+        results = validate_many([{"country": "x", "cities": []}, {}], SCHEMA)
+        self.assertEqual([r["success"] for r in results], [True, False])
+        tm = TraceManager()
+        self.assertEqual(tm.evaluate_tool_outputs([{"country": "x", "cities": []}], SCHEMA), results[:1])
+
+
+if __name__ == '__main__':
+    unittest.main()